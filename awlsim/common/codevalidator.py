@@ -26,6 +26,7 @@ from awlsim.common.compat import *
 from awlsim.common.util import *
 from awlsim.common.exceptions import *
 from awlsim.common.monotonic import * #+cimport
+from awlsim.common.net import *
 
 from awlsim.coreclient.client import *
 
@@ -85,9 +86,11 @@ class AwlValidator(object):
 						  setClientSide=False,
 						  setServerSide=True)
 			self.__client.spawnServer(listenHost = "localhost",
-						  listenPort = self._PORT_RANGE)
+						  listenPort = self._PORT_RANGE,
+						  listenFamily = AF_UNIX)
 			self.__client.connectToServer(host = "localhost",
-						      port = self.__client.serverProcessPort)
+						      port = self.__client.serverProcessPort,
+						      family = self.__client.serverProcessFamily)
 			self.__client.setLoglevel(Logging.LOG_NONE,
 						  setClientSide=False,
 						  setServerSide=True)
@@ -44,9 +44,20 @@ class S7CPUConfig(object):
 		"clockMemByte",
 		"cycleTimeLimitUs",
 		"cycleTimeTargetUs",
+		"cycleTimeSchedMode",
 		"runTimeLimitUs",
+		"virtTimeEn",
+		"virtTimeCycleStepUs",
+		"virtTimeInsnStepNs",
+		"insnTraceDepth",
 		"extInsnsEn",
 		"obStartinfoEn",
+		"cyclicIntPeriodsMs",
+		"cyclicIntPhasesMs",
+		"retentiveFlagBytes",
+		"retentiveTimers",
+		"retentiveCounters",
+		"retentiveDBs",
 	)
 
 	# Mnemonic identifiers
@@ -57,23 +68,71 @@ class S7CPUConfig(object):
 	MNEMONICS_DE			= EnumGen.item
 	EnumGen.end
 
+	# Cycle time scheduler modes
+	# Note: These numbers are .awlpro file ABI.
+	EnumGen.start
+	CYCLESCHED_FILTER		= EnumGen.item # Filtered relative padding
+	CYCLESCHED_DEADLINE		= EnumGen.item # Absolute cycle start deadlines
+	EnumGen.end
+
 	DEFAULT_MNEMONICS		= MNEMONICS_AUTO
 	DEFAULT_CLOCKMEM		= -1
 	DEFAULT_CYCLETIMELIMIT_US	= 1 * 1000 * 1000
 	DEFAULT_CYCLETIMETARGET_US	= 0
+	DEFAULT_CYCLESCHED_MODE		= CYCLESCHED_FILTER
 	DEFAULT_RUNTIMELIMIT_US		= -1
+	DEFAULT_VIRTTIME_EN		= False
+	DEFAULT_VIRTTIME_CYCLESTEP_US	= 0
+	DEFAULT_VIRTTIME_INSNSTEP_NS	= 1000
+	DEFAULT_INSNTRACE_DEPTH		= 0
+	MAX_INSNTRACE_DEPTH		= 0x10000
 	DEFAULT_EXTINSNS_EN		= False
 	DEFAULT_OBSTARTINFO_EN		= False
 
+	# Cyclic interrupt OBs and their default periods (in milliseconds).
+	# The cyclic interrupts are disabled (period 0),
+	# unless the project configures them.
+	CYCLIC_INT_OBS			= tuple(range(30, 39))
+	DEFAULT_CYCLIC_INT_PERIODS_MS	= {
+		30 : 0,
+		31 : 0,
+		32 : 0,
+		33 : 0,
+		34 : 0,
+		35 : 0,
+		36 : 0,
+		37 : 0,
+		38 : 0,
+	}
+	MAX_CYCLIC_INT_PERIOD_MS	= 60000
+
+	DEFAULT_RETENTIVE_FLAGBYTES	= 0
+	DEFAULT_RETENTIVE_TIMERS	= 0
+	DEFAULT_RETENTIVE_COUNTERS	= 0
+
 	def __init__(self, cpu=None):
 		self.cpu = None
 		self.setConfiguredMnemonics(self.DEFAULT_MNEMONICS)
 		self.setClockMemByte(self.DEFAULT_CLOCKMEM)
 		self.setCycleTimeLimitUs(self.DEFAULT_CYCLETIMELIMIT_US)
 		self.setCycleTimeTargetUs(self.DEFAULT_CYCLETIMETARGET_US)
+		self.setCycleTimeSchedMode(self.DEFAULT_CYCLESCHED_MODE)
 		self.setRunTimeLimitUs(self.DEFAULT_RUNTIMELIMIT_US)
+		self.setVirtTimeEn(self.DEFAULT_VIRTTIME_EN)
+		self.setVirtTimeCycleStepUs(self.DEFAULT_VIRTTIME_CYCLESTEP_US)
+		self.setVirtTimeInsnStepNs(self.DEFAULT_VIRTTIME_INSNSTEP_NS)
+		self.setInsnTraceDepth(self.DEFAULT_INSNTRACE_DEPTH)
 		self.setExtInsnsEn(self.DEFAULT_EXTINSNS_EN)
 		self.setOBStartinfoEn(self.DEFAULT_OBSTARTINFO_EN)
+		self.cyclicIntPeriodsMs = {}
+		self.cyclicIntPhasesMs = {}
+		for obNumber in self.CYCLIC_INT_OBS:
+			self.setCyclicInt(obNumber,
+					  self.DEFAULT_CYCLIC_INT_PERIODS_MS[obNumber], 0)
+		self.setRetentive(self.DEFAULT_RETENTIVE_FLAGBYTES,
+				  self.DEFAULT_RETENTIVE_TIMERS,
+				  self.DEFAULT_RETENTIVE_COUNTERS,
+				  ())
 		self.cpu = cpu
 
 	def assignFrom(self, otherCpuConfig):
@@ -81,9 +140,22 @@ class S7CPUConfig(object):
 		self.setClockMemByte(otherCpuConfig.clockMemByte)
 		self.setCycleTimeLimitUs(otherCpuConfig.cycleTimeLimitUs)
 		self.setCycleTimeTargetUs(otherCpuConfig.cycleTimeTargetUs)
+		self.setCycleTimeSchedMode(otherCpuConfig.cycleTimeSchedMode)
 		self.setRunTimeLimitUs(otherCpuConfig.runTimeLimitUs)
+		self.setVirtTimeEn(otherCpuConfig.virtTimeEn)
+		self.setVirtTimeCycleStepUs(otherCpuConfig.virtTimeCycleStepUs)
+		self.setVirtTimeInsnStepNs(otherCpuConfig.virtTimeInsnStepNs)
+		self.setInsnTraceDepth(otherCpuConfig.insnTraceDepth)
 		self.setExtInsnsEn(otherCpuConfig.extInsnsEn)
 		self.setOBStartinfoEn(otherCpuConfig.obStartinfoEn)
+		for obNumber in self.CYCLIC_INT_OBS:
+			self.setCyclicInt(obNumber,
+					  otherCpuConfig.getCyclicIntPeriodMs(obNumber),
+					  otherCpuConfig.getCyclicIntPhaseMs(obNumber))
+		self.setRetentive(otherCpuConfig.retentiveFlagBytes,
+				  otherCpuConfig.retentiveTimers,
+				  otherCpuConfig.retentiveCounters,
+				  otherCpuConfig.retentiveDBs)
 
 	def __copy__(self):
 		new = self.__class__()
@@ -130,6 +202,15 @@ class S7CPUConfig(object):
 			seconds = float(microseconds) / 1000000.0
 			self.cpu.setCycleTimeTarget(seconds)
 
+	def setCycleTimeSchedMode(self, mode):
+		if mode not in (self.CYCLESCHED_FILTER,
+				self.CYCLESCHED_DEADLINE):
+			raise AwlSimError("Invalid cycle time scheduler mode: %d" % mode) #@nocov
+		self.cycleTimeSchedMode = mode
+		if self.cpu:
+			self.cpu.enableCycleTimeDeadline(
+				mode == self.CYCLESCHED_DEADLINE)
+
 	def setRunTimeLimitUs(self, microseconds):
 		self.runTimeLimitUs = clamp(microseconds, -1, 0x7FFFFFFF)
 		if self.cpu:
@@ -138,6 +219,36 @@ class S7CPUConfig(object):
 				seconds = float(microseconds) / 1000000.0
 			self.cpu.setRunTimeLimit(seconds)
 
+	def setVirtTimeEn(self, virtTimeEnabled):
+		self.virtTimeEn = virtTimeEnabled
+		self.__updateVirtTime()
+
+	def setVirtTimeCycleStepUs(self, microseconds):
+		self.virtTimeCycleStepUs = clamp(microseconds, 0, 0x7FFFFFFF)
+		self.__updateVirtTime()
+
+	def setVirtTimeInsnStepNs(self, nanoseconds):
+		self.virtTimeInsnStepNs = clamp(nanoseconds, 0, 0x7FFFFFFF)
+		self.__updateVirtTime()
+
+	def __updateVirtTime(self):
+		if self.cpu:
+			self.cpu.setVirtualTime(
+				self.virtTimeEn,
+				float(self.virtTimeCycleStepUs) / 1000000.0,
+				float(self.virtTimeInsnStepNs) / 1000000000.0)
+
+	def setInsnTraceDepth(self, depth):
+		"""Set the number of instructions kept by the
+		instruction trace recorder. 0 disables the recorder.
+		"""
+		self.insnTraceDepth = clamp(depth, 0, self.MAX_INSNTRACE_DEPTH)
+		if self.cpu:
+			if self.insnTraceDepth > 0:
+				self.cpu.setupInsnTrace(True, self.insnTraceDepth)
+			else:
+				self.cpu.setupInsnTrace(False)
+
 	def setExtInsnsEn(self, extInsnsEnabled):
 		self.extInsnsEn = extInsnsEnabled
 		if self.cpu:
@@ -147,3 +258,51 @@ class S7CPUConfig(object):
 		self.obStartinfoEn = obStartinfoEnabled
 		if self.cpu:
 			self.cpu.enableObTempPresets(obStartinfoEnabled)
+
+	def setCyclicInt(self, obNumber, periodMs, phaseMs=0):
+		"""Set the period and the phase offset (in milliseconds)
+		of the cyclic interrupt OB 'obNumber'.
+		A period of 0 disables the cyclic interrupt.
+		"""
+		if obNumber not in self.CYCLIC_INT_OBS:
+			raise AwlSimError("Invalid cyclic interrupt OB %d. "
+				"Valid OBs are OB 30 - OB 38." % obNumber)
+		periodMs = clamp(periodMs, 0, self.MAX_CYCLIC_INT_PERIOD_MS)
+		phaseMs = clamp(phaseMs, 0, max(periodMs - 1, 0))
+		self.cyclicIntPeriodsMs[obNumber] = periodMs
+		self.cyclicIntPhasesMs[obNumber] = phaseMs
+		if self.cpu:
+			self.cpu.setCyclicInterrupt(obNumber,
+						    float(periodMs) / 1000.0,
+						    float(phaseMs) / 1000.0)
+
+	def getCyclicIntPeriodMs(self, obNumber):
+		return self.cyclicIntPeriodsMs[obNumber]
+
+	def getCyclicIntPhaseMs(self, obNumber):
+		return self.cyclicIntPhasesMs[obNumber]
+
+	def setRetentive(self, flagBytes, timers, counters, dbNumbers):
+		"""Set the retentive memory areas.
+		'flagBytes' is the number of retentive flag bytes starting at MB 0.
+		'timers' and 'counters' are the numbers of retentive
+		timers and counters starting at T 0 and Z 0.
+		'dbNumbers' is an iterable of the retentive DB numbers.
+		This takes effect on the next startup.
+		"""
+		self.retentiveFlagBytes = clamp(flagBytes, 0, 0x7FFFFFFF)
+		self.retentiveTimers = clamp(timers, 0, 0xFFFF)
+		self.retentiveCounters = clamp(counters, 0, 0xFFFF)
+		dbNumbers = set(dbNumbers)
+		for dbNumber in dbNumbers:
+			if not (1 <= dbNumber <= 0xFFFF):
+				raise AwlSimError("Invalid retentive DB %d." % dbNumber)
+		self.retentiveDBs = tuple(sorted(dbNumbers))
+
+	def hasRetentive(self):
+		"""Returns True, if any retentive memory area is configured.
+		"""
+		return bool(self.retentiveFlagBytes or
+			    self.retentiveTimers or
+			    self.retentiveCounters or
+			    self.retentiveDBs)
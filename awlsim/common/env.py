@@ -82,7 +82,9 @@ class AwlSimEnv(object):
 		return cls.__getVar("GUI", "auto").lower()
 
 	@classmethod
-	def __getCpuCount(cls):
+	def getCpuCount(cls):
+		"""Get the number of host CPUs.
+		"""
 		try:
 			import multiprocessing
 			return multiprocessing.cpu_count()
@@ -101,7 +103,7 @@ class AwlSimEnv(object):
 			for cpuIndex in affinityStr.split(","):
 				cpuIndex = int(cpuIndex)
 				if cpuIndex < 0:
-					cpuIndex = cls.__getCpuCount() + cpuIndex
+					cpuIndex = cls.getCpuCount() + cpuIndex
 				if cpuIndex < 0:
 					cpuIndex = 0
 				affinity.append(cpuIndex)
@@ -133,15 +135,15 @@ class AwlSimEnv(object):
 		if schedStr == cls.SCHED_NORMAL or schedStr == "other":
 			return cls.SCHED_NORMAL
 		if schedStr == cls.SCHED_FIFO or schedStr == "realtime":
-			if cls.__getCpuCount() <= 1 and ifMulticore:
+			if cls.getCpuCount() <= 1 and ifMulticore:
 				return cls.SCHED_NORMAL
 			return cls.SCHED_FIFO
 		if schedStr == cls.SCHED_RR:
-			if cls.__getCpuCount() <= 1 and ifMulticore:
+			if cls.getCpuCount() <= 1 and ifMulticore:
 				return cls.SCHED_NORMAL
 			return cls.SCHED_RR
 		if schedStr == cls.SCHED_DEADLINE:
-			if cls.__getCpuCount() <= 1 and ifMulticore:
+			if cls.getCpuCount() <= 1 and ifMulticore:
 				return cls.SCHED_NORMAL
 			return cls.SCHED_DEADLINE
 		return None
@@ -63,6 +63,7 @@ class AwlSimError(Exception):
 		self.elemUUID = elemUUID
 
 		self.failingInsnStr = None
+		self.insnTraceStr = None
 		self.seenByUser = False
 		self.reportOnly = False
 
@@ -196,6 +197,12 @@ class AwlSimError(Exception):
 				return str(curInsn)
 		return errorStr
 
+	def setInsnTraceStr(self, string):
+		self.insnTraceStr = string
+
+	def getInsnTraceStr(self):
+		return self.insnTraceStr
+
 	def doGetReport(self, title, verbose=True):
 		ret = [ "%s:\n\n" % title ]
 
@@ -244,6 +251,9 @@ class AwlSimError(Exception):
 			cpu = self.getCpu()
 			if cpu:
 				ret.append("\n%s\n" % str(cpu))
+			# Append the instruction trace, if available.
+			if self.insnTraceStr:
+				ret.append("\n%s" % self.insnTraceStr)
 
 		return "".join(ret)
 
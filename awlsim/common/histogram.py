@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Log-linear histogram
+#
+# Copyright 2018 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.exceptions import *
+
+#from cpython.mem cimport PyMem_Malloc, PyMem_Free #@cy
+
+#cimport cython #@cy
+
+
+__all__ = [
+	"Histogram",
+]
+
+
+# Number of bits of the linear sub-bucket part.
+HIST_SUB_BITS	= 5
+HIST_SUB_COUNT	= 1 << HIST_SUB_BITS
+HIST_SUB_HALF	= HIST_SUB_COUNT // 2
+# Maximum value that can be recorded (32 bit).
+HIST_MAX_VALUE	= 0xFFFFFFFF
+# Number of buckets needed to cover 0 - HIST_MAX_VALUE.
+HIST_NR_BUCKETS	= ((32 - HIST_SUB_BITS + 1) * HIST_SUB_HALF) + HIST_SUB_HALF
+
+
+class Histogram(object): #+cdef
+	"""HDR-style log-linear histogram of unsigned 32 bit integer values.
+	Values smaller than 32 are counted exactly.
+	Bigger values are counted with a relative precision of 1/16.
+	Recording is O(1) and the memory usage is constant.
+	"""
+
+	__slots__ = (
+		"__counts",
+		"count",
+		"sum",
+		"minValue",
+		"maxValue",
+	)
+
+	# Percentiles reported by summary().
+	PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+	def __init__(self):
+		self.__counts = [0] * HIST_NR_BUCKETS #@nocy
+#@cy		self.__counts = <uint64_t *>PyMem_Malloc(HIST_NR_BUCKETS * sizeof(uint64_t))
+#@cy		if not self.__counts:
+#@cy			raise AwlSimError("Histogram: Out of memory")
+		self.reset()
+
+#@cy	def __dealloc__(self):
+#@cy		PyMem_Free(self.__counts)
+#@cy		self.__counts = NULL
+
+	def reset(self): #@nocy
+#@cy	cdef void reset(self):
+#@cy		cdef uint32_t i
+
+		for i in range(HIST_NR_BUCKETS):
+			self.__counts[i] = 0
+		self.count = 0
+		self.sum = 0
+		self.minValue = HIST_MAX_VALUE
+		self.maxValue = 0
+
+	def __bucketIndex(self, value): #@nocy
+#@cy	cdef uint32_t __bucketIndex(self, uint32_t value):
+#@cy		cdef uint32_t exp
+#@cy		cdef uint32_t tmp
+
+		if value < HIST_SUB_COUNT:
+			return value
+		# Get the exponent of the value, relative to the sub-buckets.
+		exp = 0
+		tmp = value >> HIST_SUB_BITS
+		while tmp:
+			exp += 1
+			tmp >>= 1
+		return (exp * HIST_SUB_HALF) + (value >> exp)
+
+	def __bucketHighestValue(self, index): #@nocy
+#@cy	cdef uint64_t __bucketHighestValue(self, uint32_t index):
+#@cy		cdef uint32_t exp
+#@cy		cdef uint64_t sub
+
+		if index < HIST_SUB_COUNT:
+			return index
+		exp = (index // HIST_SUB_HALF) - 1
+		sub = index - (exp * HIST_SUB_HALF)
+		return ((sub + 1) << exp) - 1
+
+	def record(self, value): #@nocy
+#@cy	cdef void record(self, int64_t value):
+		"""Add a value to the histogram.
+		Values out of the 32 bit range are clamped.
+		"""
+		if value < 0:
+			value = 0
+		elif value > HIST_MAX_VALUE:
+			value = HIST_MAX_VALUE
+		self.__counts[self.__bucketIndex(value)] += 1
+		self.count += 1
+		self.sum += value
+		if value < self.minValue:
+			self.minValue = value
+		if value > self.maxValue:
+			self.maxValue = value
+
+	def percentile(self, percent):
+		"""Get the value below or equal to which 'percent' percent
+		of all recorded values are.
+		Returns 0, if there are no recorded values.
+		"""
+#@cy		cdef uint64_t threshold
+#@cy		cdef uint64_t cumulated
+#@cy		cdef uint32_t i
+
+		if self.count <= 0:
+			return 0
+		# Calculate the rank in integer arithmetic with
+		# a resolution of 0.001 percent to avoid rounding issues.
+		percent = min(max(percent, 0.0), 100.0)
+		threshold = max((self.count * int(round(percent * 1000.0)) + 99999) // 100000, 1)
+		cumulated = 0
+		for i in range(HIST_NR_BUCKETS):
+			cumulated += self.__counts[i]
+			if cumulated >= threshold:
+				return min(max(self.__bucketHighestValue(i),
+					       self.minValue),
+					   self.maxValue)
+		return self.maxValue #@nocov
+
+	def cumulativeCounts(self, limits):
+		"""Get the number of recorded values that are
+		less than or equal to each of the ascending 'limits'.
+		Values are only counted, if their whole bucket is below the limit.
+		Returns a list with one count per limit.
+		"""
+#@cy		cdef uint64_t cumulated
+#@cy		cdef uint32_t i
+
+		ret = []
+		cumulated = 0
+		i = 0
+		for limit in limits:
+			while i < HIST_NR_BUCKETS and\
+			      self.__bucketHighestValue(i) <= limit:
+				cumulated += self.__counts[i]
+				i += 1
+			ret.append(cumulated)
+		return ret
+
+	def summary(self):
+		"""Get a tuple of the recorded values count,
+		the PERCENTILES values and the maximum value.
+		"""
+		return tuple([ self.count, ] +
+			     [ self.percentile(p) for p in self.PERCENTILES ] +
+			     [ self.maxValue if self.count else 0, ])
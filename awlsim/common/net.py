@@ -27,12 +27,14 @@ from awlsim.common.util import *
 from awlsim.common.exceptions import *
 import socket
 import os
+import tempfile
 
 
 __all__ = [
 	"AF_UNIX",
 	"SocketErrors",
 	"netGetAddrInfo",
+	"netUnixSockPath",
 	"netPortIsUnused",
 ]
 
@@ -47,11 +49,24 @@ SocketErrors = (socket.error if hasattr(socket, "error") else OSError,
 		ConnectionError)
 
 
+def netUnixSockPath(host, port):
+	"""Get the Unix domain socket path for 'host':'port'.
+	If 'host' is a path, it is used as-is.
+	Otherwise a per-port socket path in the temp directory is returned.
+	"""
+	if host and (os.sep in host or (os.altsep and os.altsep in host)):
+		return host
+	return os.path.join(tempfile.gettempdir(),
+			    "awlsim-server-%d.socket" % port)
+
 def netGetAddrInfo(host, port, family = None):
 	"""getaddrinfo() wrapper.
+	If 'family' is AF_UNIX, the returned sockaddr is the socket path.
 	"""
 	socktype = socket.SOCK_STREAM
-	if family in {None, socket.AF_UNSPEC}:
+	if family is not None and family == AF_UNIX:
+		sockaddr = netUnixSockPath(host, port)
+	elif family in {None, socket.AF_UNSPEC}:
 		# First try IPv4
 		try:
 			family, socktype, proto, canonname, sockaddr =\
@@ -74,13 +89,13 @@ def netGetAddrInfo(host, port, family = None):
 					   socktype)[0]
 	return (family, socktype, sockaddr)
 
-def netPortIsUnused(host, port):
+def netPortIsUnused(host, port, family = None):
 	"""Check if a port is not used.
 	"""
 	sock = None
 	_SocketErrors = SocketErrors
 	try:
-		family, socktype, sockaddr = netGetAddrInfo(host, port)
+		family, socktype, sockaddr = netGetAddrInfo(host, port, family)
 		if family == AF_UNIX:
 			if not os.path.exists(sockaddr):
 				return True
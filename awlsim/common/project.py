@@ -392,7 +392,37 @@ class ProjectFactory(XmlFactory):
 	def parser_beginTag(self, tag):
 		project = self.project
 		if self.inProject:
-			if self.inCpu:
+			if self.inCpuConf:
+				if tag.name == "cyclic_interrupt":
+					obNumber = tag.getAttrInt("ob")
+					conf = project.getCpuConf()
+					if obNumber not in conf.CYCLIC_INT_OBS:
+						raise self.Error("Invalid cyclic interrupt "
+							"OB %d." % obNumber)
+					periodMs = tag.getAttrInt("period_ms",
+						conf.DEFAULT_CYCLIC_INT_PERIODS_MS[obNumber])
+					phaseMs = tag.getAttrInt("phase_ms", 0)
+					conf.setCyclicInt(obNumber, periodMs, phaseMs)
+					return
+				elif tag.name == "retentive":
+					conf = project.getCpuConf()
+					try:
+						dbNumbers = [ int(dbNumber)
+							      for dbNumber in tag.getAttr("dbs", "").split(",")
+							      if dbNumber.strip() ]
+						conf.setRetentive(
+							tag.getAttrInt("flag_bytes",
+								conf.DEFAULT_RETENTIVE_FLAGBYTES),
+							tag.getAttrInt("timers",
+								conf.DEFAULT_RETENTIVE_TIMERS),
+							tag.getAttrInt("counters",
+								conf.DEFAULT_RETENTIVE_COUNTERS),
+							dbNumbers)
+					except (ValueError, AwlSimError) as e:
+						raise self.Error("Invalid retentive memory "
+							"configuration.")
+					return
+			elif self.inCpu:
 				if tag.name == "specs":
 					nrAccus = tag.getAttrInt("nr_accus",
 							S7CPUSpecs.DEFAULT_NR_ACCUS)
@@ -433,8 +463,18 @@ class ProjectFactory(XmlFactory):
 							S7CPUConfig.DEFAULT_CYCLETIMELIMIT_US)
 					cycleTimeTargetUs = tag.getAttrInt("cycle_time_target_us",
 							S7CPUConfig.DEFAULT_CYCLETIMETARGET_US)
+					cycleTimeSchedMode = tag.getAttrInt("cycle_time_sched_mode",
+							S7CPUConfig.DEFAULT_CYCLESCHED_MODE)
 					runTimeLimitUs = tag.getAttrInt("run_time_limit_us",
 							S7CPUConfig.DEFAULT_RUNTIMELIMIT_US)
+					virtTimeEn = tag.getAttrBool("virtual_time_enable",
+							S7CPUConfig.DEFAULT_VIRTTIME_EN)
+					virtTimeCycleStepUs = tag.getAttrInt("virtual_time_cycle_step_us",
+							S7CPUConfig.DEFAULT_VIRTTIME_CYCLESTEP_US)
+					virtTimeInsnStepNs = tag.getAttrInt("virtual_time_insn_step_ns",
+							S7CPUConfig.DEFAULT_VIRTTIME_INSNSTEP_NS)
+					insnTraceDepth = tag.getAttrInt("insn_trace_depth",
+							S7CPUConfig.DEFAULT_INSNTRACE_DEPTH)
 					obStartEn = tag.getAttrBool("ob_startinfo_enable",
 							S7CPUConfig.DEFAULT_OBSTARTINFO_EN)
 					extInsnsEn = tag.getAttrBool("ext_insns_enable",
@@ -444,7 +484,12 @@ class ProjectFactory(XmlFactory):
 					conf.setConfiguredMnemonics(mnemonics)
 					conf.setCycleTimeLimitUs(cycleTimeLimitUs)
 					conf.setCycleTimeTargetUs(cycleTimeTargetUs)
+					conf.setCycleTimeSchedMode(cycleTimeSchedMode)
 					conf.setRunTimeLimitUs(runTimeLimitUs)
+					conf.setVirtTimeEn(virtTimeEn)
+					conf.setVirtTimeCycleStepUs(virtTimeCycleStepUs)
+					conf.setVirtTimeInsnStepNs(virtTimeInsnStepNs)
+					conf.setInsnTraceDepth(insnTraceDepth)
 					conf.setExtInsnsEn(extInsnsEn)
 					conf.setOBStartinfoEn(obStartEn)
 					self.inCpuConf = True
@@ -559,6 +604,8 @@ class ProjectFactory(XmlFactory):
 					if tag.name == "config":
 						self.inCpuConf = False
 						return
+					if tag.name in {"cyclic_interrupt", "retentive"}:
+						return
 				else:
 					if tag.name == "cpu":
 						self.inCpu = False
@@ -620,8 +667,31 @@ class ProjectFactory(XmlFactory):
 					"mnemonics"		: str(int(conf.getConfiguredMnemonics())),
 					"cycle_time_limit_us"	: str(int(conf.cycleTimeLimitUs)),
 					"cycle_time_target_us"	: str(int(conf.cycleTimeTargetUs)),
+					"cycle_time_sched_mode"	: str(int(conf.cycleTimeSchedMode)),
 					"run_time_limit_us"	: str(int(conf.runTimeLimitUs)),
-				 })
+					"virtual_time_enable"	: str(int(bool(conf.virtTimeEn))),
+					"virtual_time_cycle_step_us" : str(int(conf.virtTimeCycleStepUs)),
+					"virtual_time_insn_step_ns" : str(int(conf.virtTimeInsnStepNs)),
+					"insn_trace_depth"	: str(int(conf.insnTraceDepth)),
+				 },
+				 tags=[
+					self.Tag(name="cyclic_interrupt",
+						 attrs={
+							"ob"		: str(int(obNumber)),
+							"period_ms"	: str(int(conf.getCyclicIntPeriodMs(obNumber))),
+							"phase_ms"	: str(int(conf.getCyclicIntPhaseMs(obNumber))),
+						 })
+					for obNumber in conf.CYCLIC_INT_OBS
+				 ] + [
+					self.Tag(name="retentive",
+						 attrs={
+							"flag_bytes"	: str(int(conf.retentiveFlagBytes)),
+							"timers"	: str(int(conf.retentiveTimers)),
+							"counters"	: str(int(conf.retentiveCounters)),
+							"dbs"		: ",".join(str(int(dbNumber))
+										   for dbNumber in conf.retentiveDBs),
+						 })
+				 ])
 		]
 		childTags.append(
 			self.Tag(name="cpu",
@@ -3,5 +3,7 @@ from awlsim.common.compat import *
 
 from awlsim.core.main import *
 from awlsim.core.cpu import *
+from awlsim.core.codecoverage import *
+from awlsim.core.snapshot import *
 from awlsim.core.hardware import *
 from awlsim.core.hardware_loader import *
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Block execution time profiler
+#
+# Copyright 2018 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+
+#from awlsim.core.blockprof cimport * #@cy
+from awlsim.core.blocks import * #+cimport
+
+import time
+
+
+__all__ = [
+	"BlockProf",
+]
+
+
+class BlockProfData(object): #+cdef
+	"""Profiling data of one code block.
+	"""
+
+	def __init__(self, blockTypeStr, blockIndex):
+		self.blockTypeStr = blockTypeStr
+		self.blockIndex = blockIndex
+		self.count = 0
+		self.inclRt = 0.0
+		self.exclRt = 0.0
+		self.maxRt = 0.0
+
+	@property
+	def name(self):
+		return "%s %d" % (self.blockTypeStr, self.blockIndex)
+
+	def dump(self):
+		name = self.name
+		name += " " * (10 - len(name))
+		return "%s:  calls: %d, incl: %.3f ms, excl: %.3f ms, max/call: %.3f ms" % (
+			name,
+			self.count,
+			self.inclRt * 1.0e3,
+			self.exclRt * 1.0e3,
+			self.maxRt * 1.0e3)
+
+class BlockProf(object): #+cdef
+	"""Block level profiler.
+	This measures the inclusive and exclusive execution time,
+	the number of calls and the maximum inclusive time per call
+	of every executed code block.
+	"""
+
+	def __init__(self):
+		self.__perf_counter = time.perf_counter
+		self.__data = {}
+		self.__stackData = []
+		self.__stackStart = []
+		self.__stackChild = []
+
+	def beginOB(self):
+		"""Reset the profiler call stack.
+		This must be called before an OB is entered.
+		A previous OB run might have been aborted by an exception.
+		"""
+		self.__stackData = []
+		self.__stackStart = []
+		self.__stackChild = []
+
+	def enter(self, block): #@nocy
+#@cy	cdef void enter(self, CodeBlock block):
+#@cy		cdef BlockProfData data
+
+		key = (block.BLOCKTYPESTR, block.index)
+		data = self.__data.get(key)
+		if data is None:
+			data = self.__data[key] = BlockProfData(block.BLOCKTYPESTR,
+								block.index)
+		self.__stackData.append(data)
+		self.__stackChild.append(0.0)
+		self.__stackStart.append(self.__perf_counter())
+
+	def exit(self): #@nocy
+#@cy	cdef void exit(self):
+#@cy		cdef BlockProfData data
+#@cy		cdef double now
+#@cy		cdef double rt
+
+		now = self.__perf_counter()
+		if not self.__stackData:
+			return
+		data = self.__stackData.pop()
+		rt = now - self.__stackStart.pop()
+		data.count += 1
+		data.inclRt += rt
+		data.exclRt += rt - self.__stackChild.pop()
+		if rt > data.maxRt:
+			data.maxRt = rt
+		if self.__stackChild:
+			self.__stackChild[-1] += rt
+
+	@property
+	def haveAnyMeasurements(self):
+		return any(data.count for data in dictValues(self.__data))
+
+	def __allMeasData(self):
+		# Sort by exclusive time. The most expensive block comes first.
+		return sorted((data for data in dictValues(self.__data)
+			       if data.count),
+			      key=lambda data: data.exclRt,
+			      reverse=True)
+
+	def dump(self):
+		if not self.haveAnyMeasurements:
+			return ""
+		ret = []
+		ret.append("Block time measurements:")
+		for data in self.__allMeasData():
+			ret.append(data.dump())
+		return "\n".join(ret) + "\n"
+
+	def dumpCSV(self):
+		if not self.haveAnyMeasurements:
+			return ""
+		ret = [ "block type;"
+			"block index;"
+			"calls;"
+			"inclusive runtime (µs);"
+			"exclusive runtime (µs);"
+			"maximum runtime per call (µs)" ]
+		for data in self.__allMeasData():
+			ret.append("%s;%d;%d;%.3f;%.3f;%.3f" % (
+				data.blockTypeStr,
+				data.blockIndex,
+				data.count,
+				data.inclRt * 1.0e6,
+				data.exclRt * 1.0e6,
+				data.maxRt * 1.0e6))
+		return "\n".join(ret) + "\n"
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - AWL code coverage report
+#
+# Copyright 2018 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim.common.compat import *
+
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+
+from awlsim.core.instructions.types import * #+cimport
+
+import re
+
+
+__all__ = [
+	"CodeCoverage",
+]
+
+
+class CodeCoverageLine(object):
+	"""Coverage data of one source line.
+	"""
+
+	def __init__(self, lineNr, blockName):
+		self.lineNr = lineNr
+		self.blockName = blockName
+		self.count = 0		# Number of executions
+		self.isBranch = False	# Line contains a conditional branch
+		self.taken = 0		# Number of taken branches
+		self.notTaken = 0	# Number of not taken branches
+
+	def add(self, insn):
+		# Multiple instructions on one line:
+		# The line was executed, if any instruction was executed.
+		self.count = max(self.count, insn.covCount)
+		if insn.insnType in CodeCoverage.BRANCH_TYPES:
+			self.isBranch = True
+			self.taken += insn.covTaken
+			self.notTaken += insn.covCount - insn.covTaken
+
+class CodeCoverageSource(object):
+	"""Coverage data of one source.
+	"""
+
+	def __init__(self, source, sourceId):
+		self.source = source
+		self.sourceId = sourceId
+		self.lines = {}		# Line number -> CodeCoverageLine
+
+	@property
+	def name(self):
+		if self.source and self.source.name:
+			return self.source.name
+		if self.sourceId:
+			return bytesToHexStr(self.sourceId)
+		return "<unknown>"
+
+	@property
+	def path(self):
+		if self.source and self.source.filepath:
+			return self.source.filepath
+		return self.name
+
+	@property
+	def sourceLines(self):
+		"""Get the source text as list of lines.
+		Returns an empty list, if the source text is not available.
+		"""
+		if not self.source or not self.source.sourceBytes:
+			return []
+		try:
+			text = self.source.sourceBytes.decode(self.source.ENCODING)
+		except (UnicodeError, LookupError) as e:
+			return []
+		return text.splitlines()
+
+	def getNetworks(self):
+		"""Get the NETWORKs of the source.
+		Returns a list of (title, [CodeCoverageLine, ...]) tuples.
+		The title is the line number string, if the network has no TITLE.
+		Networks without any instructions are omitted.
+		"""
+		networks = []
+		curNetwork = None
+		for i, line in enumerate(self.sourceLines):
+			lineNr = i + 1
+			if CodeCoverage.RE_NETWORK.match(line):
+				curNetwork = [ "line %d" % lineNr, [] ]
+				networks.append(curNetwork)
+				continue
+			if CodeCoverage.RE_BLOCKEND.match(line):
+				curNetwork = None
+				continue
+			if curNetwork is None:
+				continue
+			m = CodeCoverage.RE_TITLE.match(line)
+			if m and not curNetwork[1]:
+				title = m.group(1).strip()
+				if title:
+					curNetwork[0] = "'%s' (line %d)" % (
+						title, lineNr)
+				continue
+			covLine = self.lines.get(lineNr)
+			if covLine:
+				curNetwork[1].append(covLine)
+		return [ (title, covLines)
+			 for title, covLines in networks
+			 if covLines ]
+
+class CodeCoverage(object):
+	"""AWL code coverage report.
+	This collects the per instruction coverage counters of all
+	user code blocks of a CPU.
+	Coverage collection must have been enabled with
+	S7CPU.enableCoverage() before the program was run.
+	"""
+
+	# Conditional branch instructions.
+	# For these the taken/not taken counts are reported.
+	BRANCH_TYPES = frozenset((
+		AwlInsnTypes.TYPE_SPL,
+		AwlInsnTypes.TYPE_SPB,
+		AwlInsnTypes.TYPE_SPBN,
+		AwlInsnTypes.TYPE_SPBB,
+		AwlInsnTypes.TYPE_SPBNB,
+		AwlInsnTypes.TYPE_SPBI,
+		AwlInsnTypes.TYPE_SPBIN,
+		AwlInsnTypes.TYPE_SPO,
+		AwlInsnTypes.TYPE_SPS,
+		AwlInsnTypes.TYPE_SPZ,
+		AwlInsnTypes.TYPE_SPN,
+		AwlInsnTypes.TYPE_SPP,
+		AwlInsnTypes.TYPE_SPM,
+		AwlInsnTypes.TYPE_SPPZ,
+		AwlInsnTypes.TYPE_SPMZ,
+		AwlInsnTypes.TYPE_SPU,
+		AwlInsnTypes.TYPE_LOOP,
+		AwlInsnTypes.TYPE_BEB,
+	))
+
+	RE_NETWORK	= re.compile(r'^\s*NETWORK\b', re.IGNORECASE)
+	RE_TITLE	= re.compile(r'^\s*TITLE\s*=(.*)$', re.IGNORECASE)
+	RE_BLOCKEND	= re.compile(r'^\s*END_(?:ORGANIZATION_BLOCK|FUNCTION_BLOCK|FUNCTION)\b',
+				     re.IGNORECASE)
+
+	def __init__(self, cpu):
+		self.__sources = {}	# Source ident hash -> CodeCoverageSource
+		for block in cpu.allUserCodeBlocks():
+			if block.isLibraryBlock:
+				continue
+			source = block.getSource()
+			blockName = str(block)
+			for insn in block.insns:
+				lineNr = insn.getLineNr()
+				if lineNr < 0:
+					continue # Generated instruction
+				sourceId = insn.getSourceId()
+				covSource = self.__sources.get(sourceId)
+				if covSource is None:
+					covSource = self.__sources[sourceId] =\
+						CodeCoverageSource(source, sourceId)
+				covLine = covSource.lines.get(lineNr)
+				if covLine is None:
+					covLine = covSource.lines[lineNr] =\
+						CodeCoverageLine(lineNr, blockName)
+				covLine.add(insn)
+
+	@property
+	def allSources(self):
+		return sorted(dictValues(self.__sources),
+			      key=lambda covSource: covSource.name)
+
+	@staticmethod
+	def __percent(part, total):
+		return (part * 100.0 / total) if total else 100.0
+
+	def summary(self):
+		"""Get a human readable coverage summary
+		including the list of never executed networks.
+		"""
+		ret = [ "AWL code coverage:" ]
+		unexecNetworks = []
+		for covSource in self.allSources:
+			covLines = dictValues(covSource.lines)
+			nrLines = len(covLines)
+			nrExec = sum(1 for l in covLines if l.count)
+			branches = [ l for l in covLines if l.isBranch ]
+			nrBranches = len(branches) * 2
+			nrBranchesExec = sum(int(l.taken > 0) + int(l.notTaken > 0)
+					     for l in branches)
+			ret.append("%s:  lines: %d/%d (%.1f %%), "
+				   "branches: %d/%d (%.1f %%)" % (
+				   covSource.name,
+				   nrExec, nrLines,
+				   self.__percent(nrExec, nrLines),
+				   nrBranchesExec, nrBranches,
+				   self.__percent(nrBranchesExec, nrBranches)))
+			for title, netLines in covSource.getNetworks():
+				if not any(l.count for l in netLines):
+					unexecNetworks.append("%s: %s NETWORK %s" % (
+						covSource.name,
+						netLines[0].blockName,
+						title))
+		if unexecNetworks:
+			ret.append("")
+			ret.append("Never executed networks:")
+			ret.extend(unexecNetworks)
+		return "\n".join(ret) + "\n"
+
+	def dumpCSV(self):
+		"""Dump the per source line coverage as CSV.
+		"""
+		ret = [ "source name;"
+			"source ID;"
+			"line number;"
+			"block;"
+			"execution count;"
+			"branch taken;"
+			"branch not taken" ]
+		for covSource in self.allSources:
+			for lineNr in sorted(covSource.lines):
+				covLine = covSource.lines[lineNr]
+				ret.append("%s;%s;%d;%s;%d;%s;%s" % (
+					covSource.name,
+					bytesToHexStr(covSource.sourceId) if covSource.sourceId else "",
+					lineNr,
+					covLine.blockName,
+					covLine.count,
+					str(covLine.taken) if covLine.isBranch else "",
+					str(covLine.notTaken) if covLine.isBranch else ""))
+		return "\n".join(ret) + "\n"
+
+	def dumpLCOV(self):
+		"""Dump the coverage in the LCOV tracefile format.
+		"""
+		ret = []
+		for covSource in self.allSources:
+			ret.append("TN:")
+			ret.append("SF:%s" % covSource.path)
+			nrBranches = nrBranchesHit = 0
+			for lineNr in sorted(covSource.lines):
+				covLine = covSource.lines[lineNr]
+				if not covLine.isBranch:
+					continue
+				for branchNr, count in enumerate((covLine.taken,
+								  covLine.notTaken)):
+					ret.append("BRDA:%d,0,%d,%s" % (
+						lineNr, branchNr,
+						str(count) if covLine.count else "-"))
+					nrBranches += 1
+					nrBranchesHit += int(count > 0)
+			ret.append("BRF:%d" % nrBranches)
+			ret.append("BRH:%d" % nrBranchesHit)
+			for lineNr in sorted(covSource.lines):
+				ret.append("DA:%d,%d" % (
+					lineNr, covSource.lines[lineNr].count))
+			ret.append("LF:%d" % len(covSource.lines))
+			ret.append("LH:%d" % sum(1 for l in dictValues(covSource.lines)
+						 if l.count))
+			ret.append("end_of_record")
+		return "\n".join(ret) + "\n"
+
+	def dumpListing(self):
+		"""Dump annotated source listings.
+		Each line is prefixed with its execution count.
+		Lines with instructions that were never executed
+		are marked with #####.
+		"""
+		ret = []
+		for covSource in self.allSources:
+			sourceLines = covSource.sourceLines
+			if not sourceLines:
+				continue
+			ret.append("%s:" % covSource.name)
+			for i, line in enumerate(sourceLines):
+				covLine = covSource.lines.get(i + 1)
+				if covLine is None:
+					prefix = "-"
+				elif covLine.count:
+					prefix = str(covLine.count)
+				else:
+					prefix = "#####"
+				text = "%10s:%5d: %s" % (prefix, i + 1, line)
+				if covLine and covLine.isBranch:
+					text += "  // taken: %d, not taken: %d" % (
+						covLine.taken, covLine.notTaken)
+				ret.append(text)
+			ret.append("")
+		return "\n".join(ret) + "\n"
@@ -40,6 +40,7 @@ from awlsim.common.version import *
 from awlsim.common.monotonic import * #+cimport
 from awlsim.common.movingavg import * #+cimport
 from awlsim.common.lpfilter import * #+cimport
+from awlsim.common.histogram import * #+cimport
 
 from awlsim.library.libentry import *
 
@@ -63,6 +64,12 @@ from awlsim.core.lstack import * #+cimport
 from awlsim.core.offset import * #+cimport
 from awlsim.core.obtemp import * #+cimport
 from awlsim.core.insnmeas import * #+cimport
+from awlsim.core.insntrace import * #+cimport
+from awlsim.core.blockprof import * #+cimport
+from awlsim.core.sampleprof import *
+from awlsim.core.obscheduler import *
+from awlsim.core.snapshot import *
+from awlsim.core.retentive import *
 
 from awlsim.awlcompiler.tokenizer import *
 from awlsim.awlcompiler.translator import *
@@ -247,10 +254,10 @@ class S7Prog(object):
 				e.setInsn(insn)
 				raise e
 
-	# Resolve all symbols (global and local) on all blocks, as far as possible.
-	def __resolveSymbols(self):
+	# Resolve all symbols (global and local) on 'blocks', as far as possible.
+	def __resolveSymbols(self, blocks):
 		resolver = AwlSymResolver(self.cpu)
-		for block in self.cpu.allCodeBlocks():
+		for block in blocks:
 			# Add interface references to the parameter assignment.
 			self.__assignParamInterface(block)
 			# Check type compatibility between formal and
@@ -283,8 +290,8 @@ class S7Prog(object):
 		# interface L stack allocations.
 		block.accountTempAllocations()
 
-	def __finalizeCodeBlocks(self):
-		for block in self.cpu.allUserCodeBlocks():
+	def __finalizeCodeBlocks(self, blocks):
+		for block in blocks:
 			self.__finalizeCodeBlock(block)
 
 	# Run static error checks for code block
@@ -454,14 +461,207 @@ class S7Prog(object):
 		self.pendingRawDBs = []
 
 		# Resolve symbolic instructions and operators
-		self.__resolveSymbols()
+		self.__resolveSymbols(cpu.allCodeBlocks())
 
 		# Do some finalizations
-		self.__finalizeCodeBlocks()
+		self.__finalizeCodeBlocks(cpu.allUserCodeBlocks())
 
 		# Run some static sanity checks on the code
 		self.staticSanityChecks()
 
+	@staticmethod
+	def __interfaceSignature(block):
+		# The parts of a code block interface that the callers
+		# and the instance DBs depend on.
+		return [ (field.fieldType, field.name, str(field.dataType))
+			 for field in block.interface.fields_IN_OUT_INOUT_STAT ]
+
+	@staticmethod
+	def __dbLayout(db):
+		# The DB data structure without the initial values.
+		struct = db.struct
+		return (struct.getSize(),
+			[ (field.name, str(field.offset), str(field.dataType))
+			  for field in struct.fields ])
+
+	def __hotTranslate(self, translator, resolver, rawBlocks, blockClass, dataTypes):
+#@cy		cdef S7CPU cpu
+
+		cpu = self.cpu
+		ret = []
+		numbers = set()
+		for rawBlock in rawBlocks:
+			number, sym = resolver.resolveBlockName(dataTypes,
+								rawBlock.index)
+			if number in numbers:
+				raise AwlSimError("Multiple definitions of "\
+					"%s %d." % (blockClass.BLOCKTYPESTR, number))
+			numbers.add(number)
+			rawBlock.index = number
+			if blockClass is OB:
+				oldBlock = cpu.getOB(number)
+			elif blockClass is FB:
+				oldBlock = cpu.getFB(number)
+			elif blockClass is FC:
+				oldBlock = cpu.getFC(number)
+			else:
+				oldBlock = cpu.getDB(number)
+			if blockClass is DB:
+				block = translator.translateDB(rawBlock)
+				cpu.addDB(block)
+			else:
+				if oldBlock and blockClass is not OB and\
+				   oldBlock.isLibraryBlock:
+					raise AwlSimError("Multiple definitions of %s %d.\n"
+						"%s %d is already defined by an "
+						"imported library block (%s)." % (
+						blockClass.BLOCKTYPESTR, number,
+						blockClass.BLOCKTYPESTR, number,
+						oldBlock.libraryName))
+				block = translator.translateCodeBlock(rawBlock, blockClass)
+				if blockClass is OB:
+					cpu.addOB(block)
+				elif blockClass is FB:
+					cpu.addFB(block)
+				else:
+					cpu.addFC(block)
+			ret.append((block, oldBlock))
+		return ret
+
+	def __hotBuildStaged(self, newBlocks):
+		# Build the pending blocks into the staged block tables.
+		# Appends (newBlock, replacedBlock) to 'newBlocks'.
+		# Returns False, if a full build is required.
+#@cy		cdef S7CPU cpu
+
+		from awlsim.core.datatypes import AwlDataType
+
+		cpu = self.cpu
+
+		translator = AwlTranslator(cpu)
+		resolver = AwlSymResolver(cpu)
+
+		self.__detectMnemonics()
+
+		# Translate the code blocks and build their interfaces.
+		for rawBlocks, blockClass, dataType in (
+				(self.pendingRawOBs, OB, AwlDataType.TYPE_OB_X),
+				(self.pendingRawFBs, FB, AwlDataType.TYPE_FB_X),
+				(self.pendingRawFCs, FC, AwlDataType.TYPE_FC_X)):
+			newBlocks.extend(self.__hotTranslate(translator, resolver,
+							     rawBlocks, blockClass,
+							     {dataType}))
+		newCodeBlocks = [ block for block, oldBlock in newBlocks ]
+		for block, oldBlock in newBlocks:
+			block.interface.buildDataStructure(cpu)
+			if oldBlock and self.__interfaceSignature(block) !=\
+					self.__interfaceSignature(oldBlock):
+				printVerbose("Hot build: The interface of %s "
+					     "changed." % str(block))
+				return False
+
+		# Translate the DBs.
+		# Keep the contents, if the layout did not change.
+		newDBs = self.__hotTranslate(translator, resolver,
+					     self.pendingRawDBs, DB,
+					     {AwlDataType.TYPE_DB_X,
+					      AwlDataType.TYPE_FB_X,
+					      AwlDataType.TYPE_SFB_X})
+		newBlocks.extend(newDBs)
+		for db, oldDB in newDBs:
+			if not oldDB:
+				continue
+			if self.__dbLayout(db) != self.__dbLayout(oldDB):
+				printVerbose("Hot build: The layout of %s "
+					     "changed." % str(db))
+				return False
+			db.structInstance.memory.setDataBytes(
+				bytearray(oldDB.structInstance.memory.getDataBytes()))
+
+		# Resolve, finalize and check the new code blocks only.
+		self.__resolveSymbols(newCodeBlocks)
+		self.__finalizeCodeBlocks(newCodeBlocks)
+		if not cpu.getOB(1):
+			raise AwlSimError("OB 1 is not present in the CPU.")
+		for block in newCodeBlocks:
+			self.__staticSanityChecks_block(block)
+		return True
+
+	def hotBuild(self):
+		"""Translate the pending blocks and swap them into the
+		program without rebuilding the other blocks.
+		This can be used while the CPU is in RUN.
+		It must be called between two cycles.
+		The new blocks are built in a staging copy of the block
+		tables. The copy replaces the block tables in one step,
+		if all blocks were built successfully.
+		The contents of replaced DBs are kept.
+		Returns False, if the pending blocks change the interface
+		of an existing code block or the layout of an existing DB,
+		or if UDTs or library blocks are pending. The program is
+		not modified in that case and build() must be used instead.
+		On errors the program is not modified and the pending
+		blocks are dropped.
+		"""
+#@cy		cdef S7CPU cpu
+
+		cpu = self.cpu
+
+		if self.pendingRawUDTs or self.pendingLibSelections:
+			return False
+
+		newBlocks = []
+		cpu.stageBlockTables()
+		try:
+			ok = self.__hotBuildStaged(newBlocks)
+		except Exception as e:
+			cpu.discardBlockTables()
+			for block, oldBlock in newBlocks:
+				block.destroySourceRef()
+			for rawBlock in itertools.chain(self.pendingRawDBs,
+							self.pendingRawFBs,
+							self.pendingRawFCs,
+							self.pendingRawOBs):
+				rawBlock.destroySourceRef()
+			self.pendingRawDBs = []
+			self.pendingRawFBs = []
+			self.pendingRawFCs = []
+			self.pendingRawOBs = []
+			raise e
+		if not ok:
+			# Keep the pending blocks for build().
+			cpu.discardBlockTables()
+			for block, oldBlock in newBlocks:
+				block.destroySourceRef()
+			return False
+		cpu.commitBlockTables([ (oldBlock, block)
+					for block, oldBlock in newBlocks
+					if oldBlock and isinstance(block, DB) ])
+		self.pendingRawDBs = []
+		self.pendingRawFBs = []
+		self.pendingRawFCs = []
+		self.pendingRawOBs = []
+
+		# The new blocks are live now. Drop the replaced blocks.
+		for block, oldBlock in newBlocks:
+			if isinstance(block, OB) and\
+			   block.index not in cpu.obTempPresetHandlers:
+				try:
+					presetHandlerClass = OBTempPresets_table[block.index]
+				except KeyError:
+					presetHandlerClass = OBTempPresets_dummy
+				cpu.obTempPresetHandlers[block.index] = presetHandlerClass(cpu)
+			if not oldBlock:
+				continue
+			if isinstance(block, FB):
+				# Existing instance DBs refer to the new FB.
+				# The interface did not change.
+				for db in cpu.allDBs():
+					if db.codeBlock is oldBlock:
+						db.codeBlock = block
+			oldBlock.destroySourceRef()
+		return True
+
 	def getBlockInfos(self,
 			  getOBInfo=False,
 			  getFCInfo=False,
@@ -520,6 +720,12 @@ class S7Prog(object):
 class S7CPU(object): #+cdef
 	"STEP 7 CPU"
 
+	# Busy-wait time before a cycle deadline (in seconds).
+	DEADLINE_SPIN_TAIL = 0.0002
+
+	# Flag memory larger than this (in bytes) is allocated sparsely.
+	SPARSE_MEMORY_MIN = 0x10000
+
 	def __init__(self):
 		from awlsim.core.datatypes import AwlDataType
 
@@ -528,11 +734,38 @@ class S7CPU(object): #+cdef
 
 		self.__sleep = time.sleep
 		self.__insnMeas = None
+		self.__blockProf = None
+		self.__sampleProf = None
+		self.__sampleProfCountdown = 0
+		self.__coverageEn = False
+		self.__insnTrace = None
+		self.obScheduler = OBScheduler()
+		self.timerService = TimerService()
+		self.__retentive = None
+		self.__retentiveLayout = None
+		self.__retentiveImage = None
+		self.__retentiveDirty = False
+		self.__nrRetentiveTimers = 0
+		self.__nrRetentiveCounters = 0
+		self.__retentiveTimers = []
+		self.__retentiveCounters = []
+		self.nrTimersAlloc = 0
+		self.nrCountersAlloc = 0
 		self.__clockMemByteOffset = None
 		self.specs = S7CPUSpecs(self)
 		self.conf = S7CPUConfig(self)
 		self.prog = S7Prog(self)
 		self.__cycleTimeTarget = 0.0
+		self.__cycleDeadlineEn = False
+		self.__cycleDeadline = 0.0
+		self.__padEnd = 0.0
+		self.__cycleStartRealTime = 0.0
+		self.__virtTimeEn = False
+		self.__virtTime = 0.0
+		self.__virtCycleStep = 0.0
+		self.__virtInsnStep = 0.0
+		self.__virtInsnCount = 0
+		self.__virtDateBase = None
 		self.setCycleTimeLimit(1.0)
 		self.setCycleTimeTarget(self.__cycleTimeTarget)
 		self.setCycleExitCallback(None)
@@ -791,10 +1024,99 @@ class S7CPU(object): #+cdef
 
 	def __calcCycleTimeTargetLimited(self):
 		self.__cycleTimeTargetLimited = min(self.__cycleTimeTarget, self.cycleTimeLimit / 2.0)
+		# Restart the deadline schedule with the new period.
+		self.__cycleDeadline = 0.0
+
+	def enableCycleTimeDeadline(self, en=True):
+		"""Enable or disable the absolute deadline cycle scheduler.
+		If enabled, the cycle time target is a fixed OB 1 period
+		and every cycle is started at an absolute deadline.
+		If disabled, the cycle time target is approximated by
+		filtered relative sleeping at the end of the cycle.
+		"""
+		self.__cycleDeadlineEn = bool(en)
+		self.__cycleDeadline = 0.0
+		self.padCycleTime = 0.0
+
+	def cycleTimeDeadlineEnabled(self):
+		return self.__cycleDeadlineEn
+
+	def setVirtualTime(self, enable, cycleStep=0.0, insnStep=0.0):
+		"""Enable or disable the deterministic virtual time mode.
+		In virtual time mode the CPU clock does not follow the host clock.
+		It advances by 'cycleStep' seconds per OB 1 cycle
+		and by 'insnStep' seconds per executed instruction.
+		The cycle time target padding is skipped instead of slept.
+		Switching the mode does not step the CPU clock.
+		It continues from the current time in the new mode.
+		"""
+		if cycleStep < 0.0 or insnStep < 0.0:
+			raise AwlSimError("Virtual time: The time steps "
+				"must not be negative.")
+		enable = bool(enable)
+		if self.__virtTimeEn:
+			# Account the pending instructions with the old step.
+			self.__virtualTimestamp()
+		self.__virtCycleStep = cycleStep
+		self.__virtInsnStep = insnStep
+		if enable != self.__virtTimeEn:
+			now = (self.__virtTime if self.__virtTimeEn else monotonic_time())
+			now += self.__nowOffset
+			self.__virtTimeEn = enable
+			if enable:
+				self.__virtInsnCount = self.__insnCount
+				self.__nowOffset = now - self.__virtTime
+			else:
+				self.__nowOffset = now - monotonic_time()
+			self.now = now
+			self.__cycleDeadline = 0.0
+
+	def virtualTimeEnabled(self):
+		return self.__virtTimeEn
+
+	def advanceVirtualTime(self, seconds): #@nocy
+#@cy	cdef void advanceVirtualTime(self, double seconds):
+		"""Advance the virtual time by 'seconds'.
+		This does nothing, if virtual time is disabled.
+		"""
+		if self.__virtTimeEn and seconds > 0.0:
+			self.__virtTime += seconds
 
 	def setRunTimeLimit(self, timeoutSeconds=-1.0):
 		self.__runtimeLimit = timeoutSeconds if timeoutSeconds >= 0.0 else -1.0
 
+	def setCyclicInterrupt(self, obNumber, period, phase=0.0):
+		"""Set the period and the phase offset (in seconds)
+		of the cyclic interrupt OB 'obNumber'.
+		The new configuration takes effect on the next startup.
+		"""
+		self.obScheduler.setCyclic(obNumber, period, phase)
+
+	def startDelayInterrupt(self, obNumber, delayMs, sign):
+		"""Start the time-delay interrupt OB 'obNumber'.
+		Returns the SRT_DINT RET_VAL.
+		"""
+		self.updateTimestamp()
+		ret = self.obScheduler.startDelay(obNumber, delayMs, sign, self.now)
+		self.__nextIntTime = self.obScheduler.nextDueTime()
+		return ret
+
+	def cancelDelayInterrupt(self, obNumber):
+		"""Cancel the time-delay interrupt OB 'obNumber'.
+		Returns the CAN_DINT RET_VAL.
+		"""
+		ret = self.obScheduler.cancelDelay(obNumber)
+		self.__nextIntTime = self.obScheduler.nextDueTime()
+		return ret
+
+	def queryDelayInterrupt(self, obNumber):
+		"""Query the time-delay interrupt OB 'obNumber'.
+		Returns the QRY_DINT (RET_VAL, STATUS) tuple.
+		"""
+		loaded = (0 <= obNumber <= 0xFFFF and
+			  self.getOB(obNumber) is not None)
+		return self.obScheduler.queryDelay(obNumber, loaded)
+
 	# Returns all OBs.
 	def allOBs(self):
 		for ob in self.__obs:
@@ -939,6 +1261,22 @@ class S7CPU(object): #+cdef
 		self.prog.build()
 		self.reallocate()
 
+	def hotBuild(self):
+		"""Swap the loaded sources into the running program.
+		See S7Prog.hotBuild().
+		Returns False, if build() is required instead.
+		"""
+		if not self.prog.hotBuild():
+			return False
+		self.reallocate()
+
+		# Start the cyclic interrupts of the new OBs.
+		self.updateTimestamp()
+		self.obScheduler.startNew(self.now,
+					  set(ob.index for ob in self.allOBs()))
+		self.__nextIntTime = self.obScheduler.nextDueTime()
+		return True
+
 	def load(self, parseTree, rebuild = False, sourceManager = None):
 		for rawDB in dictValues(parseTree.dbs):
 			rawDB.setSourceRef(sourceManager)
@@ -1000,14 +1338,23 @@ class S7CPU(object): #+cdef
 			self.accu1, self.accu2, self.accu3, self.accu4 =\
 				Accu(), Accu(), Accu(), Accu()
 			self.is4accu = (self.specs.nrAccus == 4)
+		# The timers and counters are allocated on first use.
 		if force or self.specs.nrTimers != len_u32(self.timers):
-			self.timers = [ Timer(self, i)
-					for i in range(self.specs.nrTimers) ]
+			self.timerService.reset()
+			self.timers = [None] * u32_to_s32(self.specs.nrTimers)
+			self.nrTimersAlloc = 0
+			self.__retentiveTimers = []
+			self.__clearRetentiveImage()
 		if force or self.specs.nrCounters != len_u32(self.counters):
-			self.counters = [ Counter(self, i)
-					  for i in range(self.specs.nrCounters) ]
+			self.counters = [None] * u32_to_s32(self.specs.nrCounters)
+			self.nrCountersAlloc = 0
+			self.__retentiveCounters = []
+			self.__clearRetentiveImage()
 		if force or self.specs.nrFlags != len_u32(self.flags):
-			self.flags = AwlMemory(self.specs.nrFlags)
+			if self.specs.nrFlags > self.SPARSE_MEMORY_MIN:
+				self.flags = AwlSparseMemory(self.specs.nrFlags)
+			else:
+				self.flags = AwlMemory(self.specs.nrFlags)
 		if force or self.specs.nrInputs != len_u32(self.inputs):
 			self.inputs = AwlMemory(self.specs.nrInputs)
 		if force or self.specs.nrOutputs != len_u32(self.outputs):
@@ -1034,8 +1381,64 @@ class S7CPU(object): #+cdef
 		self.__sfbs = [None] * u32_to_s32(self.__sfbsAlloc)
 		self.__sfcsExtended = {}
 		self.__sfbsExtended = {}
+		self.__savedBlockTables = None
+
+	def stageBlockTables(self):
+		"""Switch to a staging copy of the UDT, OB, FC, FB and DB tables.
+		All following block additions go to the copy.
+		The current tables are kept unmodified until commitBlockTables()
+		replaces them by the copy or discardBlockTables() switches back.
+		This must be called between two cycles.
+		"""
+		if self.__savedBlockTables is not None:
+			raise AwlSimError("The block tables are already staged.")
+		self.__savedBlockTables = (
+			self.__udts, self.__dbs, self.__obs, self.__fcs, self.__fbs,
+			self.__udtsAlloc, self.__dbsAlloc, self.__obsAlloc,
+			self.__fcsAlloc, self.__fbsAlloc,
+			self.__ob1,
+		)
+		self.__udts = self.__udts[:]
+		self.__dbs = self.__dbs[:]
+		self.__obs = self.__obs[:]
+		self.__fcs = self.__fcs[:]
+		self.__fbs = self.__fbs[:]
+
+	def commitBlockTables(self, replacedDBs=()):
+		"""Make the staged block tables the active block tables.
+		replacedDBs -> Iterable of (oldDB, newDB) of the DBs that were
+		               replaced by a DB with the same layout. The CPU
+		               references to the old DBs are moved to the new DBs.
+		"""
+#@cy		cdef DB oldDB
+#@cy		cdef DB newDB
+
+		self.__savedBlockTables = None
+		for oldDB, newDB in replacedDBs:
+			if self.dbRegister is oldDB:
+				self.dbRegister = newDB
+			if self.diRegister is oldDB:
+				self.diRegister = newDB
+			if self.__retentiveLayout:
+				dbs = self.__retentiveLayout[3]
+				for i, db in enumerate(dbs):
+					if db is oldDB:
+						dbs[i] = newDB
+
+	def discardBlockTables(self):
+		"""Drop the staged block tables and switch back to
+		the tables that were active before stageBlockTables().
+		"""
+		if self.__savedBlockTables is None:
+			return
+		(self.__udts, self.__dbs, self.__obs, self.__fcs, self.__fbs,
+		 self.__udtsAlloc, self.__dbsAlloc, self.__obsAlloc,
+		 self.__fcsAlloc, self.__fbsAlloc,
+		 self.__ob1) = self.__savedBlockTables
+		self.__savedBlockTables = None
 
 	def reset(self):
+		self.closeRetentive()
 		self.prog.reset()
 		for block in itertools.chain(self.__udts,
 					     self.__dbs,
@@ -1072,17 +1475,26 @@ class S7CPU(object): #+cdef
 
 		self.relativeJump = 1
 
+		# Interrupt OBs
+		self.obScheduler.reset()
+		self.__nextIntTime = OBScheduler.NEVER
+		self.__curPriority = OBScheduler.PRIORITY_OB1
+
 		# Stats
 		self.__insnCount = 0
 		self.__cycleCount = 0
 		self.insnPerSecond = 0.0
 		self.avgInsnPerCycle = 0.0
 		self.cycleStartTime = 0.0
-		self.minCycleTime = 86400.0
-		self.maxCycleTime = 0.0
 		self.avgCycleTime = 0.0
 		self.padCycleTime = 0.0
 		self.__padCycleTimeFilt = LPFilter(6)
+		self.__cycleDeadline = 0.0
+		self.lastLateness = 0.0
+		self.cycleTimeHist = Histogram()
+		self.padTimeHist = Histogram()
+		self.latenessHist = Histogram()
+		self.resetCycleStats()
 		self.__cycleTimeMovAvg = MovingAvg(9)
 		self.__speedMeasureStartTime = 0
 		self.__speedMeasureStartInsnCount = 0
@@ -1090,6 +1502,17 @@ class S7CPU(object): #+cdef
 
 		self.initializeTimestamp()
 
+	def resetCycleStats(self):
+		"""Reset the cycle time extrema and histograms.
+		"""
+		self.minCycleTime = 86400.0
+		self.maxCycleTime = 0.0
+		self.missedDeadlines = 0
+		self.maxLateness = 0.0
+		self.cycleTimeHist.reset()
+		self.padTimeHist.reset()
+		self.latenessHist.reset()
+
 	def setupInsnMeas(self, enable=True):
 		if enable:
 			if not self.__insnMeas:
@@ -1100,6 +1523,76 @@ class S7CPU(object): #+cdef
 			self.__insnMeas = None
 		return insnMeas
 
+	def setupBlockProf(self, enable=True):
+		"""Enable or disable the block level profiler.
+		Returns the BlockProf instance.
+		"""
+		if enable:
+			if not self.__blockProf:
+				self.__blockProf = BlockProf()
+			blockProf = self.__blockProf
+		else:
+			blockProf = self.__blockProf
+			self.__blockProf = None
+		return blockProf
+
+	def setupSampleProf(self, enable=True, rate=SampleProf.DEFAULT_RATE):
+		"""Start or stop the statistical sampling profiler.
+		Returns the SampleProf instance.
+		"""
+		if enable:
+			if not self.__sampleProf:
+				self.__sampleProf = SampleProf(rate)
+			sampleProf = self.__sampleProf
+			sampleProf.start()
+			self.__sampleProfCountdown = 1
+		else:
+			sampleProf = self.__sampleProf
+			self.__sampleProf = None
+			if sampleProf:
+				sampleProf.stop()
+		return sampleProf
+
+	def setupInsnTrace(self, enable=True, depth=None):
+		"""Enable or disable the instruction trace recorder.
+		depth is the number of instructions to keep.
+		None means InsnTrace.DEFAULT_DEPTH.
+		Changing the depth discards the recorded trace.
+		Returns the InsnTrace instance.
+		"""
+		if depth is None:
+			depth = InsnTrace.DEFAULT_DEPTH
+		if enable:
+			if not self.__insnTrace or self.__insnTrace.depth != depth:
+				self.__insnTrace = InsnTrace(depth)
+			insnTrace = self.__insnTrace
+		else:
+			insnTrace = self.__insnTrace
+			self.__insnTrace = None
+		return insnTrace
+
+	def getInsnTrace(self):
+		"""Get the InsnTrace instance or None, if tracing is disabled.
+		"""
+		return self.__insnTrace
+
+	def enableCoverage(self, enable=True):
+		"""Enable or disable the collection of
+		per instruction code coverage counters.
+		"""
+		self.__coverageEn = bool(enable)
+
+	def coverageEnabled(self):
+		return self.__coverageEn
+
+	def resetCoverage(self):
+		"""Reset the code coverage counters of all instructions.
+		"""
+		for block in self.allUserCodeBlocks():
+			for insn in block.insns:
+				insn.covCount = 0
+				insn.covTaken = 0
+
 	def setCycleExitCallback(self, cb, data=None):
 		self.cbCycleExit = cb
 		self.cbCycleExitData = data
@@ -1138,9 +1631,9 @@ class S7CPU(object): #+cdef
 		if self.cbScreenUpdate is not None:
 			self.cbScreenUpdate(self.cbScreenUpdateData)
 
-	def __runOB(self, block): #@nocy
+	def __runOB(self, block, nested=False): #@nocy
 #@cy	@cython.boundscheck(False)
-#@cy	cdef __runOB(self, OB block):
+#@cy	cdef __runOB(self, OB block, _Bool nested=False):
 #@cy		cdef AwlInsn insn
 #@cy		cdef CallStackElem cse
 #@cy		cdef CallStackElem exitCse
@@ -1148,6 +1641,10 @@ class S7CPU(object): #+cdef
 #@cy		cdef uint32_t insnCount
 #@cy		cdef OBTempPresets presetHandler
 #@cy		cdef _Bool insnMeasEnabled
+#@cy		cdef _Bool blockProfEnabled
+#@cy		cdef _Bool coverageEnabled
+#@cy		cdef _Bool sampleProfEnabled
+#@cy		cdef _Bool insnTraceEnabled
 #@cy		cdef _Bool postInsnCbEnabled
 #@cy		cdef _Bool blockExitCbEnabled
 
@@ -1155,8 +1652,12 @@ class S7CPU(object): #+cdef
 		#       by @cython.boundscheck(False) in this method.
 
 		# Update timekeeping
+		# A nested interrupt OB belongs to the cycle it preempted.
 		self.updateTimestamp()
-		self.cycleStartTime = self.now
+		if not nested:
+			self.cycleStartTime = self.now
+			if self.__virtTimeEn: #+unlikely
+				self.__cycleStartRealTime = monotonic_time()
 
 		# Initialize the L-stack. A previous block execution might
 		# have exited with an exception and left allocation behind.
@@ -1183,6 +1684,14 @@ class S7CPU(object): #+cdef
 			presetHandler.generate(activeLStack.memory.getRawDataBytes())
 
 		insnMeasEnabled = self.__insnMeas is not None
+		blockProfEnabled = self.__blockProf is not None
+		coverageEnabled = self.__coverageEn
+		sampleProfEnabled = self.__sampleProf is not None
+		insnTraceEnabled = self.__insnTrace is not None
+		if blockProfEnabled: #+unlikely
+			if not nested:
+				self.__blockProf.beginOB()
+			self.__blockProf.enter(block)
 		postInsnCbEnabled = self.cbPostInsn is not None
 		blockExitCbEnabled = self.cbBlockExit is not None
 
@@ -1192,14 +1701,30 @@ class S7CPU(object): #+cdef
 				# Fetch the next instruction.
 				insn = cse.insns[cse.ip]
 				self.relativeJump = 1
+				if sampleProfEnabled: #+unlikely
+					self.__sampleProfCountdown -= 1
+					if self.__sampleProfCountdown <= 0:
+						self.__sampleProfCountdown = self.__sampleProf.poll(cse)
+				if insnTraceEnabled: #+unlikely
+					self.__insnTrace.record(cse.block, cse.ip, insn,
+								self.statusWord.getWord(),
+								self.accu1.get(), self.accu2.get(),
+								self.ar1.get(), self.ar2.get(),
+								self.dbRegister.index,
+								self.diRegister.index)
 
 				# Execute the instruction.
 				if insnMeasEnabled: #+unlikely
 					self.__insnMeas.meas(True, insn.insnType)
 					insn.run()
 					self.__insnMeas.meas(False, insn.insnType)
+					self.__insnMeas.measLine(insn, cse)
 				else:
 					insn.run()
+				if coverageEnabled: #+unlikely
+					insn.covCount += 1
+					if self.relativeJump != 1:
+						insn.covTaken += 1
 				if postInsnCbEnabled: #+unlikely
 					self.cbPostInsn(cse, self.cbPostInsnData)
 
@@ -1214,23 +1739,101 @@ class S7CPU(object): #+cdef
 					# Check if the cycle time is exceeded.
 					if self.now - self.cycleStartTime > self.cycleTimeLimit:
 						self.__cycleTimeExceed()
+					if self.__virtTimeEn: #+unlikely
+						# The virtual time might not advance.
+						# Also check the real time to catch endless loops.
+						if monotonic_time() - self.__cycleStartRealTime > self.cycleTimeLimit:
+							self.__cycleTimeExceed()
 
 					# Check if the runtime limit is enabled and exceeded.
 					if self.__runtimeLimit >= 0.0:
 						self.__checkRunTimeLimit()
 
+					# Check if an interrupt OB is due.
+					# It preempts this OB at this instruction boundary.
+					if self.now >= self.__nextIntTime: #+unlikely
+						self.__runInterrupts()
+
 			if blockExitCbEnabled: #+unlikely
 				self.cbBlockExit(self.cbBlockExitData)
 			cse, exitCse = cse.prevCse, cse
 			self.callStackTop = cse
 			self.callStackDepth -= 1
 			exitCse.handleBlockExit()
+			if blockProfEnabled: #+unlikely
+				self.__blockProf.exit()
 		assert(self.callStackDepth == 0) #@nocy
 
 		# Check if the runtime limit is enabled and exceeded.
 		if self.__runtimeLimit >= 0.0:
 			self.__checkRunTimeLimit()
 
+	# Run all due interrupt OBs with a priority class
+	# above the priority class of the running OB.
+	def __runInterrupts(self): #+cdef
+		while True:
+			intr = self.obScheduler.popDue(self.now, self.__curPriority)
+			if intr is None:
+				break
+			ob = self.getOB(intr.obNumber)
+			if ob is not None: #+likely
+				self.__runInterruptOB(ob, intr.priority)
+			self.updateTimestamp()
+		self.__nextIntTime = self.obScheduler.nextDueTime()
+
+	# Preempt the running OB and run the interrupt OB 'ob'.
+	# The state of the preempted OB is restored afterwards.
+	def __runInterruptOB(self, ob, priority): #@nocy
+#@cy	cdef __runInterruptOB(self, OB ob, int32_t priority):
+#@cy		cdef uint32_t accu1
+#@cy		cdef uint32_t accu2
+#@cy		cdef uint32_t accu3
+#@cy		cdef uint32_t accu4
+#@cy		cdef uint32_t ar1
+#@cy		cdef uint32_t ar2
+#@cy		cdef uint16_t statusWord
+#@cy		cdef int32_t prevPriority
+#@cy		cdef int32_t relativeJump
+#@cy		cdef uint32_t callStackDepth
+#@cy		cdef _Bool mcrActive
+#@cy		cdef DB dbRegister
+#@cy		cdef DB diRegister
+#@cy		cdef CallStackElem callStackTop
+#@cy		cdef LStackAllocator activeLStack
+
+		accu1, accu2 = self.accu1.get(), self.accu2.get()
+		accu3, accu4 = self.accu3.get(), self.accu4.get()
+		ar1, ar2 = self.ar1.get(), self.ar2.get()
+		statusWord = self.statusWord.getWord()
+		dbRegister, diRegister = self.dbRegister, self.diRegister
+		callStackTop, callStackDepth = self.callStackTop, self.callStackDepth
+		activeLStack = self.activeLStack
+		mcrActive, mcrStack = self.mcrActive, self.mcrStack
+		relativeJump = self.relativeJump
+		prevPriority = self.__curPriority
+
+		self.__curPriority = priority
+		self.setMcrActive(False)
+		self.mcrStack = [ ]
+		try:
+			self.__runOB(ob, True)
+		finally:
+			self.__curPriority = prevPriority
+			self.accu1.set(accu1)
+			self.accu2.set(accu2)
+			self.accu3.set(accu3)
+			self.accu4.set(accu4)
+			self.ar1.set(ar1)
+			self.ar2.set(ar2)
+			self.statusWord.setWord(statusWord)
+			self.dbRegister, self.diRegister = dbRegister, diRegister
+			self.callStackTop = callStackTop
+			self.callStackDepth = callStackDepth
+			self.activeLStack = activeLStack
+			self.setMcrActive(mcrActive)
+			self.mcrStack = mcrStack
+			self.relativeJump = relativeJump
+
 	def initClockMemState(self, force=False):
 		"""Reset/initialize the clock memory byte state.
 		"""
@@ -1265,24 +1868,43 @@ class S7CPU(object): #+cdef
 		self.__speedMeasureStartTime = self.now
 		self.__speedMeasureStartInsnCount = 0
 		self.__speedMeasureStartCycleCount = 0
+		self.__cycleDeadline = 0.0
+		self.__padEnd = 0.0
 
 		self.initClockMemState(force=True)
 
-		# Run startup OB
 		ob102 = self.getOB(102)
 		ob100 = self.getOB(100)
-		if ob102 and self.is4accu:
-			# Cold start.
-			# This is only done on 4xx-series CPUs.
-			self.__runOB(ob102)
-		elif ob100:
-			# Warm start.
-			# This really is a cold start, because remanent
-			# resources were reset. However we could not execute
-			# OB 102, so this is a fallback.
-			# This is not 100% compliant with real CPUs, but it probably
-			# is sane behavior.
-			self.__runOB(ob100)
+		coldStart = bool(ob102 and self.is4accu)
+
+		# Restore the retentive memory.
+		# A cold start resets the retentive memory.
+		self.__startRetentive(coldStart)
+
+		# Run startup OB
+		# The startup OB is not preempted by interrupt OBs.
+		self.__curPriority = OBScheduler.PRIORITY_STARTUP
+		try:
+			if coldStart:
+				# Cold start.
+				# This is only done on 4xx-series CPUs.
+				self.__runOB(ob102)
+			elif ob100:
+				# Warm start.
+				# This really is a cold start, because remanent
+				# resources were reset. However we could not execute
+				# OB 102, so this is a fallback.
+				# This is not 100% compliant with real CPUs, but it probably
+				# is sane behavior.
+				self.__runOB(ob100)
+		finally:
+			self.__curPriority = OBScheduler.PRIORITY_OB1
+
+		# Start the cyclic interrupts.
+		self.updateTimestamp()
+		self.obScheduler.start(self.now,
+				       set(ob.index for ob in self.allOBs()))
+		self.__nextIntTime = self.obScheduler.nextDueTime()
 
 	# Run one cycle of the user program
 #@cy	@cython.cdivision(True)
@@ -1302,8 +1924,19 @@ class S7CPU(object): #+cdef
 		self.__runOB(self.__ob1)
 
 		# Update timekeeping and statistics
+		if self.__virtTimeEn: #+unlikely
+			self.__virtTime += self.__virtCycleStep
 		self.updateTimestamp()
 		self.__cycleCount = (self.__cycleCount + 1) & 0x3FFFFFFF #+suffix-u
+		self.cycleTimeHist.record(int((self.now - self.cycleStartTime) * 1000000.0))
+
+		# Run the interrupt OBs that became due at the end of OB 1.
+		if self.now >= self.__nextIntTime:
+			self.__runInterrupts()
+
+		# Write the retentive memory at the cycle boundary.
+		if self.__retentiveLayout is not None:
+			self.__commitRetentive()
 
 		# Evaluate speed measurement
 		elapsedTime = self.now - self.__speedMeasureStartTime
@@ -1327,7 +1960,8 @@ class S7CPU(object): #+cdef
 
 				# Calculate the cycle time padding, if enabled.
 				padCycleTime = 0.0
-				if self.__cycleTimeTargetLimited > 0.0:
+				if self.__cycleTimeTargetLimited > 0.0 and\
+				   not self.__cycleDeadlineEn:
 					cycleTimeDiff = self.__cycleTimeTargetLimited - cycleTime
 					padCycleTime = self.__padCycleTimeFilt.run(self.padCycleTime + cycleTimeDiff)
 					if padCycleTime < 0.0:
@@ -1371,8 +2005,165 @@ class S7CPU(object): #+cdef
 
 	# Sleep for the cycle padding duration, if required.
 	def sleepCyclePadding(self): #+cdef
-		if self.padCycleTime > 0.0:
-			self.__sleep(self.padCycleTime)
+#@cy		cdef double padCycleTime
+
+		if self.__cycleTimeTargetLimited > 0.0:
+			if self.__virtTimeEn:
+				self.__virtualCyclePadding()
+			elif self.__cycleDeadlineEn:
+				self.__sleepUntilDeadline()
+			else:
+				padCycleTime = self.padCycleTime
+				self.padTimeHist.record(int(padCycleTime * 1000000.0))
+				if padCycleTime > 0.0:
+					self.__padSleep(padCycleTime)
+
+	# Start the cycle padding, but do not sleep.
+	# This is the non-blocking variant of sleepCyclePadding().
+	# The padding is finished by calling pollCyclePadding().
+	def startCyclePadding(self): #+cdef
+#@cy		cdef double now
+#@cy		cdef double deadline
+#@cy		cdef double padCycleTime
+
+		self.__padEnd = 0.0
+		if self.__cycleTimeTargetLimited > 0.0:
+			if self.__virtTimeEn:
+				self.__virtualCyclePadding()
+			elif self.__cycleDeadlineEn:
+				now = monotonic_time()
+				deadline = self.__cycleDeadline
+				if deadline > 0.0 and now <= deadline:
+					self.padTimeHist.record(int((deadline - now) * 1000000.0))
+					self.__padEnd = deadline
+				else:
+					# First cycle or overrun.
+					# This does not sleep.
+					self.__sleepUntilDeadline()
+			else:
+				padCycleTime = self.padCycleTime
+				self.padTimeHist.record(int(padCycleTime * 1000000.0))
+				if padCycleTime > 0.0:
+					self.__padEnd = monotonic_time() + padCycleTime
+
+	# Run the interrupt OBs that became due during the cycle padding
+	# that was started by startCyclePadding().
+	# Returns the monotonic time at which the padding ends or the
+	# next interrupt OB becomes due, whatever comes first.
+	# Returns 0.0, if the padding is over and the next cycle is due.
+	def pollCyclePadding(self): #@nocy
+#@cy	cdef double pollCyclePadding(self):
+#@cy		cdef double now
+#@cy		cdef double padEnd
+
+		padEnd = self.__padEnd
+		if padEnd <= 0.0:
+			return 0.0
+		self.updateTimestamp()
+		if self.now >= self.__nextIntTime:
+			self.__runInterrupts()
+		now = monotonic_time()
+		if now < padEnd:
+			return min(padEnd, now + max(self.__nextIntTime - self.now, 0.0))
+		if self.__cycleDeadlineEn:
+			self.__recordLateness(now - padEnd)
+			self.__cycleDeadline = padEnd + self.__cycleTimeTargetLimited
+		self.__padEnd = 0.0
+		return 0.0
+
+	# Sleep for 'seconds' of cycle padding time.
+	# Interrupt OBs that become due while sleeping are run on time.
+	def __padSleep(self, seconds): #@nocy
+#@cy	cdef __padSleep(self, double seconds):
+#@cy		cdef double end
+#@cy		cdef double remaining
+
+		end = monotonic_time() + seconds
+		while True:
+			self.updateTimestamp()
+			if self.now >= self.__nextIntTime:
+				self.__runInterrupts()
+			remaining = end - monotonic_time()
+			if remaining <= 0.0:
+				break
+			self.__sleep(max(min(remaining, self.__nextIntTime - self.now), 0.0))
+
+	# Sleep until the absolute start deadline of the next cycle.
+	# The deadlines are a fixed grid of cycleTimeTarget periods,
+	# so sleep inaccuracies do not accumulate.
+	# The OS sleep wakes up DEADLINE_SPIN_TAIL early and the
+	# remaining time is busy-waited to reduce wakeup jitter.
+	def __sleepUntilDeadline(self): #+cdef
+#@cy		cdef double now
+#@cy		cdef double deadline
+#@cy		cdef double period
+#@cy		cdef double sleepTime
+#@cy		cdef double lateness
+
+		period = self.__cycleTimeTargetLimited
+		now = monotonic_time()
+		deadline = self.__cycleDeadline
+		if deadline <= 0.0:
+			# First cycle on this schedule.
+			# Start the deadline grid right now.
+			lateness = 0.0
+			deadline = now
+		elif now > deadline:
+			# The cycle overran its deadline.
+			# Skip the missed periods and restart the schedule
+			# from now instead of bursting to catch up.
+			lateness = now - deadline
+			self.missedDeadlines = (self.missedDeadlines + 1) & 0xFFFFFFFF #+suffix-u
+			deadline = now
+		else:
+			self.padTimeHist.record(int((deadline - now) * 1000000.0))
+			sleepTime = deadline - now - self.DEADLINE_SPIN_TAIL
+			if sleepTime > 0.0:
+				self.__padSleep(sleepTime)
+			now = monotonic_time()
+			while now < deadline:
+				now = monotonic_time()
+			lateness = now - deadline
+		self.__recordLateness(lateness)
+		self.__cycleDeadline = deadline + period
+
+	def __recordLateness(self, lateness): #@nocy
+#@cy	cdef __recordLateness(self, double lateness):
+		self.lastLateness = lateness
+		if lateness > self.maxLateness:
+			self.maxLateness = lateness
+		self.latenessHist.record(int(lateness * 1000000.0))
+
+	# Skip the cycle padding in virtual time.
+	# The next cycle starts exactly one cycle time target
+	# after the start of the current cycle.
+	def __virtualCyclePadding(self): #+cdef
+#@cy		cdef double padTime
+#@cy		cdef double deadline
+#@cy		cdef double intTime
+
+		self.updateTimestamp()
+		deadline = self.cycleStartTime + self.__cycleTimeTargetLimited
+		padTime = deadline - self.now
+		# Step the clock to the interrupts that are due
+		# before the deadline and run them.
+		intTime = self.__nextIntTime
+		while intTime <= deadline:
+			if intTime > self.now:
+				self.__virtTime += intTime - self.now
+				self.updateTimestamp()
+				# Compensate the rounding error of the clock step.
+				if intTime > self.now:
+					self.now = intTime
+					self.timerService.expire(intTime)
+			self.__runInterrupts()
+			intTime = self.__nextIntTime
+		if deadline > self.now:
+			self.__virtTime += deadline - self.now
+			self.updateTimestamp()
+		if padTime < 0.0:
+			padTime = 0.0
+		self.padTimeHist.record(int(padTime * 1000000.0))
 
 	# Returns 'self.now' as 31 bit millisecond representation.
 	# That is data type 'TIME'.
@@ -1396,7 +2187,10 @@ class S7CPU(object): #+cdef
 		# which is 2147483647 ms, which is 2147483.647 s.
 		# Create an offset to 'self.now' that is added every
 		# time 'self.now' is updated.
-		now = monotonic_time()
+		self.__virtTime = 0.0
+		self.__virtInsnCount = self.__insnCount
+		self.__virtDateBase = datetime.datetime.now()
+		now = self.__virtTime if self.__virtTimeEn else monotonic_time()
 		self.__nowOffset = -(now) + (2147483.647 - 0.1)
 		self.now = now = now + self.__nowOffset
 		self.startupTime = now
@@ -1411,10 +2205,17 @@ class S7CPU(object): #+cdef
 #@cy		cdef double now
 
 		# Update the system time
-		now = _getTime() #@nocy
-#@cy		now = monotonic_time()
+		if self.__virtTimeEn: #+unlikely
+			now = self.__virtualTimestamp()
+		else:
+			now = _getTime() #@nocy
+#@cy			now = monotonic_time()
 		self.now = now = now + self.__nowOffset
 
+		# Expire the timers that reached their deadline.
+		if now >= self.timerService.nextDeadline: #+unlikely
+			self.timerService.expire(now)
+
 		# Update the clock memory byte
 		if self.__clockMemByteOffset is not None and\
 		   now >= self.__nextClockMemTime:
@@ -1449,6 +2250,18 @@ class S7CPU(object): #+cdef
 					"\n\nThe configured clock memory byte "
 					"address might be invalid." )
 
+	# Get the virtual time.
+	# This accounts the instructions executed since the last call.
+	def __virtualTimestamp(self): #@nocy
+#@cy	cdef double __virtualTimestamp(self):
+#@cy		cdef uint32_t insnCount
+
+		insnCount = self.__insnCount
+		self.__virtTime += (((insnCount - self.__virtInsnCount) & 0x3FFFFFFF) * #+suffix-u
+				    self.__virtInsnStep)
+		self.__virtInsnCount = insnCount
+		return self.__virtTime
+
 	def __cycleTimeExceed(self): #+cdef
 		raise AwlSimError("Cycle time exceed %.3f seconds" % (
 				  self.cycleTimeLimit))
@@ -1472,7 +2285,10 @@ class S7CPU(object): #+cdef
 #@cy		cdef uint32_t second
 #@cy		cdef uint32_t msec
 
-		dt = datetime.datetime.now()
+		if self.__virtTimeEn: #+unlikely
+			dt = self.__virtDateBase + datetime.timedelta(seconds=self.__virtTime)
+		else:
+			dt = datetime.datetime.now()
 		year, month, day, hour, minute, second, msec =\
 			dt.year, dt.month, dt.day, dt.hour, \
 			dt.minute, dt.second, dt.microsecond // 1000
@@ -1758,6 +2574,9 @@ class S7CPU(object): #+cdef
 		self.callStackTop = newCse
 		self.callStackDepth = callStackDepth + 1 #+suffix-u
 
+		if self.__blockProf is not None: #+unlikely
+			self.__blockProf.enter(newCse.block)
+
 	def run_BE(self): #@nocy
 #@cy	cdef void run_BE(self):
 #@cy		cdef S7StatusWord s
@@ -1833,15 +2652,430 @@ class S7CPU(object): #+cdef
 
 	def getTimer(self, index): #@nocy
 #@cy	cdef Timer getTimer(self, uint32_t index):
+#@cy		cdef Timer timer
+
 		if index >= len_u32(self.timers):
 			raise AwlSimError("Fetched invalid timer %d" % index) #@nocov
-		return self.timers[index]
+		timer = self.timers[index]
+		if timer is None: #+unlikely
+			timer = self.timers[index] = Timer(self, index)
+			self.nrTimersAlloc += 1
+			if index < self.__nrRetentiveTimers:
+				self.__retentiveTimers.append(timer)
+		return timer
 
 	def getCounter(self, index): #@nocy
 #@cy	cdef Counter getCounter(self, uint32_t index):
+#@cy		cdef Counter counter
+
 		if index >= len_u32(self.counters):
 			raise AwlSimError("Fetched invalid counter %d" % index) #@nocov
-		return self.counters[index]
+		counter = self.counters[index]
+		if counter is None: #+unlikely
+			counter = self.counters[index] = Counter(self, index)
+			self.nrCountersAlloc += 1
+			if index < self.__nrRetentiveCounters:
+				self.__retentiveCounters.append(counter)
+		return counter
+
+	def getAllocStats(self):
+		"""Get the allocation statistics of the lazily allocated
+		timers, counters and flag memory pages.
+		Returns a dict of name -> (allocated, total).
+		"""
+		nrFlagPages = intDivRoundUp(len(self.flags), AwlSparseMemory.PAGE_SIZE)
+		if isinstance(self.flags, AwlSparseMemory):
+			flagPagesAlloc = self.flags.getNrPages()
+		else:
+			flagPagesAlloc = nrFlagPages
+		return {
+			"timers"	: (self.nrTimersAlloc, len(self.timers)),
+			"counters"	: (self.nrCountersAlloc, len(self.counters)),
+			"flag_pages"	: (flagPagesAlloc, nrFlagPages),
+		}
+
+	def getProgramIdent(self):
+		"""Get the ident hash of the loaded program.
+		This is calculated from the ident hashes
+		of all user code blocks and DBs.
+		"""
+		h = Block.IDENT_HASH()
+		for block in itertools.chain(self.allUserCodeBlocks(),
+					     self.allDBs()):
+			h.update(block.identHash)
+		return h.digest()
+
+	def captureState(self):
+		"""Capture the runtime state of the CPU.
+		This must be called between two cycles.
+		Returns a CPUStateSnapshot.
+		"""
+#@cy		cdef Timer timer
+#@cy		cdef Counter counter
+#@cy		cdef DB db
+
+		snapshot = CPUStateSnapshot()
+		snapshot.programIdent = self.getProgramIdent()
+		snapshot.now = self.now
+		snapshot.accus = [ self.accu1.value, self.accu2.value,
+				   self.accu3.value, self.accu4.value, ]
+		snapshot.ars = [ self.ar1.value, self.ar2.value, ]
+		snapshot.statusWord = self.statusWord.getWord()
+		snapshot.dbRegister = self.dbRegister.index
+		snapshot.diRegister = self.diRegister.index
+		snapshot.clockMemCount = self.__clockMemCount
+		snapshot.nextClockMemTime = self.__nextClockMemTime
+		snapshot.inputs = bytes(self.inputs.getDataBytes())
+		snapshot.outputs = bytes(self.outputs.getDataBytes())
+		snapshot.flags = bytes(self.flags.getDataBytes())
+		for db in self.allDBs():
+			if db.structInstance is not None:
+				snapshot.dbs[db.index] = bytes(
+					db.structInstance.memory.getDataBytes())
+		for timer in self.timers:
+			if timer is None:
+				continue
+			snapshot.timers.append((
+				timer.index,
+				self.__getTimerFlags(timer),
+				timer.timebase,
+				timer.deadline,
+				timer.remaining,
+			))
+		for counter in self.counters:
+			if counter is None:
+				continue
+			snapshot.counters.append((
+				counter.index,
+				self.__getCounterFlags(counter),
+				0,
+				counter.counter,
+			))
+		for obNumber, intr in sorted(dictItems(self.obScheduler.interrupts)):
+			snapshot.interrupts.append((
+				obNumber, 1 if intr.active else 0, 0,
+				intr.sign, 0, intr.lostCount,
+				intr.dueTime, intr.delay,
+			))
+		return snapshot
+
+	def restoreState(self, snapshot):
+		"""Restore a CPUStateSnapshot.
+		The CPU must run the same program that the snapshot
+		was captured from.
+		This must be called between two cycles.
+		"""
+#@cy		cdef Timer timer
+#@cy		cdef Counter counter
+#@cy		cdef DB db
+#@cy		cdef double delta
+
+		# Check whether the snapshot fits to this CPU before
+		# modifying anything.
+		if snapshot.programIdent and\
+		   snapshot.programIdent != self.getProgramIdent():
+			raise AwlSimError("Snapshot: The snapshot was captured "
+				"from a different program.")
+		for name, memory, data in (("inputs", self.inputs, snapshot.inputs),
+					   ("outputs", self.outputs, snapshot.outputs),
+					   ("flags", self.flags, snapshot.flags)):
+			if len(memory) != len(data):
+				raise AwlSimError("Snapshot: The size of the %s "
+					"(%d bytes) does not match the CPU (%d bytes)." % (
+					name, len(data), len(memory)))
+		for dbNumber, data in dictItems(snapshot.dbs):
+			db = self.getDB(dbNumber)
+			if db is None or db.structInstance is None or\
+			   len(db.structInstance.memory) != len(data):
+				raise AwlSimError("Snapshot: DB %d does not match "
+					"the program." % dbNumber)
+		for dbNumber in (snapshot.dbRegister, snapshot.diRegister):
+			if self.getDB(dbNumber) is None:
+				raise AwlSimError("Snapshot: DB %d does not exist." % (
+					dbNumber))
+		for entry in snapshot.timers:
+			if entry[0] >= len(self.timers):
+				raise AwlSimError("Snapshot: Timer %d does not exist." % (
+					entry[0]))
+		for entry in snapshot.counters:
+			if entry[0] >= len(self.counters):
+				raise AwlSimError("Snapshot: Counter %d does not exist." % (
+					entry[0]))
+
+		# Restore the clock, so that all deadlines stay valid.
+		self.updateTimestamp()
+		delta = snapshot.now - self.now
+		self.__nowOffset += delta
+		self.now = snapshot.now
+		self.startupTime += delta
+		self.cycleStartTime += delta
+		self.__speedMeasureStartTime += delta
+		self.__cycleDeadline = 0.0
+		self.__clockMemCount = snapshot.clockMemCount
+		self.__nextClockMemTime = snapshot.nextClockMemTime
+
+		self.accu1.value, self.accu2.value,\
+		self.accu3.value, self.accu4.value = snapshot.accus
+		self.ar1.value, self.ar2.value = snapshot.ars
+		self.statusWord.setWord(snapshot.statusWord)
+		self.dbRegister = self.getDB(snapshot.dbRegister)
+		self.diRegister = self.getDB(snapshot.diRegister)
+
+		self.inputs.setDataBytes(bytearray(snapshot.inputs))
+		self.outputs.setDataBytes(bytearray(snapshot.outputs))
+		self.flags.setDataBytes(bytearray(snapshot.flags))
+		for dbNumber, data in dictItems(snapshot.dbs):
+			self.getDB(dbNumber).structInstance.memory.setDataBytes(
+				bytearray(data))
+
+		self.timerService.reset()
+		self.timers = [None] * len(self.timers)
+		self.nrTimersAlloc = 0
+		self.__retentiveTimers = []
+		self.__clearRetentiveImage()
+		for index, flags, timebase, deadline, remaining in snapshot.timers:
+			timer = self.getTimer(index)
+			self.__setTimerFlags(timer, flags)
+			timer.timebase = timebase
+			timer.deadline = deadline
+			timer.remaining = remaining
+			timer.requeue()
+		self.counters = [None] * len(self.counters)
+		self.nrCountersAlloc = 0
+		self.__retentiveCounters = []
+		for index, flags, _, value in snapshot.counters:
+			counter = self.getCounter(index)
+			self.__setCounterFlags(counter, flags)
+			counter.counter = value
+
+		for obNumber, active, _, sign, _, lostCount, dueTime, delay in snapshot.interrupts:
+			intr = self.obScheduler.getInterrupt(obNumber)
+			if intr is None:
+				continue
+			intr.active = bool(active) and (not intr.isCyclic or
+							intr.period > 0.0)
+			intr.sign = sign
+			intr.lostCount = lostCount
+			intr.dueTime = dueTime
+			intr.delay = delay
+		self.__nextIntTime = self.obScheduler.nextDueTime()
+
+	def __getTimerFlags(self, timer): #@nocy
+#@cy	cdef uint8_t __getTimerFlags(self, Timer timer):
+		S = CPUStateSnapshot
+		return ((S.TIMERFLG_PREVVKE_S if timer.prevVKE_S else 0) |
+			(S.TIMERFLG_PREVVKE_FR if timer.prevVKE_FR else 0) |
+			(S.TIMERFLG_SETSTATUS if timer.deadlineActionSetStatus else 0) |
+			(S.TIMERFLG_STATUS if timer.status else 0) |
+			(S.TIMERFLG_RUNNING if timer.running else 0))
+
+	def __setTimerFlags(self, timer, flags): #@nocy
+#@cy	cdef void __setTimerFlags(self, Timer timer, uint8_t flags):
+		S = CPUStateSnapshot
+		timer.prevVKE_S = bool(flags & S.TIMERFLG_PREVVKE_S)
+		timer.prevVKE_FR = bool(flags & S.TIMERFLG_PREVVKE_FR)
+		timer.deadlineActionSetStatus = bool(flags & S.TIMERFLG_SETSTATUS)
+		timer.status = bool(flags & S.TIMERFLG_STATUS)
+		timer.running = bool(flags & S.TIMERFLG_RUNNING)
+
+	def __getCounterFlags(self, counter): #@nocy
+#@cy	cdef uint8_t __getCounterFlags(self, Counter counter):
+		S = CPUStateSnapshot
+		return ((S.COUNTERFLG_PREVVKE_FR if counter.prevVKE_FR else 0) |
+			(S.COUNTERFLG_PREVVKE_S if counter.prevVKE_S else 0) |
+			(S.COUNTERFLG_PREVVKE_ZV if counter.prevVKE_ZV else 0) |
+			(S.COUNTERFLG_PREVVKE_ZR if counter.prevVKE_ZR else 0))
+
+	def __setCounterFlags(self, counter, flags): #@nocy
+#@cy	cdef void __setCounterFlags(self, Counter counter, uint8_t flags):
+		S = CPUStateSnapshot
+		counter.prevVKE_FR = bool(flags & S.COUNTERFLG_PREVVKE_FR)
+		counter.prevVKE_S = bool(flags & S.COUNTERFLG_PREVVKE_S)
+		counter.prevVKE_ZV = bool(flags & S.COUNTERFLG_PREVVKE_ZV)
+		counter.prevVKE_ZR = bool(flags & S.COUNTERFLG_PREVVKE_ZR)
+
+	def setRetentiveFile(self, filename):
+		"""Set the retentive memory file.
+		The retentive memory areas configured in S7CPUConfig are
+		written to this file at the end of each cycle and they are
+		restored from it on the next warm restart.
+		None disables the retentive memory.
+		This takes effect on the next startup.
+		"""
+		self.closeRetentive()
+		self.__retentive = RetentiveStore(filename) if filename else None
+
+	def closeRetentive(self):
+		"""Close the retentive memory file.
+		"""
+		if self.__retentive is not None:
+			self.__retentive.close()
+		self.__retentiveLayout = None
+		self.__retentiveImage = None
+		self.__retentiveDirty = False
+		self.__nrRetentiveTimers = 0
+		self.__nrRetentiveCounters = 0
+		self.__retentiveTimers = []
+		self.__retentiveCounters = []
+
+	# Open the retentive memory file and restore the
+	# retentive memory areas from it, unless 'coldStart' is set.
+	def __startRetentive(self, coldStart):
+#@cy		cdef DB db
+#@cy		cdef uint32_t imageSize
+
+		self.closeRetentive()
+		conf = self.conf
+		if self.__retentive is None or not conf.hasRetentive():
+			return
+
+		nrFlagBytes = min(conf.retentiveFlagBytes, len(self.flags))
+		nrTimers = min(conf.retentiveTimers, len(self.timers))
+		nrCounters = min(conf.retentiveCounters, len(self.counters))
+		imageSize = (nrFlagBytes +
+			     (nrTimers * RetentiveStore.timerStruct.size) +
+			     (nrCounters * RetentiveStore.counterStruct.size))
+		layout = [ "M:%d" % nrFlagBytes,
+			   "T:%d" % nrTimers,
+			   "Z:%d" % nrCounters, ]
+		dbs = []
+		for dbNumber in conf.retentiveDBs:
+			db = self.getDB(dbNumber)
+			if db is None or db.structInstance is None:
+				printWarning("Retentive memory: DB %d does not "
+					     "exist." % dbNumber)
+				continue
+			dbs.append(db)
+			imageSize += len(db.structInstance.memory)
+			layout.append("DB%d:%d" % (dbNumber,
+				len(db.structInstance.memory)))
+
+		image = self.__retentive.open(";".join(layout), imageSize)
+		self.__retentiveLayout = (nrFlagBytes, nrTimers, nrCounters, dbs)
+		# Only the allocated timers and counters are committed.
+		# getTimer() and getCounter() add newly allocated ones.
+		self.__nrRetentiveTimers = nrTimers
+		self.__nrRetentiveCounters = nrCounters
+		self.__retentiveTimers = [ timer for timer in self.timers[0 : nrTimers]
+					   if timer is not None ]
+		self.__retentiveCounters = [ counter for counter in self.counters[0 : nrCounters]
+					     if counter is not None ]
+		self.__retentiveImage = bytearray(imageSize)
+		self.__retentiveDirty = True
+		if image is not None and not coldStart:
+			self.__restoreRetentive(bytearray(image))
+		else:
+			self.__retentive.clear()
+		self.__commitRetentive()
+
+	# Restore the retentive memory areas from a retentive image.
+	def __restoreRetentive(self, image):
+#@cy		cdef Timer timer
+#@cy		cdef Counter counter
+#@cy		cdef DB db
+#@cy		cdef uint32_t i
+#@cy		cdef uint32_t offset
+#@cy		cdef uint32_t size
+
+		timerStruct = RetentiveStore.timerStruct
+		counterStruct = RetentiveStore.counterStruct
+		nrFlagBytes, nrTimers, nrCounters, dbs = self.__retentiveLayout
+
+		self.flags.setDataBytesRange(0, image[0 : nrFlagBytes])
+		offset = nrFlagBytes
+		for i in range(nrTimers):
+			entry = image[offset : offset + timerStruct.size]
+			offset += timerStruct.size
+			if any(entry):
+				flags, timebase, _, remaining = timerStruct.unpack(entry)
+				timer = self.getTimer(i)
+				self.__setTimerFlags(timer, flags)
+				timer.timebase = timebase
+				timer.remaining = remaining
+				timer.deadline = self.now + remaining
+				timer.requeue()
+		for i in range(nrCounters):
+			entry = image[offset : offset + counterStruct.size]
+			offset += counterStruct.size
+			if any(entry):
+				flags, _, value = counterStruct.unpack(entry)
+				counter = self.getCounter(i)
+				self.__setCounterFlags(counter, flags)
+				counter.counter = value
+		for db in dbs:
+			size = len(db.structInstance.memory)
+			db.structInstance.memory.setDataBytesRange(0,
+				image[offset : offset + size])
+			offset += size
+
+	# Zero the retentive image buffer.
+	# The entries of deallocated timers and counters must be zero.
+	def __clearRetentiveImage(self): #+cdef
+		if self.__retentiveImage is not None:
+			self.__retentiveImage = bytearray(len(self.__retentiveImage))
+			self.__retentiveDirty = True
+
+	# Write the retentive memory areas to the retentive memory file.
+	# The image is assembled in a private buffer first.
+	# Only the areas that changed since the last commit are updated
+	# in the buffer, and the file is only written if any area changed.
+	def __commitRetentive(self): #+cdef
+#@cy		cdef Timer timer
+#@cy		cdef Counter counter
+#@cy		cdef DB db
+#@cy		cdef AwlMemory memory
+#@cy		cdef bytearray image
+#@cy		cdef _Bool dirty
+#@cy		cdef uint32_t offset
+#@cy		cdef uint32_t timersOffset
+#@cy		cdef uint32_t countersOffset
+#@cy		cdef uint32_t size
+
+		timerStruct = RetentiveStore.timerStruct
+		counterStruct = RetentiveStore.counterStruct
+		nrFlagBytes, nrTimers, nrCounters, dbs = self.__retentiveLayout
+		image = self.__retentiveImage
+		dirty = self.__retentiveDirty
+
+		data = self.flags.getDataBytesRange(0, nrFlagBytes)
+		if data != image[0 : nrFlagBytes]:
+			image[0 : nrFlagBytes] = data
+			dirty = True
+		# Timers and counters are not deallocated while running.
+		# The image entries of unallocated ones stay zero.
+		timersOffset = nrFlagBytes
+		for timer in self.__retentiveTimers:
+			offset = timersOffset + (timer.index * timerStruct.size)
+			data = timerStruct.pack(self.__getTimerFlags(timer),
+				timer.timebase, 0,
+				max(timer.deadline - self.now, 0.0) if timer.running\
+				else timer.remaining)
+			if data != image[offset : offset + timerStruct.size]:
+				image[offset : offset + timerStruct.size] = data
+				dirty = True
+		countersOffset = timersOffset + (nrTimers * timerStruct.size)
+		for counter in self.__retentiveCounters:
+			offset = countersOffset + (counter.index * counterStruct.size)
+			data = counterStruct.pack(self.__getCounterFlags(counter),
+				0, counter.counter)
+			if data != image[offset : offset + counterStruct.size]:
+				image[offset : offset + counterStruct.size] = data
+				dirty = True
+		offset = countersOffset + (nrCounters * counterStruct.size)
+		for db in dbs:
+			memory = db.structInstance.memory
+			size = len(memory)
+			data = memory.getDataBytes()
+			if data != image[offset : offset + size]:
+				image[offset : offset + size] = data
+				dirty = True
+			offset += size
+
+		if dirty:
+			fileImage, offset = self.__retentive.beginCommit()
+			fileImage[offset : offset + len(image)] = image
+			self.__retentive.endCommit()
+			self.__retentiveDirty = False
 
 	def getSpecs(self):
 		return self.specs
@@ -2743,14 +3977,13 @@ class S7CPU(object): #+cdef
 	def __dumpMem(self, prefix, memory, byteOffset, maxLen):
 		if not memory or maxLen <= 0:
 			return [ prefix + "--" ]
-		memArray = memory.getDataBytes()
-		ret, line, first, count, i = [], [], True, 0, byteOffset
+		memArray = memory.getDataBytesRange(byteOffset, maxLen)
+		ret, line, first, count, i = [], [], True, 0, 0
 		def append(line):
 			ret.append((prefix if first else (' ' * len(prefix))) +\
 				   ' '.join(line))
 		try:
-			end = maxLen + byteOffset
-			while i < end:
+			while i < maxLen:
 				line.append("%02X" % memArray[i])
 				count += 1
 				if count >= 16:
@@ -2867,6 +4100,18 @@ class S7CPU(object): #+cdef
 			padCycleTimeStr = "%.03f" % (padCycleTime * 1000.0)
 		ret.append("    OB1:  avg: %s ms  min: %s ms  max: %s ms  pad: %s ms" % (
 			   avgCycleTimeStr, minCycleTimeStr, maxCycleTimeStr, padCycleTimeStr))
+		if self.cycleTimeHist.count:
+			p50, p90, p99, p999 = (self.cycleTimeHist.percentile(p)
+					       for p in Histogram.PERCENTILES)
+			ret.append("   Tail:  p50: %.03f ms  p90: %.03f ms  p99: %.03f ms  p99.9: %.03f ms" % (
+				   p50 / 1000.0, p90 / 1000.0, p99 / 1000.0, p999 / 1000.0))
+		if self.__virtTimeEn:
+			ret.append("   Time:  virtual  %.03f s" % self.__virtTime)
+		if self.__cycleDeadlineEn:
+			ret.append("  Sched:  deadline-missed: %d  lateness: %.03f ms  max: %.03f ms" % (
+				   self.missedDeadlines,
+				   self.lastLateness * 1000.0,
+				   self.maxLateness * 1000.0))
 		return '\n'.join(ret)
 
 	@property
@@ -25,6 +25,7 @@ from awlsim.common.compat import *
 
 from awlsim.common.exceptions import *
 from awlsim.common.util import *
+from awlsim.common.histogram import * #+cimport
 
 from awlsim.core.offset import * #+cimport
 from awlsim.core.hardware_loader import *
@@ -112,6 +113,11 @@ class AbstractHardwareInterface(object): #+cdef
 		self.__running = False
 		self.__parseParameters(parameters)
 
+		# readInputs() and writeOutputs() run times, in microseconds.
+		# These are only recorded, if enabled by AwlSim.enableHwTiming().
+		self.readTimeHist = Histogram()
+		self.writeTimeHist = Histogram()
+
 		# Get the base addresses for convenience.
 		self.inputAddressBase = self.getParamValueByName("inputAddressBase")
 		self.outputAddressBase = self.getParamValueByName("outputAddressBase")
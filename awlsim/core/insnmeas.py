@@ -70,9 +70,46 @@ class InsnMeasData(object): #+cdef
 			self.maxRt * 1.0e6,
 			self.avgRt * 1.0e6)
 
+class InsnMeasLineData(object): #+cdef
+	"""Measurement data of one source line.
+	"""
+
+	def __init__(self, sourceId, sourceName, lineNr, blockName):
+		self.sourceId = sourceId
+		self.sourceName = sourceName
+		self.lineNr = lineNr
+		self.blockName = blockName
+		self.cumRt = 0.0
+		self.count = 0
+
+	def getRt(self, calOffset):
+		"""Get the calibrated cumulative runtime.
+		"""
+		return max(0.0, self.cumRt - (calOffset * self.count))
+
+class InsnMeasStackData(object): #+cdef
+	"""Measurement data of one call stack and source line.
+	"""
+
+	def __init__(self, stack):
+		self.stack = stack
+		self.cumRt = 0.0
+		self.count = 0
+
+	def getRt(self, calOffset):
+		"""Get the calibrated cumulative runtime.
+		"""
+		return max(0.0, self.cumRt - (calOffset * self.count))
+
 class InsnMeas(object): #+cdef
+	# Number of hot lines to show in dump().
+	DUMP_NR_HOTLINES = 20
+
 	def __init__(self):
 		self.__perf_counter = time.perf_counter
+		self.__lastRt = 0.0
+		self.__lineData = {}
+		self.__stackData = {}
 
 		self.__data = [None] * u32_to_s16(AwlInsnTypes.NR_TYPES + 1) #+suffix-u
 		for i in range(AwlInsnTypes.NR_TYPES + 1):
@@ -102,13 +139,47 @@ class InsnMeas(object): #+cdef
 		if begin:
 			measData.measStart = now
 		else:
-			rt = now - measData.measStart
+			self.__lastRt = rt = now - measData.measStart
 			measData.cumRt += rt
 			measData.count += 1
 			measData.minRt = min(measData.minRt, rt)
 			measData.maxRt = max(measData.maxRt, rt)
 			measData.measured = True
 
+	def measLine(self, insn, cse): #@nocy
+#@cy	cdef void measLine(self, AwlInsn insn, object cse):
+#@cy		cdef InsnMeasLineData lineData
+#@cy		cdef InsnMeasStackData stackData
+#@cy		cdef double rt
+
+		# Attribute the runtime of the last measured instruction
+		# to its source line and to the active call stack.
+		rt = self.__lastRt
+		lineNr = insn.getLineNr()
+		key = (insn.getSourceId(), lineNr)
+		lineData = self.__lineData.get(key)
+		if lineData is None:
+			source = cse.block.getSource()
+			lineData = InsnMeasLineData(
+				sourceId=key[0],
+				sourceName=(source.name if source else ""),
+				lineNr=lineNr,
+				blockName=str(cse.block))
+			self.__lineData[key] = lineData
+		lineData.cumRt += rt
+		lineData.count += 1
+
+		frames = [ "line %d" % lineNr, ]
+		while cse is not None:
+			frames.append(str(cse.block))
+			cse = cse.prevCse
+		stack = ";".join(reversed(frames))
+		stackData = self.__stackData.get(stack)
+		if stackData is None:
+			stackData = self.__stackData[stack] = InsnMeasStackData(stack)
+		stackData.cumRt += rt
+		stackData.count += 1
+
 	@property
 	def haveAnyMeasurements(self):
 		return any(self.__data[i].measured
@@ -129,6 +200,14 @@ class InsnMeas(object): #+cdef
 				measData = measData.subtractCal(calOffset)
 				yield insnType, measData
 
+	@property
+	def __allLineData(self):
+		# Sort by runtime. The hottest line comes first.
+		calOffset = self.__calOffset
+		return sorted(dictValues(self.__lineData),
+			      key=lambda lineData: lineData.getRt(calOffset),
+			      reverse=True)
+
 	def dump(self):
 		if not self.haveAnyMeasurements:
 			return
@@ -137,6 +216,18 @@ class InsnMeas(object): #+cdef
 		for insnType, measData in self.__allMeasData:
 			name = AwlInsnTypes.type2name_german[insnType]
 			ret.append(measData.dump(name))
+		calOffset = self.__calOffset
+		allLineData = self.__allLineData[:self.DUMP_NR_HOTLINES]
+		if allLineData:
+			ret.append("")
+			ret.append("Hot source lines:")
+		for lineData in allLineData:
+			ret.append("%s:%d (%s):  count: %d, cum: %.3f us" % (
+				lineData.sourceName or "<unknown>",
+				lineData.lineNr,
+				lineData.blockName,
+				lineData.count,
+				lineData.getRt(calOffset) * 1.0e6))
 		return "\n".join(ret) + "\n"
 
 	def dumpCSV(self):
@@ -156,3 +247,44 @@ class InsnMeas(object): #+cdef
 				measData.maxRt * 1.0e6,
 				measData.avgRt * 1.0e6))
 		return "\n".join(ret) + "\n"
+
+	def dumpLinesCSV(self):
+		"""Dump the per source line measurements as CSV.
+		"""
+		if not self.haveAnyMeasurements:
+			return ""
+		calOffset = self.__calOffset
+		ret = [ "source name;"
+			"source ID;"
+			"line number;"
+			"block;"
+			"execution count;"
+			"cumulative runtime (µs);"
+			"average runtime (µs)" ]
+		for lineData in self.__allLineData:
+			rt = lineData.getRt(calOffset)
+			ret.append("%s;%s;%d;%s;%d;%.3f;%.3f" % (
+				lineData.sourceName,
+				bytesToHexStr(lineData.sourceId) if lineData.sourceId else "",
+				lineData.lineNr,
+				lineData.blockName,
+				lineData.count,
+				rt * 1.0e6,
+				(rt / lineData.count) * 1.0e6 if lineData.count else 0.0))
+		return "\n".join(ret) + "\n"
+
+	def dumpFolded(self):
+		"""Dump the per call stack measurements in the collapsed
+		stack ("folded") format that is used by flame graph tools.
+		The value of each stack is the runtime in nanoseconds.
+		"""
+		if not self.haveAnyMeasurements:
+			return ""
+		calOffset = self.__calOffset
+		ret = []
+		for stack in sorted(self.__stackData):
+			stackData = self.__stackData[stack]
+			ret.append("%s %d" % (
+				stack,
+				int(round(stackData.getRt(calOffset) * 1.0e9))))
+		return "\n".join(ret) + "\n"
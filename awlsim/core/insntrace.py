@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Instruction execution trace recorder
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.enumeration import *
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+
+#from awlsim.core.insntrace cimport * #@cy
+from awlsim.core.blocks import * #+cimport
+from awlsim.core.instructions.main import * #+cimport
+
+#from cpython.mem cimport PyMem_Malloc, PyMem_Free #@cy
+
+
+__all__ = [
+	"InsnTrace",
+]
+
+
+class InsnTraceEntry(object):		#@nocy
+	__slots__ = (			#@nocy
+		"seq",			#@nocy
+		"blockType",		#@nocy
+		"blockIndex",		#@nocy
+		"ip",			#@nocy
+		"insnType",		#@nocy
+		"statusWord",		#@nocy
+		"accu1",		#@nocy
+		"accu2",		#@nocy
+		"ar1",			#@nocy
+		"ar2",			#@nocy
+		"dbNr",			#@nocy
+		"diNr",			#@nocy
+	)				#@nocy
+
+class InsnTrace(object): #+cdef
+	"""Instruction execution trace recorder.
+	The last 'depth' executed instructions and the CPU state at the
+	start of each instruction are recorded into a preallocated ring buffer.
+	Recording does not allocate memory, so the recorder is cheap
+	enough to be left enabled on a production system.
+	"""
+
+	DEFAULT_DEPTH	= 256
+	MAX_DEPTH	= 0x10000
+
+	# Block types in the trace entries.
+	EnumGen.start
+	BLOCKTYPE_UNKNOWN	= EnumGen.item
+	BLOCKTYPE_OB		= EnumGen.item
+	BLOCKTYPE_FC		= EnumGen.item
+	BLOCKTYPE_FB		= EnumGen.item
+	EnumGen.end
+
+	blockType2str = {
+		BLOCKTYPE_UNKNOWN	: "?",
+		BLOCKTYPE_OB		: "OB",
+		BLOCKTYPE_FC		: "FC",
+		BLOCKTYPE_FB		: "FB",
+	}
+
+#@cy	def __dealloc__(self):
+#@cy		PyMem_Free(self.__entries)
+#@cy		self.__entries = NULL
+
+	def __init__(self, depth=DEFAULT_DEPTH):
+		if not (1 <= depth <= self.MAX_DEPTH):
+			raise AwlSimError("Instruction trace: Invalid depth %d. "
+				"Valid range is 1 - %d." % (
+				depth, self.MAX_DEPTH))
+		self.depth = depth
+		self.__entries = [ InsnTraceEntry() for i in range(depth) ] #@nocy
+#@cy		self.__entries = <InsnTraceEntry *>PyMem_Malloc(depth * sizeof(InsnTraceEntry))
+#@cy		if not self.__entries:
+#@cy			raise AwlSimError("Instruction trace: Out of memory")
+		self.reset()
+
+	def reset(self):
+		"""Discard all recorded entries.
+		"""
+		self.__pos = 0
+		self.count = 0
+
+	def record(self, block, ip, insn, statusWord, #@nocy
+		   accu1, accu2, ar1, ar2, dbNr, diNr): #@nocy
+#@cy	cdef void record(self, CodeBlock block, uint32_t ip, AwlInsn insn,
+#@cy			 uint16_t statusWord,
+#@cy			 uint32_t accu1, uint32_t accu2,
+#@cy			 uint32_t ar1, uint32_t ar2,
+#@cy			 int32_t dbNr, int32_t diNr):
+#@cy		cdef InsnTraceEntry *entry
+#@cy		cdef uint32_t pos
+
+		pos = self.__pos
+		entry = self.__entries[pos]	#@nocy
+#@cy		entry = &self.__entries[pos]
+		pos += 1
+		self.__pos = 0 if pos >= self.depth else pos
+		entry.seq = self.count
+		self.count += 1
+
+		if block.isOB:
+			entry.blockType = self.BLOCKTYPE_OB
+		elif block.isFC:
+			entry.blockType = self.BLOCKTYPE_FC
+		elif block.isFB:
+			entry.blockType = self.BLOCKTYPE_FB
+		else:
+			entry.blockType = self.BLOCKTYPE_UNKNOWN
+		entry.blockIndex = block.index
+		entry.ip = ip
+		entry.insnType = insn.insnType
+		entry.statusWord = statusWord
+		entry.accu1 = accu1
+		entry.accu2 = accu2
+		entry.ar1 = ar1
+		entry.ar2 = ar2
+		entry.dbNr = dbNr
+		entry.diNr = diNr
+
+	@property
+	def haveAnyMeasurements(self):
+		return self.count > 0
+
+	def getEntries(self):
+		"""Get the recorded entries as list of dicts.
+		The oldest entry comes first.
+		"""
+#@cy		cdef InsnTraceEntry entry
+
+		nrEntries = min(self.count, self.depth)
+		pos = (self.__pos - nrEntries) % self.depth
+		ret = []
+		for i in range(nrEntries):
+			entry = self.__entries[(pos + i) % self.depth]
+			ret.append({
+				"seq"		: entry.seq,
+				"blockType"	: entry.blockType,
+				"blockIndex"	: entry.blockIndex,
+				"ip"		: entry.ip,
+				"insnType"	: entry.insnType,
+				"statusWord"	: entry.statusWord,
+				"accu1"		: entry.accu1,
+				"accu2"		: entry.accu2,
+				"ar1"		: entry.ar1,
+				"ar2"		: entry.ar2,
+				"dbNr"		: entry.dbNr,
+				"diNr"		: entry.diNr,
+			})
+		return ret
+
+	@staticmethod
+	def __getInsn(blocks, entry):
+		"""Get the AwlInsn of a trace entry.
+		Returns None, if the block has been changed since.
+		"""
+		block = blocks.get((entry["blockType"], entry["blockIndex"]))
+		if block is not None and entry["ip"] < len(block.insns):
+			insn = block.insns[entry["ip"]]
+			if insn.insnType == entry["insnType"]:
+				return insn
+		return None
+
+	@staticmethod
+	def __getInsnStr(insn, entry):
+		if insn is not None:
+			return str(insn)
+		return AwlInsn.type2name_english.get(entry["insnType"],
+						     "<unknown>")
+
+	@classmethod
+	def __getBlocks(cls, cpu):
+		blocks = {}
+		if cpu:
+			for block in cpu.allUserCodeBlocks():
+				if block.isOB:
+					blockType = cls.BLOCKTYPE_OB
+				elif block.isFC:
+					blockType = cls.BLOCKTYPE_FC
+				elif block.isFB:
+					blockType = cls.BLOCKTYPE_FB
+				else:
+					continue
+				blocks[(blockType, block.index)] = block
+		return blocks
+
+	def dump(self, cpu=None):
+		"""Dump the trace as human readable text.
+		If 'cpu' is given, the instructions are resolved
+		to their full text.
+		"""
+		if not self.haveAnyMeasurements:
+			return ""
+		blocks = self.__getBlocks(cpu)
+		ret = [ "Instruction trace (last %d of %d instructions, "
+			"CPU state before execution):" % (
+			min(self.count, self.depth), self.count) ]
+		ret.append("%10s  %-8s %5s %5s  %-24s %4s  %8s  %8s  %8s  %8s  %5s %5s" % (
+			   "seq", "block", "ip", "line", "instruction",
+			   "STW", "ACCU1", "ACCU2", "AR1", "AR2", "DB", "DI"))
+		for entry in self.getEntries():
+			insn = self.__getInsn(blocks, entry)
+			insnStr = self.__getInsnStr(insn, entry)
+			if len(insnStr) > 24:
+				insnStr = insnStr[:21] + "..."
+			ret.append("%10d  %-8s %5d %5d  %-24s %04X  %08X  %08X  %08X  %08X  %5d %5d" % (
+				entry["seq"],
+				"%s %d" % (self.blockType2str[entry["blockType"]],
+					   entry["blockIndex"]),
+				entry["ip"],
+				insn.getLineNr() if insn is not None else -1,
+				insnStr,
+				entry["statusWord"],
+				entry["accu1"],
+				entry["accu2"],
+				entry["ar1"],
+				entry["ar2"],
+				entry["dbNr"],
+				entry["diNr"]))
+		return "\n".join(ret) + "\n"
+
+	def dumpCSV(self, cpu=None):
+		"""Dump the trace as CSV.
+		"""
+		if not self.haveAnyMeasurements:
+			return ""
+		blocks = self.__getBlocks(cpu)
+		ret = [ "seq;"
+			"block type;"
+			"block index;"
+			"ip;"
+			"line number;"
+			"instruction;"
+			"status word;"
+			"accu 1;"
+			"accu 2;"
+			"ar 1;"
+			"ar 2;"
+			"db;"
+			"di" ]
+		for entry in self.getEntries():
+			insn = self.__getInsn(blocks, entry)
+			ret.append("%d;%s;%d;%d;%d;%s;%d;%d;%d;%d;%d;%d;%d" % (
+				entry["seq"],
+				self.blockType2str[entry["blockType"]],
+				entry["blockIndex"],
+				entry["ip"],
+				insn.getLineNr() if insn is not None else -1,
+				self.__getInsnStr(insn, entry).replace(";", ","),
+				entry["statusWord"],
+				entry["accu1"],
+				entry["accu2"],
+				entry["ar1"],
+				entry["ar2"],
+				entry["dbNr"],
+				entry["diNr"]))
+		return "\n".join(ret) + "\n"
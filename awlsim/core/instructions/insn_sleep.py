@@ -48,6 +48,12 @@ class AwlInsn_SLEEP(AwlInsn): #+cdef
 		if sleepSecs >= self.cpu.cycleTimeLimit:
 			raise AwlSimError("__SLEEP time exceed cycle time limit") #@nocov
 
+		if self.cpu.virtualTimeEnabled():
+			# Do not sleep in virtual time. Just advance the clock.
+			self.cpu.advanceVirtualTime(sleepSecs)
+			self.cpu.updateTimestamp()
+			return
+
 		self.cpu.updateTimestamp()
 		start = self.cpu.now
 		while 1:
@@ -228,6 +228,8 @@ class AwlInsn(object): #+cdef
 		"labelStr",
 		"commentStr",
 		"parentInfo",
+		"covCount",
+		"covTaken",
 		"_widths_1",
 		"_widths_8_16_32",
 		"_widths_16",
@@ -248,6 +250,8 @@ class AwlInsn(object): #+cdef
 		self.params = ()			# Parameter assignments (for CALL)
 		self.labelStr = None			# Optional label string.
 		self.commentStr = ""			# Optional comment string.
+		self.covCount = 0			# Coverage: Execution count
+		self.covTaken = 0			# Coverage: Control flow jumps
 
 		# Local copy of commonly used fetch/store widths.
 		self._widths_1		= AwlOperatorWidths.WIDTH_MASK_1
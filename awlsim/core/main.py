@@ -28,6 +28,7 @@ from awlsim.common.env import *
 from awlsim.common.exceptions import *
 from awlsim.common.profiler import *
 from awlsim.common.util import *
+from awlsim.common.monotonic import * #+cimport
 
 from awlsim.core.cpu import * #+cimport
 from awlsim.core.hardware import * #+cimport
@@ -52,7 +53,7 @@ def AwlSim_decorator_profiled(profileLevel):
 			if self._profileLevel >= profileLevel:
 				self._profileStart() #@nocov
 			try:
-				func(self, *args, **kwargs)
+				return func(self, *args, **kwargs)
 			finally:
 				if self._profileLevel >= profileLevel:
 					self._profileStop() #@nocov
@@ -65,7 +66,7 @@ def AwlSim_decorator_throwsAwlSimError(func):
 	@functools.wraps(func) #@nocy
 	def awlSimErrorExtension_wrapper(self, *args, **kwargs):
 		try:
-			func(self, *args, **kwargs)
+			return func(self, *args, **kwargs)
 		except AwlSimError as e:
 			self._handleSimException(e)
 	return awlSimErrorExtension_wrapper
@@ -81,6 +82,7 @@ class AwlSim(object): #+cdef
 		self.__registeredHardware = []
 		self.__registeredHardwareCount = 0
 		self.__hwStartupRequired = True
+		self.__hwTimingEn = False
 		self._fatalHwErrors = True
 		self.cpu = S7CPU()
 		self.cpu.setPeripheralReadCallback(self.__peripheralReadCallback)
@@ -91,6 +93,22 @@ class AwlSim(object): #+cdef
 	def getCPU(self):
 		return self.cpu
 
+	def enableHwTiming(self, enable=True):
+		"""Enable or disable the run time measurement of the
+		hardware module readInputs() and writeOutputs() methods.
+		The times are recorded into the readTimeHist and writeTimeHist
+		histograms of the hardware modules.
+		"""
+		self.__hwTimingEn = bool(enable)
+
+	def hwTimingEnabled(self):
+		return self.__hwTimingEn
+
+	def getHardware(self):
+		"""Get a list of all registered hardware modules.
+		"""
+		return self.__registeredHardware[:]
+
 	def __setProfiler(self, profileLevel): #@nocov
 		self._profileLevel = profileLevel
 		if self._profileLevel <= 0:
@@ -118,6 +136,11 @@ class AwlSim(object): #+cdef
 			# The CPU reference is not set, yet.
 			# Set it to the current CPU.
 			e.setCpu(self.cpu)
+		if e.getInsnTraceStr() is None:
+			# Freeze the instruction trace at the time of the error.
+			insnTrace = self.cpu.getInsnTrace()
+			if insnTrace:
+				e.setInsnTraceStr(insnTrace.dump(self.cpu))
 		if fatal:
 			# Re-raise the exception for upper layers to catch.
 			raise e
@@ -153,6 +176,15 @@ class AwlSim(object): #+cdef
 	def build(self):
 		self.cpu.build()
 
+	@profiled(2)
+	@throwsAwlSimError
+	def hotBuild(self):
+		"""Build the loaded blocks and swap them into the running
+		program at this cycle boundary, without a full build().
+		Returns False, if a full build() is required instead.
+		"""
+		return self.cpu.hotBuild()
+
 	@profiled(2)
 	@throwsAwlSimError
 	def load(self, parseTree, rebuild = False, sourceManager = None):
@@ -214,11 +246,89 @@ class AwlSim(object): #+cdef
 		if self._profileLevel >= 1:
 			self._profileStop() #@nocov
 
+	def pollCycle(self): #@nocy
+#@cy	cpdef double pollCycle(self):
+		"""Run one cycle, if it is due. This never blocks.
+		The cycle padding is not slept, but the next cycle is
+		delayed until the padding is over.
+		This is used to run multiple CPUs in one thread.
+		Returns the monotonic time at which this method has to be
+		called again. Returns 0.0, if it has to be called again immediately.
+		"""
+#@cy		cdef double nextTime
+
+		nextTime = 0.0
+		if self._profileLevel >= 1:
+			self._profileStart() #@nocov
+
+		try:
+			nextTime = self.cpu.pollCyclePadding()
+			if nextTime <= 0.0:
+				if self.__registeredHardwareCount:
+					self.__readHwInputs()
+				self.cpu.runCycle()
+				if self.__registeredHardwareCount:
+					self.__writeHwOutputs()
+				self.cpu.startCyclePadding()
+				nextTime = self.cpu.pollCyclePadding()
+		except AwlSimError as e:
+			self._handleSimException(e)
+		except MaintenanceRequest as e:
+			self.__handleMaintenanceRequest(e)
+
+		if self._profileLevel >= 1:
+			self._profileStop() #@nocov
+		return nextTime
+
+	@throwsAwlSimError
+	def step(self, nrCycles=1, timeStep=-1.0):
+		"""Run exactly 'nrCycles' cycles in lockstep.
+		This is used to co-simulate the program with an external plant model.
+		The model stores the process image inputs (cpu.storeInputRange())
+		before the step and fetches the outputs (cpu.fetchOutputRange())
+		after the step.
+		If timeStep is not negative, the CPU runs in virtual time during
+		the step and exactly 'timeStep' seconds pass per cycle (plus the
+		configured virtual time per instruction).
+		The CPU configuration is restored afterwards. Enable virtual time
+		in the configuration, if the clock shall not advance between steps.
+		"""
+		if timeStep < 0.0:
+			for i in range(nrCycles):
+				self.runCycle()
+			return
+		conf = self.cpu.getConf()
+		virtTimeEn = conf.virtTimeEn
+		virtTimeCycleStepUs = conf.virtTimeCycleStepUs
+		try:
+			conf.setVirtTimeCycleStepUs(int(round(timeStep * 1000000.0)))
+			conf.setVirtTimeEn(True)
+			for i in range(nrCycles):
+				self.runCycle()
+		finally:
+			conf.setVirtTimeEn(virtTimeEn)
+			conf.setVirtTimeCycleStepUs(virtTimeCycleStepUs)
+
+	def captureState(self):
+		"""Capture the runtime state of the CPU.
+		Returns a CPUStateSnapshot.
+		"""
+		return self.cpu.captureState()
+
+	@throwsAwlSimError
+	def restoreState(self, snapshot):
+		"""Restore a CPUStateSnapshot captured by captureState().
+		The CPU must run the same program.
+		"""
+		self.cpu.restoreState(snapshot)
+
 	@throwsAwlSimError
 	def shutdown(self):
 		"""Shutdown the Awlsim core.
 		This will unregister all hardware modules and shut down execution.
 		"""
+		self.cpu.setupSampleProf(False)
+		self.cpu.closeRetentive()
 		self.unregisterAllHardware()
 		ps = self.getProfileStats()
 		if ps: #@nocov
@@ -285,6 +395,7 @@ class AwlSim(object): #+cdef
 		"""
 #@cy		cdef AbstractHardwareInterface hw
 #@cy		cdef uint32_t i
+#@cy		cdef double begin
 
 		# Note: Bounds checking of the indexing operator [] is disabled
 		#       by @cython.boundscheck(False) in this method.
@@ -292,7 +403,12 @@ class AwlSim(object): #+cdef
 		for i in range(self.__registeredHardwareCount):
 			try:
 				hw = self.__registeredHardware[i]
-				hw.readInputs()
+				if self.__hwTimingEn: #+unlikely
+					begin = monotonic_time()
+					hw.readInputs()
+					hw.readTimeHist.record(int((monotonic_time() - begin) * 1000000.0))
+				else:
+					hw.readInputs()
 			except AwlSimError as e:
 				self._handleSimException(e,
 					fatal = self._fatalHwErrors)
@@ -303,6 +419,7 @@ class AwlSim(object): #+cdef
 		"""
 #@cy		cdef AbstractHardwareInterface hw
 #@cy		cdef uint32_t i
+#@cy		cdef double begin
 
 		# Note: Bounds checking of the indexing operator [] is disabled
 		#       by @cython.boundscheck(False) in this method.
@@ -310,7 +427,12 @@ class AwlSim(object): #+cdef
 		for i in range(self.__registeredHardwareCount):
 			try:
 				hw = self.__registeredHardware[i]
-				hw.writeOutputs()
+				if self.__hwTimingEn: #+unlikely
+					begin = monotonic_time()
+					hw.writeOutputs()
+					hw.writeTimeHist.record(int((monotonic_time() - begin) * 1000000.0))
+				else:
+					hw.writeOutputs()
 			except AwlSimError as e:
 				self._handleSimException(e,
 					fatal = self._fatalHwErrors)
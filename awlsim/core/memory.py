@@ -44,6 +44,7 @@ __all__ = [
 	"Accu",
 	"Addressregister",
 	"AwlMemory",
+	"AwlSparseMemory",
 	"AwlMemoryObject",
 	"make_AwlMemoryObject_fromBytes",
 	"make_AwlMemoryObject_fromScalar",
@@ -686,6 +687,29 @@ class AwlMemory(object): #+cdef
 #@cy	cdef uint8_t * getRawDataBytes(self):
 		return self.__dataBytes
 
+	# Get a copy of the data bytes from 'offset' to 'offset + length'.
+	# The range is truncated to the memory size.
+	def getDataBytesRange(self, offset, length):			#@nocy
+		return self.__dataBytes[offset : offset + length]	#@nocy
+
+#@cy	cpdef bytearray getDataBytesRange(self, uint32_t offset, uint32_t length):
+#@cy		cdef uint64_t end
+#@cy		offset = min(offset, self.__dataBytesLen)
+#@cy		end = min(<uint64_t>offset + length, self.__dataBytesLen)
+#@cy		return bytearray((<char *>self.__dataBytes)[offset : end])
+
+	# Overwrite the data bytes from 'offset' with 'data'.
+	# The range is truncated to the memory size.
+	def setDataBytesRange(self, offset, data):			#@nocy
+		length = max(min(len(data), self.__dataBytesLen - offset), 0)	#@nocy
+		self.__dataBytes[offset : offset + length] = data[ : length]	#@nocy
+
+#@cy	cpdef setDataBytesRange(self, uint32_t offset, bytearray data):
+#@cy		cdef uint64_t length
+#@cy		offset = min(offset, self.__dataBytesLen)
+#@cy		length = min(<uint64_t>len(data), self.__dataBytesLen - offset)
+#@cy		memcpy(&self.__dataBytes[offset], <uint8_t *>data, length)
+
 #@cy	def __dealloc__(self):
 #@cy		PyMem_Free(self.__dataBytes)
 #@cy		self.__dataBytes = NULL
@@ -788,6 +812,174 @@ class AwlMemory(object): #+cdef
 	def __str__(self): #@nocov
 		return self.__repr__()
 
+class AwlSparseMemory(AwlMemory): #+cdef
+	"""Sparse memory representation.
+	The memory is split into pages that are allocated on the first
+	non-zero store. Pages that have not been allocated read as zero.
+	This is used for large memory areas that are mostly unused.
+	"""
+
+	__slots__ = (
+		"pages",	# dict of page index -> bytearray
+		"size",		# Memory size, in bytes
+	)
+
+	PAGE_SHIFT	= 12
+	PAGE_SIZE	= 1 << PAGE_SHIFT
+	PAGE_MASK	= PAGE_SIZE - 1
+
+	def __init__(self, size=0):
+		AwlMemory.__init__(self, 0)
+		self.size = size
+		self.pages = {}
+
+	def setDataBytes(self, dataBytes): #@nocy
+#@cy	cpdef setDataBytes(self, bytearray dataBytes):
+		self.size = len(dataBytes)
+		self.pages = {}
+		self.__write(0, dataBytes)
+
+	def getDataBytes(self): #@nocy
+#@cy	cpdef bytearray getDataBytes(self):
+		return self.__read(0, self.size)
+
+	def getDataBytesRange(self, offset, length): #@nocy
+#@cy	cpdef bytearray getDataBytesRange(self, uint32_t offset, uint32_t length):
+		offset = min(offset, self.size)
+		return self.__read(offset, min(offset + length, self.size) - offset)
+
+	def setDataBytesRange(self, offset, data): #@nocy
+#@cy	cpdef setDataBytesRange(self, uint32_t offset, bytearray data):
+		offset = min(offset, self.size)
+		self.__write(offset, data[ : self.size - offset])
+
+	def getRawDataBytes(self): #@nocy
+#@cy	cdef uint8_t * getRawDataBytes(self):
+		raise AwlSimError("AwlSparseMemory: No raw data access.")
+
+	# Get the number of allocated pages.
+	def getNrPages(self):
+		return len(self.pages)
+
+	# Read 'nrBytes' from 'byteOffset'.
+	# The range is not checked.
+	def __read(self, byteOffset, nrBytes): #@nocy
+#@cy	cdef bytearray __read(self, uint32_t byteOffset, uint32_t nrBytes):
+#@cy		cdef bytearray data
+#@cy		cdef uint32_t pageOffset
+#@cy		cdef uint32_t count
+
+		data = bytearray()
+		while nrBytes:
+			pageOffset = byteOffset & self.PAGE_MASK
+			count = min(nrBytes, self.PAGE_SIZE - pageOffset)
+			page = self.pages.get(byteOffset >> self.PAGE_SHIFT)
+			if page is None:
+				data += bytearray(count)
+			else:
+				data += page[pageOffset : pageOffset + count]
+			byteOffset += count
+			nrBytes -= count
+		return data
+
+	# Write 'data' to 'byteOffset'.
+	# The range is not checked.
+	def __write(self, byteOffset, data): #@nocy
+#@cy	cdef __write(self, uint32_t byteOffset, bytearray data):
+#@cy		cdef uint32_t pageOffset
+#@cy		cdef uint32_t count
+#@cy		cdef uint32_t pos
+
+		pos = 0
+		while pos < len(data):
+			pageOffset = byteOffset & self.PAGE_MASK
+			count = min(len(data) - pos, self.PAGE_SIZE - pageOffset)
+			chunk = data[pos : pos + count]
+			page = self.pages.get(byteOffset >> self.PAGE_SHIFT)
+			if page is None and any(chunk):
+				page = bytearray(self.PAGE_SIZE)
+				self.pages[byteOffset >> self.PAGE_SHIFT] = page
+			if page is not None:
+				page[pageOffset : pageOffset + count] = chunk
+			byteOffset += count
+			pos += count
+
+	def fetch(self, offset, width): #@nocy
+#@cy	cdef AwlMemoryObject fetch(self, AwlOffset offset, uint32_t width) except NULL:
+#@cy		cdef uint32_t byteOffset
+#@cy		cdef uint64_t end
+#@cy		cdef uint8_t value
+#@cy		cdef bytearray data
+
+		byteOffset = offset.byteOffset
+		if width == 1:
+			if byteOffset >= self.size: #+unlikely
+				raise AwlSimError("fetch: Operator offset '%s' out of range." % (
+						  str(offset)))
+			page = self.pages.get(byteOffset >> self.PAGE_SHIFT)
+			if page is None:
+				return constMemObj_1bit_0
+			value = page[byteOffset & self.PAGE_MASK]
+			return (constMemObj_1bit_1 if ((value >> offset.bitOffset) & 1) else #+suffix-u
+			        constMemObj_1bit_0)
+		else:
+			assert(not offset.bitOffset) #@nocy
+			end = byteOffset + intDivRoundUp(width, 8)
+			if end > self.size: #+unlikely
+				raise AwlSimError("fetch: Operator offset '%s' out of range." % (
+						  str(offset)))
+			data = self.__read(byteOffset, end - byteOffset)
+			return make_AwlMemoryObject_fromBytes(data, width) #@nocy
+#@cy			return make_AwlMemoryObject_fromCArray(<const uint8_t *>data, width)
+
+	def store(self, offset, memObj): #@nocy
+#@cy	cdef store(self, AwlOffset offset, AwlMemoryObject memObj):
+#@cy		cdef uint32_t byteOffset
+#@cy		cdef uint32_t bitOffset
+#@cy		cdef uint32_t pageOffset
+#@cy		cdef uint32_t width
+#@cy		cdef uint64_t nrBytes
+#@cy		cdef uint8_t bit
+
+		width = memObj.width
+		byteOffset = offset.byteOffset
+
+		if width == 1:
+			if byteOffset >= self.size: #+unlikely
+				raise AwlSimError("store: Operator offset '%s' out of range." % (
+						  str(offset)))
+			bit = memObj.dataBytes[0] & 1
+			page = self.pages.get(byteOffset >> self.PAGE_SHIFT)
+			if page is None:
+				if not bit:
+					return
+				page = bytearray(self.PAGE_SIZE)
+				self.pages[byteOffset >> self.PAGE_SHIFT] = page
+			bitOffset = offset.bitOffset
+			pageOffset = byteOffset & self.PAGE_MASK
+			page[pageOffset] = ((page[pageOffset] & (~(1 << bitOffset) & 0xFF)) | #+suffix-u
+					    (bit << bitOffset))
+		else:
+			nrBytes = intDivRoundUp(width, 8)
+			if byteOffset + nrBytes > self.size: #+unlikely
+				raise AwlSimError("store: Operator offset '%s' out of range." % (
+						  str(offset)))
+			self.__write(byteOffset, memObj.dataBytes) #@nocy
+#@cy			self.__write(byteOffset, bytearray((<char *>memObj.dataBytes)[:nrBytes]))
+
+	def __len__(self):
+		return self.size
+
+	def __bool__(self):
+		return bool(self.size)
+
+	def __nonzero__(self):		#@nocy
+		return bool(self.size)	#@nocy
+
+	def __repr__(self): #@nocov
+		return "AwlSparseMemory(size=%d, pages=%d)" % (
+			self.size, len(self.pages))
+
 class AwlMemoryObject(object):						#@nocy
 	__slots__ = (							#@nocy
 		"width",	# int, width in bits			#@nocy
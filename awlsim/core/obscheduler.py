@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Interrupt OB scheduler
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+from awlsim.common.cpuconfig import *
+
+
+__all__ = [
+	"OBInterrupt",
+	"OBScheduler",
+]
+
+
+class OBInterrupt(object):
+	"""State of one interrupt OB.
+	"""
+
+	__slots__ = (
+		"obNumber",	# The OB number
+		"priority",	# The priority class
+		"startEvent",	# The OB start event (STRT_INF)
+		"period",	# Cyclic interrupt period, in seconds. 0 = no cyclic interrupt.
+		"phase",	# Cyclic interrupt phase offset, in seconds.
+		"delay",	# Time-delay interrupt delay, in seconds.
+		"sign",		# Time-delay interrupt SIGN word.
+		"dueTime",	# The next due time, in CPU time.
+		"active",	# True, if the interrupt is armed.
+		"lostCount",	# Number of lost interrupts (overruns).
+	)
+
+	def __init__(self, obNumber, priority, startEvent):
+		self.obNumber = obNumber
+		self.priority = priority
+		self.startEvent = startEvent
+		self.period = 0.0
+		self.phase = 0.0
+		self.delay = 0.0
+		self.sign = 0
+		self.dueTime = 0.0
+		self.active = False
+		self.lostCount = 0
+
+	@property
+	def isCyclic(self):
+		return self.obNumber in OBScheduler.CYCLIC_OBS
+
+class OBScheduler(object):
+	"""Interrupt OB scheduler.
+	This keeps track of the cyclic interrupts (OB 30 - OB 38)
+	and the time-delay interrupts (OB 20 - OB 23).
+	It decides which interrupt OB is due next.
+	Running the OBs is up to the CPU.
+	"""
+
+	CYCLIC_OBS	= S7CPUConfig.CYCLIC_INT_OBS
+	DELAY_OBS	= tuple(range(20, 24))
+
+	# Priority classes
+	PRIORITY_OB1		= 1
+	PRIORITY_STARTUP	= 27
+	priorities = {
+		20 : 3,  21 : 4,  22 : 5,  23 : 6,
+		30 : 7,  31 : 8,  32 : 9,  33 : 10, 34 : 11,
+		35 : 12, 36 : 13, 37 : 14, 38 : 15,
+	}
+
+	# Maximum time-delay interrupt delay, in milliseconds.
+	MAX_DELAY_MS = 60000
+
+	# Error codes of the time-delay interrupt SFCs.
+	E_OBNR		= 0x8090 # Invalid OB_NR
+	E_DTIME		= 0x8091 # Invalid DTIME
+	E_NOTSTARTED	= 0x80A0 # Time-delay interrupt not started
+
+	# Time-delay interrupt status word bits (QRY_DINT STATUS).
+	STATUS_ACTIVE	= 1 << 2 # The time-delay interrupt is started.
+	STATUS_LOADED	= 1 << 4 # The OB is loaded.
+
+	# Due time of disabled interrupts.
+	NEVER = float("inf")
+
+	def __init__(self):
+		self.interrupts = {}
+		for obNumber in self.DELAY_OBS:
+			self.interrupts[obNumber] = OBInterrupt(
+				obNumber = obNumber,
+				priority = self.priorities[obNumber],
+				startEvent = 0x20 + (obNumber - 19))
+		for obNumber in self.CYCLIC_OBS:
+			intr = self.interrupts[obNumber] = OBInterrupt(
+				obNumber = obNumber,
+				priority = self.priorities[obNumber],
+				startEvent = 0x30 + (obNumber - 29))
+			intr.period = S7CPUConfig.DEFAULT_CYCLIC_INT_PERIODS_MS[obNumber] / 1000.0
+		self.reset()
+
+	def reset(self):
+		"""Disarm all interrupts.
+		"""
+		for intr in dictValues(self.interrupts):
+			intr.active = False
+			intr.lostCount = 0
+
+	def getInterrupt(self, obNumber):
+		"""Get the OBInterrupt of an interrupt OB or None.
+		"""
+		return self.interrupts.get(obNumber, None)
+
+	def setCyclic(self, obNumber, period, phase):
+		"""Configure a cyclic interrupt.
+		'period' and 'phase' are in seconds. A period of 0 disables the OB.
+		This takes effect on the next startup.
+		"""
+		intr = self.interrupts[obNumber]
+		intr.period = max(period, 0.0)
+		intr.phase = max(phase, 0.0)
+
+	def start(self, now, loadedOBs):
+		"""Arm the cyclic interrupts of the cyclic OBs in 'loadedOBs'.
+		The first interrupt of each OB is due one period
+		plus the phase offset after 'now'.
+		Time-delay interrupts that have already been
+		started (e.g. in OB 100) are kept.
+		"""
+		for obNumber in self.CYCLIC_OBS:
+			intr = self.interrupts[obNumber]
+			intr.active = (intr.period > 0.0 and
+				       obNumber in loadedOBs)
+			intr.dueTime = now + intr.period + intr.phase
+
+	def startNew(self, now, loadedOBs):
+		"""Arm the cyclic interrupts of the cyclic OBs in 'loadedOBs',
+		which are not armed yet (e.g. OBs added while running).
+		The first interrupt of each OB is due one period
+		plus the phase offset after 'now'.
+		Interrupts that are already armed are kept.
+		"""
+		for obNumber in self.CYCLIC_OBS:
+			intr = self.interrupts[obNumber]
+			if not intr.active and intr.period > 0.0 and\
+			   obNumber in loadedOBs:
+				intr.active = True
+				intr.dueTime = now + intr.period + intr.phase
+
+	def nextDueTime(self):
+		"""Get the due time of the next armed interrupt.
+		Returns NEVER, if no interrupt is armed.
+		"""
+		dueTime = self.NEVER
+		for intr in dictValues(self.interrupts):
+			if intr.active and intr.dueTime < dueTime:
+				dueTime = intr.dueTime
+		return dueTime
+
+	def popDue(self, now, priority):
+		"""Get the due interrupt with the highest priority class.
+		Only interrupts with a priority class above 'priority'
+		are considered. The returned interrupt is re-armed
+		(cyclic interrupt) or disarmed (time-delay interrupt).
+		Returns None, if no such interrupt is due.
+		"""
+		found = None
+		for intr in dictValues(self.interrupts):
+			if intr.active and intr.dueTime <= now and\
+			   intr.priority > priority and\
+			   (found is None or intr.priority > found.priority):
+				found = intr
+		if found is None:
+			return None
+		if found.isCyclic:
+			# Re-arm the cyclic interrupt.
+			# Periods that have been missed are lost.
+			found.dueTime += found.period
+			if found.dueTime <= now:
+				missed = int((now - found.dueTime) // found.period) + 1
+				found.lostCount += missed
+				found.dueTime += missed * found.period
+		else:
+			found.active = False
+		return found
+
+	def startDelay(self, obNumber, delayMs, sign, now):
+		"""Start a time-delay interrupt (SRT_DINT).
+		Returns the SFC RET_VAL.
+		"""
+		if obNumber not in self.DELAY_OBS:
+			return self.E_OBNR
+		if not (1 <= delayMs <= self.MAX_DELAY_MS):
+			return self.E_DTIME
+		intr = self.interrupts[obNumber]
+		intr.delay = delayMs / 1000.0
+		intr.sign = sign & 0xFFFF
+		intr.dueTime = now + intr.delay
+		intr.active = True
+		return 0
+
+	def cancelDelay(self, obNumber):
+		"""Cancel a time-delay interrupt (CAN_DINT).
+		Returns the SFC RET_VAL.
+		"""
+		if obNumber not in self.DELAY_OBS:
+			return self.E_OBNR
+		intr = self.interrupts[obNumber]
+		if not intr.active:
+			return self.E_NOTSTARTED
+		intr.active = False
+		return 0
+
+	def queryDelay(self, obNumber, loaded):
+		"""Query a time-delay interrupt (QRY_DINT).
+		'loaded' tells whether the OB is loaded.
+		Returns a tuple (RET_VAL, STATUS).
+		"""
+		if obNumber not in self.DELAY_OBS:
+			return self.E_OBNR, 0
+		intr = self.interrupts[obNumber]
+		status = 0
+		if intr.active:
+			status |= self.STATUS_ACTIVE
+		if loaded:
+			status |= self.STATUS_LOADED
+		return 0, status
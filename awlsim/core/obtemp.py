@@ -107,6 +107,152 @@ class OB1TempPresets(OBTempPresets): #+cdef
 		except IndexError:
 			self.tempUnderflow()
 
+class OBDelayIntTempPresets(OBTempPresets): #+cdef
+	"""Time-delay interrupt OB (OB 20 - OB 23) temp-presets handler."""
+
+	def generate(self, localdata): #@nocy
+#@cy	cdef generate(self, uint8_t *localdata):
+#@cy		cdef S7CPU cpu
+#@cy		cdef uint32_t sign
+#@cy		cdef uint32_t dtimeMs
+
+		cpu = self.cpu
+		intr = cpu.obScheduler.getInterrupt(self.obNumber)
+		try:
+			sign = intr.sign & 0xFFFF
+			dtimeMs = int(round(intr.delay * 1000.0)) & 0x7FFFFFFF
+
+			# Byte 0: OB2x_EV_CLASS
+			localdata[0] = 0x11
+			# Byte 1: OB2x_STRT_INF
+			localdata[1] = intr.startEvent & 0xFF
+			# Byte 2: OB2x_PRIORITY
+			localdata[2] = intr.priority & 0xFF
+			# Byte 3: OB2x_OB_NUMBR
+			localdata[3] = self.obNumber & 0xFF
+			# Byte 4: OB2x_RESERVED_1
+			localdata[4] = 0x00
+			# Byte 5: OB2x_RESERVED_2
+			localdata[5] = 0x00
+			# Byte 6-7: OB2x_SIGN
+			localdata[6] = (sign >> 8) & 0xFF
+			localdata[7] = sign & 0xFF
+			# Byte 8-11: OB2x_DTIME
+			localdata[8] = (dtimeMs >> 24) & 0xFF
+			localdata[9] = (dtimeMs >> 16) & 0xFF
+			localdata[10] = (dtimeMs >> 8) & 0xFF
+			localdata[11] = dtimeMs & 0xFF
+			# Byte 12-19: OB2x_DATE_TIME
+			cpu.makeCurrentDateAndTime(localdata, 12)
+		except IndexError:
+			self.tempUnderflow()
+
+class OBCyclicIntTempPresets(OBTempPresets): #+cdef
+	"""Cyclic interrupt OB (OB 30 - OB 38) temp-presets handler."""
+
+	def generate(self, localdata): #@nocy
+#@cy	cdef generate(self, uint8_t *localdata):
+#@cy		cdef S7CPU cpu
+#@cy		cdef uint32_t phaseMs
+#@cy		cdef uint32_t periodMs
+
+		cpu = self.cpu
+		intr = cpu.obScheduler.getInterrupt(self.obNumber)
+		try:
+			phaseMs = min(0xFFFF, int(round(intr.phase * 1000.0)))
+			periodMs = min(0x7FFF, int(round(intr.period * 1000.0)))
+
+			# Byte 0: OB3x_EV_CLASS
+			localdata[0] = 0x11
+			# Byte 1: OB3x_STRT_INF
+			localdata[1] = intr.startEvent & 0xFF
+			# Byte 2: OB3x_PRIORITY
+			localdata[2] = intr.priority & 0xFF
+			# Byte 3: OB3x_OB_NUMBR
+			localdata[3] = self.obNumber & 0xFF
+			# Byte 4: OB3x_RESERVED_1
+			localdata[4] = 0x00
+			# Byte 5: OB3x_RESERVED_2
+			localdata[5] = 0x00
+			# Byte 6-7: OB3x_PHASE_OFFSET
+			localdata[6] = (phaseMs >> 8) & 0xFF
+			localdata[7] = phaseMs & 0xFF
+			# Byte 8-9: OB3x_RESERVED_3
+			localdata[8] = 0x00
+			localdata[9] = 0x00
+			# Byte 10-11: OB3x_EXC_FREQ
+			localdata[10] = (periodMs >> 8) & 0xFF
+			localdata[11] = periodMs & 0xFF
+			# Byte 12-19: OB3x_DATE_TIME
+			cpu.makeCurrentDateAndTime(localdata, 12)
+		except IndexError:
+			self.tempUnderflow()
+
+class OB20TempPresets(OBDelayIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBDelayIntTempPresets.__init__(self, 20, cpu)
+
+class OB21TempPresets(OBDelayIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBDelayIntTempPresets.__init__(self, 21, cpu)
+
+class OB22TempPresets(OBDelayIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBDelayIntTempPresets.__init__(self, 22, cpu)
+
+class OB23TempPresets(OBDelayIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBDelayIntTempPresets.__init__(self, 23, cpu)
+
+class OB30TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 30, cpu)
+
+class OB31TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 31, cpu)
+
+class OB32TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 32, cpu)
+
+class OB33TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 33, cpu)
+
+class OB34TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 34, cpu)
+
+class OB35TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 35, cpu)
+
+class OB36TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 36, cpu)
+
+class OB37TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 37, cpu)
+
+class OB38TempPresets(OBCyclicIntTempPresets): #+cdef
+	def __init__(self, cpu):
+		OBCyclicIntTempPresets.__init__(self, 38, cpu)
+
 OBTempPresets_table = { #+cdef-dict
 	1	: OB1TempPresets,
+	20	: OB20TempPresets,
+	21	: OB21TempPresets,
+	22	: OB22TempPresets,
+	23	: OB23TempPresets,
+	30	: OB30TempPresets,
+	31	: OB31TempPresets,
+	32	: OB32TempPresets,
+	33	: OB33TempPresets,
+	34	: OB34TempPresets,
+	35	: OB35TempPresets,
+	36	: OB36TempPresets,
+	37	: OB37TempPresets,
+	38	: OB38TempPresets,
 }
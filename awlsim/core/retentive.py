@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Retentive memory
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.util import *
+from awlsim.common.datatypehelpers import * #+cimport
+from awlsim.common.exceptions import *
+
+import mmap
+import os
+import struct
+import zlib
+
+
+__all__ = [
+	"RetentiveStore",
+]
+
+
+class RetentiveStore(object):
+	"""Memory mapped retentive memory image file.
+	The file holds two slots for the retentive image. A commit
+	always writes the slot that does not hold the last committed image
+	and then marks it as the current one by writing its sequence
+	number and checksum. The image of a crashed commit fails the
+	checksum and the other slot is used instead.
+	A commit only copies the image into the mapped pages.
+	Writing the pages to disk is left to the operating system.
+	"""
+
+	# File format:
+	#	Header (at offset 0):
+	#		Magic			(8 bytes)
+	#		Format version		(16 bit)
+	#		Reserved		(16 bit)
+	#		Layout checksum		(32 bit)
+	#		Image size		(32 bit)
+	#	Slot headers (at SLOT_HDR_OFFSETS):
+	#		Sequence number		(64 bit, 0 = empty)
+	#		Image checksum		(32 bit)
+	#	Slot 0 image (at PAGE_SIZE)
+	#	Slot 1 image (at PAGE_SIZE + slot size)
+	hdrStruct = struct.Struct(str(">8sHHII"))
+	slotHdrStruct = struct.Struct(str(">QI"))
+
+	MAGIC		= b"AWLRETM\x00"
+	VERSION		= 1
+
+	PAGE_SIZE		= 0x1000
+	SLOT_HDR_OFFSETS	= (0x20, 0x30)
+
+	# Image entry of a timer:
+	#	CPUStateSnapshot.TIMERFLG_...	(8 bit)
+	#	time base			(8 bit)
+	#	reserved			(16 bit)
+	#	remaining time			(double)
+	timerStruct = struct.Struct(str(">BBHd"))
+	# Image entry of a counter:
+	#	CPUStateSnapshot.COUNTERFLG_...	(8 bit)
+	#	reserved			(8 bit)
+	#	counter value			(16 bit)
+	counterStruct = struct.Struct(str(">BBH"))
+
+	def __init__(self, filename):
+		self.filename = filename
+		self.__fd = None
+		self.__map = None
+		self.__imageSize = 0
+		self.__slotSize = 0
+		self.__slot = 0
+		self.__seq = 0
+
+	@property
+	def isOpen(self):
+		return self.__map is not None
+
+	def open(self, layout, imageSize):
+		"""Open or create the retentive memory file.
+		'layout' is a string that describes the retentive areas.
+		The stored image is only used, if it was
+		written with the same 'layout' and 'imageSize'.
+		Returns the last committed image or None.
+		"""
+		self.close()
+		layoutCsum = zlib.crc32(layout.encode("UTF-8")) & 0xFFFFFFFF
+		self.__imageSize = imageSize
+		self.__slotSize = roundUp(max(imageSize, 1), self.PAGE_SIZE)
+		fileSize = self.PAGE_SIZE + (2 * self.__slotSize)
+		try:
+			mode = "r+b" if os.path.exists(self.filename) else "w+b"
+			self.__fd = open(self.filename, mode)
+			self.__fd.seek(0, os.SEEK_END)
+			if self.__fd.tell() != fileSize:
+				self.__fd.truncate(fileSize)
+			self.__map = mmap.mmap(self.__fd.fileno(), fileSize)
+		except (IOError, OSError, ValueError, mmap.error) as e:
+			self.close()
+			raise AwlSimError("Retentive memory: Failed to map "
+				"'%s': %s" % (self.filename, str(e)))
+
+		image = None
+		magic, version, _, fileLayoutCsum, fileImageSize =\
+			self.hdrStruct.unpack_from(self.__map, 0)
+		if magic == self.MAGIC and\
+		   version == self.VERSION and\
+		   fileLayoutCsum == layoutCsum and\
+		   fileImageSize == imageSize:
+			for slot in range(2):
+				seq, csum = self.slotHdrStruct.unpack_from(
+					self.__map, self.SLOT_HDR_OFFSETS[slot])
+				offset = self.__slotOffset(slot)
+				if seq > self.__seq and\
+				   self.__checksum(offset) == csum:
+					self.__seq = seq
+					self.__slot = slot
+					image = self.__map[offset : offset + imageSize]
+		else:
+			if magic == self.MAGIC:
+				printWarning("Retentive memory: The memory layout "
+					"in '%s' does not match the configuration. "
+					"Discarding the retentive data." % self.filename)
+			self.hdrStruct.pack_into(self.__map, 0,
+				self.MAGIC, self.VERSION, 0,
+				layoutCsum, imageSize)
+			self.clear()
+		return image
+
+	def clear(self):
+		"""Discard the stored images.
+		"""
+		for offset in self.SLOT_HDR_OFFSETS:
+			self.slotHdrStruct.pack_into(self.__map, offset, 0, 0)
+		end = self.__slotOffset(2)
+		self.__map[self.PAGE_SIZE : end] = bytearray(end - self.PAGE_SIZE)
+		self.__seq = 0
+		self.__slot = 0
+
+	def close(self):
+		"""Write the mapped pages to disk and close the file.
+		"""
+		if self.__map is not None:
+			with suppressAllExc:
+				self.__map.flush()
+			self.__map.close()
+			self.__map = None
+		if self.__fd is not None:
+			with suppressAllExc:
+				self.__fd.close()
+			self.__fd = None
+		self.__seq = 0
+		self.__slot = 0
+
+	def __slotOffset(self, slot):
+		return self.PAGE_SIZE + (slot * self.__slotSize)
+
+	def __checksum(self, offset):
+		image = memoryview(self.__map)[offset : offset + self.__imageSize]
+		return zlib.crc32(image) & 0xFFFFFFFF
+
+	def beginCommit(self):
+		"""Start writing a new image.
+		Returns a tuple (buffer, offset). The new image
+		must be written to 'buffer' at 'offset'.
+		"""
+		return self.__map, self.__slotOffset(self.__slot ^ 1)
+
+	def endCommit(self):
+		"""Make the image written after beginCommit()
+		the current image.
+		"""
+		slot = self.__slot ^ 1
+		self.__seq += 1
+		self.slotHdrStruct.pack_into(self.__map, self.SLOT_HDR_OFFSETS[slot],
+					     self.__seq,
+					     self.__checksum(self.__slotOffset(slot)))
+		self.__slot = slot
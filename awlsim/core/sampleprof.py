@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Statistical sampling profiler
+#
+# Copyright 2018 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim.common.compat import *
+
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+from awlsim.common.monotonic import * #+cimport
+
+import random
+
+
+__all__ = [
+	"SampleProf",
+]
+
+
+class SampleProfBlockData(object):
+	"""Sampling data of one code block.
+	"""
+
+	def __init__(self, blockTypeStr, blockIndex):
+		self.blockTypeStr = blockTypeStr
+		self.blockIndex = blockIndex
+		self.inclSamples = 0
+		self.exclSamples = 0
+
+	@property
+	def name(self):
+		return "%s %d" % (self.blockTypeStr, self.blockIndex)
+
+class SampleProfLineData(object):
+	"""Sampling data of one source line.
+	"""
+
+	def __init__(self, sourceId, sourceName, lineNr, blockName):
+		self.sourceId = sourceId
+		self.sourceName = sourceName
+		self.lineNr = lineNr
+		self.blockName = blockName
+		self.samples = 0
+
+class SampleProf(object):
+	"""Statistical sampling profiler.
+	The CPU main loop polls the profiler every few instructions.
+	If the next sampling time is due, the instruction that the CPU
+	is about to execute (the top of the call stack) is sampled.
+	The poll interval is randomized, so that the samples do not
+	lock onto loops in the user program.
+
+	Sampling times that pass while the CPU does not execute
+	instructions (e.g. while it sleeps or does housekeeping)
+	are counted as idle samples.
+	"""
+
+	DEFAULT_RATE	= 99.0		# Default sampling rate, in Hz
+	MIN_RATE	= 1.0		# Minimum sampling rate, in Hz
+	MAX_RATE	= 10000.0	# Maximum sampling rate, in Hz
+
+	# Average number of instructions between two polls.
+	POLL_INTERVAL	= 32
+
+	# Number of hot lines to show in dump().
+	DUMP_NR_HOTLINES = 20
+
+	def __init__(self, rate=DEFAULT_RATE):
+		if not (self.MIN_RATE <= rate <= self.MAX_RATE):
+			raise AwlSimError("Sampling profiler: Invalid sampling "
+				"rate %.1f Hz. Valid range is %.1f - %.1f Hz." % (
+				rate, self.MIN_RATE, self.MAX_RATE))
+		self.rate = rate
+		self.__period = 1.0 / rate
+		self.__running = False
+		self.__startTime = 0.0
+		self.__nextSample = 0.0
+		self.reset()
+
+	def reset(self):
+		"""Reset all sampled data.
+		"""
+		self.nrSamples = 0
+		self.nrIdleSamples = 0
+		self.__runTime = 0.0
+		if self.__running:
+			self.__startTime = monotonic_time()
+			self.__nextSample = self.__startTime + self.__period
+		self.__blockData = {}
+		self.__lineData = {}
+		self.__stackData = {}
+
+	@property
+	def running(self):
+		return self.__running
+
+	def start(self):
+		"""Start sampling.
+		"""
+		if self.__running:
+			return
+		self.__running = True
+		self.__startTime = monotonic_time()
+		self.__nextSample = self.__startTime + self.__period
+
+	def stop(self):
+		"""Stop sampling.
+		The sampled data is kept.
+		"""
+		if not self.__running:
+			return
+		self.__running = False
+		self.__runTime += monotonic_time() - self.__startTime
+
+	def poll(self, cse):
+		"""Take a sample, if the next sampling time is due.
+		This is called from the CPU main loop before the instruction
+		at the top of the call stack 'cse' is executed.
+		Returns the number of instructions until the next poll.
+		"""
+		if self.__running:
+			now = monotonic_time()
+			if now >= self.__nextSample:
+				# Sampling times that passed without a poll
+				# were spent outside of the user program.
+				nrIdle = int((now - self.__nextSample) / self.__period)
+				self.nrSamples += nrIdle
+				self.nrIdleSamples += nrIdle
+				self.__nextSample += (nrIdle + 1) * self.__period
+				self.sample(cse)
+		return random.randint(1, self.POLL_INTERVAL * 2 - 1)
+
+	def sample(self, cse):
+		"""Take one sample of the instruction at the top
+		of the call stack 'cse'.
+		"""
+		self.nrSamples += 1
+		if cse is None or cse.ip >= cse.nrInsns:
+			# The CPU is not executing an instruction.
+			self.nrIdleSamples += 1
+			return
+		insn = cse.insns[cse.ip]
+
+		lineNr = insn.getLineNr()
+		key = (insn.getSourceId(), lineNr)
+		lineData = self.__lineData.get(key)
+		if lineData is None:
+			source = cse.block.getSource()
+			lineData = SampleProfLineData(
+				sourceId=key[0],
+				sourceName=(source.name if source else ""),
+				lineNr=lineNr,
+				blockName=str(cse.block))
+			self.__lineData[key] = lineData
+		lineData.samples += 1
+
+		frames = [ "line %d" % lineNr, ]
+		seenBlocks = set()
+		exclusive = True
+		while cse is not None:
+			block = cse.block
+			frames.append(str(block))
+			key = (block.BLOCKTYPESTR, block.index)
+			blockData = self.__blockData.get(key)
+			if blockData is None:
+				blockData = self.__blockData[key] =\
+					SampleProfBlockData(*key)
+			if exclusive:
+				blockData.exclSamples += 1
+				exclusive = False
+			if key not in seenBlocks:
+				# Count recursive calls only once.
+				blockData.inclSamples += 1
+				seenBlocks.add(key)
+			cse = cse.prevCse
+		stack = ";".join(reversed(frames))
+		self.__stackData[stack] = self.__stackData.get(stack, 0) + 1
+
+	@property
+	def haveAnyMeasurements(self):
+		return self.nrSamples > self.nrIdleSamples
+
+	def __share(self, samples):
+		return (samples * 100.0) / self.nrSamples if self.nrSamples else 0.0
+
+	@property
+	def runTime(self):
+		"""Get the total time the sampler has been running, in seconds.
+		"""
+		runTime = self.__runTime
+		if self.__running:
+			runTime += monotonic_time() - self.__startTime
+		return runTime
+
+	def __estTime(self, samples):
+		# The achieved sampling rate might be lower than the
+		# requested rate. Estimate the time from the sample share.
+		if not self.nrSamples:
+			return 0.0
+		return (samples * self.runTime) / self.nrSamples
+
+	@property
+	def __allBlockData(self):
+		# Sort by exclusive samples. The most expensive block comes first.
+		return sorted(dictValues(self.__blockData),
+			      key=lambda data: data.exclSamples,
+			      reverse=True)
+
+	@property
+	def __allLineData(self):
+		# Sort by samples. The hottest line comes first.
+		return sorted(dictValues(self.__lineData),
+			      key=lambda lineData: lineData.samples,
+			      reverse=True)
+
+	def dump(self):
+		if not self.haveAnyMeasurements:
+			return ""
+		ret = []
+		runTime = self.runTime
+		ret.append("Sampling profiler: %d samples in %.3f s "
+			   "(%.1f Hz, requested %.1f Hz, %.1f %% idle)" % (
+			   self.nrSamples, runTime,
+			   (self.nrSamples / runTime) if runTime > 0.0 else 0.0,
+			   self.rate,
+			   self.__share(self.nrIdleSamples)))
+		ret.append("")
+		ret.append("Block time samples:")
+		for data in self.__allBlockData:
+			name = data.name
+			name += " " * (10 - len(name))
+			ret.append("%s:  incl: %.1f %% (~%.3f ms), "
+				   "excl: %.1f %% (~%.3f ms)" % (
+				   name,
+				   self.__share(data.inclSamples),
+				   self.__estTime(data.inclSamples) * 1.0e3,
+				   self.__share(data.exclSamples),
+				   self.__estTime(data.exclSamples) * 1.0e3))
+		ret.append("")
+		ret.append("Hot source lines:")
+		for lineData in self.__allLineData[:self.DUMP_NR_HOTLINES]:
+			ret.append("%s:%d (%s):  samples: %d, %.1f %%" % (
+				lineData.sourceName or "<unknown>",
+				lineData.lineNr,
+				lineData.blockName,
+				lineData.samples,
+				self.__share(lineData.samples)))
+		return "\n".join(ret) + "\n"
+
+	def dumpCSV(self):
+		"""Dump the per block samples as CSV.
+		"""
+		if not self.haveAnyMeasurements:
+			return ""
+		ret = [ "block type;"
+			"block index;"
+			"inclusive samples;"
+			"exclusive samples;"
+			"inclusive share (%);"
+			"exclusive share (%)" ]
+		for data in self.__allBlockData:
+			ret.append("%s;%d;%d;%d;%.3f;%.3f" % (
+				data.blockTypeStr,
+				data.blockIndex,
+				data.inclSamples,
+				data.exclSamples,
+				self.__share(data.inclSamples),
+				self.__share(data.exclSamples)))
+		return "\n".join(ret) + "\n"
+
+	def dumpLinesCSV(self):
+		"""Dump the per source line samples as CSV.
+		"""
+		if not self.haveAnyMeasurements:
+			return ""
+		ret = [ "source name;"
+			"source ID;"
+			"line number;"
+			"block;"
+			"samples;"
+			"share (%)" ]
+		for lineData in self.__allLineData:
+			ret.append("%s;%s;%d;%s;%d;%.3f" % (
+				lineData.sourceName,
+				bytesToHexStr(lineData.sourceId) if lineData.sourceId else "",
+				lineData.lineNr,
+				lineData.blockName,
+				lineData.samples,
+				self.__share(lineData.samples)))
+		return "\n".join(ret) + "\n"
+
+	def dumpFolded(self):
+		"""Dump the per call stack samples in the collapsed
+		stack ("folded") format that is used by flame graph tools.
+		The value of each stack is the number of samples.
+		"""
+		if not self.haveAnyMeasurements:
+			return ""
+		ret = []
+		for stack in sorted(self.__stackData):
+			ret.append("%s %d" % (stack, self.__stackData[stack]))
+		return "\n".join(ret) + "\n"
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - CPU state snapshot
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.enumeration import *
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+
+import struct
+import zlib
+
+
+__all__ = [
+	"CPUStateSnapshot",
+]
+
+
+class CPUStateSnapshot(object):
+	"""Runtime state of a CPU.
+	This is captured by S7CPU.captureState() between two cycles
+	and can be restored by S7CPU.restoreState() into a CPU
+	running the same program.
+	"""
+
+	# Binary format:
+	#	Header:
+	#		Magic			(8 bytes)
+	#		Format version		(16 bit)
+	#		Flags			(16 bit)
+	#		Payload length		(32 bit)
+	#	Payload (zlib compressed, if FLG_ZLIB):
+	#		Sections:
+	#			Section type	(16 bit)
+	#			Section length	(32 bit)
+	#			Section data
+	# Unknown sections are ignored.
+	hdrStruct = struct.Struct(str(">8sHHI"))
+	sectHdrStruct = struct.Struct(str(">HI"))
+
+	MAGIC		= b"AWLSNAP\x00"
+	VERSION		= 1
+
+	FLG_ZLIB	= 1 << 0
+
+	# Maximum size of the decompressed payload.
+	MAX_DECOMPRESSED_SIZE	= 1024 * 1024 * 256
+
+	EnumGen.start
+	SECT_REGS	= EnumGen.itemAt(1)
+	SECT_INPUTS	= EnumGen.item
+	SECT_OUTPUTS	= EnumGen.item
+	SECT_FLAGS	= EnumGen.item
+	SECT_DB		= EnumGen.item
+	SECT_TIMERS	= EnumGen.item
+	SECT_COUNTERS	= EnumGen.item
+	SECT_INTERRUPTS	= EnumGen.item
+	SECT_PROGRAM	= EnumGen.item
+	EnumGen.end
+
+	# SECT_REGS:
+	#	now				(double)
+	#	accu 1 - 4			(4 x 32 bit)
+	#	AR 1 - 2			(2 x 32 bit)
+	#	status word			(16 bit)
+	#	DB register (0 = none)		(16 bit)
+	#	DI register (0 = none)		(16 bit)
+	#	reserved			(16 bit)
+	#	clock memory count		(32 bit)
+	#	next clock memory toggle time	(double)
+	regsStruct = struct.Struct(str(">dIIIIIIHHHHId"))
+	# SECT_DB:
+	#	DB number			(16 bit)
+	#	DB data
+	dbStruct = struct.Struct(str(">H"))
+	# SECT_TIMERS (one entry per allocated timer):
+	#	timer index			(32 bit)
+	#	TIMERFLG_...			(8 bit)
+	#	time base			(8 bit)
+	#	deadline			(double)
+	#	remaining time			(double)
+	timerStruct = struct.Struct(str(">IBBdd"))
+	# SECT_COUNTERS (one entry per allocated counter):
+	#	counter index			(32 bit)
+	#	COUNTERFLG_...			(8 bit)
+	#	reserved			(8 bit)
+	#	counter value			(16 bit)
+	counterStruct = struct.Struct(str(">IBBH"))
+	# SECT_INTERRUPTS (one entry per interrupt OB):
+	#	OB number			(16 bit)
+	#	active				(8 bit)
+	#	reserved			(8 bit)
+	#	SIGN				(16 bit)
+	#	reserved			(16 bit)
+	#	lost interrupts count		(32 bit)
+	#	due time			(double)
+	#	time-delay interrupt delay	(double)
+	interruptStruct = struct.Struct(str(">HBBHHIdd"))
+	# SECT_PROGRAM:
+	#	program ident hash		(S7CPU.getProgramIdent())
+
+	# Timer flags
+	TIMERFLG_PREVVKE_S	= 1 << 0
+	TIMERFLG_PREVVKE_FR	= 1 << 1
+	TIMERFLG_SETSTATUS	= 1 << 2
+	TIMERFLG_STATUS		= 1 << 3
+	TIMERFLG_RUNNING	= 1 << 4
+
+	# Counter flags
+	COUNTERFLG_PREVVKE_FR	= 1 << 0
+	COUNTERFLG_PREVVKE_S	= 1 << 1
+	COUNTERFLG_PREVVKE_ZV	= 1 << 2
+	COUNTERFLG_PREVVKE_ZR	= 1 << 3
+
+	def __init__(self):
+		self.now = 0.0
+		self.accus = [ 0, 0, 0, 0, ]
+		self.ars = [ 0, 0, ]
+		self.statusWord = 0
+		self.dbRegister = 0
+		self.diRegister = 0
+		self.clockMemCount = 0
+		self.nextClockMemTime = 0.0
+		self.inputs = b""
+		self.outputs = b""
+		self.flags = b""
+		self.dbs = {}		# DB number -> bytes
+		self.timers = []	# List of timerStruct tuples
+		self.counters = []	# List of counterStruct tuples
+		self.interrupts = []	# List of interruptStruct tuples
+		self.programIdent = b""	# Ident hash of the captured program
+
+	def toBytes(self, compress=True):
+		"""Get the binary representation of the snapshot.
+		"""
+		def section(sectType, data):
+			return self.sectHdrStruct.pack(sectType, len(data)) + data
+		try:
+			regs = self.regsStruct.pack(self.now,
+						    *(self.accus + self.ars +
+						      [ self.statusWord,
+							self.dbRegister,
+							self.diRegister,
+							0,
+							self.clockMemCount,
+							self.nextClockMemTime ]))
+			sections = [
+				section(self.SECT_REGS, regs),
+				section(self.SECT_INPUTS, bytes(self.inputs)),
+				section(self.SECT_OUTPUTS, bytes(self.outputs)),
+				section(self.SECT_FLAGS, bytes(self.flags)),
+			]
+			for dbNumber, data in sorted(dictItems(self.dbs)):
+				sections.append(section(self.SECT_DB,
+					self.dbStruct.pack(dbNumber) + bytes(data)))
+			sections.append(section(self.SECT_TIMERS,
+				b"".join(self.timerStruct.pack(*t)
+					 for t in self.timers)))
+			sections.append(section(self.SECT_COUNTERS,
+				b"".join(self.counterStruct.pack(*c)
+					 for c in self.counters)))
+			sections.append(section(self.SECT_INTERRUPTS,
+				b"".join(self.interruptStruct.pack(*i)
+					 for i in self.interrupts)))
+			if self.programIdent:
+				sections.append(section(self.SECT_PROGRAM,
+					bytes(self.programIdent)))
+		except struct.error as e:
+			raise AwlSimError("Snapshot: Failed to pack the "
+				"CPU state: %s" % str(e))
+		payload = b"".join(sections)
+		flags = 0
+		if compress:
+			payload = zlib.compress(payload)
+			flags |= self.FLG_ZLIB
+		return self.hdrStruct.pack(self.MAGIC, self.VERSION,
+					   flags, len(payload)) + payload
+
+	@classmethod
+	def __unpackEntries(cls, entryStruct, data):
+		if len(data) % entryStruct.size:
+			raise ValueError
+		return [ entryStruct.unpack_from(data, offset)
+			 for offset in range(0, len(data), entryStruct.size) ]
+
+	@classmethod
+	def fromBytes(cls, data):
+		"""Create a snapshot from its binary representation.
+		"""
+		snapshot = cls()
+		try:
+			magic, version, flags, length = cls.hdrStruct.unpack_from(data, 0)
+			if magic != cls.MAGIC:
+				raise AwlSimError("Snapshot: Invalid file format.")
+			if version != cls.VERSION:
+				raise AwlSimError("Snapshot: Unsupported format "
+					"version %d." % version)
+			payload = bytes(data[cls.hdrStruct.size : cls.hdrStruct.size + length])
+			if len(payload) != length:
+				raise ValueError
+			if flags & cls.FLG_ZLIB:
+				decomp = zlib.decompressobj()
+				payload = decomp.decompress(payload, cls.MAX_DECOMPRESSED_SIZE)
+				if decomp.unconsumed_tail:
+					raise AwlSimError("Snapshot: The decompressed "
+						"data is bigger than %d bytes." % (
+						cls.MAX_DECOMPRESSED_SIZE))
+				if not decomp.eof:
+					raise ValueError
+			offset = 0
+			while offset < len(payload):
+				sectType, sectLen = cls.sectHdrStruct.unpack_from(payload, offset)
+				offset += cls.sectHdrStruct.size
+				sectData = payload[offset : offset + sectLen]
+				offset += sectLen
+				if len(sectData) != sectLen:
+					raise ValueError
+				if sectType == cls.SECT_REGS:
+					regs = cls.regsStruct.unpack_from(sectData, 0)
+					snapshot.now = regs[0]
+					snapshot.accus = list(regs[1:5])
+					snapshot.ars = list(regs[5:7])
+					snapshot.statusWord = regs[7]
+					snapshot.dbRegister = regs[8]
+					snapshot.diRegister = regs[9]
+					snapshot.clockMemCount = regs[11]
+					snapshot.nextClockMemTime = regs[12]
+				elif sectType == cls.SECT_INPUTS:
+					snapshot.inputs = sectData
+				elif sectType == cls.SECT_OUTPUTS:
+					snapshot.outputs = sectData
+				elif sectType == cls.SECT_FLAGS:
+					snapshot.flags = sectData
+				elif sectType == cls.SECT_DB:
+					(dbNumber, ) = cls.dbStruct.unpack_from(sectData, 0)
+					snapshot.dbs[dbNumber] = sectData[cls.dbStruct.size : ]
+				elif sectType == cls.SECT_TIMERS:
+					snapshot.timers = cls.__unpackEntries(
+						cls.timerStruct, sectData)
+				elif sectType == cls.SECT_COUNTERS:
+					snapshot.counters = cls.__unpackEntries(
+						cls.counterStruct, sectData)
+				elif sectType == cls.SECT_INTERRUPTS:
+					snapshot.interrupts = cls.__unpackEntries(
+						cls.interruptStruct, sectData)
+				elif sectType == cls.SECT_PROGRAM:
+					snapshot.programIdent = sectData
+		except (struct.error, zlib.error, ValueError) as e:
+			raise AwlSimError("Snapshot: Invalid or truncated data.")
+		return snapshot
+
+	@classmethod
+	def fromFile(cls, filename):
+		"""Read a snapshot file.
+		"""
+		try:
+			with open(filename, "rb") as fd:
+				return cls.fromBytes(fd.read())
+		except (IOError, OSError) as e:
+			raise AwlSimError("Snapshot: Failed to read '%s': %s" % (
+				filename, str(e)))
+
+	def toFile(self, filename):
+		"""Write the snapshot to a file.
+		"""
+		try:
+			safeFileWrite(filename, self.toBytes())
+		except (IOError, OSError) as e:
+			raise AwlSimError("Snapshot: Failed to write '%s': %s" % (
+				filename, str(e)))
@@ -28,6 +28,9 @@ from awlsim.core.systemblocks.system_sfc_m3 import * #+cimport
 from awlsim.core.systemblocks.system_sfc_m2 import * #+cimport
 from awlsim.core.systemblocks.system_sfc_m1 import * #+cimport
 from awlsim.core.systemblocks.system_sfc_21 import * #+cimport
+from awlsim.core.systemblocks.system_sfc_32 import * #+cimport
+from awlsim.core.systemblocks.system_sfc_33 import * #+cimport
+from awlsim.core.systemblocks.system_sfc_34 import * #+cimport
 from awlsim.core.systemblocks.system_sfc_46 import * #+cimport
 from awlsim.core.systemblocks.system_sfc_47 import * #+cimport
 from awlsim.core.systemblocks.system_sfc_64 import * #+cimport
@@ -43,6 +46,9 @@ _SFC_table = { #+cdef-dict
 	-1	: SFCm1,	# __SFC_NOP
 
 	21	: SFC21,	# FILL
+	32	: SFC32,	# SRT_DINT
+	33	: SFC33,	# CAN_DINT
+	34	: SFC34,	# QRY_DINT
 	46	: SFC46,	# STP
 	47	: SFC47,	# WAIT
 	64	: SFC64,	# TIME_TCK
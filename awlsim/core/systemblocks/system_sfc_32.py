@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - SFCs
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.datatypehelpers import * #+cimport
+from awlsim.common.exceptions import *
+from awlsim.common.util import *
+
+from awlsim.core.systemblocks.systemblocks import * #+cimport
+from awlsim.core.blockinterface import *
+from awlsim.core.datatypes import *
+
+
+class SFC32(SFC): #+cdef
+	name = (32, "SRT_DINT", "start time-delay interrupt")
+
+	interfaceFields = {
+		BlockInterfaceField.FTYPE_IN	: (
+			BlockInterfaceField(name="OB_NR", dataType="INT"),
+			BlockInterfaceField(name="DTIME", dataType="TIME"),
+			BlockInterfaceField(name="SIGN", dataType="WORD"),
+		),
+		BlockInterfaceField.FTYPE_OUT	: (
+			BlockInterfaceField(name="RET_VAL", dataType="INT"),
+		),
+	}
+
+	def run(self): #+cpdef
+#@cy		cdef S7StatusWord s
+#@cy		cdef int32_t OB_NR
+#@cy		cdef int32_t DTIME
+#@cy		cdef uint32_t SIGN
+#@cy		cdef uint32_t retVal
+
+		s = self.cpu.statusWord
+
+		OB_NR = wordToSignedPyInt(AwlMemoryObject_asScalar(
+			self.fetchInterfaceFieldByName("OB_NR")))
+		DTIME = dwordToSignedPyInt(AwlMemoryObject_asScalar(
+			self.fetchInterfaceFieldByName("DTIME")))
+		SIGN = AwlMemoryObject_asScalar(
+			self.fetchInterfaceFieldByName("SIGN"))
+
+		# Start the time-delay interrupt.
+		# DTIME is the delay in milliseconds.
+		retVal = self.cpu.startDelayInterrupt(OB_NR, DTIME, SIGN)
+		self.storeInterfaceFieldByName("RET_VAL",
+			make_AwlMemoryObject_fromScalar(retVal, 16))
+		s.BIE = 0 if retVal else 1
@@ -62,10 +62,14 @@ class SFC47(SFC): #+cdef
 		WT = wordToSignedPyInt(AwlMemoryObject_asScalar(
 			self.fetchInterfaceFieldByName("WT")))
 		if WT > 0:
-			end = start + (min(WT, 32767) / 1000000.0)
-			now = timer()
-			while now < end and now >= start:
+			if self.cpu.virtualTimeEnabled():
+				# Do not wait in virtual time. Just advance the clock.
+				self.cpu.advanceVirtualTime(min(WT, 32767) / 1000000.0)
+			else:
+				end = start + (min(WT, 32767) / 1000000.0)
 				now = timer()
+				while now < end and now >= start:
+					now = timer()
 		self.cpu.updateTimestamp()
 
 		s.BIE = 1
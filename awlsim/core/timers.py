@@ -29,6 +29,8 @@ from awlsim.common.util import *
 
 from awlsim.core.statusword import * #+cimport
 
+import heapq
+
 # Get the C round() function. This is different from the Python3 round().
 #from libc.math cimport round #@cy
 
@@ -140,6 +142,83 @@ def Timer_s5t_to_seconds(s5t): #@nocy
 		return (a + (b * 10) + (c * 100)) * 10.0
 	raise AwlSimError("Timer_s5t_to_seconds: Invalid time base")
 
+class TimerService(object): #+cdef
+	"""Deadline service of the classic AWL timers.
+	The running timers are kept in a heap keyed by their deadline.
+	The CPU advances the service on each timestamp update,
+	so only the expired timers are touched and querying
+	the timer status is a plain read.
+	Restarted and stopped timers leave a stale heap entry behind.
+	Stale entries are dropped when they are popped
+	or when too many of them have accumulated.
+	"""
+
+	__slots__ = (
+		"nextDeadline",
+		"heap",
+		"nrStale",
+	)
+
+	# Do not compact heaps smaller than this.
+	COMPACT_MIN = 64
+
+	def __init__(self):
+		self.reset()
+
+	def reset(self):
+		self.heap = []
+		self.nrStale = 0
+		self.nextDeadline = float("inf")
+
+	# Add a started timer to the heap.
+	def add(self, timer): #@nocy
+#@cy	cdef void add(self, Timer timer):
+		heapq.heappush(self.heap, (timer.deadline, timer.index,
+					   timer.generation, timer))
+		if timer.deadline < self.nextDeadline:
+			self.nextDeadline = timer.deadline
+
+	# A timer has been restarted or stopped.
+	# Its heap entry is stale now.
+	def invalidate(self): #@nocy
+#@cy	cdef void invalidate(self):
+#@cy		cdef uint32_t nrStale
+
+		self.nrStale = nrStale = self.nrStale + 1
+		if nrStale >= self.COMPACT_MIN and nrStale * 2 > len(self.heap): #+unlikely
+			self.__compact()
+
+	def __compact(self): #+cdef
+		self.heap = [ entry for entry in self.heap
+			      if entry[3].queued and entry[2] == entry[3].generation ]
+		heapq.heapify(self.heap)
+		self.nrStale = 0
+		self.__updateNextDeadline()
+
+	def __updateNextDeadline(self): #+cdef
+		self.nextDeadline = self.heap[0][0] if self.heap else float("inf")
+
+	# Expire all timers with a deadline at or before 'now'.
+	def expire(self, now): #@nocy
+#@cy	cdef void expire(self, double now):
+#@cy		cdef Timer timer
+#@cy		cdef list heap
+
+		heap = self.heap
+		while heap and heap[0][0] <= now:
+			entry = heapq.heappop(heap)
+			timer = entry[3]
+			if timer.queued and entry[2] == timer.generation:
+				timer.expire()
+			elif self.nrStale:
+				self.nrStale -= 1
+		self.__updateNextDeadline()
+
+	# Get the number of running timers.
+	def countRunning(self): #@nocy
+#@cy	cdef uint32_t countRunning(self):
+		return len(self.heap) - self.nrStale
+
 class Timer(object): #+cdef
 	"""Classic AWL timer.
 	"""
@@ -155,6 +234,8 @@ class Timer(object): #+cdef
 		"remaining",
 		"status",
 		"running",
+		"queued",
+		"generation",
 	)
 
 	def __init__(self, cpu, index):
@@ -168,16 +249,19 @@ class Timer(object): #+cdef
 		self.remaining = 0.0
 		self.status = 0
 		self.running = False
+		self.queued = False	# True, if there is a valid TimerService entry.
+		self.generation = 0	# TimerService entry generation.
 
 	# Get the timer status (Q)
+	# The deadline is handled by the TimerService.
 	def get(self): #@nocy
 #@cy	cdef _Bool get(self):
-		self.__checkDeadline()
 		return self.status
 
 	# Reset (R) timer
 	def reset(self): #@nocy
 #@cy	cdef void reset(self):
+		self.__dequeue()
 		self.running, self.status, self.remaining =\
 			False, 0, 0.0
 
@@ -230,7 +314,8 @@ class Timer(object): #+cdef
 	# Get the remaining time, in seconds
 	def __getRemainingSeconds(self): #@nocy
 #@cy	cdef double __getRemainingSeconds(self):
-		self.__checkDeadline()
+		if self.running:
+			self.__updateRemaining()
 		return self.remaining
 
 	# Update the remaining time value
@@ -257,8 +342,8 @@ class Timer(object): #+cdef
 				self.status = 1
 				self.__start(s5t)
 		else:
-			self.__checkDeadline()
-			self.running, self.status = False, 0
+			self.__stop()
+			self.status = 0
 		self.prevVKE_S, s.OR, s.NER = s.VKE, 0, 0
 
 	def run_SV(self, s5t): #@nocy
@@ -282,8 +367,8 @@ class Timer(object): #+cdef
 			if not self.prevVKE_S: # Pos edge
 				self.__start(s5t)
 		else:
-			self.__checkDeadline()
-			self.running, self.status = False, 0
+			self.__stop()
+			self.status = 0
 		self.prevVKE_S, s.OR, s.NER = s.VKE, 0, 0
 
 	def run_SS(self, s5t): #@nocy
@@ -303,8 +388,8 @@ class Timer(object): #+cdef
 		self.deadlineActionSetStatus = False
 		s = self.cpu.statusWord
 		if s.VKE & (self.prevVKE_S ^ 1): # Pos edge
-			self.__checkDeadline()
-			self.status, self.running = 1, False
+			self.__stop()
+			self.status = 1
 		if (s.VKE ^ 1) & self.prevVKE_S: # Neg edge
 			self.status = 1
 			self.__start(s5t)
@@ -316,13 +401,45 @@ class Timer(object): #+cdef
 		self.deadline = self.cpu.now + Timer_s5t_to_seconds(s5t)
 		self.__updateRemaining()
 		self.running = True
+		self.__dequeue()
+		if self.remaining <= 0.0:
+			self.expire()
+		else:
+			self.queued = True
+			self.cpu.timerService.add(self)
 
-	def __checkDeadline(self): #@nocy
-#@cy	cdef void __checkDeadline(self):
+	# Stop a running timer and keep the remaining time.
+	def __stop(self): #@nocy
+#@cy	cdef void __stop(self):
 		if self.running:
 			self.__updateRemaining()
-			if self.remaining <= 0.0:
-				if self.deadlineActionSetStatus:
-					self.running, self.status = False, 1
-				else:
-					self.running, self.status = False, 0
+			self.running = False
+			self.__dequeue()
+
+	# Invalidate the TimerService entry.
+	def __dequeue(self): #@nocy
+#@cy	cdef void __dequeue(self):
+		if self.queued:
+			self.queued = False
+			self.generation = (self.generation + 1) & 0xFFFFFFFF
+			self.cpu.timerService.invalidate()
+
+	# Add a running timer to the TimerService.
+	# This is used to restore a timer state.
+	def requeue(self): #@nocy
+#@cy	cdef void requeue(self):
+		self.__dequeue()
+		if self.running:
+			self.queued = True
+			self.cpu.timerService.add(self)
+
+	# The deadline has been reached.
+	# This is called by the TimerService.
+	def expire(self): #@nocy
+#@cy	cdef void expire(self):
+		self.queued = False
+		self.running, self.remaining = False, 0.0
+		if self.deadlineActionSetStatus:
+			self.status = 1
+		else:
+			self.status = 0
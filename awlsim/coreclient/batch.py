@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Batch scenario runner
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.util import *
+from awlsim.common.env import *
+from awlsim.common.exceptions import *
+from awlsim.common.wordpacker import *
+
+from awlsim.coreserver.memarea import *
+
+if isPy2Compat: #@nocov
+	from ConfigParser import SafeConfigParser as _ConfigParser
+	from ConfigParser import Error as _ConfigParserError
+else: #@nocov
+	from configparser import ConfigParser as _ConfigParser
+	from configparser import Error as _ConfigParserError
+
+import os
+import select
+import json
+
+
+__all__ = [
+	"BatchScenario",
+	"BatchResult",
+	"BatchRunner",
+]
+
+
+class BatchScenario(object):
+	"""One test scenario of a batch run.
+	name -> The scenario name.
+	cycles -> Stop after this number of OB 1 cycles.
+	runtime -> Stop after this CPU run time (in seconds).
+	init -> List of memory area strings (MemoryArea.fromString() format
+	        with value) that are written before the first cycle.
+	stimuli -> Dict of cycle number -> list of memory area strings.
+	           The areas are written before the given cycle.
+	           The first cycle is cycle 0.
+	expect -> List of memory area strings with value that are
+	          checked after the last cycle.
+	"""
+
+	SECTION_PREFIX		= "scenario:"
+	STIMULUS_PREFIX		= "stimulus."
+
+	@classmethod
+	def parseText(cls, text, filename="<scenarios>"):
+		"""Parse a scenario file.
+		Returns a list of BatchScenario()s.
+
+		The file has one section per scenario:
+			[scenario:NAME]
+			cycles = 100
+			runtime = 1.5
+			init = M:0:8:1 DB:1:0:16:1000
+			stimulus.10 = E:0:8:1
+			expect = A:0:8:1
+		A [DEFAULT] section provides defaults for all scenarios.
+		"""
+		scenarios = []
+		try:
+			p = _ConfigParser()
+			textIO = StringIO(text)
+			if hasattr(p, "read_file"): #@nocov
+				p.read_file(textIO, filename)
+			else: #@nocov
+				p.readfp(textIO, filename)
+			for section in p.sections():
+				if not section.startswith(cls.SECTION_PREFIX):
+					raise AwlSimError("Invalid section [%s]." % section)
+				name = section[len(cls.SECTION_PREFIX) : ].strip()
+				cycles = runtime = None
+				init, stimuli, expect = [], {}, []
+				for option in p.options(section):
+					value = p.get(section, option)
+					if option == "cycles":
+						cycles = int(value)
+					elif option == "runtime":
+						runtime = float(value)
+					elif option == "init":
+						init = value.split()
+					elif option == "expect":
+						expect = value.split()
+					elif option.startswith(cls.STIMULUS_PREFIX):
+						cycle = int(option[len(cls.STIMULUS_PREFIX) : ])
+						stimuli[cycle] = value.split()
+					else:
+						raise AwlSimError("Scenario '%s': Unknown "
+							"option '%s'." % (name, option))
+				scenarios.append(cls(name=name,
+						     cycles=cycles,
+						     runtime=runtime,
+						     init=init,
+						     stimuli=stimuli,
+						     expect=expect))
+		except _ConfigParserError as e:
+			raise AwlSimError("Batch scenario file '%s': "
+				"Parser error: %s" % (filename, str(e)))
+		except ValueError as e:
+			raise AwlSimError("Batch scenario file '%s': "
+				"Invalid value: %s" % (filename, str(e)))
+		return scenarios
+
+	@classmethod
+	def parseFile(cls, filename):
+		"""Read and parse a scenario file.
+		Returns a list of BatchScenario()s.
+		"""
+		try:
+			with open(filename, "rb") as fd:
+				data = fd.read()
+		except (IOError, OSError) as e:
+			raise AwlSimError("Failed to read batch scenario "
+				"file '%s': %s" % (filename, str(e)))
+		return cls.parseText(data.decode("UTF-8"), filename)
+
+	def __init__(self, name,
+		     cycles=None,
+		     runtime=None,
+		     init=(),
+		     stimuli=None,
+		     expect=()):
+		if not name:
+			raise AwlSimError("Batch scenario: No name.")
+		if cycles is None and runtime is None:
+			raise AwlSimError("Batch scenario '%s': Either the number "
+				"of cycles or the run time must be specified." % name)
+		if (cycles is not None and cycles <= 0) or\
+		   (runtime is not None and runtime < 0.0):
+			raise AwlSimError("Batch scenario '%s': Invalid number "
+				"of cycles or run time." % name)
+		self.name = name
+		self.cycles = cycles
+		self.runtime = runtime
+		self.init = self.__parseAreas(init)
+		self.stimuli = { cycle : self.__parseAreas(areas)
+				 for cycle, areas in dictItems(stimuli or {}) }
+		self.expect = self.__parseAreas(expect)
+		for text, memArea in self.expect:
+			if memArea.memType not in {MemoryArea.TYPE_E,
+						   MemoryArea.TYPE_A,
+						   MemoryArea.TYPE_M,
+						   MemoryArea.TYPE_DB,
+						   MemoryArea.TYPE_STW}:
+				raise AwlSimError("Batch scenario '%s': Can not "
+					"check the memory area '%s'." % (name, text))
+
+	def __parseAreas(self, texts):
+		try:
+			return [ (text, MemoryArea.fromString(text, withData=True))
+				 for text in texts ]
+		except AwlSimError as e:
+			raise AwlSimError("Batch scenario '%s': %s" % (
+				self.name, e.message))
+
+class BatchResult(object):
+	"""The result of one BatchScenario run.
+	"""
+
+	def __init__(self, name, cycles=0, runtime=0.0, failures=()):
+		self.name = name
+		self.cycles = cycles
+		self.runtime = runtime
+		self.failures = list(failures)
+
+	@property
+	def passed(self):
+		return not self.failures
+
+	def toBytes(self):
+		return json.dumps({
+			"name"		: self.name,
+			"cycles"	: self.cycles,
+			"runtime"	: self.runtime,
+			"failures"	: self.failures,
+		}).encode("UTF-8")
+
+	@classmethod
+	def fromBytes(cls, data):
+		try:
+			d = json.loads(data.decode("UTF-8"))
+			return cls(name=d["name"],
+				   cycles=d["cycles"],
+				   runtime=d["runtime"],
+				   failures=d["failures"])
+		except (ValueError, KeyError, TypeError) as e:
+			raise AwlSimError("BatchResult: Invalid data.")
+
+	def __repr__(self):
+		if self.passed:
+			return "PASS  %s  (%d cycles, %.3f s)" % (
+				self.name, self.cycles, self.runtime)
+		return "FAIL  %s  (%d cycles, %.3f s)\n%s" % (
+			self.name, self.cycles, self.runtime,
+			"\n".join("      " + f for f in self.failures))
+
+class BatchRunner(object):
+	"""Run many BatchScenario()s on one built and started AwlSim.
+	The project is built only once. Every scenario runs in a
+	process that is forked from the started CPU. So every scenario
+	starts with the same CPU state and the scenarios can not
+	influence each other.
+	"""
+
+	def __init__(self, sim, nrJobs=None):
+		"""sim -> The AwlSim instance. startup() must have been called.
+		nrJobs -> The number of scenarios that run in parallel.
+		          None: One per host CPU.
+		"""
+		if not hasattr(os, "fork"):
+			raise AwlSimError("BatchRunner: Batch runs are not "
+				"supported on this system.")
+		self.__sim = sim
+		self.__nrJobs = max(nrJobs or AwlSimEnv.getCpuCount(), 1)
+		self.__snapshot = None
+
+	def run(self, scenarios, callback=None):
+		"""Run all 'scenarios'.
+		'callback' is called with each BatchResult as soon as
+		the scenario finished.
+		Returns the list of BatchResult()s in the order of 'scenarios'.
+		"""
+		# The children restore this snapshot.
+		# That restarts the CPU clock where the parent stopped it.
+		self.__snapshot = self.__sim.captureState()
+
+		results = [ None ] * len(scenarios)
+		pending = list(reversed(list(enumerate(scenarios))))
+		running = {}
+		while pending or running:
+			while pending and len(running) < self.__nrJobs:
+				index, scenario = pending.pop()
+				readFd, pid = self.__fork(scenario)
+				running[readFd] = (pid, index, bytearray())
+			readFds, _, _ = select.select(list(running), [], [])
+			for readFd in readFds:
+				pid, index, data = running[readFd]
+				chunk = os.read(readFd, 0x10000)
+				if chunk:
+					data += chunk
+					continue
+				running.pop(readFd)
+				os.close(readFd)
+				_, status = os.waitpid(pid, 0)
+				try:
+					if os.WIFSIGNALED(status):
+						raise AwlSimError("Killed by signal %d." % (
+							os.WTERMSIG(status)))
+					if os.WEXITSTATUS(status) != 0:
+						raise AwlSimError("Exit code %d." % (
+							os.WEXITSTATUS(status)))
+					result = BatchResult.fromBytes(bytes(data))
+				except AwlSimError as e:
+					result = BatchResult(scenarios[index].name,
+						failures=[ "The scenario process "
+							   "failed: %s" % e.message ])
+				results[index] = result
+				if callback:
+					callback(result)
+		return results
+
+	def __fork(self, scenario):
+		readFd, writeFd = os.pipe()
+		pid = os.fork()
+		if pid == 0:
+			# Child process.
+			exitCode = 1
+			try:
+				os.close(readFd)
+				data = self.__runScenario(scenario).toBytes()
+				while data:
+					data = data[os.write(writeFd, data) : ]
+				exitCode = 0
+			finally:
+				# Do not run any cleanup of the parent state
+				# (hardware modules, retentive memory, etc...).
+				os._exit(exitCode)
+		os.close(writeFd)
+		return readFd, pid
+
+	def __runScenario(self, scenario):
+		sim = self.__sim
+		cpu = sim.getCPU()
+		failures = []
+		count = 0
+		startTime = 0.0
+		try:
+			sim.restoreState(self.__snapshot)
+			startTime = cpu.now
+			for text, memArea in scenario.init:
+				memArea.writeToCpu(cpu)
+			while True:
+				for text, memArea in scenario.stimuli.get(count, ()):
+					memArea.writeToCpu(cpu)
+				count += 1
+				sim.runCycle()
+				if scenario.cycles is not None and\
+				   count >= scenario.cycles:
+					break
+				if scenario.runtime is not None and\
+				   cpu.now - startTime >= scenario.runtime:
+					break
+		except MaintenanceRequest as e:
+			if e.requestType not in (MaintenanceRequest.TYPE_SHUTDOWN,
+						 MaintenanceRequest.TYPE_STOP,
+						 MaintenanceRequest.TYPE_RTTIMEOUT):
+				failures.append("Unexpected maintenance "
+						"request: %s" % str(e))
+		except AwlSimError as e:
+			failures.append(e.getReport(verbose=False).strip())
+		runtime = cpu.now - startTime
+
+		for text, expected in scenario.expect:
+			memArea = MemoryArea(memType=expected.memType,
+					     flags=0,
+					     index=expected.index,
+					     start=expected.start,
+					     length=expected.length)
+			bitWidth = expected.length * 8
+			try:
+				memArea.readFromCpu(cpu)
+			except AwlSimError as e:
+				failures.append("%s: %s" % (text, e.message))
+				continue
+			value = WordPacker.fromBytes(memArea.data, bitWidth)
+			expectedValue = WordPacker.fromBytes(expected.data, bitWidth)
+			if value != expectedValue:
+				failures.append("%s: The value is %d (0x%X)." % (
+						text, value, value))
+
+		return BatchResult(name=scenario.name,
+				   cycles=count,
+				   runtime=runtime,
+				   failures=failures)
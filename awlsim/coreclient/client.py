@@ -36,10 +36,13 @@ from awlsim.coreserver.server import *
 from awlsim.coreserver.messages import *
 from awlsim.coreserver.memarea import *
 
+from awlsim.core.snapshot import *
+
 import sys
 import socket
 import errno
 import time
+import collections
 
 
 class MsgWaiter(object):
@@ -63,10 +66,14 @@ class AwlSimClient(object):
 	"""Awlsim coreserver client API.
 	"""
 
+	# Maximum number of pipelined messages in flight.
+	PIPELINE_DEPTH = 64
+
 	def __init__(self):
 		self.serverProcess = None
 		self.serverProcessHost = None
 		self.serverProcessPort = None
+		self.serverProcessFamily = None
 		self.__transceiver = None
 		self.__defaultTimeout = 3.0
 		self.__timeoutFactor = 2.0 if isPyPy else 1.0
@@ -77,6 +84,7 @@ class AwlSimClient(object):
 			serverExecutable=None,
 			listenHost=AwlSimServer.DEFAULT_HOST,
 			listenPort=AwlSimServer.DEFAULT_PORT,
+			listenFamily=None,
 			frozenExecutableMagic=True,
 			commandMask=AwlSimServer.CMDMSK_DEFAULT,
 			projectFile=None,
@@ -93,6 +101,8 @@ class AwlSimClient(object):
 		listenHost -> The hostname or IP address to listen on.
 		listenPort -> The port to listen on.
 			      This may be an iterable to try multiple ports.
+		listenFamily -> Address family to listen on. None or socket.AF_...
+				If this is AF_UNIX, a Unix domain socket is used.
 		frozenExecutableMagic -> If True and if running frozen executable,
 					 override serverExecutable.
 		commandMask -> Command mask for the server.
@@ -117,7 +127,7 @@ class AwlSimClient(object):
 
 		actualListenPort = None
 		for port in toList(listenPort):
-			if not netPortIsUnused(listenHost, port):
+			if not netPortIsUnused(listenHost, port, listenFamily):
 				continue
 			if serverExecutable:
 				for serverExe in toList(serverExecutable):
@@ -127,6 +137,7 @@ class AwlSimClient(object):
 						self.serverProcess = AwlSimServer.start(
 							listenHost=listenHost,
 							listenPort=port,
+							listenFamily=listenFamily,
 							forkServerProcess=serverExe,
 							commandMask=commandMask,
 							projectFile=projectFile,
@@ -151,6 +162,7 @@ class AwlSimClient(object):
 						self.serverProcess=AwlSimServer.start(
 							listenHost=listenHost,
 							listenPort=port,
+							listenFamily=listenFamily,
 							forkInterpreter=interp,
 							commandMask=commandMask,
 							projectFile=projectFile,
@@ -174,6 +186,7 @@ class AwlSimClient(object):
 				toList(listenPort)[0], toList(listenPort)[-1], listenHost))
 		self.serverProcessHost = listenHost
 		self.serverProcessPort = actualListenPort
+		self.serverProcessFamily = listenFamily
 		if isJython:
 			#XXX Workaround: Jython's socket module does not like connecting
 			# to a starting server. Wait a few seconds for the server
@@ -197,14 +210,23 @@ class AwlSimClient(object):
 		self.serverProcess = None
 		self.serverProcessHost = None
 		self.serverProcessPort = None
+		self.serverProcessFamily = None
 
 	def connectToServer(self,
 			    host=AwlSimServer.DEFAULT_HOST,
 			    port=AwlSimServer.DEFAULT_PORT,
-			    timeout=3.0):
+			    timeout=3.0,
+			    family=None,
+			    compress=None,
+			    instance=0):
 		"""Connect to a AwlSim-core server.
 		host -> The hostname or IP address to connect to.
+			If 'family' is AF_UNIX, this may be the socket path.
 		port -> The port to connect to.
+		family -> Address family. None (autodetect) or socket.AF_...
+		compress -> Negotiate zlib compression of large payloads.
+			    None: Compress on all but Unix domain socket links.
+		instance -> The CPU instance ID on a multi-instance server.
 		"""
 		self.__defaultTimeout = timeout
 		timeout *= self.__timeoutFactor
@@ -213,7 +235,7 @@ class AwlSimClient(object):
 		sock, ok = None, False
 		_SocketErrors = SocketErrors
 		try:
-			family, socktype, sockaddr = netGetAddrInfo(host, port)
+			family, socktype, sockaddr = netGetAddrInfo(host, port, family)
 			if family == AF_UNIX:
 				readableSockaddr = sockaddr
 			else:
@@ -251,20 +273,37 @@ class AwlSimClient(object):
 					sock.close()
 		printInfo("AwlSimClient: Connected.")
 		self.__transceiver = AwlSimMessageTransceiver(sock, readableSockaddr)
+		self.__transceiver.txInstanceId = instance
 		self.__msgWaiters = []
 
 		# Ping the server
+		# and negotiate payload compression for non-local links.
 		try:
-			self.__transceiver.send(AwlSimMessage_PING())
-			msg = self.__transceiver.receive(timeout=timeout)
+			ping = AwlSimMessage_PING()
+			if compress is None:
+				compress = (family != AF_UNIX)
+			if compress and self.__transceiver.haveCompression:
+				ping.hdrFlags |= AwlSimMessage.HDR_FLAG_CAP_ZLIB
+			self.__transceiver.send(ping)
+			msg = None
+			while not msg and monotonic_time() - startTime <= timeout:
+				# The reply may be an EXCEPTION with payload.
+				# That takes more than one receive() call.
+				msg = self.__transceiver.receive(timeout=timeout)
 			if not msg:
 				raise AwlSimError("AwlSimClient: Server did not "
 					"respond to PING request.")
+			if msg.msgId == AwlSimMessage.MSG_ID_EXCEPTION:
+				raise msg.exception
 			if msg.msgId != AwlSimMessage.MSG_ID_PONG:
 				raise AwlSimError("AwlSimClient: Server did not "
 					"respond properly to PING request. "
 					"(Expected ID %d, but got ID %d)" %\
 					(AwlSimMessage.MSG_ID_PONG, msg.msgId))
+			if (ping.hdrFlags & AwlSimMessage.HDR_FLAG_CAP_ZLIB) and\
+			   (msg.hdrFlags & AwlSimMessage.HDR_FLAG_CAP_ZLIB):
+				printVerbose("AwlSimClient: Using payload compression.")
+				self.__transceiver.enableCompression()
 		except TransferError as e:
 			raise AwlSimError("AwlSimClient: PING to server failed")
 
@@ -465,6 +504,72 @@ class AwlSimClient(object):
 					    ignoreMaintenanceRequests=ignoreMaintenanceRequests)
 		return waiter.status
 
+	def __sendPipelinedAndWaitFor_REPLY(self, msgs, minTimeout=None):
+		"""Send all messages in 'msgs' without waiting for the
+		individual replies in between. Up to PIPELINE_DEPTH messages
+		are in flight at the same time.
+		The timeout applies to the progress of the replies.
+		Returns a list of the reply status codes.
+		"""
+		timeout = self.__defaultTimeout
+		if minTimeout is not None:
+			timeout = max(timeout, minTimeout)
+		timeout *= self.__timeoutFactor
+
+		def makeCheckRxMsg(msg):
+			return lambda rxMsg: (rxMsg.msgId == AwlSimMessage.MSG_ID_REPLY and
+					      rxMsg.isReplyTo(msg))
+
+		def waitPending(maxPending):
+			end = monotonic_time() + timeout
+			while len(pending) > maxPending:
+				if pending[0].rxMsg is not None:
+					pending.popleft()
+					end = monotonic_time() + timeout
+					continue
+				if monotonic_time() >= end:
+					raise AwlSimError("AwlSimClient: Timeout waiting "
+						"for server reply.")
+				self.processMessages(0.1)
+
+		waiters, pending = [], collections.deque()
+		try:
+			for msg in msgs:
+				waiter = MsgWaiter(makeCheckRxMsg(msg))
+				self.__msgWaiters.append(waiter)
+				waiters.append(waiter)
+				pending.append(waiter)
+				self.__send(msg)
+				waitPending(self.PIPELINE_DEPTH - 1)
+			waitPending(0)
+		finally:
+			for waiter in waiters:
+				with contextlib.suppress(ValueError):
+					self.__msgWaiters.remove(waiter)
+		return [ waiter.rxMsg.status for waiter in waiters ]
+
+	def __loadPipelined(self, msgsAndErrors, minTimeout=10.0):
+		"""Send a list of (message, errorText) tuples pipelined.
+		Raises an AwlSimError with errorText for the first message
+		that did not succeed. If errorText is None, the reply status
+		of that message is ignored.
+		"""
+		if not self.__transceiver:
+			return False
+		msgsAndErrors = list(msgsAndErrors)
+		statusList = self.__sendPipelinedAndWaitFor_REPLY(
+			[ msg for msg, errorText in msgsAndErrors ],
+			minTimeout=minTimeout)
+		for status, (msg, errorText) in zip(statusList, msgsAndErrors):
+			if status != AwlSimMessage_REPLY.STAT_OK and\
+			   errorText is not None:
+				raise AwlSimError("AwlSimClient: %s" % errorText)
+		return True
+
+	@staticmethod
+	def __buildMsgs():
+		return [ (AwlSimMessage_BUILD(), "Failed to build sources"), ]
+
 	def reset(self):
 		if not self.__transceiver:
 			return False
@@ -553,16 +658,22 @@ class AwlSimClient(object):
 		return True
 
 	def loadAwlSources(self, awlSources):
-		return all(self.loadAwlSource(awlSource)
-			   for awlSource in awlSources)
+		return self.__loadPipelined(
+			(AwlSimMessage_AWLSRC(awlSource),
+			 "Failed to load AWL source")
+			for awlSource in awlSources)
 
 	def loadFupSources(self, fupSources):
-		return all(self.loadFupSource(fupSource)
-			   for fupSource in fupSources)
+		return self.__loadPipelined(
+			(AwlSimMessage_FUPSRC(fupSource),
+			 "Failed to load FUP source")
+			for fupSource in fupSources)
 
 	def loadKopSources(self, kopSources):
-		return all(self.loadKopSource(kopSource)
-			   for kopSource in kopSources)
+		return self.__loadPipelined(
+			(AwlSimMessage_KOPSRC(kopSource),
+			 "Failed to load KOP source")
+			for kopSource in kopSources)
 
 	def getSymTabSource(self, identHash, sync=True):
 		if not self.__transceiver:
@@ -591,8 +702,10 @@ class AwlSimClient(object):
 		return True
 
 	def loadSymTabSources(self, symTabSources):
-		return all(self.loadSymTabSource(symTabSource)
-			   for symTabSource in symTabSources)
+		return self.__loadPipelined(
+			(AwlSimMessage_SYMTABSRC(symTabSource),
+			 "Failed to load symbol table source")
+			for symTabSource in symTabSources)
 
 	def loadLibraryBlock(self, libSelection):
 		if not self.__transceiver:
@@ -604,8 +717,10 @@ class AwlSimClient(object):
 		return True
 
 	def loadLibraryBlocks(self, libSelections):
-		return all(self.loadLibraryBlock(libSel)
-			   for libSel in libSelections)
+		return self.__loadPipelined(
+			(AwlSimMessage_LIBSEL(libSel),
+			 "Failed to load library block selection")
+			for libSel in libSelections)
 
 	def loadHardwareModule(self, hwmodDesc):
 		if not self.__transceiver:
@@ -617,8 +732,10 @@ class AwlSimClient(object):
 		return True
 
 	def loadHardwareModules(self, hwmodDescs):
-		return all(self.loadHardwareModule(hwmodDesc)
-			   for hwmodDesc in hwmodDescs)
+		return self.__loadPipelined(
+			(AwlSimMessage_HWMOD(hwmodDesc),
+			 "Failed to load hardware module")
+			for hwmodDesc in hwmodDescs)
 
 	def build(self):
 		if not self.__transceiver:
@@ -648,24 +765,34 @@ class AwlSimClient(object):
 		return True
 
 	# Request the (source) ident hashes from the CPU.
-	# This method is asynchronous.
+	# This method is asynchronous, unless sync=True.
 	# The idents are returned via handle_IDENTS()
+	# If sync=True, the AwlSimMessage_IDENTS is returned instead.
+	# If noVolatile=True, volatile (generated) sources are omitted.
 	def requestIdents(self,
 			  reqAwlSources=False,
 			  reqFupSources=False,
 			  reqKopSources=False,
 			  reqSymTabSources=False,
 			  reqHwModules=False,
-			  reqLibSelections=False):
+			  reqLibSelections=False,
+			  noVolatile=False,
+			  sync=False):
 		if not self.__transceiver:
 			return False
-		self.__send(AwlSimMessage_GET_IDENTS(
+		msg = AwlSimMessage_GET_IDENTS(
 			(AwlSimMessage_GET_IDENTS.GET_AWLSRCS if reqAwlSources else 0) |\
 			(AwlSimMessage_GET_IDENTS.GET_FUPSRCS if reqFupSources else 0) |\
 			(AwlSimMessage_GET_IDENTS.GET_KOPSRCS if reqKopSources else 0) |\
 			(AwlSimMessage_GET_IDENTS.GET_SYMTABSRCS if reqSymTabSources else 0) |\
 			(AwlSimMessage_GET_IDENTS.GET_HWMODS if reqHwModules else 0) |\
-			(AwlSimMessage_GET_IDENTS.GET_LIBSELS if reqLibSelections else 0)))
+			(AwlSimMessage_GET_IDENTS.GET_LIBSELS if reqLibSelections else 0) |\
+			(AwlSimMessage_GET_IDENTS.GET_NOVOLATILE if noVolatile else 0))
+		if sync:
+			return self.__sendAndWait(msg,
+				lambda rxMsg: (rxMsg.msgId == AwlSimMessage.MSG_ID_IDENTS and
+					       rxMsg.isReplyTo(msg)))
+		self.__send(msg)
 		return True
 
 	# Request the compiled block info from the CPU.
@@ -783,25 +910,133 @@ class AwlSimClient(object):
 			loadHwMods=True,
 			loadSymTabs=True, loadLibSelections=True,
 			loadSources=True,
-			loadFup=True, loadKop=True):
+			loadFup=True, loadKop=True,
+			build=False):
 		"""Load selected settings and sources from project.
+		All messages are sent pipelined. The replies are collected
+		while sending, so this does not wait a round trip per source.
+		If 'build' is True, the program is built after the download.
+		The BUILD is only sent, if all messages of the download
+		succeeded. A failed download leaves the successfully loaded
+		parts on the server, but they are not built.
 		"""
+		msgs = []
 		if loadCpuSpecs:
-			self.setCpuSpecs(project.getCpuSpecs())
+			msgs.append((AwlSimMessage_CPUSPECS(project.getCpuSpecs()),
+				     "Failed to set cpuspecs"))
 		if loadCpuConf:
-			self.setCpuConf(project.getCpuConf())
+			msgs.append((AwlSimMessage_CPUCONF(project.getCpuConf()),
+				     "Failed to set cpuconf"))
 		if loadHwMods:
-			self.loadHardwareModules(project.getHwmodSettings().getLoadedModules())
+			msgs.extend((AwlSimMessage_HWMOD(hwmodDesc),
+				     "Failed to load hardware module")
+				    for hwmodDesc in project.getHwmodSettings().getLoadedModules())
 		if loadSymTabs:
-			self.loadSymTabSources(project.getSymTabSources())
+			msgs.extend((AwlSimMessage_SYMTABSRC(symTabSource),
+				     "Failed to load symbol table source")
+				    for symTabSource in project.getSymTabSources())
 		if loadLibSelections:
-			self.loadLibraryBlocks(project.getLibSelections())
+			msgs.extend((AwlSimMessage_LIBSEL(libSel),
+				     "Failed to load library block selection")
+				    for libSel in project.getLibSelections())
 		if loadSources:
-			self.loadAwlSources(project.getAwlSources())
+			msgs.extend((AwlSimMessage_AWLSRC(awlSource),
+				     "Failed to load AWL source")
+				    for awlSource in project.getAwlSources())
 		if loadFup:
-			self.loadFupSources(project.getFupSources())
+			msgs.extend((AwlSimMessage_FUPSRC(fupSource),
+				     "Failed to load FUP source")
+				    for fupSource in project.getFupSources())
 		if loadKop:
-			self.loadKopSources(project.getKopSources())
+			msgs.extend((AwlSimMessage_KOPSRC(kopSource),
+				     "Failed to load KOP source")
+				    for kopSource in project.getKopSources())
+		if not self.__loadPipelined(msgs):
+			return False
+		if build:
+			return self.__loadPipelined(self.__buildMsgs())
+		return True
+
+	def loadProjectIncremental(self, project):
+		"""Download only the differences between 'project' and
+		the program that is loaded in the server.
+		The source ident hashes are compared. New or changed
+		AWL/FUP/KOP sources are uploaded, the program is built
+		and sources that are not in 'project' anymore are removed.
+		If the symbol tables, hardware modules or library selections
+		differ, an incremental download is not possible. A CPU reset
+		and full download are done instead.
+		Returns True, if the download was incremental.
+		"""
+		if not self.__transceiver:
+			return False
+
+		def sameItems(a, b):
+			a, b = list(a), list(b)
+			return len(a) == len(b) and all(x in b for x in a)
+
+		def identHashes(sources):
+			return { source.identHash for source in sources }
+
+		idents = self.requestIdents(reqAwlSources=True,
+					    reqFupSources=True,
+					    reqKopSources=True,
+					    reqSymTabSources=True,
+					    reqHwModules=True,
+					    reqLibSelections=True,
+					    noVolatile=True,
+					    sync=True)
+
+		if not sameItems(identHashes(project.getSymTabSources()),
+				 identHashes(idents.symTabSources)) or\
+		   not sameItems(project.getHwmodSettings().getLoadedModules(),
+				 idents.hwMods) or\
+		   not sameItems(project.getLibSelections(),
+				 idents.libSelections):
+			printVerbose("AwlSimClient: Incremental download not "
+				     "possible. Doing full download.")
+			self.reset()
+			self.loadProject(project, build=True)
+			return False
+
+		msgs = [ (AwlSimMessage_CPUSPECS(project.getCpuSpecs()),
+			  "Failed to set cpuspecs"),
+			 (AwlSimMessage_CPUCONF(project.getCpuConf()),
+			  "Failed to set cpuconf"), ]
+		removeHashes = []
+		for projectSources, serverSources, msgClass, errorText in (
+				(project.getAwlSources(), idents.awlSources,
+				 AwlSimMessage_AWLSRC, "Failed to load AWL source"),
+				(project.getFupSources(), idents.fupSources,
+				 AwlSimMessage_FUPSRC, "Failed to load FUP source"),
+				(project.getKopSources(), idents.kopSources,
+				 AwlSimMessage_KOPSRC, "Failed to load KOP source")):
+			serverHashes = identHashes(serverSources)
+			projectHashes = identHashes(projectSources)
+			msgs.extend((msgClass(source), errorText)
+				    for source in projectSources
+				    if source.identHash not in serverHashes)
+			removeHashes.extend(identHash
+					    for identHash in serverHashes
+					    if identHash not in projectHashes)
+		printVerbose("AwlSimClient: Incremental download: "
+			     "%d sources to load, %d sources to remove." % (
+			     len(msgs) - 2, len(removeHashes)))
+
+		self.__loadPipelined(msgs)
+
+		# Build before removing the old sources.
+		# The newly built blocks replace the blocks of changed sources.
+		# Therefore removing the old source afterwards only removes
+		# the blocks that are really gone.
+		# If all blocks of an old source were replaced, the server
+		# already dropped that source. So ignore REMOVESRC failures.
+		# The BUILD is only sent after all loads succeeded.
+		msgs = self.__buildMsgs()
+		msgs.extend((AwlSimMessage_REMOVESRC(identHash), None)
+			    for identHash in removeHashes)
+		self.__loadPipelined(msgs)
+		return True
 
 	# Set the memory areas we are interested in receiving
 	# dumps for, in the server.
@@ -842,15 +1077,81 @@ class AwlSimClient(object):
 			self.__send(msg)
 		return True
 
-	def getCpuStats(self, sync=False):
+	def step(self, nrCycles=1, timeStep=-1.0,
+		 writeAreas=None, readAreas=None,
+		 timeout=None):
+		"""Run exactly 'nrCycles' cycles in lockstep on the server.
+		This is used to co-simulate the program with an external
+		plant model. The CPU must not be in RUN state.
+		writeAreas -> List of MemoryArea instances with data.
+			      These are written before the cycles are run
+			      (e.g. the process image inputs).
+		readAreas -> List of MemoryArea instances.
+			     These are read after the cycles have been run
+			     (e.g. the process image outputs).
+		timeStep -> Virtual time per cycle, in seconds.
+			    Negative: Keep the CPU clock configuration.
+		timeout -> Minimum time to wait for the step to finish, in seconds.
+		Returns the list of read MemoryArea instances.
+		"""
+		if not self.__transceiver:
+			return None
+		if nrCycles > AwlSimMessage_STEP.MAX_CYCLES:
+			raise AwlSimError("AwlSimClient: Lockstep failed. "
+				"Too many cycles per step (max %d)." % (
+				AwlSimMessage_STEP.MAX_CYCLES))
+		msg = AwlSimMessage_STEP(0, nrCycles, timeStep,
+					 writeAreas, readAreas)
+		rxMsg = self.__sendAndWait(msg,
+			lambda rxMsg: (rxMsg.msgId in {AwlSimMessage.MSG_ID_MEMORY,
+						       AwlSimMessage.MSG_ID_REPLY} and
+				       rxMsg.isReplyTo(msg)),
+			minTimeout=timeout)
+		if rxMsg.msgId != AwlSimMessage.MSG_ID_MEMORY:
+			raise AwlSimError("AwlSimClient: Lockstep failed. "
+				"The CPU is in RUN state or an input "
+				"memory area could not be written.")
+		return rxMsg.memAreas
+
+	def getSnapshot(self):
+		"""Capture the CPU runtime state on the server.
+		Returns a CPUStateSnapshot.
+		"""
+		if not self.__transceiver:
+			return None
+		msg = AwlSimMessage_GET_SNAPSHOT()
+		rxMsg = self.__sendAndWait(msg,
+			lambda rxMsg: (rxMsg.msgId == AwlSimMessage.MSG_ID_SNAPSHOT and
+				       rxMsg.isReplyTo(msg)))
+		return CPUStateSnapshot.fromBytes(rxMsg.snapshotBytes)
+
+	def restoreSnapshot(self, snapshot):
+		"""Restore a CPUStateSnapshot on the server.
+		The server must run the same program that the
+		snapshot was captured from.
+		"""
+		if not self.__transceiver:
+			return False
+		msg = AwlSimMessage_SNAPSHOT(snapshot.toBytes())
+		status = self.__sendAndWaitFor_REPLY(msg)
+		if status != AwlSimMessage_REPLY.STAT_OK:
+			raise AwlSimError("AwlSimClient: Failed to restore "
+				"the CPU state snapshot. The snapshot does "
+				"not match the program.")
+		return True
+
+	def getCpuStats(self, sync=False, reset=False):
 		"""Get CPU statistics.
 		This returns AwlSimMessage_CPUSTATS, if sync=True.
 		Otherwise handle_CPUSTATS() is called upon reception of cpustats.
+		If reset=True, the cycle time statistics and histograms
+		are reset on the server after reading them.
 		Returns None, if an error occurred.
 		"""
 		if not self.__transceiver:
 			return None
-		msg = AwlSimMessage_GET_CPUSTATS()
+		msg = AwlSimMessage_GET_CPUSTATS(
+			flags=(AwlSimMessage_GET_CPUSTATS.FLG_RESET if reset else 0))
 		if sync:
 			rxMsg = self.__sendAndWait(msg,
 				lambda rxMsg: (rxMsg.msgId == AwlSimMessage.MSG_ID_CPUSTATS,
@@ -860,13 +1161,21 @@ class AwlSimClient(object):
 			self.__send(msg)
 		return True
 
-	def measStart(self, sync=True):
-		"""Start instruction time measurements.
+	def measStart(self, sync=True,
+		      measType=AwlSimMessage_MEAS_CONFIG.MEASTYPE_INSN,
+		      sampleRate=0, traceDepth=0):
+		"""Start instruction or block time measurements,
+		the sampling profiler or the instruction trace recorder.
+		sampleRate -> The sampling profiler rate in Hz. 0 = default.
+		traceDepth -> The number of traced instructions. 0 = default.
 		"""
 		if not self.__transceiver:
 			return None
 		msg = AwlSimMessage_MEAS_CONFIG(
-			flags=AwlSimMessage_MEAS_CONFIG.FLG_ENABLE)
+			flags=AwlSimMessage_MEAS_CONFIG.FLG_ENABLE,
+			measType=measType,
+			sampleRate=int(round(sampleRate)),
+			traceDepth=traceDepth)
 		if sync:
 			rxMsg = self.__sendAndWait(msg,
 				lambda rxMsg: (rxMsg.msgId == AwlSimMessage.MSG_ID_MEAS,
@@ -877,16 +1186,27 @@ class AwlSimClient(object):
 			self.__send(msg)
 		return True
 
-	def measStop(self, csv=True, sync=True):
-		"""Stop instruction time measurements and
+	def measStop(self, csv=True, sync=True,
+		     measType=AwlSimMessage_MEAS_CONFIG.MEASTYPE_INSN,
+		     lines=False, folded=False):
+		"""Stop instruction or block time measurements
+		or the sampling profiler and
 		return the measurement report data string, if any.
+		lines -> Get the per source line report (CSV).
+		folded -> Get the per call stack report
+			  in flame graph "folded" format.
 		"""
 		if not self.__transceiver:
 			return None
 		msg = AwlSimMessage_MEAS_CONFIG(
-			flags=AwlSimMessage_MEAS_CONFIG.FLG_GETMEAS)
+			flags=AwlSimMessage_MEAS_CONFIG.FLG_GETMEAS,
+			measType=measType)
 		if csv:
 			msg.flags |= AwlSimMessage_MEAS_CONFIG.FLG_CSV
+		if lines:
+			msg.flags |= AwlSimMessage_MEAS_CONFIG.FLG_LINES
+		if folded:
+			msg.flags |= AwlSimMessage_MEAS_CONFIG.FLG_FOLDED
 		if sync:
 			rxMsg = self.__sendAndWait(msg,
 				lambda rxMsg: (rxMsg.msgId == AwlSimMessage.MSG_ID_MEAS,
@@ -899,6 +1219,27 @@ class AwlSimClient(object):
 			self.__send(msg)
 		return ""
 
+	def getInsnTrace(self, csv=False):
+		"""Get the instruction trace report data string.
+		The trace recorder keeps running.
+		Returns an empty string, if the recorder is not enabled.
+		"""
+		if not self.__transceiver:
+			return None
+		msg = AwlSimMessage_MEAS_CONFIG(
+			flags=(AwlSimMessage_MEAS_CONFIG.FLG_GETMEAS |
+			       AwlSimMessage_MEAS_CONFIG.FLG_KEEP),
+			measType=AwlSimMessage_MEAS_CONFIG.MEASTYPE_TRACE)
+		if csv:
+			msg.flags |= AwlSimMessage_MEAS_CONFIG.FLG_CSV
+		rxMsg = self.__sendAndWait(msg,
+			lambda rxMsg: (rxMsg.msgId == AwlSimMessage.MSG_ID_MEAS and
+				       rxMsg.isReplyTo(msg)))
+		if ((rxMsg.flags & AwlSimMessage_MEAS.FLG_FAIL) or
+		    not (rxMsg.flags & AwlSimMessage_MEAS.FLG_HAVEDATA)):
+			return ""
+		return rxMsg.reportStr
+
 	def shutdownCoreServer(self):
 		"""Shut down the core server.
 		"""
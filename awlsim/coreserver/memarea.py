@@ -68,6 +68,80 @@ class MemoryArea(object):
 			data = bytearray(data)
 		self.data = data
 
+	@classmethod
+	def fromString(cls, memAreaStr, withData=False):
+		"""Parse a memory area string.
+		The format is AREA:OFFS:BITWIDTH for E, A, M and L,
+		DB:DBNR:OFFS:BITWIDTH for data blocks,
+		T:NR and Z:NR for timers and counters and
+		STW for the status word.
+		If 'withData' is True, the value is appended as :VAL.
+		"""
+		def dataToBytes(value, length):
+			if not (0 <= value <= ((1 << length) - 1)):
+				raise ValueError
+			return WordPacker.toBytes(byteBuffer=bytearray(length // 8),
+						  bitWidth=length,
+						  value=value)
+
+		try:
+			elems = memAreaStr.split(":")
+			start = index = length = 0
+			data = b''
+			memType = {
+				"E"	: cls.TYPE_E,
+				"A"	: cls.TYPE_A,
+				"M"	: cls.TYPE_M,
+				"L"	: cls.TYPE_L,
+				"DB"	: cls.TYPE_DB,
+				"T"	: cls.TYPE_T,
+				"Z"	: cls.TYPE_Z,
+				"STW"	: cls.TYPE_STW,
+			}[elems[0].upper().strip()]
+			if memType in { cls.TYPE_E,
+					cls.TYPE_A,
+					cls.TYPE_M,
+					cls.TYPE_L, }:
+				start = int(elems[1])
+				length = int(elems[2])
+				if (not (0 <= start <= 0xFFFF) or
+				    length not in (8, 16, 32)):
+					raise ValueError
+				if withData:
+					data = dataToBytes(int(elems[3]), length)
+			elif memType == cls.TYPE_DB:
+				index = int(elems[1])
+				start = int(elems[2])
+				length = int(elems[3])
+				if (not (0 <= start <= 0xFFFF) or
+				    not (0 <= index <= 0xFFFF) or
+				    length not in (8, 16, 32)):
+					raise ValueError
+				if withData:
+					data = dataToBytes(int(elems[4]), length)
+			elif memType in { cls.TYPE_T,
+					  cls.TYPE_Z, }:
+				index = int(elems[1])
+				length = 16
+				if not (0 <= index <= 0xFFFF):
+					raise ValueError
+				if withData:
+					data = dataToBytes(int(elems[2]), 16)
+			elif memType == cls.TYPE_STW:
+				length = 16
+				if withData:
+					data = dataToBytes(int(elems[1]), 16)
+			else:
+				assert(0)
+		except (ValueError, IndexError, KeyError, AwlSimError) as e:
+			raise AwlSimError("Invalid memory area '%s'." % memAreaStr)
+		return cls(memType=memType,
+			   flags=0,
+			   index=index,
+			   start=start,
+			   length=length // 8,
+			   data=data)
+
 	def __raiseReadErr(self, exception):
 		self.flags |= self.FLG_ERR_READ
 		raise exception
@@ -135,8 +209,8 @@ class MemoryArea(object):
 #@cy		cdef Timer timer
 
 		try:
-			timer = cpu.timers[self.index]
-		except IndexError as e:
+			timer = cpu.getTimer(self.index)
+		except AwlSimError as e:
 			self.__raiseReadErr(
 				AwlSimError("MemoryArea: Invalid timer index %d" % self.index)
 			)
@@ -149,8 +223,8 @@ class MemoryArea(object):
 #@cy		cdef Counter counter
 
 		try:
-			counter = cpu.counters[self.index]
-		except IndexError as e:
+			counter = cpu.getCounter(self.index)
+		except AwlSimError as e:
 			self.__raiseReadErr(
 				AwlSimError("MemoryArea: Invalid counter index %d" % self.index)
 			)
@@ -229,8 +303,8 @@ class MemoryArea(object):
 #@cy		cdef Timer timer
 
 		try:
-			timer = cpu.timers[self.index]
-		except IndexError as e:
+			timer = cpu.getTimer(self.index)
+		except AwlSimError as e:
 			self.__raiseWriteErr(
 				AwlSimError("MemoryArea: Invalid timer index %d" % self.index)
 			)
@@ -250,8 +324,8 @@ class MemoryArea(object):
 #@cy		cdef Counter counter
 
 		try:
-			counter = cpu.counters[self.index]
-		except IndexError as e:
+			counter = cpu.getCounter(self.index)
+		except AwlSimError as e:
 			self.__raiseWriteErr(
 				AwlSimError("MemoryArea: Invalid counter index %d" % self.index)
 			)
@@ -41,6 +41,12 @@ from awlsim.library.libselection import *
 import struct
 import socket
 import errno
+import codecs
+
+try:
+	import zlib
+except ImportError as e: #@nocov
+	zlib = None
 
 
 class TransferError(Exception):
@@ -84,7 +90,7 @@ class AwlSimMessage(object):
 	#	Sequence count	(16 bit)
 	#	Reply to ID	(16 bit)
 	#	Reply to seq	(16 bit)
-	#	reserved	(32 bit)
+	#	Instance ID	(32 bit)
 	#	reserved	(32 bit)
 	#	reserved	(32 bit)
 	#	reserved	(32 bit)
@@ -95,7 +101,16 @@ class AwlSimMessage(object):
 	HDR_MAGIC		= 0x5719
 	HDR_LENGTH		= hdrStruct.size
 
-	HDR_FLAG_REPLY		= 1 << 0
+	# Byte offset and format of the instance ID in the header.
+	# The instance ID selects the CPU instance on a
+	# multi-instance server (AwlSimMultiServer).
+	# Single instance servers only accept instance 0.
+	HDR_INSTANCE_OFFSET	= 12
+	hdrInstanceStruct	= struct.Struct(str(">I"))
+
+	HDR_FLAG_REPLY		= 1 << 0	# This is a reply message.
+	HDR_FLAG_ZLIB		= 1 << 1	# The payload is zlib compressed.
+	HDR_FLAG_CAP_ZLIB	= 1 << 2	# PING/PONG: Peer can receive zlib payloads.
 
 	# Message IDs:
 	EnumGen.start
@@ -150,6 +165,9 @@ class AwlSimMessage(object):
 	MSG_ID_INSNSTATE	= EnumGen.item
 	MSG_ID_MEAS_CONFIG	= EnumGen.item
 	MSG_ID_MEAS		= EnumGen.item
+	MSG_ID_STEP		= EnumGen.item
+	MSG_ID_GET_SNAPSHOT	= EnumGen.item
+	MSG_ID_SNAPSHOT		= EnumGen.item
 	EnumGen.end
 
 	_bytesLenStruct = struct.Struct(str(">I"))
@@ -194,29 +212,46 @@ class AwlSimMessage(object):
 	@classmethod
 	def unpackString(cls, data, offset = 0):
 		try:
-			_bytes, count = cls.unpackBytes(data, offset)
-			return (_bytes.decode("utf-8", "strict"), count)
+			_bytes, count = cls.unpackBytesView(data, offset)
+			# Decode directly from the (receive) buffer.
+			string, _ = codecs.utf_8_decode(_bytes, "strict", True)
+			return (string, count)
 		except UnicodeError as e:
 			raise ValueError
 
 	@classmethod
-	def unpackBytes(cls, data, offset = 0):
+	def unpackBytesView(cls, data, offset = 0):
+		"""Unpack a length prefixed byte string from 'data'.
+		Returns a memoryview into 'data'. This does not copy the data.
+		Note that the memoryview is only valid as long as 'data'
+		is not modified. Do not store it anywhere.
+		"""
 		try:
 			(length, ) = cls._bytesLenStruct.unpack_from(data, offset)
-			_bytes = data[offset + cls._bytesLenStruct.size :
-				      offset + cls._bytesLenStruct.size + length]
+			begin = offset + cls._bytesLenStruct.size
+			_bytes = memoryview(data)[begin : begin + length]
 			if len(_bytes) != length:
 				raise ValueError
 			return (_bytes, cls._bytesLenStruct.size + length)
 		except struct.error as e:
 			raise ValueError
 
+	@classmethod
+	def unpackBytes(cls, data, offset = 0):
+		"""Unpack a length prefixed byte string from 'data'.
+		Returns a copy of the data as bytes.
+		"""
+		_bytes, count = cls.unpackBytesView(data, offset)
+		return (_bytes.tobytes(), count)
+
 	# Default values for instance attributes:
 	msgId = None	# MSG_ID_...
+	compressible = False # Payload may be compressed, if negotiated.
 	seq = 0		# Sequence number.
 	hdrFlags = 0	# HDR_FLAG_...
 	replyToId = 0	# Reply to msgId
 	replyToSeq = 0	# Reply to seq
+	instanceId = 0	# Instance ID
 
 	def toBytes(self, payloadLength=0):
 		return self.hdrStruct.pack(self.HDR_MAGIC,
@@ -225,7 +260,7 @@ class AwlSimMessage(object):
 					   self.seq,
 					   self.replyToId,
 					   self.replyToSeq,
-					   0, # reserved
+					   self.instanceId,
 					   0, # reserved
 					   0, # reserved
 					   0, # reserved
@@ -514,6 +549,7 @@ class _AwlSimMessage_GET_source(AwlSimMessage):
 
 class _AwlSimMessage_source(AwlSimMessage):
 	sourceClass = None
+	compressible = True
 
 	# Payload struct:
 	#	flags (32 bit)
@@ -808,6 +844,7 @@ class AwlSimMessage_GET_CPUDUMP(AwlSimMessage):
 
 class AwlSimMessage_CPUDUMP(AwlSimMessage):
 	msgId = AwlSimMessage.MSG_ID_CPUDUMP
+	compressible = True
 
 	def __init__(self, dumpText):
 		self.dumpText = dumpText
@@ -830,6 +867,32 @@ class AwlSimMessage_CPUDUMP(AwlSimMessage):
 class AwlSimMessage_GET_CPUSTATS(AwlSimMessage):
 	msgId = AwlSimMessage.MSG_ID_GET_CPUSTATS
 
+	# Flags
+	FLG_RESET	= 1 << 0 # Reset the cycle statistics after reading them.
+
+	# Payload struct:
+	#	flags (32 bit)
+	#	reserved (32 bit)
+	plStruct = struct.Struct(str(">II"))
+
+	def __init__(self, flags=0):
+		self.flags = flags
+
+	def toBytes(self):
+		pl = self.plStruct.pack(self.flags, 0)
+		return AwlSimMessage.toBytes(self, len(pl)) + pl
+
+	@classmethod
+	def fromBytes(cls, payload):
+		if not payload:
+			# Old peer without flags.
+			return cls()
+		try:
+			flags, _ = cls.plStruct.unpack_from(payload, 0)
+		except (ValueError, struct.error) as e:
+			raise TransferError("GET_CPUSTATS: Data format error")
+		return cls(flags)
+
 class AwlSimMessage_CPUSTATS(AwlSimMessage):
 	msgId = AwlSimMessage.MSG_ID_CPUSTATS
 
@@ -852,6 +915,9 @@ class AwlSimMessage_CPUSTATS(AwlSimMessage):
 	#	minCycleTime in microseconds (32 bit)
 	#	maxCycleTime in microseconds (32 bit)
 	#	padCycleTime in microseconds (32 bit)
+	#	missedDeadlines (32 bit)
+	#	lastLateness in microseconds (32 bit)
+	#	maxLateness in microseconds (32 bit)
 	#	reserved (32 bit)
 	#	reserved (32 bit)
 	#	reserved (32 bit)
@@ -861,13 +927,29 @@ class AwlSimMessage_CPUSTATS(AwlSimMessage):
 	#	reserved (32 bit)
 	#	reserved (32 bit)
 	#	reserved (32 bit)
+	# followed by zero or more histogram structs:
+	#	histogram ID (16 bit)
+	#	reserved (16 bit)
 	#	reserved (32 bit)
-	#	reserved (32 bit)
+	#	number of recorded values (64 bit)
+	#	p50 in microseconds (32 bit)
+	#	p90 in microseconds (32 bit)
+	#	p99 in microseconds (32 bit)
+	#	p99.9 in microseconds (32 bit)
+	#	maximum in microseconds (32 bit)
 	#	reserved (32 bit)
 	plStruct = struct.Struct(str(">IIQQIIIIIIIIIIIIIIIIIIIIIIIIII"))
+	plHistStruct = struct.Struct(str(">HHIQIIIIII"))
 
 	FLG_RUN = 1 << 0
 
+	# Histogram IDs
+	EnumGen.start
+	HIST_CYCLETIME	= EnumGen.item # OB 1 execution time
+	HIST_PADDING	= EnumGen.item # Cycle padding time
+	HIST_LATENESS	= EnumGen.item # Deadline scheduler lateness
+	EnumGen.end
+
 	def __init__(self,
 		     running,
 		     uptime,
@@ -877,7 +959,11 @@ class AwlSimMessage_CPUSTATS(AwlSimMessage):
 		     avgCycleTime,
 		     minCycleTime,
 		     maxCycleTime,
-		     padCycleTime):
+		     padCycleTime,
+		     missedDeadlines=0,
+		     lastLateness=0.0,
+		     maxLateness=0.0,
+		     histograms=None):
 		self.running = bool(running)
 		self.uptime = float(uptime)
 		self.runtime = float(runtime)
@@ -887,6 +973,12 @@ class AwlSimMessage_CPUSTATS(AwlSimMessage):
 		self.minCycleTime = float(minCycleTime)
 		self.maxCycleTime = float(maxCycleTime)
 		self.padCycleTime = float(padCycleTime)
+		self.missedDeadlines = int(missedDeadlines)
+		self.lastLateness = float(lastLateness)
+		self.maxLateness = float(maxLateness)
+		# Dict of histogram ID to summary tuples:
+		# (count, p50, p90, p99, p99.9, max). Times in seconds.
+		self.histograms = histograms or {}
 
 	def toBytes(self):
 		try:
@@ -912,10 +1004,24 @@ class AwlSimMessage_CPUSTATS(AwlSimMessage):
 				      0, 0xFFFFFFFF),
 				clamp(int(round(self.padCycleTime * 1000000.0)),
 				      0, 0xFFFFFFFF),
-				0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0
+				clamp(self.missedDeadlines, 0, 0xFFFFFFFF),
+				clamp(int(round(self.lastLateness * 1000000.0)),
+				      0, 0xFFFFFFFF),
+				clamp(int(round(self.maxLateness * 1000000.0)),
+				      0, 0xFFFFFFFF),
+				0, 0, 0, 0, 0, 0, 0, 0, 0
 			)
+			for histId, summary in sorted(dictItems(self.histograms)):
+				count, times = summary[0], summary[1:]
+				pl += self.plHistStruct.pack(
+					histId, 0, 0,
+					clamp(count, 0, 0xFFFFFFFFFFFFFFFF),
+					*[ clamp(int(round(t * 1000000.0)), 0, 0xFFFFFFFF)
+					   for t in times ],
+					0
+				)
 			return AwlSimMessage.toBytes(self, len(pl)) + pl
-		except ValueError:
+		except (ValueError, struct.error):
 			raise TransferError("CPUSTATS: Data format error")
 
 	@classmethod
@@ -927,8 +1033,18 @@ class AwlSimMessage_CPUSTATS(AwlSimMessage):
 			insnPerSecond, insnPerCycle,\
 			_, _, _, _,\
 			avgCycleTime, minCycleTime, maxCycleTime, padCycleTime,\
-			_, _, _, _, _, _, _, _, _, _, _, _ =\
+			missedDeadlines, lastLateness, maxLateness,\
+			_, _, _, _, _, _, _, _, _ =\
 				cls.plStruct.unpack_from(payload, 0)
+			histograms = {}
+			offset = cls.plStruct.size
+			while offset + cls.plHistStruct.size <= len(payload):
+				histId, _, _, count, p50, p90, p99, p999, maxVal, _ =\
+					cls.plHistStruct.unpack_from(payload, offset)
+				offset += cls.plHistStruct.size
+				histograms[histId] = (count,) + tuple(
+					float(t) / 1000000.0
+					for t in (p50, p90, p99, p999, maxVal))
 		except (ValueError, struct.error) as e:
 			raise TransferError("CPUSTATS: Data format error")
 		return cls(running=bool(flags & cls.FLG_RUN),
@@ -939,7 +1055,11 @@ class AwlSimMessage_CPUSTATS(AwlSimMessage):
 			   avgCycleTime=(float(avgCycleTime) / 1000000.0),
 			   minCycleTime=(float(minCycleTime) / 1000000.0),
 			   maxCycleTime=(float(maxCycleTime) / 1000000.0),
-			   padCycleTime=(float(padCycleTime) / 1000000.0))
+			   padCycleTime=(float(padCycleTime) / 1000000.0),
+			   missedDeadlines=missedDeadlines,
+			   lastLateness=(float(lastLateness) / 1000000.0),
+			   maxLateness=(float(maxLateness) / 1000000.0),
+			   histograms=histograms)
 
 class AwlSimMessage_MAINTREQ(AwlSimMessage):
 	msgId = AwlSimMessage.MSG_ID_MAINTREQ
@@ -1019,11 +1139,26 @@ class AwlSimMessage_CPUCONF(AwlSimMessage):
 	msgId = AwlSimMessage.MSG_ID_CPUCONF
 
 	plStruct = struct.Struct(str(">32I"))
+	# The retentive DB numbers follow the fixed part.
+	# Their count is stored in the fixed part. Older peers unpack the
+	# fixed part with a strict length, so they only accept the message,
+	# if there are no retentive DBs.
+	# Any data after the DB numbers is ignored.
+	dbNumberStruct = struct.Struct(str(">H"))
 
 	def __init__(self, cpuconf):
 		self.cpuconf = cpuconf
 
 	def toBytes(self):
+		# Each cyclic interrupt OB is packed into one word:
+		# The period in the high 16 bits and the phase offset
+		# in the low 16 bits (both in milliseconds).
+		# A disabled OB (period 0) is sent as period 0xFFFF,
+		# because an all-zero word means 'default configuration'.
+		cyclicInts = tuple(
+			((self.cpuconf.getCyclicIntPeriodMs(obNumber) or 0xFFFF) << 16) |
+			(self.cpuconf.getCyclicIntPhaseMs(obNumber) & 0xFFFF)
+			for obNumber in S7CPUConfig.CYCLIC_INT_OBS)
 		pl = self.plStruct.pack(self.cpuconf.getConfiguredMnemonics(),
 					self.cpuconf.clockMemByte & 0xFFFFFFFF,
 					self.cpuconf.cycleTimeLimitUs & 0xFFFFFFFF,
@@ -1032,14 +1167,26 @@ class AwlSimMessage_CPUCONF(AwlSimMessage):
 					1 if self.cpuconf.extInsnsEn else 0,
 					1 if self.cpuconf.obStartinfoEn else 0,
 					self.cpuconf.cycleTimeTargetUs & 0xFFFFFFFF,
-					*( (0,) * 24 ) # padding
+					self.cpuconf.cycleTimeSchedMode & 0xFFFFFFFF,
+					1 if self.cpuconf.virtTimeEn else 0,
+					self.cpuconf.virtTimeCycleStepUs & 0xFFFFFFFF,
+					self.cpuconf.virtTimeInsnStepNs & 0xFFFFFFFF,
+					self.cpuconf.insnTraceDepth & 0xFFFFFFFF,
+					*(cyclicInts + # 9 words
+					  (self.cpuconf.retentiveFlagBytes & 0xFFFFFFFF,
+					   self.cpuconf.retentiveTimers & 0xFFFFFFFF,
+					   self.cpuconf.retentiveCounters & 0xFFFFFFFF,
+					   len(self.cpuconf.retentiveDBs)) +
+					  (0,) * 6) # padding
 		)
+		pl += b"".join(self.dbNumberStruct.pack(dbNumber)
+			       for dbNumber in self.cpuconf.retentiveDBs)
 		return AwlSimMessage.toBytes(self, len(pl)) + pl
 
 	@classmethod
 	def fromBytes(cls, payload):
 		try:
-			data = cls.plStruct.unpack(payload)
+			data = cls.plStruct.unpack_from(payload, 0)
 			(mnemonics,
 			 clockMemByte,
 			 cycleTimeLimitUs,
@@ -1047,7 +1194,25 @@ class AwlSimMessage_CPUCONF(AwlSimMessage):
 			 extInsnsEn,
 			 obStartinfoEn,
 			 cycleTimeTargetUs,
-			) = data[:8]
+			 cycleTimeSchedMode,
+			 virtTimeEn,
+			 virtTimeCycleStepUs,
+			 virtTimeInsnStepNs,
+			 insnTraceDepth,
+			) = data[:13]
+			cyclicInts = data[13:13 + len(S7CPUConfig.CYCLIC_INT_OBS)]
+			(retentiveFlagBytes,
+			 retentiveTimers,
+			 retentiveCounters,
+			 nrRetentiveDBs,
+			) = data[22:26]
+			if nrRetentiveDBs > 0xFFFF:
+				raise struct.error
+			retentiveDBs = [
+				cls.dbNumberStruct.unpack_from(payload,
+					cls.plStruct.size + i * cls.dbNumberStruct.size)[0]
+				for i in range(nrRetentiveDBs)
+			]
 		except struct.error as e:
 			raise TransferError("CPUCONF: Invalid data format")
 		cpuconf = S7CPUConfig()
@@ -1055,10 +1220,28 @@ class AwlSimMessage_CPUCONF(AwlSimMessage):
 		cpuconf.setClockMemByte(-1 if clockMemByte > 0xFFFF else clockMemByte)
 		cpuconf.setCycleTimeLimitUs(cycleTimeLimitUs)
 		cpuconf.setCycleTimeTargetUs(cycleTimeTargetUs)
+		cpuconf.setCycleTimeSchedMode(cycleTimeSchedMode)
 		cpuconf.setRunTimeLimitUs(qwordToSignedPyInt((runTimeLimitUsHigh << 32) |
 							     runTimeLimitUsLow))
+		cpuconf.setVirtTimeEn(True if (virtTimeEn & 1) else False)
+		cpuconf.setVirtTimeCycleStepUs(virtTimeCycleStepUs)
+		cpuconf.setVirtTimeInsnStepNs(virtTimeInsnStepNs)
+		cpuconf.setInsnTraceDepth(insnTraceDepth)
+		for obNumber, cyclicInt in zip(S7CPUConfig.CYCLIC_INT_OBS, cyclicInts):
+			if cyclicInt:
+				periodMs = (cyclicInt >> 16) & 0xFFFF
+				cpuconf.setCyclicInt(obNumber,
+						     0 if periodMs == 0xFFFF else periodMs,
+						     cyclicInt & 0xFFFF)
 		cpuconf.setExtInsnsEn(True if (extInsnsEn & 1) else False)
 		cpuconf.setOBStartinfoEn(True if (obStartinfoEn & 1) else False)
+		try:
+			cpuconf.setRetentive(retentiveFlagBytes,
+					     retentiveTimers,
+					     retentiveCounters,
+					     retentiveDBs)
+		except AwlSimError as e:
+			raise TransferError("CPUCONF: %s" % e.getMessage())
 		return cls(cpuconf)
 
 class AwlSimMessage_REQ_MEMORY(AwlSimMessage):
@@ -1190,10 +1373,11 @@ class AwlSimMessage_MEMORY(AwlSimMessage):
 				memType, mFlags, index, start, length, actualLength, _, _ =\
 					cls.plAreaStruct.unpack_from(payload, offset)
 				offset += cls.plAreaStruct.size
-				data = payload[offset : offset + actualLength]
+				data = memoryview(payload)[offset : offset + actualLength]
 				offset += roundUp(actualLength, 4)
 				if len(data) != actualLength:
 					raise IndexError
+				data = data.tobytes()
 				memAreas.append(MemoryArea(memType, mFlags, index,
 							   start, length, data))
 		except (struct.error, IndexError) as e:
@@ -1379,9 +1563,9 @@ class AwlSimMessage_MEAS_CONFIG(AwlSimMessage):
 
 	# Payload data struct:
 	#	Flags (32 bit)
-	#	reserved (32 bit)
-	#	reserved (32 bit)
-	#	reserved (32 bit)
+	#	Measurement type (32 bit)
+	#	Sampling rate in Hz (32 bit)
+	#	Instruction trace depth (32 bit)
 	#	reserved (32 bit)
 	#	reserved (32 bit)
 	#	reserved (32 bit)
@@ -1400,25 +1584,174 @@ class AwlSimMessage_MEAS_CONFIG(AwlSimMessage):
 	FLG_ENABLE		= 1 << 0
 	FLG_GETMEAS		= 1 << 1
 	FLG_CSV			= 1 << 2
+	FLG_LINES		= 1 << 3 # Per source line report (CSV)
+	FLG_FOLDED		= 1 << 4 # Call stack report (folded)
+	FLG_KEEP		= 1 << 5 # GETMEAS without stopping (trace only)
+
+	# Measurement types:
+	EnumGen.start
+	MEASTYPE_INSN		= EnumGen.item # Instruction time measurements
+	MEASTYPE_BLOCK		= EnumGen.item # Block time measurements
+	MEASTYPE_SAMPLE		= EnumGen.item # Sampling profiler
+	MEASTYPE_TRACE		= EnumGen.item # Instruction trace recorder
+	EnumGen.end
 
-	def __init__(self, flags):
+	def __init__(self, flags, measType=MEASTYPE_INSN, sampleRate=0,
+		     traceDepth=0):
 		self.flags = flags & 0xFFFFFFFF
+		self.measType = measType
+		self.sampleRate = sampleRate # 0 = default rate
+		self.traceDepth = traceDepth # 0 = current or default depth
 
 	def toBytes(self):
 		pl = self.plDataStruct.pack(
 			self.flags,
-			0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+			self.measType,
+			self.sampleRate,
+			self.traceDepth,
+			0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
 		return AwlSimMessage.toBytes(self, len(pl)) + pl
 
 	@classmethod
 	def fromBytes(cls, payload):
 		try:
-			flags, _, _, _,\
+			flags, measType, sampleRate, traceDepth,\
 			_, _, _, _, _, _, _, _, _, _, _, _ =\
 				cls.plDataStruct.unpack_from(payload, 0)
 		except (struct.error, IndexError) as e:
 			raise TransferError("MEAS_CONFIG: Invalid data format")
-		return cls(flags)
+		return cls(flags, measType, sampleRate, traceDepth)
+
+class AwlSimMessage_STEP(AwlSimMessage):
+	"""Lockstep request.
+	Write the memory areas 'writeAreas' (e.g. the process image inputs
+	computed by a plant model), run exactly 'nrCycles' cycles and
+	read back the memory areas 'readAreas' (e.g. the process image outputs).
+	The server replies with a MEMORY message containing the read areas.
+	"""
+
+	msgId = AwlSimMessage.MSG_ID_STEP
+
+	# Payload header struct:
+	#	flags (32 bit)
+	#	number of cycles (32 bit)
+	#	virtual time per cycle in nanoseconds, -1 = unchanged (64 bit)
+	#	number of memory areas to write (32 bit)
+	#	number of memory areas to read (32 bit)
+	#	reserved (32 bit)
+	#	reserved (32 bit)
+	#	reserved (32 bit)
+	#	reserved (32 bit)
+	#	the memory areas to write (AwlSimMessage_MEMORY area format)
+	#	the memory areas to read (AwlSimMessage_REQ_MEMORY area format)
+	plHdrStruct = struct.Struct(str(">IIqIIIIII"))
+
+	# Upper limit for the number of cycles per step.
+	# The server does not handle communication during the step.
+	MAX_CYCLES = 10000
+
+	def __init__(self, flags, nrCycles, timeStep=-1.0,
+		     writeAreas=None, readAreas=None):
+		self.flags = flags
+		self.nrCycles = nrCycles
+		self.timeStep = timeStep # in seconds. < 0 = unchanged.
+		self.writeAreas = writeAreas or []
+		self.readAreas = readAreas or []
+
+	def toBytes(self):
+		timeStepNs = -1
+		if self.timeStep >= 0.0:
+			timeStepNs = int(round(self.timeStep * 1000000000.0))
+		pl = [ self.plHdrStruct.pack(self.flags,
+					     self.nrCycles,
+					     timeStepNs,
+					     len(self.writeAreas),
+					     len(self.readAreas),
+					     0, 0, 0, 0) ]
+		for memArea in self.writeAreas:
+			actualLength = len(memArea.data)
+			pl.append(AwlSimMessage_MEMORY.plAreaStruct.pack(
+				memArea.memType,
+				memArea.flags,
+				memArea.index,
+				memArea.start,
+				memArea.length,
+				actualLength,
+				0, 0))
+			pl.append(bytes(memArea.data))
+			# Pad to a 32-bit boundary
+			pl.append(b'\x00' * (roundUp(actualLength, 4) - actualLength))
+		for memArea in self.readAreas:
+			pl.append(AwlSimMessage_REQ_MEMORY.plAreaStruct.pack(
+				memArea.memType,
+				memArea.flags,
+				memArea.index,
+				memArea.start,
+				memArea.length,
+				0, 0, 0, 0, 0))
+		pl = b''.join(pl)
+		return AwlSimMessage.toBytes(self, len(pl)) + pl
+
+	@classmethod
+	def fromBytes(cls, payload):
+		try:
+			offset = 0
+			flags, nrCycles, timeStepNs, nrWriteAreas, nrReadAreas,\
+			_, _, _, _ =\
+				cls.plHdrStruct.unpack_from(payload, offset)
+			offset += cls.plHdrStruct.size
+			timeStep = -1.0
+			if timeStepNs >= 0:
+				timeStep = float(timeStepNs) / 1000000000.0
+			writeAreas = []
+			for i in range(nrWriteAreas):
+				memType, mFlags, index, start, length, actualLength, _, _ =\
+					AwlSimMessage_MEMORY.plAreaStruct.unpack_from(payload, offset)
+				offset += AwlSimMessage_MEMORY.plAreaStruct.size
+				data = memoryview(payload)[offset : offset + actualLength]
+				offset += roundUp(actualLength, 4)
+				if len(data) != actualLength:
+					raise IndexError
+				writeAreas.append(MemoryArea(memType, mFlags, index,
+							     start, length, data.tobytes()))
+			readAreas = []
+			for i in range(nrReadAreas):
+				memType, mFlags, index, start, length,\
+				_, _, _, _, _ =\
+					AwlSimMessage_REQ_MEMORY.plAreaStruct.unpack_from(payload, offset)
+				offset += AwlSimMessage_REQ_MEMORY.plAreaStruct.size
+				readAreas.append(MemoryArea(memType, mFlags, index, start, length))
+		except (struct.error, IndexError) as e:
+			raise TransferError("STEP: Invalid data format")
+		return cls(flags, nrCycles, timeStep, writeAreas, readAreas)
+
+class AwlSimMessage_GET_SNAPSHOT(AwlSimMessage):
+	msgId = AwlSimMessage.MSG_ID_GET_SNAPSHOT
+
+class AwlSimMessage_SNAPSHOT(AwlSimMessage):
+	"""CPU state snapshot.
+	This is the reply to GET_SNAPSHOT.
+	Sent by the client, it restores the CPU state.
+	The payload is the CPUStateSnapshot binary representation.
+	"""
+
+	msgId = AwlSimMessage.MSG_ID_SNAPSHOT
+	compressible = True
+
+	def __init__(self, snapshotBytes):
+		self.snapshotBytes = snapshotBytes
+
+	def toBytes(self):
+		pl = self.packBytes(self.snapshotBytes)
+		return AwlSimMessage.toBytes(self, len(pl)) + pl
+
+	@classmethod
+	def fromBytes(cls, payload):
+		try:
+			snapshotBytes, count = cls.unpackBytes(payload)
+		except ValueError as e:
+			raise TransferError("SNAPSHOT: Invalid data format")
+		return cls(snapshotBytes)
 
 class AwlSimMessage_REMOVESRC(AwlSimMessage):
 	msgId = AwlSimMessage.MSG_ID_REMOVESRC
@@ -1511,6 +1844,7 @@ class AwlSimMessage_GET_IDENTS(AwlSimMessage):
 	GET_LIBSELS		= EnumGen.bitmask # Get AwlLibEntrySelection()s
 	GET_FUPSRCS		= EnumGen.bitmask # Get FupSource()s (w/o data)
 	GET_KOPSRCS		= EnumGen.bitmask # Get KopSource()s (w/o data)
+	GET_NOVOLATILE		= EnumGen.bitmask # Omit volatile (generated) sources
 	EnumGen.end
 
 	# Payload header struct:
@@ -1542,6 +1876,7 @@ class AwlSimMessage_GET_IDENTS(AwlSimMessage):
 
 class AwlSimMessage_IDENTS(AwlSimMessage):
 	msgId = AwlSimMessage.MSG_ID_IDENTS
+	compressible = True
 
 	# Payload header struct:
 	#	Number of AWL sources (32 bit)
@@ -1804,11 +2139,31 @@ class AwlSimMessageTransceiver(object):
 		AwlSimMessage.MSG_ID_INSNSTATE		: AwlSimMessage_INSNSTATE,
 		AwlSimMessage.MSG_ID_MEAS_CONFIG	: AwlSimMessage_MEAS_CONFIG,
 		AwlSimMessage.MSG_ID_MEAS		: AwlSimMessage_MEAS,
+		AwlSimMessage.MSG_ID_STEP		: AwlSimMessage_STEP,
+		AwlSimMessage.MSG_ID_GET_SNAPSHOT	: AwlSimMessage_GET_SNAPSHOT,
+		AwlSimMessage.MSG_ID_SNAPSHOT		: AwlSimMessage_SNAPSHOT,
 	}
 
 	DEFAULT_TX_BUF_SIZE	= 1024 * 100
 	DEFAULT_RX_BUF_SIZE	= 1024 * 100
 
+	# Size of the preallocated message receive buffer.
+	DEFAULT_RX_MSGBUF_SIZE	= 1024 * 64
+	# The receive buffer is shrunk back to default, if it grew beyond this.
+	MAX_RX_MSGBUF_SIZE	= 1024 * 1024
+
+	# Payloads of compressible messages bigger than this are compressed,
+	# if the peer negotiated compression support.
+	COMPRESS_THRES		= 1024 * 4
+	COMPRESS_LEVEL		= 1
+	# Upper limit for decompressed payloads.
+	MAX_DECOMPRESSED_SIZE	= 1024 * 1024 * 256
+	# Upper limit for received payloads.
+	MAX_RX_PAYLOAD_SIZE	= 1024 * 1024 * 256
+
+	# Flag: zlib compression is supported locally.
+	haveCompression = zlib is not None
+
 	def __init__(self, sock, peerInfoString):
 		self.sock = sock
 		self.peerInfoString = peerInfoString
@@ -1828,8 +2183,19 @@ class AwlSimMessageTransceiver(object):
 
 		# Transmit status
 		self.txSeqCount = 0
+		self.txCompress = False
+		self.txInstanceId = 0
+
+		# Total transfer statistics
+		self.txMsgCount = 0
+		self.txByteCount = 0
+		self.rxMsgCount = 0
+		self.rxByteCount = 0
 
 		# Receive buffer
+		self.__haveRecvInto = hasattr(sock, "recv_into")
+		self.rxByteCnt = 0
+		self.__rxAlloc(self.DEFAULT_RX_MSGBUF_SIZE)
 		self.__resetRxBuf()
 
 		_SocketErrors = SocketErrors
@@ -1921,8 +2287,37 @@ class AwlSimMessageTransceiver(object):
 
 	def __setMsgTxSeq(self, msg):
 		msg.seq = self.txSeqCount
+		msg.instanceId = self.txInstanceId
 		self.txSeqCount = (self.txSeqCount + 1) & 0xFFFF
 
+	def enableCompression(self, enable=True):
+		"""Enable zlib compression of compressible transmitted payloads.
+		This must only be enabled, if the peer announced
+		HDR_FLAG_CAP_ZLIB support.
+		"""
+		self.txCompress = bool(enable and self.haveCompression)
+
+	def __msgToBytes(self, msg):
+		data = msg.toBytes()
+		if self.txCompress and msg.compressible:
+			hdrLen = AwlSimMessage.HDR_LENGTH
+			if len(data) - hdrLen > self.COMPRESS_THRES:
+				payload = zlib.compress(memoryview(data)[hdrLen : ],
+							self.COMPRESS_LEVEL)
+				if len(payload) < len(data) - hdrLen:
+					hdr = AwlSimMessage.hdrStruct.pack(
+						AwlSimMessage.HDR_MAGIC,
+						msg.msgId,
+						msg.hdrFlags | AwlSimMessage.HDR_FLAG_ZLIB,
+						msg.seq,
+						msg.replyToId,
+						msg.replyToSeq,
+						msg.instanceId,
+						0, 0, 0, # reserved
+						len(payload))
+					data = hdr + payload
+		return data
+
 	def send(self, msg, timeout=None):
 		if timeout != self.__timeout:
 			self.sock.settimeout(timeout)
@@ -1934,12 +2329,12 @@ class AwlSimMessageTransceiver(object):
 			dataList = []
 			for oneMsg in msg:
 				self.__setMsgTxSeq(oneMsg)
-				dataList.append(oneMsg.toBytes())
+				dataList.append(self.__msgToBytes(oneMsg))
 			data = memoryview(b"".join(dataList))
 			nrMsg = len(msg)
 		else:
 			self.__setMsgTxSeq(msg)
-			data = memoryview(msg.toBytes())
+			data = memoryview(self.__msgToBytes(msg))
 			nrMsg = 1
 
 		offset = 0
@@ -1953,39 +2348,64 @@ class AwlSimMessageTransceiver(object):
 				transferError = TransferError(None, e)
 				if transferError.reason != TransferError.REASON_BLOCKING:
 					raise transferError
+		self.txMsgCount += nrMsg
+		self.txByteCount += dataLen
 		if self.__debugEnabled:
 			self.__accountTx(nrMsg, 1, dataLen)
 
+	def __rxAlloc(self, size):
+		"""(Re)allocate the receive buffer to hold at least 'size' bytes.
+		The already received header bytes are preserved.
+		"""
+		size = max(roundUp(size, 4096), self.DEFAULT_RX_MSGBUF_SIZE)
+		rxBuf = bytearray(size)
+		if self.rxByteCnt:
+			rxBuf[0 : self.rxByteCnt] = self.__rxView[0 : self.rxByteCnt]
+		self.__rxBuf = rxBuf
+		self.__rxView = memoryview(rxBuf)
+
+	def __recvInto(self, rxByteCnt, size):
+		"""Receive up to 'size' bytes into the receive buffer at
+		offset 'rxByteCnt'. Returns the new receive byte count
+		or None, if the receive would block."""
+		_SocketErrors = SocketErrors
+		try:
+			if self.__haveRecvInto:
+				count = self.sock.recv_into(
+					self.__rxView[rxByteCnt : rxByteCnt + size],
+					size)
+			else: #@nocov
+				data = self.sock.recv(size)
+				count = len(data)
+				self.__rxView[rxByteCnt : rxByteCnt + count] = data
+		except _SocketErrors as e:
+			transferError = TransferError(None, e)
+			if transferError.reason == TransferError.REASON_BLOCKING:
+				return None
+			self.__resetRxBuf()
+			raise transferError
+		if count <= 0:
+			# The remote end closed the connection
+			self.__resetRxBuf()
+			raise TransferError(None, None,
+					    TransferError.REASON_REMOTEDIED)
+		self.rxByteCnt = rxByteCnt = rxByteCnt + count
+		return rxByteCnt
+
 	def receive(self, timeout=0.0):
 		if timeout != self.__timeout:
 			self.sock.settimeout(timeout)
 			self.__timeout = timeout
 
-		_SocketErrors = SocketErrors
 		hdrLen, rxByteCnt = AwlSimMessage.HDR_LENGTH, self.rxByteCnt
 		if rxByteCnt < hdrLen:
-			try:
-				data = self.sock.recv(hdrLen - rxByteCnt)
-			except _SocketErrors as e:
-				transferError = TransferError(None, e)
-				if transferError.reason == TransferError.REASON_BLOCKING:
-					return None
-				self.__resetRxBuf()
-				raise transferError
-			if not data:
-				# The remote end closed the connection
-				self.__resetRxBuf()
-				raise TransferError(None, None,
-						    TransferError.REASON_REMOTEDIED)
-			self.rxBuffers.append(data)
-			self.rxByteCnt = rxByteCnt = rxByteCnt + len(data)
-			if rxByteCnt < hdrLen:
+			rxByteCnt = self.__recvInto(rxByteCnt, hdrLen - rxByteCnt)
+			if rxByteCnt is None or rxByteCnt < hdrLen:
 				return None
 			try:
 				magic, self.msgId, self.hdrFlags, self.seq,\
-				self.replyToId, self.replyToSeq, _, _, _, _, self.payloadLen =\
-					AwlSimMessage.hdrStruct.unpack(b"".join(self.rxBuffers))
-				self.rxBuffers = [] # Discard raw header bytes.
+				self.replyToId, self.replyToSeq, self.instanceId, _, _, _, self.payloadLen =\
+					AwlSimMessage.hdrStruct.unpack_from(self.__rxBuf, 0)
 			except struct.error as e:
 				self.__resetRxBuf()
 				raise AwlSimError("Received message with invalid "
@@ -1995,26 +2415,20 @@ class AwlSimMessageTransceiver(object):
 				raise AwlSimError("Received message with invalid "
 					"magic value (was 0x%04X, expected 0x%04X)." %\
 					(magic, AwlSimMessage.HDR_MAGIC))
+			if self.payloadLen > self.MAX_RX_PAYLOAD_SIZE:
+				payloadLen = self.payloadLen
+				self.__resetRxBuf()
+				raise AwlSimError("Received message with too big "
+					"payload (%d bytes, max %d bytes)." %\
+					(payloadLen, self.MAX_RX_PAYLOAD_SIZE))
+			if hdrLen + self.payloadLen > len(self.__rxBuf):
+				self.__rxAlloc(hdrLen + self.payloadLen)
 			if self.payloadLen:
 				return None
 		msgLen = hdrLen + self.payloadLen
 		if rxByteCnt < msgLen:
-			try:
-				data = self.sock.recv(msgLen - rxByteCnt)
-			except _SocketErrors as e:
-				transferError = TransferError(None, e)
-				if transferError.reason == TransferError.REASON_BLOCKING:
-					return None
-				self.__resetRxBuf()
-				raise transferError
-			if not data:
-				# The remote end closed the connection
-				self.__resetRxBuf()
-				raise TransferError(None, None,
-						    TransferError.REASON_REMOTEDIED)
-			self.rxBuffers.append(data)
-			self.rxByteCnt = rxByteCnt = rxByteCnt + len(data)
-			if rxByteCnt < msgLen:
+			rxByteCnt = self.__recvInto(rxByteCnt, msgLen - rxByteCnt)
+			if rxByteCnt is None or rxByteCnt < msgLen:
 				return None
 		try:
 			cls = self.id2class[self.msgId]
@@ -2022,22 +2436,50 @@ class AwlSimMessageTransceiver(object):
 			self.__resetRxBuf()
 			msgId = "No ID" if self.msgId is None else ("0x%04X" % self.msgId)
 			raise AwlSimError("Received unknown message: %s" % msgId)
-		msg = cls.fromBytes(b"".join(self.rxBuffers))
+		# Decode the payload in place.
+		# The decoder must copy everything it wants to keep.
+		payload = self.__rxView[hdrLen : msgLen]
+		if self.hdrFlags & AwlSimMessage.HDR_FLAG_ZLIB:
+			payload = self.__decompress(payload)
+		msg = cls.fromBytes(payload)
 		msg.seq = self.seq
-		msg.hdrFlags = self.hdrFlags
+		msg.hdrFlags = self.hdrFlags & ~AwlSimMessage.HDR_FLAG_ZLIB
 		msg.replyToId = self.replyToId
 		msg.replyToSeq = self.replyToSeq
+		msg.instanceId = self.instanceId
 		self.__resetRxBuf()
+		self.rxMsgCount += 1
+		self.rxByteCount += msgLen
 		if self.__debugEnabled:
 			self.__accountRx(1, 1, msgLen)
 		return msg
 
+	def __decompress(self, payload):
+		if not self.haveCompression:
+			self.__resetRxBuf()
+			raise AwlSimError("Received compressed message, "
+				"but zlib is not available.")
+		try:
+			decomp = zlib.decompressobj()
+			data = decomp.decompress(payload, self.MAX_DECOMPRESSED_SIZE)
+			if decomp.unconsumed_tail or not decomp.eof:
+				raise zlib.error("Truncated or too large")
+		except zlib.error as e:
+			self.__resetRxBuf()
+			raise AwlSimError("Received message with invalid "
+				"compressed payload: %s" % str(e))
+		return data
+
 	def __resetRxBuf(self):
-		self.rxBuffers = []
+		if len(self.__rxBuf) > self.MAX_RX_MSGBUF_SIZE:
+			# Do not keep a huge buffer around after a big message.
+			self.rxByteCnt = 0
+			self.__rxAlloc(self.DEFAULT_RX_MSGBUF_SIZE)
 		self.rxByteCnt = 0
 		self.msgId = 0
 		self.hdrFlags = 0
 		self.seq = 0
 		self.replyToId = 0
 		self.replyToSeq = 0
+		self.instanceId = 0
 		self.payloadLen = 0
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - OpenMetrics / Prometheus exporter
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim.common.compat import *
+
+from awlsim.common.enumeration import *
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+from awlsim.common.datatypehelpers import * #+cimport
+from awlsim.common.net import *
+
+import math
+import socket
+import threading
+
+if isPy2Compat: #@nocov
+	from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+else:
+	from http.server import HTTPServer, BaseHTTPRequestHandler
+
+
+__all__ = [
+	"MetricFamily",
+	"MetricsExporter",
+]
+
+
+class MetricFamily(object):
+	"""One metric family with all of its samples.
+	"""
+
+	EnumGen.start
+	TYPE_GAUGE	= EnumGen.item
+	TYPE_COUNTER	= EnumGen.item
+	TYPE_HISTOGRAM	= EnumGen.item
+	TYPE_INFO	= EnumGen.item
+	EnumGen.end
+
+	type2str = {
+		TYPE_GAUGE	: "gauge",
+		TYPE_COUNTER	: "counter",
+		TYPE_HISTOGRAM	: "histogram",
+		TYPE_INFO	: "info",
+	}
+
+	def __init__(self, name, metricType, helpText):
+		self.name = name
+		self.metricType = metricType
+		self.helpText = helpText
+		self.samples = []	# List of (suffix, labels, value)
+
+	def add(self, value, **labels):
+		"""Add a gauge, counter or info sample.
+		"""
+		suffix = {
+			self.TYPE_COUNTER	: "_total",
+			self.TYPE_INFO		: "_info",
+		}.get(self.metricType, "")
+		self.samples.append((suffix, labels, value))
+		return self
+
+	def addHistogram(self, limits, counts, count, sum, **labels):
+		"""Add the samples of one histogram.
+		'limits' are the ascending upper bucket limits
+		and 'counts' are the cumulative counts for these limits.
+		"""
+		for limit, cumulated in zip(limits, counts):
+			bucketLabels = dict(labels)
+			bucketLabels["le"] = limit
+			self.samples.append(("_bucket", bucketLabels, cumulated))
+		bucketLabels = dict(labels)
+		bucketLabels["le"] = float("inf")
+		self.samples.append(("_bucket", bucketLabels, count))
+		self.samples.append(("_count", labels, count))
+		self.samples.append(("_sum", labels, sum))
+		return self
+
+	@staticmethod
+	def __valueToStr(value):
+		if isinstance(value, bool):
+			return "1" if value else "0"
+		if isInteger(value):
+			return "%d" % value
+		if math.isinf(value):
+			return "+Inf" if value > 0 else "-Inf"
+		if math.isnan(value):
+			return "NaN"
+		return repr(float(value))
+
+	@classmethod
+	def __labelsToStr(cls, labels):
+		if not labels:
+			return ""
+		ret = []
+		for name in sorted(labels):
+			value = labels[name]
+			if not isString(value):
+				value = cls.__valueToStr(value)
+			value = value.replace("\\", "\\\\")
+			value = value.replace("\n", "\\n")
+			value = value.replace('"', '\\"')
+			ret.append('%s="%s"' % (name, value))
+		return "{" + ",".join(ret) + "}"
+
+	def toText(self, openMetrics=True):
+		"""Get the family in the text exposition format.
+		If 'openMetrics' is False, the Prometheus 0.0.4
+		text format is generated.
+		"""
+		name = self.name
+		typeStr = self.type2str[self.metricType]
+		if not openMetrics:
+			# The old format has no info type
+			# and expects the full counter sample name.
+			if self.metricType == self.TYPE_INFO:
+				name += "_info"
+				typeStr = "gauge"
+			elif self.metricType == self.TYPE_COUNTER:
+				name += "_total"
+		ret = [ "# TYPE %s %s" % (name, typeStr),
+			"# HELP %s %s" % (name, self.helpText), ]
+		for suffix, labels, value in self.samples:
+			ret.append("%s%s%s %s" % (
+				self.name, suffix,
+				self.__labelsToStr(labels),
+				self.__valueToStr(value)))
+		return "\n".join(ret) + "\n"
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+	"""HTTP request handler of the metrics exporter.
+	"""
+
+	def do_GET(self):
+		exporter = self.server.exporter
+		if self.path.split("?")[0] not in ("/metrics", "/"):
+			self.send_error(404)
+			return
+		openMetrics = "application/openmetrics-text" in\
+			      (self.headers.get("Accept") or "")
+		body = exporter.getText(openMetrics).encode("UTF-8")
+		self.send_response(200)
+		self.send_header("Content-Type",
+				 exporter.CONTENT_TYPE_OPENMETRICS if openMetrics else\
+				 exporter.CONTENT_TYPE_PROMETHEUS)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		printDebug("Metrics: %s %s" % (self.address_string(),
+					       format % args))
+
+class MetricsHTTPServer(HTTPServer):
+	allow_reuse_address = True
+
+	def __init__(self, exporter, family, sockaddr):
+		self.address_family = family
+		self.exporter = exporter
+		HTTPServer.__init__(self, sockaddr, MetricsRequestHandler)
+
+class MetricsExporter(object):
+	"""OpenMetrics / Prometheus exporter.
+	A HTTP server thread serves the metrics on GET /metrics.
+	The metrics are not collected in the HTTP thread. The thread asks
+	the owner to collect a snapshot via 'requestCallback' and the owner's
+	main loop calls setSnapshot() with a list of MetricFamily instances.
+	That way all values are consistent and the network I/O
+	never blocks the CPU main loop.
+	"""
+
+	CONTENT_TYPE_OPENMETRICS	= "application/openmetrics-text; version=1.0.0; charset=utf-8"
+	CONTENT_TYPE_PROMETHEUS		= "text/plain; version=0.0.4; charset=utf-8"
+
+	# Time to wait for the main loop to collect a snapshot, in seconds.
+	# If the main loop does not respond in time, the last snapshot is served.
+	SNAPSHOT_TIMEOUT = 2.0
+
+	def __init__(self, host, port, family=None):
+		self.__host = host
+		self.__port = port
+		self.__family = family
+		self.__requestCallback = None
+		self.__httpServer = None
+		self.__thread = None
+		self.__lock = threading.Lock()
+		self.__snapshotEvent = threading.Event()
+		self.__snapshot = []
+
+	@property
+	def running(self):
+		return self.__thread is not None
+
+	def start(self, requestCallback):
+		"""Start the HTTP server thread.
+		'requestCallback' is called from the HTTP thread to request a
+		new snapshot. It must not block and must not collect the metrics.
+		"""
+		if self.__thread:
+			return
+		self.__requestCallback = requestCallback
+		try:
+			if self.__host:
+				family, socktype, sockaddr = netGetAddrInfo(
+					self.__host, self.__port, self.__family)
+				if family == AF_UNIX:
+					raise AwlSimError("Unix sockets are not supported.")
+			else:
+				family = self.__family or socket.AF_INET
+				sockaddr = ("", self.__port)
+			self.__httpServer = MetricsHTTPServer(self, family, sockaddr[:2])
+			host, port = self.getAddress()
+			printInfo("Serving metrics on http://%s:%d/metrics" % (
+				  host or "[all-interfaces]", port))
+		except SocketErrors as e:
+			raise AwlSimError("Metrics exporter: Failed to create "
+				"HTTP server socket: %s" % str(e))
+		except AwlSimError as e:
+			raise AwlSimError("Metrics exporter: %s" % e.getMessage())
+		self.__thread = threading.Thread(target=self.__httpServer.serve_forever,
+						 name="MetricsExporter")
+		self.__thread.daemon = True
+		self.__thread.start()
+
+	def stop(self):
+		"""Stop the HTTP server thread.
+		"""
+		if not self.__thread:
+			return
+		self.__httpServer.shutdown()
+		self.__thread.join()
+		self.__thread = None
+		with suppressAllExc:
+			self.__httpServer.server_close()
+		self.__httpServer = None
+		self.__requestCallback = None
+
+	def getAddress(self):
+		"""Get the (host, port) the HTTP server listens on.
+		"""
+		if not self.__httpServer:
+			return None
+		return self.__httpServer.server_address[:2]
+
+	def setSnapshot(self, families):
+		"""Set a new snapshot (list of MetricFamily instances).
+		This is called by the owner's main loop.
+		"""
+		with self.__lock:
+			self.__snapshot = families
+		self.__snapshotEvent.set()
+
+	def getText(self, openMetrics=True):
+		"""Request a new snapshot and get it in the text format.
+		This is called from the HTTP thread.
+		"""
+		requestCallback = self.__requestCallback
+		if requestCallback:
+			self.__snapshotEvent.clear()
+			requestCallback()
+			self.__snapshotEvent.wait(self.SNAPSHOT_TIMEOUT)
+		with self.__lock:
+			families = self.__snapshot
+		text = "".join(f.toText(openMetrics) for f in families)
+		if openMetrics:
+			text += "# EOF\n"
+		return text
@@ -0,0 +1,663 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Multi-instance coreserver
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.subprocess_wrapper import *
+from awlsim.common.net import *
+from awlsim.common.env import *
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+from awlsim.common.monotonic import * #+cimport
+
+from awlsim.coreserver.messages import *
+from awlsim.coreserver.server import *
+
+import sys
+import os
+import select as select_mod
+import signal
+import socket
+import shutil
+import tempfile
+import time
+
+
+__all__ = [
+	"AwlSimMultiServer",
+	"AwlSimServerWorker",
+]
+
+
+class AwlSimServerWorker(object):
+	"""Worker process of the multi-instance server.
+	The worker hosts a set of CPU instances. Each instance is a
+	complete AwlSimServer that listens on its own Unix domain socket.
+	The instances are run round-robin in time slices of one CPU cycle.
+	"""
+
+	ENV_WORKER		= "AWLSIM_CORESERVER_WORKER"
+
+	@classmethod
+	def _execute(cls, env=None):
+		"""Execute the worker process.
+		Returns the exit() return value."""
+
+		worker, retval = None, ExitCodes.EXIT_OK
+		try:
+			worker = cls()
+			for sig in (signal.SIGTERM, signal.SIGINT):
+				signal.signal(sig, worker.signalHandler)
+			worker.runFromEnvironment(env)
+		except AwlSimError as e:
+			print(e.getReport())
+			retval = ExitCodes.EXIT_ERR_SIM
+		except KeyboardInterrupt:
+			print("AwlSimServerWorker: Interrupted.")
+		finally:
+			if worker:
+				worker.shutdown()
+		return retval
+
+	def __init__(self):
+		self.__servers = {}	# Instance ID -> AwlSimServer
+		self.__exit = False
+
+	def runFromEnvironment(self, env=None):
+		"""Run the worker.
+		Configuration is passed via environment variables in 'env'.
+		If 'env' is not passed, the current environment is used."""
+
+		if not env:
+			env = AwlSimEnv.getEnv()
+
+		try:
+			loglevel = int(env.get("AWLSIM_CORESERVER_LOGLEVEL"))
+		except (TypeError, ValueError) as e:
+			raise AwlSimError("AwlSimServerWorker: No loglevel specified")
+		Logging.setPrefix("AwlSimServerWorker %s: " % env.get(self.ENV_WORKER))
+		Logging.setLoglevel(loglevel)
+
+		if env.get(AwlSimServer.ENV_MAGIC) != AwlSimServer.ENV_MAGIC:
+			raise AwlSimError("AwlSimServerWorker: Missing magic value")
+
+		sockDir = env.get("AWLSIM_CORESERVER_SOCKDIR")
+		if not sockDir:
+			raise AwlSimError("AwlSimServerWorker: No socket "
+					  "directory specified")
+		try:
+			instanceIds = [ int(i) for i in
+					env.get("AWLSIM_CORESERVER_INSTANCES").split(",") ]
+		except (AttributeError, ValueError) as e:
+			raise AwlSimError("AwlSimServerWorker: No instances specified")
+		try:
+			commandMask = int(env.get("AWLSIM_CORESERVER_CMDMSK"))
+		except (TypeError, ValueError) as e:
+			raise AwlSimError("AwlSimServerWorker: No command mask specified")
+		try:
+			projectWriteBack = bool(int(env.get("AWLSIM_CORESERVER_PROJECTRW")))
+		except (TypeError, ValueError) as e:
+			projectWriteBack = False
+
+		for instanceId in instanceIds:
+			self.startInstance(
+				instanceId = instanceId,
+				sockPath = AwlSimMultiServer.getInstanceSockPath(
+					sockDir, instanceId),
+				commandMask = commandMask,
+				project = env.get("AWLSIM_CORESERVER_PROJECT_%d" % instanceId) or None,
+				projectWriteBack = projectWriteBack,
+				retentive = env.get("AWLSIM_CORESERVER_RETENTIVE_%d" % instanceId) or None)
+		self.run()
+
+	def startInstance(self, instanceId, sockPath,
+			  commandMask=0,
+			  project=None,
+			  projectWriteBack=False,
+			  retentive=None):
+		"""Create the CPU instance 'instanceId'.
+		The instance listens on the Unix domain socket 'sockPath'.
+		"""
+		if instanceId in self.__servers:
+			raise AwlSimError("AwlSimServerWorker: Instance %d "
+					  "already exists." % instanceId)
+		printVerbose("Starting CPU instance %d" % instanceId)
+		server = AwlSimServer()
+		self.__servers[instanceId] = server
+		server.startup(host = sockPath,
+			       port = 0,
+			       family = AF_UNIX,
+			       commandMask = commandMask,
+			       project = project,
+			       projectWriteBack = projectWriteBack,
+			       retentive = retentive)
+
+	def run(self):
+		"""Run the instances until all of them exited.
+		"""
+		servers = self.__servers
+		while servers:
+			# Sleep at most this long, if no CPU is running.
+			nextTime = monotonic_time() + 0.2
+			for instanceId, server in list(dictItems(servers)):
+				if self.__exit:
+					server.setRunState(server.STATE_EXIT)
+				if server.getRunState() == server.STATE_EXIT:
+					printInfo("CPU instance %d exited." % instanceId)
+					servers.pop(instanceId)
+					server.shutdown()
+					continue
+				if server.runSlice():
+					# The instances do not sleep their cycle
+					# padding. Wait for the earliest deadline instead.
+					nextTime = min(nextTime, server.getNextCycleTime())
+			timeout = nextTime - monotonic_time()
+			if timeout > 0.0 and servers:
+				# Sleep until there is some communication
+				# or the next cycle of any CPU is due.
+				rlist = []
+				for server in dictValues(servers):
+					rlist.extend(server.getReadSockets())
+				try:
+					select_mod.select(rlist, [], [], timeout)
+				except Exception:
+					raise AwlSimError("AwlSimServerWorker: "
+						"Communication error. 'select' failed")
+
+	def shutdown(self):
+		for server in dictValues(self.__servers):
+			with suppressAllExc:
+				server.shutdown()
+		self.__servers = {}
+
+	def signalHandler(self, sig, frame):
+		printInfo("Received signal %d" % sig)
+		if sig in (signal.SIGTERM, signal.SIGINT):
+			self.__exit = True
+
+class _ProxyConnection(object):
+	"""A connection of the multi-instance server message router.
+	This is either a client connection or a connection
+	to one of the CPU instances.
+	"""
+
+	# Stop receiving from a connection, while the transmit buffer of
+	# the destination of its messages is bigger than this.
+	TX_HIGH_WATER = 1024 * 1024
+
+	def __init__(self, sock, peerInfoString, instanceId=-1, client=None):
+		self.sock = sock
+		self.peerInfoString = peerInfoString
+		self.rxBuf = bytearray()
+		self.txBuf = bytearray()
+		# Client connection: Instance ID -> instance connection
+		self.instances = {}
+		# Instance connection: The instance ID and the client connection
+		self.instanceId = instanceId
+		self.client = client
+
+	@property
+	def isInstance(self):
+		return self.client is not None
+
+	def fileno(self):
+		return self.sock.fileno()
+
+	@property
+	def txCongested(self):
+		return len(self.txBuf) > self.TX_HIGH_WATER
+
+	@property
+	def rxBlocked(self):
+		"""Returns True, if receiving is stopped, because a destination
+		of the received messages is congested.
+		"""
+		if self.isInstance:
+			return self.client.txCongested
+		# Rejected messages are replied to the client itself.
+		return self.txCongested or\
+		       any(i.txCongested for i in dictValues(self.instances))
+
+	def popMessage(self):
+		"""Get the next complete message from the receive buffer.
+		Returns a bytearray or None.
+		"""
+		rxBuf, hdrLen = self.rxBuf, AwlSimMessage.HDR_LENGTH
+		if len(rxBuf) < hdrLen:
+			return None
+		hdr = AwlSimMessage.hdrStruct.unpack_from(rxBuf, 0)
+		if hdr[0] != AwlSimMessage.HDR_MAGIC:
+			raise TransferError("Received message with invalid magic value.")
+		payloadLen = hdr[-1]
+		if payloadLen > AwlSimMessageTransceiver.MAX_RX_PAYLOAD_SIZE:
+			raise TransferError("Received message with too big "
+				"payload (%d bytes, max %d bytes)." % (
+				payloadLen, AwlSimMessageTransceiver.MAX_RX_PAYLOAD_SIZE))
+		msgLen = hdrLen + payloadLen
+		if len(rxBuf) < msgLen:
+			return None
+		msg = rxBuf[0 : msgLen]
+		del rxBuf[0 : msgLen]
+		return msg
+
+	def flush(self):
+		"""Send as much of the transmit buffer as possible
+		without blocking.
+		"""
+		_SocketErrors = SocketErrors
+		while self.txBuf:
+			try:
+				count = self.sock.send(self.txBuf)
+			except _SocketErrors as e:
+				transferError = TransferError(None, e)
+				if transferError.reason == TransferError.REASON_BLOCKING:
+					return
+				raise transferError
+			del self.txBuf[0 : count]
+
+	def close(self):
+		with suppressAllExc:
+			self.sock.shutdown(socket.SHUT_RDWR)
+		with suppressAllExc:
+			self.sock.close()
+
+class AwlSimMultiServer(object):
+	"""Multi-instance coreserver.
+	This hosts many independent CPU instances in a pool of
+	worker processes (AwlSimServerWorker).
+	The clients connect to one socket. Every message is routed to the
+	CPU instance selected by the instance ID in the message header.
+	"""
+
+	DEFAULT_HOST		= AwlSimServer.DEFAULT_HOST
+	DEFAULT_PORT		= AwlSimServer.DEFAULT_PORT
+
+	# Timeout for the workers to create the instance sockets.
+	STARTUP_TIMEOUT		= 30.0
+
+	@classmethod
+	def getInstanceSockPath(cls, sockDir, instanceId):
+		return os.path.join(sockDir, "instance-%d.socket" % instanceId)
+
+	@classmethod
+	def start(cls, listenHost, listenPort,
+		  listenFamily=None,
+		  nrInstances=1,
+		  nrWorkers=None,
+		  commandMask=AwlSimServer.CMDMSK_DEFAULT,
+		  projectFiles=(),
+		  projectWriteBack=False,
+		  retentiveFile=None):
+		"""Run a multi-instance server in this process.
+		See startup() for a description of the parameters.
+		Returns the exit() return value."""
+
+		server, retval = None, ExitCodes.EXIT_OK
+		try:
+			server = cls()
+			for sig in (signal.SIGTERM, ):
+				signal.signal(sig, server.signalHandler)
+			server.startup(host = listenHost,
+				       port = listenPort,
+				       family = listenFamily,
+				       nrInstances = nrInstances,
+				       nrWorkers = nrWorkers,
+				       commandMask = commandMask,
+				       projectFiles = projectFiles,
+				       projectWriteBack = projectWriteBack,
+				       retentiveFile = retentiveFile)
+			server.run()
+		except AwlSimError as e:
+			print(e.getReport())
+			retval = ExitCodes.EXIT_ERR_SIM
+		except KeyboardInterrupt:
+			print("AwlSimMultiServer: Interrupted.")
+		finally:
+			if server:
+				server.shutdown()
+		return retval
+
+	def __init__(self):
+		self.__exit = False
+		self.__socket = None
+		self.__unixSockPath = None
+		self.__sockDir = None
+		self.__workers = []
+		self.__nrInstances = 0
+		self.__connections = []
+
+	def startup(self, host, port, family=None,
+		    nrInstances=1,
+		    nrWorkers=None,
+		    commandMask=0,
+		    projectFiles=(),
+		    projectWriteBack=False,
+		    retentiveFile=None,
+		    interpreter=None):
+		"""Start the workers and listen on 'host':'port'.
+		family -> Address family. Either None or one of socket.AF_...
+		nrInstances -> The number of CPU instances.
+		               The instance IDs are 0 to nrInstances - 1.
+		nrWorkers -> The number of worker processes.
+		             None: One worker per host CPU, but not more
+		                   workers than instances.
+		             The instances are distributed round-robin
+		             over the workers. If AWLSIM_AFFINITY is set, the
+		             workers are distributed round-robin over the CPUs
+		             in the affinity list.
+		commandMask -> Mask of allowed commands (CMDMSK_...).
+		projectFiles -> An empty list, a list with one project file
+		                that is loaded into all instances
+		                or a list with one project file per instance.
+		projectWriteBack -> Write all data changes back to the
+		                    project files. This requires one
+		                    project file per instance.
+		retentiveFile -> If this is a file path, the retentive memory
+		                 of instance N is kept in the file PATH.N
+		interpreter -> The Python interpreter for the workers.
+		               None: Use sys.executable."""
+
+		if AF_UNIX is None:
+			raise AwlSimError("AwlSimMultiServer: The multi-instance "
+				"server requires Unix domain sockets.")
+		if nrInstances < 1:
+			raise AwlSimError("AwlSimMultiServer: Invalid number "
+				"of instances.")
+		if nrWorkers is None:
+			nrWorkers = len(AwlSimEnv.getAffinity()) or\
+				    AwlSimEnv.getCpuCount()
+		nrWorkers = clamp(nrWorkers, 1, nrInstances)
+		projectFiles = list(projectFiles)
+		if len(projectFiles) not in {0, 1, nrInstances}:
+			raise AwlSimError("AwlSimMultiServer: Either one project "
+				"for all instances or one project per instance "
+				"must be specified.")
+		if projectWriteBack and nrInstances > 1 and\
+		   len(projectFiles) != nrInstances:
+			raise AwlSimError("AwlSimMultiServer: Project write back "
+				"requires one project file per instance.")
+		if len(projectFiles) == 1:
+			projectFiles *= nrInstances
+		if not interpreter:
+			interpreter = sys.executable
+
+		self.close()
+		self.__nrInstances = nrInstances
+		self.__sockDir = tempfile.mkdtemp(prefix="awlsim-multiserver-")
+
+		affinity = AwlSimEnv.getAffinity()
+		for workerIndex in range(nrWorkers):
+			instanceIds = list(range(workerIndex, nrInstances, nrWorkers))
+			env = AwlSimEnv.getEnv()
+			env[AwlSimServer.ENV_MAGIC]		= AwlSimServer.ENV_MAGIC
+			env[AwlSimServerWorker.ENV_WORKER]	= str(workerIndex)
+			env["AWLSIM_CORESERVER_SOCKDIR"]	= self.__sockDir
+			env["AWLSIM_CORESERVER_INSTANCES"]	= ",".join(str(i) for i in instanceIds)
+			env["AWLSIM_CORESERVER_LOGLEVEL"]	= str(Logging.loglevel)
+			env["AWLSIM_CORESERVER_CMDMSK"]		= str(int(commandMask))
+			env["AWLSIM_CORESERVER_PROJECTRW"]	= str(int(bool(projectWriteBack)))
+			for instanceId in instanceIds:
+				if projectFiles:
+					env["AWLSIM_CORESERVER_PROJECT_%d" % instanceId] =\
+						projectFiles[instanceId]
+				if retentiveFile:
+					env["AWLSIM_CORESERVER_RETENTIVE_%d" % instanceId] =\
+						"%s.%d" % (retentiveFile, instanceId)
+			if affinity:
+				# Pin the worker to one host CPU.
+				env["AWLSIM_AFFINITY"] = str(affinity[workerIndex % len(affinity)])
+			printInfo("Starting worker %d with CPU instance%s %s" % (
+				  workerIndex,
+				  "s" if len(instanceIds) > 1 else "",
+				  ", ".join(str(i) for i in instanceIds)))
+			try:
+				self.__workers.append(PopenWrapper(
+					[interpreter, "-m", "awlsim.coreserver.run"],
+					env=env,
+					hideWindow=True))
+			except OSError as e:
+				raise AwlSimError("AwlSimMultiServer: Failed to run "
+					"interpreter '%s': %s" % (interpreter, str(e)))
+
+		# Wait for all instances to come up.
+		timeout = monotonic_time() + self.STARTUP_TIMEOUT
+		for instanceId in range(nrInstances):
+			sockPath = self.getInstanceSockPath(self.__sockDir, instanceId)
+			while not os.path.exists(sockPath):
+				if any(w.poll() is not None for w in self.__workers):
+					raise AwlSimError("AwlSimMultiServer: A worker "
+						"process failed to start.")
+				if monotonic_time() > timeout:
+					raise AwlSimError("AwlSimMultiServer: Timeout "
+						"waiting for CPU instance %d." % instanceId)
+				time.sleep(0.05)
+
+		self.__listen(host, port, family)
+
+	def __listen(self, host, port, family):
+		"""Listen on 'host':'port'."""
+
+		sock, ok = None, False
+		_SocketErrors = SocketErrors
+		try:
+			if host or (family is not None and family == AF_UNIX):
+				family, socktype, sockaddr = netGetAddrInfo(
+						host, port, family)
+			else:
+				if family is None:
+					family = socket.AF_INET
+				socktype = socket.SOCK_STREAM
+				sockaddr = ("", # INADDR_ANY
+					    port)
+			printInfo("Listening on %s..." % str(sockaddr))
+			sock = socket.socket(family, socktype)
+			sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+			sock.setblocking(False)
+			sock.bind(sockaddr)
+			if family == AF_UNIX:
+				# We created the socket file. Remove it on close().
+				self.__unixSockPath = sockaddr
+			sock.listen(5)
+			ok = True
+		except _SocketErrors as e:
+			raise AwlSimError("AwlSimMultiServer: Failed to create server "
+				"socket: " + str(e))
+		finally:
+			if not ok and sock:
+				with suppressAllExc:
+					sock.close()
+		self.__socket = sock
+
+	def __accept(self):
+		_SocketErrors = SocketErrors
+		try:
+			clientSock, addrInfo = self.__socket.accept()
+		except _SocketErrors as e:
+			transferError = TransferError(None, e)
+			if transferError.reason == transferError.REASON_BLOCKING:
+				return
+			raise AwlSimError("AwlSimMultiServer: accept() failed: %s" % str(e))
+		if self.__unixSockPath:
+			peerInfoString = self.__unixSockPath
+		else:
+			peerInfoString = "[%s]:%d" % addrInfo[:2]
+		printInfo("Client '%s' connected" % peerInfoString)
+		clientSock.setblocking(False)
+		self.__connections.append(_ProxyConnection(clientSock, peerInfoString))
+
+	def __connectInstance(self, client, instanceId):
+		"""Open the connection from 'client' to a CPU instance.
+		"""
+		sockPath = self.getInstanceSockPath(self.__sockDir, instanceId)
+		sock = socket.socket(AF_UNIX, socket.SOCK_STREAM)
+		try:
+			sock.connect(sockPath)
+		except SocketErrors as e:
+			sock.close()
+			raise TransferError("Failed to connect to CPU instance "
+					    "%d: %s" % (instanceId, str(e)))
+		sock.setblocking(False)
+		conn = _ProxyConnection(sock, sockPath,
+					instanceId=instanceId,
+					client=client)
+		client.instances[instanceId] = conn
+		self.__connections.append(conn)
+		return conn
+
+	def __rejectMessage(self, client, msgBytes, instanceId):
+		"""Reply to a message for a nonexistent instance.
+		"""
+		_, msgId, _, seq, _, _, _, _, _, _, _ =\
+			AwlSimMessage.hdrStruct.unpack_from(msgBytes, 0)
+		reply = AwlSimMessage_EXCEPTION(AwlSimError(
+			"AwlSimMultiServer: CPU instance %d does not exist." % (
+			instanceId)))
+		reply.replyToId = msgId
+		reply.replyToSeq = seq
+		reply.hdrFlags |= AwlSimMessage.HDR_FLAG_REPLY
+		reply.instanceId = instanceId
+		client.txBuf += reply.toBytes()
+
+	def __routeMessage(self, conn, msgBytes):
+		hdrInstanceStruct = AwlSimMessage.hdrInstanceStruct
+		offset = AwlSimMessage.HDR_INSTANCE_OFFSET
+		if conn.isInstance:
+			# Message from an instance to its client.
+			# Tag it with the instance ID.
+			hdrInstanceStruct.pack_into(msgBytes, offset, conn.instanceId)
+			client = conn.client
+			client.txBuf += msgBytes
+			client.flush()
+		else:
+			# Message from a client to an instance.
+			(instanceId, ) = hdrInstanceStruct.unpack_from(msgBytes, offset)
+			if instanceId >= self.__nrInstances:
+				self.__rejectMessage(conn, msgBytes, instanceId)
+				conn.flush()
+				return
+			instance = conn.instances.get(instanceId)
+			if instance is None:
+				instance = self.__connectInstance(conn, instanceId)
+			# The instances are single instance servers.
+			hdrInstanceStruct.pack_into(msgBytes, offset, 0)
+			instance.txBuf += msgBytes
+			instance.flush()
+
+	def __receive(self, conn):
+		_SocketErrors = SocketErrors
+		try:
+			data = conn.sock.recv(0x10000)
+		except _SocketErrors as e:
+			transferError = TransferError(None, e)
+			if transferError.reason == TransferError.REASON_BLOCKING:
+				return
+			raise transferError
+		if not data:
+			raise TransferError(None, None, TransferError.REASON_REMOTEDIED)
+		conn.rxBuf += data
+		while True:
+			msgBytes = conn.popMessage()
+			if msgBytes is None:
+				break
+			self.__routeMessage(conn, msgBytes)
+
+	def __closeConnection(self, conn):
+		"""Close a client connection and all its instance connections.
+		"""
+		client = conn.client if conn.isInstance else conn
+		for c in [ client ] + list(dictValues(client.instances)):
+			if c in self.__connections:
+				self.__connections.remove(c)
+				c.close()
+		printInfo("Client '%s' disconnected" % client.peerInfoString)
+
+	def run(self):
+		"""Run the message router until all workers exited.
+		"""
+		while not self.__exit:
+			if all(w.poll() is not None for w in self.__workers):
+				printInfo("All CPU instances exited.")
+				break
+			# Apply backpressure to the senders of messages
+			# that cannot be forwarded fast enough.
+			rlist = [ self.__socket ] +\
+				[ c for c in self.__connections if not c.rxBlocked ]
+			wlist = [ c for c in self.__connections if c.txBuf ]
+			try:
+				rlist, wlist, _ = select_mod.select(rlist, wlist, [], 0.5)
+			except Exception:
+				raise AwlSimError("AwlSimMultiServer: Communication "
+					"error. 'select' failed")
+			if self.__socket in rlist:
+				rlist.remove(self.__socket)
+				self.__accept()
+			for conn in wlist + rlist:
+				if conn not in self.__connections:
+					continue # Already closed.
+				try:
+					if conn in wlist:
+						conn.flush()
+					if conn in rlist:
+						self.__receive(conn)
+				except TransferError as e:
+					if e.reason != TransferError.REASON_REMOTEDIED:
+						printError("Connection '%s': %s" % (
+							   conn.peerInfoString, str(e)))
+					self.__closeConnection(conn)
+
+	def close(self):
+		"""Close all connections and the main socket."""
+
+		for conn in self.__connections:
+			conn.close()
+		self.__connections = []
+		if self.__socket:
+			with suppressAllExc:
+				self.__socket.close()
+			self.__socket = None
+		if self.__unixSockPath:
+			with suppressAllExc:
+				os.unlink(self.__unixSockPath)
+			self.__unixSockPath = None
+
+	def shutdown(self):
+		printInfo("Shutting down.")
+		with suppressAllExc:
+			self.close()
+		for worker in self.__workers:
+			with suppressAllExc:
+				if worker.poll() is None:
+					worker.terminate()
+		for worker in self.__workers:
+			with suppressAllExc:
+				worker.wait()
+		self.__workers = []
+		if self.__sockDir:
+			with suppressAllExc:
+				shutil.rmtree(self.__sockDir)
+			self.__sockDir = None
+
+	def signalHandler(self, sig, frame):
+		printInfo("Received signal %d" % sig)
+		if sig in (signal.SIGTERM, signal.SIGINT):
+			self.__exit = True
@@ -26,8 +26,13 @@ if __name__ == "__main__":
 	import awlsim_loader.coverage_helper
 	import awlsim_loader.cython_helper as __cython
 	import sys
+	import os
 
-	__modname = "awlsim.coreserver.server"
+	if os.environ.get("AWLSIM_CORESERVER_WORKER"):
+		# This is a worker process of a multi-instance server.
+		__modname = "awlsim.coreserver.multiserver"
+	else:
+		__modname = "awlsim.coreserver.server"
 	__mod = None
 
 	if __cython.shouldUseCython(__modname):
@@ -40,5 +45,7 @@ if __name__ == "__main__":
 		exec("import %s as __mod" % __modname)
 
 	if __mod:
+		if __modname.endswith(".multiserver"):
+			sys.exit(__mod.AwlSimServerWorker._execute())
 		sys.exit(__mod.AwlSimServer._execute())
 	sys.exit(1)
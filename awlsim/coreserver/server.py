@@ -37,11 +37,15 @@ from awlsim.common.mlock import *
 
 from awlsim.core.main import * #+cimport
 from awlsim.core.symbolparser import *
+from awlsim.core.sampleprof import *
+from awlsim.core.insntrace import * #+cimport
+from awlsim.core.snapshot import *
 
 from awlsim.awlcompiler import *
 
 from awlsim.coreserver.messages import *
 from awlsim.coreserver.memarea import *
+from awlsim.coreserver.metrics import *
 
 from awlsim.fupcompiler import *
 
@@ -128,38 +132,7 @@ class AwlSimServer(object): #+cdef
 
 	@classmethod
 	def getaddrinfo(cls, host, port, family = None):
-		socktype = socket.SOCK_STREAM
-		if osIsPosix and\
-		   family is None and\
-		   host in {"localhost", "127.0.0.1", "::1"} and\
-		   False: #XXX disabled, for now
-			# We are on posix OS. Instead of AF_INET on localhost,
-			# we use Unix domain sockets.
-			family = AF_UNIX
-			sockaddr = "/tmp/awlsim-server-%d.socket" % port
-		else:
-			if family in {None, socket.AF_UNSPEC}:
-				# First try IPv4
-				try:
-					family, socktype, proto, canonname, sockaddr =\
-						socket.getaddrinfo(host, port,
-								   socket.AF_INET,
-								   socktype)[0]
-				except socket.gaierror as e:
-					if excErrno(e) == socket.EAI_ADDRFAMILY:
-						# Also try IPv6
-						family, socktype, proto, canonname, sockaddr =\
-							socket.getaddrinfo(host, port,
-									   socket.AF_INET6,
-									   socktype)[0]
-					else:
-						raise e
-			else:
-				family, socktype, proto, canonname, sockaddr =\
-					socket.getaddrinfo(host, port,
-							   family,
-							   socktype)[0]
-		return (family, socktype, sockaddr)
+		return netGetAddrInfo(host, port, family)
 
 	@classmethod
 	def start(cls, listenHost, listenPort,
@@ -168,8 +141,14 @@ class AwlSimServer(object): #+cdef
 		  forkServerProcess=None,
 		  commandMask=CMDMSK_DEFAULT,
 		  projectFile=None,
-		  projectWriteBack=False):
+		  projectWriteBack=False,
+		  metricsListen=None,
+		  retentiveFile=None):
 		"""Start a new server.
+		If 'metricsListen' is a (host, port) tuple, the OpenMetrics
+		exporter is served on that address.
+		If 'retentiveFile' is not None, the retentive memory
+		is kept in that file.
 		If 'forkInterpreter' or 'forkServerProcess' are not None, spawn a subprocess.
 		If 'forkInterpreter' and 'forkServerProcess' are None, run the server in this process."""
 
@@ -189,6 +168,9 @@ class AwlSimServer(object): #+cdef
 		env["AWLSIM_CORESERVER_CMDMSK"]		= str(int(commandMask))
 		env["AWLSIM_CORESERVER_PROJECT"]	= str(projectFile or "")
 		env["AWLSIM_CORESERVER_PROJECTRW"]	= str(int(bool(projectWriteBack)))
+		env["AWLSIM_CORESERVER_METRICSHOST"]	= str(metricsListen[0] if metricsListen else "")
+		env["AWLSIM_CORESERVER_METRICSPORT"]	= str(int(metricsListen[1]) if metricsListen else "")
+		env["AWLSIM_CORESERVER_RETENTIVE"]	= str(retentiveFile or "")
 
 		if forkServerProcess:
 			# Fork a new server process.
@@ -265,6 +247,7 @@ class AwlSimServer(object): #+cdef
 		self.__gc_get_count = getattr(gc, "get_count", None)
 		self.__emptyList = []
 		self.__startupDone = False
+		self.__nextCycleTime = 0.0
 		self.__state = -1
 		self.__needOB10x = True
 		self.__projectFile = None
@@ -286,6 +269,12 @@ class AwlSimServer(object): #+cdef
 		self.__unixSockPath = None
 		self.__clients = []
 		self.__sock2client = {}
+		# Transfer statistics of the disconnected clients:
+		# [ txMsgCount, txByteCount, rxMsgCount, rxByteCount ]
+		self.__closedClientsStats = [ 0, 0, 0, 0 ]
+
+		self.__metricsExporter = None
+		self.__metricsRequest = False
 
 		self.__sim = AwlSim()
 		self.setCycleExitHook(None)
@@ -351,12 +340,25 @@ class AwlSimServer(object): #+cdef
 		except (TypeError, ValueError) as e:
 			projectWriteBack = True
 
+		metrics = None
+		metricsPort = env.get("AWLSIM_CORESERVER_METRICSPORT")
+		if metricsPort and metricsPort.strip():
+			try:
+				metrics = (env.get("AWLSIM_CORESERVER_METRICSHOST") or "",
+					   int(metricsPort))
+			except ValueError as e:
+				raise AwlSimError("AwlSimServer: Invalid metrics port specified")
+
+		retentiveFile = env.get("AWLSIM_CORESERVER_RETENTIVE") or None
+
 		self.startup(host = host,
 			     port = port,
 			     family = fam,
 			     commandMask = commandMask,
 			     project = projectFile,
-			     projectWriteBack = projectWriteBack)
+			     projectWriteBack = projectWriteBack,
+			     metrics = metrics,
+			     retentive = retentiveFile)
 		self.run()
 
 	def __setupAffinitySets(self):
@@ -544,6 +546,29 @@ class AwlSimServer(object): #+cdef
 	def getRunState(self):
 		return self.__state
 
+	def __cpuStartup(self, allowRtPolicy):
+		"""Start the hardware modules and run the CPU startup (OB 10x).
+		"""
+		printVerbose("CPU startup (OB 10x).")
+
+		# In case the hardware module spawns some threads make sure these
+		# inherit the affinity set and sched policy for peripherals.
+		self.__setAffinity(core=False)
+		self.__setSched(allowRtPolicy=allowRtPolicy,
+				peripheral=True)
+		try:
+			# Start the hardware modules.
+			self.__sim.hardwareStartup()
+		finally:
+			# Go back to core affinity mask and sched policy.
+			self.__setAffinity(core=True)
+			self.__setSched(allowRtPolicy=allowRtPolicy,
+					peripheral=False)
+
+		# Run the CPU statup and the CPU statup OBs.
+		self.__sim.startup()
+		self.__needOB10x = False
+
 	def setRunState(self, runstate):
 		if self.__state == runstate:
 			# Already in that state.
@@ -579,25 +604,7 @@ class AwlSimServer(object): #+cdef
 
 				self.__startupTimeStamp = monotonic_time()
 				if self.__needOB10x:
-					printVerbose("CPU startup (OB 10x).")
-
-					# In case the hardware module spawns some threads make sure these
-					# inherit the affinity set and sched policy for peripherals.
-					self.__setAffinity(core=False)
-					self.__setSched(allowRtPolicy=True,
-							peripheral=True)
-					try:
-						# Start the hardware modules.
-						self.__sim.hardwareStartup()
-					finally:
-						# Go back to core affinity mask and sched policy.
-						self.__setAffinity(core=True)
-						self.__setSched(allowRtPolicy=True,
-								peripheral=False)
-
-					# Run the CPU statup and the CPU statup OBs.
-					self.__sim.startup()
-					self.__needOB10x = False
+					self.__cpuStartup(allowRtPolicy=True)
 				else:
 					# Set core sched policy.
 					self.__setSched(allowRtPolicy=True,
@@ -890,7 +897,15 @@ class AwlSimServer(object): #+cdef
 						self.symTabSourceContainer):
 				sourceManager = sourceContainer.getSourceManagerByIdent(identHash)
 				if sourceManager:
+					# Volatile sources generated from this source
+					# (e.g. AWL compiled from FUP) go away with it.
+					generatedManagers = [ m for m in sourceManager.getRelatedSourceManagers()
+							      if m.source and m.source.volatile_ ]
 					self.__removeSource(sourceContainer, sourceManager)
+					for genManager in generatedManagers:
+						if genManager.source:
+							self.__removeSource(self.awlSourceContainer,
+									    genManager)
 					# Run static sanity checks now to ensure
 					# the CPU is still runnable.
 					self.__sim.staticSanityChecks()
@@ -913,12 +928,27 @@ class AwlSimServer(object): #+cdef
 
 			parser = AwlParser()
 			parser.parseSource(awlSource)
-			self.__sim.load(parser.getParseTree(), needRebuild, srcManager)
+			self.__sim.load(parser.getParseTree(), False, srcManager)
+			if needRebuild:
+				self.__build()
 
 		self.awlSourceContainer.addManager(srcManager)
 		self.__updateProjectFile()
 		return srcManager
 
+	def __build(self):
+		"""Build the loaded sources.
+		In RUN state the new blocks are swapped into the running
+		program, if that is possible without a full rebuild.
+		"""
+		if self.__state == self.STATE_RUN:
+			if self.__sim.hotBuild():
+				printVerbose("Blocks were loaded in RUN.")
+				return
+			printInfo("Cannot load the blocks in RUN. "
+				  "Rebuilding the program.")
+		self.__sim.build()
+
 	def loadFupSource(self, fupSource):
 		srcManager = SourceManager(fupSource)
 
@@ -1002,6 +1032,12 @@ class AwlSimServer(object): #+cdef
 		printDebug("Received message: PING")
 		reply = AwlSimMessage_PONG()
 		reply.setReplyTo(msg)
+		if (msg.hdrFlags & AwlSimMessage.HDR_FLAG_CAP_ZLIB) and\
+		   client.transceiver.haveCompression:
+			# The client can receive compressed payloads
+			# and we can compress. Tell the client we can, too.
+			reply.hdrFlags |= AwlSimMessage.HDR_FLAG_CAP_ZLIB
+			client.transceiver.enableCompression()
 		client.transceiver.send(reply)
 
 	def __rx_PONG(self, client, msg):
@@ -1139,7 +1175,7 @@ class AwlSimServer(object): #+cdef
 	def __rx_BUILD(self, client, msg):
 		printDebug("Received message: BUILD")
 		status = AwlSimMessage_REPLY.STAT_OK
-		self.__sim.build()
+		self.__build()
 		client.transceiver.send(AwlSimMessage_REPLY.make(msg, status))
 
 	def __rx_REMOVESRC(self, client, msg):
@@ -1301,25 +1337,152 @@ class AwlSimServer(object): #+cdef
 		if msg.flags & msg.FLG_SYNC:
 			client.transceiver.send(AwlSimMessage_REPLY.make(msg, status))
 
+	def __rx_STEP(self, client, msg):
+		printDebug("Received message: STEP")
+		if self.__state == self.STATE_RUN or\
+		   msg.nrCycles > msg.MAX_CYCLES:
+			# The CPU is free running. Lockstep is not possible.
+			# Or the step would block the server for too long.
+			client.transceiver.send(AwlSimMessage_REPLY.make(
+				msg, AwlSimMessage_REPLY.STAT_FAIL))
+			return
+
+		if self.__projectToBeLoaded:
+			self.__doLoadProject()
+		if self.__needOB10x:
+			self.__startupTimeStamp = monotonic_time()
+			self.__cpuStartup(allowRtPolicy=False)
+
+		sim = self.__sim
+		cpu = sim.cpu
+		status = AwlSimMessage_REPLY.STAT_OK
+		for memArea in msg.writeAreas:
+			try:
+				memArea.writeToCpu(cpu)
+			except AwlSimError as e:
+				if not (memArea.flags & (MemoryArea.FLG_ERR_READ |\
+							 MemoryArea.FLG_ERR_WRITE)):
+					raise
+				status = AwlSimMessage_REPLY.STAT_FAIL
+		if status != AwlSimMessage_REPLY.STAT_OK:
+			# Do not run the cycles with incomplete inputs.
+			client.transceiver.send(AwlSimMessage_REPLY.make(msg, status))
+			return
+		sim.step(msg.nrCycles, msg.timeStep)
+		for memArea in msg.readAreas:
+			memArea.flags = 0
+			try:
+				memArea.readFromCpu(cpu)
+			except AwlSimError as e:
+				# The client is supposed to check the error bits.
+				if not (memArea.flags & (MemoryArea.FLG_ERR_READ |\
+							 MemoryArea.FLG_ERR_WRITE)):
+					raise
+
+		reply = AwlSimMessage_MEMORY(0, msg.readAreas)
+		reply.setReplyTo(msg)
+		client.transceiver.send(reply)
+
+	def __rx_GET_SNAPSHOT(self, client, msg):
+		printDebug("Received message: GET_SNAPSHOT")
+		snapshot = self.__sim.captureState()
+		reply = AwlSimMessage_SNAPSHOT(snapshot.toBytes())
+		reply.setReplyTo(msg)
+		client.transceiver.send(reply)
+
+	def __rx_SNAPSHOT(self, client, msg):
+		printDebug("Received message: SNAPSHOT")
+		if self.__projectToBeLoaded:
+			self.__doLoadProject()
+		if self.__needOB10x:
+			# Run the startup OBs first.
+			# They would overwrite the restored state otherwise.
+			self.__startupTimeStamp = monotonic_time()
+			self.__cpuStartup(allowRtPolicy=(self.__state == self.STATE_RUN))
+		status = AwlSimMessage_REPLY.STAT_OK
+		try:
+			snapshot = CPUStateSnapshot.fromBytes(msg.snapshotBytes)
+			self.__sim.restoreState(snapshot)
+		except AwlSimError as e:
+			printError(e.getReport())
+			status = AwlSimMessage_REPLY.STAT_FAIL
+		client.transceiver.send(AwlSimMessage_REPLY.make(msg, status))
+
+	def __setupInsnTrace(self, enable, depth):
+		"""Enable or disable the instruction trace recorder
+		through the CPU configuration.
+		depth=0 keeps the current depth or uses the default.
+		"""
+		cpu = self.__sim.cpu
+		conf = cpu.getConf()
+		insnTrace = cpu.getInsnTrace()
+		if enable:
+			if depth or not conf.insnTraceDepth:
+				conf.setInsnTraceDepth(depth or InsnTrace.DEFAULT_DEPTH)
+			insnTrace = cpu.getInsnTrace()
+		else:
+			conf.setInsnTraceDepth(0)
+		return insnTrace
+
 	def __rx_MEAS_CONFIG(self, client, msg):
 		printDebug("Received message: MEAS_CONFIG")
 		replyFlags = 0
 		replyStr = ""
-		insnMeas = None
-		if msg.flags & msg.FLG_ENABLE:
-			printDebug("Enabling instruction time measurements")
-			insnMeas = self.__sim.cpu.setupInsnMeas(True)
-			if not insnMeas:
-				replyFlags |= AwlSimMessage_MEAS.FLG_FAIL
+		meas = None
+		if msg.measType == msg.MEASTYPE_INSN:
+			setupMeas = self.__sim.cpu.setupInsnMeas
+			measName = "instruction"
+		elif msg.measType == msg.MEASTYPE_BLOCK:
+			setupMeas = self.__sim.cpu.setupBlockProf
+			measName = "block"
+		elif msg.measType == msg.MEASTYPE_SAMPLE:
+			sampleRate = msg.sampleRate or SampleProf.DEFAULT_RATE
+			setupMeas = lambda enable: self.__sim.cpu.setupSampleProf(
+				enable, sampleRate)
+			measName = "sampling"
+		elif msg.measType == msg.MEASTYPE_TRACE:
+			setupMeas = lambda enable: self.__setupInsnTrace(
+				enable, msg.traceDepth)
+			measName = "trace"
+			if (msg.flags & msg.FLG_GETMEAS) and\
+			   (msg.flags & msg.FLG_KEEP) and\
+			   not (msg.flags & msg.FLG_ENABLE):
+				# Only read the trace. Keep the recorder running.
+				setupMeas = None
+				meas = self.__sim.cpu.getInsnTrace()
 		else:
-			printDebug("Disabling instruction time measurements")
-			insnMeas = self.__sim.cpu.setupInsnMeas(False)
+			setupMeas = None
+			replyFlags |= AwlSimMessage_MEAS.FLG_FAIL
+		if setupMeas:
+			if msg.flags & msg.FLG_ENABLE:
+				printDebug("Enabling %s time measurements" % measName)
+				try:
+					meas = setupMeas(True)
+				except AwlSimError as e:
+					printError(e.getReport())
+					meas = None
+				if not meas:
+					replyFlags |= AwlSimMessage_MEAS.FLG_FAIL
+			else:
+				printDebug("Disabling %s time measurements" % measName)
+				meas = setupMeas(False)
 		if msg.flags & msg.FLG_GETMEAS:
-			if insnMeas:
-				if msg.flags & msg.FLG_CSV:
-					replyStr = insnMeas.dumpCSV()
+			if meas:
+				if msg.measType == msg.MEASTYPE_TRACE:
+					if msg.flags & msg.FLG_CSV:
+						replyStr = meas.dumpCSV(self.__sim.cpu)
+					else:
+						replyStr = meas.dump(self.__sim.cpu)
+				elif (msg.flags & msg.FLG_FOLDED) and\
+				     msg.measType != msg.MEASTYPE_BLOCK:
+					replyStr = meas.dumpFolded()
+				elif (msg.flags & msg.FLG_LINES) and\
+				     msg.measType != msg.MEASTYPE_BLOCK:
+					replyStr = meas.dumpLinesCSV()
+				elif msg.flags & msg.FLG_CSV:
+					replyStr = meas.dumpCSV()
 				else:
-					replyStr = insnMeas.dump()
+					replyStr = meas.dump()
 				if replyStr:
 					replyFlags |= AwlSimMessage_MEAS.FLG_HAVEDATA
 		reply = AwlSimMessage_MEAS(flags=replyFlags,
@@ -1342,6 +1505,10 @@ class AwlSimServer(object): #+cdef
 			fupSrcs = self.fupSourceContainer.getSources()
 		if msg.getFlags & msg.GET_KOPSRCS:
 			pass#TODO
+		if msg.getFlags & msg.GET_NOVOLATILE:
+			awlSrcs = [ s for s in awlSrcs if not s.volatile_ ]
+			symSrcs = [ s for s in symSrcs if not s.volatile_ ]
+			fupSrcs = [ s for s in fupSrcs if not s.volatile_ ]
 		reply = AwlSimMessage_IDENTS(awlSrcs, symSrcs,
 					     hwMods, libSels,
 					     fupSrcs, kopSrcs)
@@ -1354,6 +1521,15 @@ class AwlSimServer(object): #+cdef
 		now = monotonic_time()
 		uptime = now - self.__initTimeStamp
 		runtime = (now - self.__startupTimeStamp) if self.__running else 0.0
+		histograms = {}
+		for histId, hist in (
+				(AwlSimMessage_CPUSTATS.HIST_CYCLETIME, cpu.cycleTimeHist),
+				(AwlSimMessage_CPUSTATS.HIST_PADDING, cpu.padTimeHist),
+				(AwlSimMessage_CPUSTATS.HIST_LATENESS, cpu.latenessHist)):
+			if hist.count:
+				summary = hist.summary()
+				histograms[histId] = (summary[0],) + tuple(
+					float(us) / 1000000.0 for us in summary[1:])
 		reply = AwlSimMessage_CPUSTATS(
 			running=self.__running,
 			uptime=uptime,
@@ -1364,10 +1540,176 @@ class AwlSimServer(object): #+cdef
 			minCycleTime=cpu.minCycleTime,
 			maxCycleTime=cpu.maxCycleTime,
 			padCycleTime=cpu.padCycleTime,
+			missedDeadlines=cpu.missedDeadlines,
+			lastLateness=cpu.lastLateness,
+			maxLateness=cpu.maxLateness,
+			histograms=histograms,
 		)
+		if msg.flags & msg.FLG_RESET:
+			cpu.resetCycleStats()
 		reply.setReplyTo(msg)
 		client.transceiver.send(reply)
 
+	# Upper bucket limits of the exported time histograms, in seconds.
+	METRICS_TIME_BUCKETS = (0.0001, 0.00025, 0.0005,
+				0.001, 0.0025, 0.005,
+				0.01, 0.025, 0.05,
+				0.1, 0.25, 0.5,
+				1.0, 2.5, 5.0)
+
+	def __requestMetrics(self):
+		"""Request a metrics snapshot.
+		This is called from the metrics exporter thread.
+		The main loop collects the snapshot.
+		"""
+		self.__metricsRequest = True
+
+	@classmethod
+	def __addTimeHistogram(cls, family, hist, **labels):
+		"""Add a Histogram() with microsecond values
+		to a histogram MetricFamily.
+		"""
+		family.addHistogram(cls.METRICS_TIME_BUCKETS,
+				    hist.cumulativeCounts([ int(limit * 1000000.0)
+							   for limit in cls.METRICS_TIME_BUCKETS ]),
+				    hist.count,
+				    hist.sum / 1000000.0,
+				    **labels)
+
+	def __collectMetrics(self):
+		"""Collect a metrics snapshot and pass it to the exporter.
+		"""
+		self.__metricsRequest = False
+		exporter = self.__metricsExporter
+		if not exporter:
+			return
+		cpu = self.__sim.cpu
+		now = monotonic_time()
+		haveCycles = cpu.cycleTimeHist.count > 0
+		G, C, H = MetricFamily.TYPE_GAUGE, MetricFamily.TYPE_COUNTER, MetricFamily.TYPE_HISTOGRAM
+
+		families = [
+			MetricFamily("awlsim_build", MetricFamily.TYPE_INFO,
+				     "Awlsim version information").add(1,
+				     version=VERSION_STRING,
+				     core="cython" if isCython else "python",
+				     python="%d.%d.%d" % sys.version_info[:3]),
+			MetricFamily("awlsim_server_uptime_seconds", G,
+				     "Time since the server was started").add(
+				     now - self.__initTimeStamp),
+			MetricFamily("awlsim_cpu_running", G,
+				     "CPU is in RUN state").add(
+				     bool(self.__running)),
+			MetricFamily("awlsim_cpu_runtime_seconds", G,
+				     "Time since the CPU went to RUN").add(
+				     (now - self.__startupTimeStamp) if self.__running else 0.0),
+			MetricFamily("awlsim_cpu_cycles", C,
+				     "Number of OB 1 cycles").add(
+				     cpu.cycleTimeHist.count),
+			MetricFamily("awlsim_cpu_instructions_per_second", G,
+				     "Executed instructions per second").add(
+				     cpu.insnPerSecond),
+			MetricFamily("awlsim_cpu_instructions_per_cycle", G,
+				     "Average executed instructions per OB 1 cycle").add(
+				     cpu.avgInsnPerCycle),
+			MetricFamily("awlsim_cpu_cycle_time_avg_seconds", G,
+				     "Average OB 1 cycle time").add(
+				     cpu.avgCycleTime),
+			MetricFamily("awlsim_cpu_cycle_time_min_seconds", G,
+				     "Minimum OB 1 cycle time").add(
+				     cpu.minCycleTime if haveCycles else 0.0),
+			MetricFamily("awlsim_cpu_cycle_time_max_seconds", G,
+				     "Maximum OB 1 cycle time").add(
+				     cpu.maxCycleTime),
+			MetricFamily("awlsim_cpu_cycle_padding_seconds", G,
+				     "Current OB 1 cycle padding time").add(
+				     cpu.padCycleTime),
+			MetricFamily("awlsim_cpu_missed_deadlines", C,
+				     "Number of missed cycle deadlines").add(
+				     cpu.missedDeadlines),
+			MetricFamily("awlsim_cpu_lateness_max_seconds", G,
+				     "Maximum cycle deadline lateness").add(
+				     cpu.maxLateness),
+		]
+		for name, helpText, hist in (
+				("awlsim_cpu_cycle_duration_seconds",
+				 "OB 1 cycle time", cpu.cycleTimeHist),
+				("awlsim_cpu_padding_duration_seconds",
+				 "OB 1 cycle padding time", cpu.padTimeHist),
+				("awlsim_cpu_lateness_duration_seconds",
+				 "Cycle deadline lateness", cpu.latenessHist)):
+			family = MetricFamily(name, H, helpText)
+			self.__addTimeHistogram(family, hist)
+			families.append(family)
+		family = MetricFamily("awlsim_cpu_allocated_objects", G,
+				      "Allocated timers, counters and flag memory pages")
+		for area, (allocated, total) in sorted(dictItems(cpu.getAllocStats())):
+			family.add(allocated, area=area)
+		families.append(family)
+
+		# Core server communication statistics
+		clients = [ c for c in self.__clients if c.transceiver ]
+		stats = self.__closedClientsStats
+		families.extend((
+			MetricFamily("awlsim_server_clients", G,
+				     "Number of connected clients").add(
+				     len(clients)),
+			MetricFamily("awlsim_server_tx_messages", C,
+				     "Number of transmitted messages").add(
+				     stats[0] + sum(c.transceiver.txMsgCount for c in clients)),
+			MetricFamily("awlsim_server_tx_bytes", C,
+				     "Number of transmitted bytes").add(
+				     stats[1] + sum(c.transceiver.txByteCount for c in clients)),
+			MetricFamily("awlsim_server_rx_messages", C,
+				     "Number of received messages").add(
+				     stats[2] + sum(c.transceiver.rxMsgCount for c in clients)),
+			MetricFamily("awlsim_server_rx_bytes", C,
+				     "Number of received bytes").add(
+				     stats[3] + sum(c.transceiver.rxByteCount for c in clients)),
+			MetricFamily("awlsim_server_rx_pending_bytes", G,
+				     "Bytes of partially received messages").add(
+				     sum(c.transceiver.rxByteCnt for c in clients)),
+			MetricFamily("awlsim_server_insnstate_queued_messages", G,
+				     "Queued instruction state messages").add(
+				     sum(len(d.msgs)
+					 for c in clients
+					 for d in dictValues(c.insnStateDump))),
+			MetricFamily("awlsim_server_memory_read_requests", G,
+				     "Number of clients with cyclic memory read requests").add(
+				     sum(1 for c in clients if c.memReadRequestMsg)),
+		))
+
+		# Python garbage collector statistics
+		if self.__gc_get_count:
+			family = MetricFamily("awlsim_python_gc_objects", G,
+					      "Garbage collector object count per generation")
+			for generation, count in enumerate(self.__gc_get_count()):
+				family.add(count, generation=generation)
+			families.append(family)
+		gc_get_stats = getattr(gc, "get_stats", None)
+		if gc_get_stats:
+			family = MetricFamily("awlsim_python_gc_collections", C,
+					      "Garbage collector runs per generation")
+			for generation, genStats in enumerate(gc_get_stats()):
+				family.add(genStats.get("collections", 0),
+					   generation=generation)
+			families.append(family)
+
+		# Hardware module timing statistics
+		readFamily = MetricFamily("awlsim_hardware_read_duration_seconds", H,
+					  "Hardware module input read time")
+		writeFamily = MetricFamily("awlsim_hardware_write_duration_seconds", H,
+					   "Hardware module output write time")
+		for i, hw in enumerate(self.__sim.getHardware()):
+			self.__addTimeHistogram(readFamily, hw.readTimeHist,
+						module=hw.name, index=i)
+			self.__addTimeHistogram(writeFamily, hw.writeTimeHist,
+						module=hw.name, index=i)
+		if readFamily.samples:
+			families.extend((readFamily, writeFamily))
+
+		exporter.setSnapshot(families)
+
 	# Message receive control flags.
 	RXFLG_NONE	= 0		# No flags
 	RXFLG_EXFATAL	= 1 << 0	# AwlSimError exceptions are fatal
@@ -1403,6 +1745,9 @@ class AwlSimServer(object): #+cdef
 		AwlSimMessage.MSG_ID_MEMORY		: (__rx_MEMORY,		RXFLG_NONE),
 		AwlSimMessage.MSG_ID_INSNSTATE_CONFIG	: (__rx_INSNSTATE_CONFIG, RXFLG_NONE),
 		AwlSimMessage.MSG_ID_MEAS_CONFIG	: (__rx_MEAS_CONFIG,	RXFLG_NONE),
+		AwlSimMessage.MSG_ID_STEP		: (__rx_STEP,		RXFLG_EXFATAL),
+		AwlSimMessage.MSG_ID_GET_SNAPSHOT	: (__rx_GET_SNAPSHOT,	RXFLG_NONE),
+		AwlSimMessage.MSG_ID_SNAPSHOT		: (__rx_SNAPSHOT,	RXFLG_NONE),
 		AwlSimMessage.MSG_ID_GET_IDENTS		: (__rx_GET_IDENTS,	RXFLG_NONE),
 #		AwlSimMessage.MSG_ID_GET_CPUDUMP	: (__rx_GET_CPUDUMP,	RXFLG_NONE),
 		AwlSimMessage.MSG_ID_GET_CPUSTATS	: (__rx_GET_CPUSTATS,	RXFLG_NONE),
@@ -1425,6 +1770,9 @@ class AwlSimServer(object): #+cdef
 			msg = client.transceiver.receive(0.0)
 			if not msg:
 				return
+			if msg.instanceId: #+unlikely
+				self.__rejectInstance(client, msg)
+				return
 			if msg.msgId not in self.__msgRxHandlers:
 				printInfo("Received unsupported "
 					  "message 0x%02X" % msg.msgId)
@@ -1440,6 +1788,16 @@ class AwlSimServer(object): #+cdef
 			self.__clientCommTransferError(e, client)
 			return
 
+	def __rejectInstance(self, client, msg):
+		printError("Received message for CPU instance %d, "
+			   "but this is not a multi-instance server." % (
+			   msg.instanceId))
+		reply = AwlSimMessage_EXCEPTION(AwlSimError(
+			"AwlSimServer: CPU instance %d does not exist. "
+			"This is not a multi-instance server." % msg.instanceId))
+		reply.setReplyTo(msg)
+		client.transceiver.send(reply)
+
 	def __handleSocketComm(self, sockList): #@nocy
 #@cy	cdef __handleSocketComm(self, list sockList):
 		if self.__socket in sockList:
@@ -1508,14 +1866,14 @@ class AwlSimServer(object): #+cdef
 #			timeout.tv_sec = 0				#@cy-posix
 #			timeout.tv_usec = 10000				#@cy-posix
 
-	def __handleCommunicationBlocking(self):
+	def __handleCommunicationBlocking(self, timeout=0.2):
 		handleComm = False
 		try:
 			# Use blocking select(), but with a timeout.
 			# This gives us the chance to exit the main loop,
 			# if we got shutdown due to a signal.
 			handleComm = any(select_mod.select(
-				self.__selectRlist, [], [], 0.2))
+				self.__selectRlist, [], [], timeout))
 		except Exception:
 			self.__selectException()
 		if handleComm:
@@ -1526,6 +1884,12 @@ class AwlSimServer(object): #+cdef
 		self.__haveAnyMemReadReq = bool(any(bool(c.memReadRequestMsg)
 						    for c in self.__clients))
 
+	def getReadSockets(self):
+		"""Get the list of sockets the server waits on for
+		incoming connections and messages.
+		"""
+		return list(self.__selectRlist)
+
 	def __handleMemReadReqs(self, constrained=True):
 		broken = False
 		for client in self.__clients:
@@ -1666,9 +2030,14 @@ class AwlSimServer(object): #+cdef
 		    raiseExceptionsFromRun=False,
 		    handleMaintenanceServerside=False,
 		    project=None,
-		    projectWriteBack=False):
+		    projectWriteBack=False,
+		    metrics=None,
+		    retentive=None):
 		"""Start the server on 'host':'port'.
 		family -> Address family. Either None or one of socket.AF_...
+		          If this is AF_UNIX, the server listens on a
+		          Unix domain socket. 'host' may be the socket path then.
+		          Otherwise a per-'port' default path is used.
 		commanMask -> Mask of allowed commands (CMDMSK_...).
 		raiseExceptionsFromRun -> Flag whether to raise AwlSimError()
 					  from the run() method and let the caller handle them.
@@ -1678,6 +2047,10 @@ class AwlSimServer(object): #+cdef
 		           from the specified project as an initial program.
 		projectWriteBack -> If True, all data changes (e.g. source download)
 		                    be written to the projectFile (if available).
+		metrics -> If this is a (host, port) tuple, the OpenMetrics
+		           exporter HTTP endpoint is served on that address.
+		retentive -> If this is a file path, the retentive memory
+		             is kept in that file.
 		This must be called once before run()."""
 
 		assert(not self.__startupDone)
@@ -1685,11 +2058,18 @@ class AwlSimServer(object): #+cdef
 		self.__raiseExceptionsFromRun = raiseExceptionsFromRun
 		self.__handleMaintenanceServerside = handleMaintenanceServerside
 
+		if retentive:
+			self.__sim.cpu.setRetentiveFile(retentive)
 		self.__loadProject(project, projectWriteBack)
 
 		self.__listen(host, port, family)
 		self.__rebuildSelectReadList()
 
+		if metrics:
+			self.__metricsExporter = MetricsExporter(*metrics)
+			self.__metricsExporter.start(self.__requestMetrics)
+			self.__sim.enableHwTiming(True)
+
 		self.__nextStats = self.__sim.cpu.now
 		self.__updateCpuCallbacks()
 
@@ -1723,6 +2103,8 @@ class AwlSimServer(object): #+cdef
 						if handleComm:
 							self.__sendCpuDump(constrained=False)
 							self.__handleMemReadReqs(constrained=False)
+						if self.__metricsRequest:
+							self.__collectMetrics()
 						handleComm = self.__handleCommunicationBlocking()
 					continue
 
@@ -1731,62 +2113,125 @@ class AwlSimServer(object): #+cdef
 						sim.runCycle()
 						if self.__haveAnyMemReadReq:
 							self.__handleMemReadReqs()
+						if self.__metricsRequest: #+unlikely
+							self.__collectMetrics()
 						self.__handleCommunication()		#@cy-win
 #						self.__handleCommunicationPosix()	#@cy-posix
 						self.__yieldHostCPU()
 					continue
 
 			except (AwlSimError, AwlParserError) as e:
-				printVerbose("Main loop exception: %s" % (
-					     e.getMessage()))
-
-				if not e.getReportOnlyFlag():
-					# Stop the CPU
-					self.setRunState(self.STATE_STOP)
-					# Schedule a CPU restart/rebuild.
-					self.__needOB10x = True
-
-				# Try to add more information to the exception.
-				self.__extendAwlSimError(e)
-
-				# Send the exception to all clients.
-				msg = AwlSimMessage_EXCEPTION(e)
-				for client in self.__clients:
-					try:
-						client.transceiver.send(msg)
-					except TransferError as e:
-						printError("Failed to forward "
-							   "exception to client.")
-						client.broken = True
-				self.__removeBrokenClients()
-
-				if self.__raiseExceptionsFromRun:
-					if e.getReportOnlyFlag():
-						printError(e.getReport())
-					else:
-						# Let the caller handle the exception
-						raise e
+				self.__handleMainLoopException(e)
 			except MaintenanceRequest as e:
-				printVerbose("Main loop maintenance request: %d" % (
-					     e.requestType))
-				# Put the CPU into maintenance mode.
-				# This will halt the CPU until a client
-				# or the server sets it into RUN or STOP again.
-				self.setRunState(self.STATE_MAINTENANCE)
-				if self.__handleMaintenanceServerside:
-					# Let the server handle the request.
-					raise e
-				else:
-					# Send the maintenance message.
-					with contextlib.suppress(TransferError):
-						if self.__clients:
-							# Forward it to the first client
-							msg = AwlSimMessage_MAINTREQ(e)
-							self.__clients[0].transceiver.send(msg)
+				self.__handleMainLoopMaintenance(e)
 			except TransferError as e:
 				# This should be caught earlier.
 				printError("Uncaught transfer error: " + str(e))
 
+	def runSlice(self, maxCycles=1):
+		"""Run one time slice of the main event loop.
+		This runs up to 'maxCycles' CPU cycles and handles
+		the pending communication, but it never blocks.
+		The cycle time padding is not slept. A cycle only runs,
+		if it is due. See getNextCycleTime().
+		This is used to host multiple servers in one process.
+		Returns True, if the CPU is in RUN state."""
+#@cy		cdef AwlSim sim
+#@cy		cdef uint32_t i
+
+		assert(self.__startupDone)
+		self.__nextCycleTime = 0.0
+		try:
+			if self.__projectToBeLoaded:
+				self.__doLoadProject()
+
+			if self.__state == self.STATE_RUN:
+				sim = self.__sim
+				for i in range(maxCycles):
+					if not self.__running:
+						break
+					self.__nextCycleTime = sim.pollCycle()
+					if self.__haveAnyMemReadReq:
+						self.__handleMemReadReqs()
+					if self.__metricsRequest: #+unlikely
+						self.__collectMetrics()
+					self.__handleCommunication()
+					if self.__nextCycleTime > 0.0:
+						# The cycle padding is not over, yet.
+						break
+					self.__yieldHostCPU()
+			elif self.__state in {self.STATE_STOP,
+					      self.STATE_MAINTENANCE}:
+				if self.__handleCommunicationBlocking(0.0):
+					self.__sendCpuDump(constrained=False)
+					self.__handleMemReadReqs(constrained=False)
+				if self.__metricsRequest:
+					self.__collectMetrics()
+		except (AwlSimError, AwlParserError) as e:
+			self.__handleMainLoopException(e)
+		except MaintenanceRequest as e:
+			self.__handleMainLoopMaintenance(e)
+		except TransferError as e:
+			# This should be caught earlier.
+			printError("Uncaught transfer error: " + str(e))
+		return self.__running
+
+	def getNextCycleTime(self):
+		"""Get the monotonic time at which runSlice()
+		has to be called again to run the next cycle.
+		Returns 0.0, if the next cycle is due immediately.
+		"""
+		return self.__nextCycleTime
+
+	def __handleMainLoopException(self, e):
+		printVerbose("Main loop exception: %s" % (
+			     e.getMessage()))
+
+		if not e.getReportOnlyFlag():
+			# Stop the CPU
+			self.setRunState(self.STATE_STOP)
+			# Schedule a CPU restart/rebuild.
+			self.__needOB10x = True
+
+		# Try to add more information to the exception.
+		self.__extendAwlSimError(e)
+
+		# Send the exception to all clients.
+		msg = AwlSimMessage_EXCEPTION(e)
+		for client in self.__clients:
+			try:
+				client.transceiver.send(msg)
+			except TransferError as e:
+				printError("Failed to forward "
+					   "exception to client.")
+				client.broken = True
+		self.__removeBrokenClients()
+
+		if self.__raiseExceptionsFromRun:
+			if e.getReportOnlyFlag():
+				printError(e.getReport())
+			else:
+				# Let the caller handle the exception
+				raise e
+
+	def __handleMainLoopMaintenance(self, e):
+		printVerbose("Main loop maintenance request: %d" % (
+			     e.requestType))
+		# Put the CPU into maintenance mode.
+		# This will halt the CPU until a client
+		# or the server sets it into RUN or STOP again.
+		self.setRunState(self.STATE_MAINTENANCE)
+		if self.__handleMaintenanceServerside:
+			# Let the server handle the request.
+			raise e
+		else:
+			# Send the maintenance message.
+			with contextlib.suppress(TransferError):
+				if self.__clients:
+					# Forward it to the first client
+					msg = AwlSimMessage_MAINTREQ(e)
+					self.__clients[0].transceiver.send(msg)
+
 	def __listen(self, host, port, family):
 		"""Listen on 'host':'port'."""
 
@@ -1800,20 +2245,16 @@ class AwlSimServer(object): #+cdef
 		sock, ok = None, False
 		_SocketErrors = SocketErrors
 		try:
-			if host:
+			if host or (family is not None and family == AF_UNIX):
 				family, socktype, sockaddr = netGetAddrInfo(
 						host, port, family)
 				if family == AF_UNIX:
-					self.__unixSockPath = sockaddr
 					readableSockaddr = sockaddr
 				else:
 					readableSockaddr = "[%s]:%d" % (sockaddr[0], sockaddr[1])
 			else:
 				if family is None:
 					family = socket.AF_INET
-				if family == AF_UNIX:
-					raise AwlSimError("AwlSimServer: "
-						"AF_UNIX can't be used with 'ANY' host.")
 				assert(family in {socket.AF_INET, socket.AF_INET6})
 				socktype = socket.SOCK_STREAM
 				sockaddr = ("", # INADDR_ANY
@@ -1826,6 +2267,9 @@ class AwlSimServer(object): #+cdef
 			sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 			sock.setblocking(False)
 			sock.bind(sockaddr)
+			if family == AF_UNIX:
+				# We created the socket file. Remove it on close().
+				self.__unixSockPath = sockaddr
 			sock.listen(5)
 			ok = True
 		except _SocketErrors as e:
@@ -1875,6 +2319,14 @@ class AwlSimServer(object): #+cdef
 		self.__rebuildSelectReadList()
 
 	def __clientRemove(self, client):
+		transceiver = client.transceiver
+		if transceiver:
+			stats = self.__closedClientsStats
+			stats[0] += transceiver.txMsgCount
+			stats[1] += transceiver.txByteCount
+			stats[2] += transceiver.rxMsgCount
+			stats[3] += transceiver.rxByteCount
+			transceiver.shutdown()
 		self.__clients.remove(client)
 		self.__sock2client.pop(client.fileno)
 		self.__rebuildSelectReadList()
@@ -1891,6 +2343,10 @@ class AwlSimServer(object): #+cdef
 
 		self.__startupDone = False
 
+		if self.__metricsExporter:
+			self.__metricsExporter.stop()
+			self.__metricsExporter = None
+
 		for client in self.__clients:
 			client.transceiver.shutdown()
 			client.transceiver = None
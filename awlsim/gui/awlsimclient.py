@@ -25,6 +25,8 @@ from awlsim.gui.runstate import *
 from awlsim.gui.linkconfig import *
 from awlsim.gui.validatorsched import *
 
+from awlsim.common.net import *
+
 from awlsim.coreclient.client import *
 from awlsim.coreclient.sshtunnel import *
 
@@ -344,11 +346,13 @@ class GuiAwlSimClient_LowLevel(AwlSimClient, QObject):
 			if not self.serverProcess:
 				self.spawnServer(interpreter = interpreterList,
 						 listenHost = host,
-						 listenPort = portRange)
+						 listenPort = portRange,
+						 listenFamily = AF_UNIX)
 			self.shutdownTransceiver()
 			self.connectToServer(host=host,
 					     port=self.serverProcessPort,
-					     timeout=10.0)
+					     timeout=10.0,
+					     family=self.serverProcessFamily)
 		except AwlSimError as e:
 			with suppressAllExc:
 				self.shutdown()
@@ -645,7 +649,9 @@ class GuiAwlSimClient(GuiAwlSimClient_LowLevel):
 			return True
 
 	# Reset/clear the CPU and upload all sources.
-	def action_download(self):
+	# If incremental is True, the CPU is not reset
+	# and only new or changed sources are uploaded.
+	def action_download(self, incremental=False):
 		if self.__actionDownloadBlocked:
 			return True
 		with self.__actionDownloadBlocked:
@@ -666,10 +672,11 @@ class GuiAwlSimClient(GuiAwlSimClient_LowLevel):
 					return False
 
 				self.setRunState(False)
-				self.reset()
-
-				self.loadProject(project)
-				self.build()
+				if incremental:
+					self.loadProjectIncremental(project)
+				else:
+					self.reset()
+					self.loadProject(project, build=True)
 
 				self.guiRunState.setState(GuiRunState.STATE_ONLINE)
 			except AwlParserError as e:
@@ -221,6 +221,63 @@ class CpuConfigWidget(QWidget):
 		self.cycleTimeTargetSpinBox.setDecimals(1)
 		group.layout().addWidget(self.cycleTimeTargetSpinBox, 3, 1)
 
+		label = QLabel("Cycle (OB 1) scheduler", self)
+		label.setToolTip(
+			"Select how the cycle time minimum is enforced.\n"
+			"Padding: Sleep at the end of the cycle for a filtered\n"
+			"amount of time, so that the average cycle time\n"
+			"approximates the cycle time minimum.\n"
+			"Fixed period: Start every cycle at an absolute deadline,\n"
+			"so that the cycle time minimum becomes a fixed period.\n"
+			"This reduces jitter, but busy-waits shortly before\n"
+			"each deadline. Overruns are counted as missed deadlines.")
+		group.layout().addWidget(label, 4, 0)
+		self.cycleSchedCombo = QComboBox(self)
+		self.cycleSchedCombo.addItem("Padding",
+			S7CPUConfig.CYCLESCHED_FILTER)
+		self.cycleSchedCombo.addItem("Fixed period",
+			S7CPUConfig.CYCLESCHED_DEADLINE)
+		self.cycleSchedCombo.setToolTip(label.toolTip())
+		group.layout().addWidget(self.cycleSchedCombo, 4, 1)
+
+		self.virtTimeCheckBox = QCheckBox("Enable deterministic "
+			"&virtual time", self)
+		self.virtTimeCheckBox.setToolTip(
+			"If this box is checked, the CPU clock does not follow\n"
+			"the host clock. Instead it advances by fixed steps per\n"
+			"cycle and per instruction. Timers, clock memory and\n"
+			"the cycle time minimum then run independent of the host\n"
+			"speed, which usually is a lot faster than real time.\n"
+			"Program runs become reproducible.")
+		group.layout().addWidget(self.virtTimeCheckBox, 5, 0, 1, 2)
+
+		label = QLabel("Virtual time per cycle", self)
+		label.setToolTip(
+			"Virtual time that passes per cycle (OB 1) run,\n"
+			"in addition to the time per instruction.")
+		group.layout().addWidget(label, 6, 0)
+		self.virtTimeCycleSpinBox = QDoubleSpinBox(self)
+		self.virtTimeCycleSpinBox.setToolTip(label.toolTip())
+		self.virtTimeCycleSpinBox.setSuffix(" ms")
+		self.virtTimeCycleSpinBox.setSingleStep(1.0)
+		self.virtTimeCycleSpinBox.setMinimum(0.0)
+		self.virtTimeCycleSpinBox.setMaximum(1000.0)
+		self.virtTimeCycleSpinBox.setDecimals(3)
+		group.layout().addWidget(self.virtTimeCycleSpinBox, 6, 1)
+
+		label = QLabel("Virtual time per instruction", self)
+		label.setToolTip(
+			"Virtual time that passes per executed instruction.")
+		group.layout().addWidget(label, 7, 0)
+		self.virtTimeInsnSpinBox = QDoubleSpinBox(self)
+		self.virtTimeInsnSpinBox.setToolTip(label.toolTip())
+		self.virtTimeInsnSpinBox.setSuffix(" us")
+		self.virtTimeInsnSpinBox.setSingleStep(0.1)
+		self.virtTimeInsnSpinBox.setMinimum(0.0)
+		self.virtTimeInsnSpinBox.setMaximum(1000.0)
+		self.virtTimeInsnSpinBox.setDecimals(3)
+		group.layout().addWidget(self.virtTimeInsnSpinBox, 7, 1)
+
 		self.layout().addWidget(group, 0, 1, 1, 1)
 
 		group = QGroupBox("AWL language", self)
@@ -292,6 +349,12 @@ class CpuConfigWidget(QWidget):
 			Qt.Checked if conf.extInsnsEn else Qt.Unchecked)
 		self.cycleTimeSpinBox.setValue(conf.cycleTimeLimitUs / 1000.0)
 		self.cycleTimeTargetSpinBox.setValue(conf.cycleTimeTargetUs / 1000.0)
+		index = self.cycleSchedCombo.findData(conf.cycleTimeSchedMode)
+		self.cycleSchedCombo.setCurrentIndex(index if index >= 0 else 0)
+		self.virtTimeCheckBox.setCheckState(
+			Qt.Checked if conf.virtTimeEn else Qt.Unchecked)
+		self.virtTimeCycleSpinBox.setValue(conf.virtTimeCycleStepUs / 1000.0)
+		self.virtTimeInsnSpinBox.setValue(conf.virtTimeInsnStepNs / 1000.0)
 
 		self.preDownloadValidationCheckBox.setCheckState(
 			Qt.Checked if guiSettings.getPreDownloadValidationEn() else Qt.Unchecked)
@@ -316,6 +379,10 @@ class CpuConfigWidget(QWidget):
 		extInsnsEnabled = self.extInsnsCheckBox.checkState() == Qt.Checked
 		cycleTimeLimit = self.cycleTimeSpinBox.value()
 		cycleTimeTarget = self.cycleTimeTargetSpinBox.value()
+		cycleSchedMode = self.cycleSchedCombo.itemData(self.cycleSchedCombo.currentIndex())
+		virtTimeEnabled = self.virtTimeCheckBox.checkState() == Qt.Checked
+		virtTimeCycleStep = self.virtTimeCycleSpinBox.value()
+		virtTimeInsnStep = self.virtTimeInsnSpinBox.value()
 		preDownloadValidation = self.preDownloadValidationCheckBox.checkState() == Qt.Checked
 
 		specs.setNrAccus(nrAccus)
@@ -333,6 +400,10 @@ class CpuConfigWidget(QWidget):
 		conf.setExtInsnsEn(extInsnsEnabled)
 		conf.setCycleTimeLimitUs(int(round(cycleTimeLimit * 1000.0)))
 		conf.setCycleTimeTargetUs(int(round(cycleTimeTarget * 1000.0)))
+		conf.setCycleTimeSchedMode(cycleSchedMode)
+		conf.setVirtTimeEn(virtTimeEnabled)
+		conf.setVirtTimeCycleStepUs(int(round(virtTimeCycleStep * 1000.0)))
+		conf.setVirtTimeInsnStepNs(int(round(virtTimeInsnStep * 1000.0)))
 		guiSettings.setPreDownloadValidationEn(preDownloadValidation)
 
 		return True
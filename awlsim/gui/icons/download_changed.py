@@ -0,0 +1,115 @@
+# AUTOMATICALLY GENERATED FILE
+# DO NOT EDIT
+
+# Generated from download-changed.png
+
+icon_download_changed = b'iVBORw0KGgoAAAANSUhEUgAAADAAAAAwCAYAAABXAvmHAAAP'\
+                        b'J0lEQVR42s2ZB1RUV7SGfXlR0KjRxEa3AGIs0diwYUFRESyh'\
+                        b'qaARNAiKHUF6k96RXpQqiCC9DCKIEFGU3qSKNLEXbGn+75wD'\
+                        b'g2CLWTGPzFrfmnvvzNz5/3322XsPDBjwLz7ETPK/nLErqWmN'\
+                        b'fgY2mWRiozGX873I6MN6Iw4ktZNeiKrGLh7Q34+Z2/N4f9gZ'\
+                        b'DeeYAsRcbUB0fv1fEp5zA7JHYiH0Y6hKvxuYqxDGO3N7CBzO'\
+                        b'5uPMlQZEEYEf5XI9Qi5WQ+ZABPjlfJT7fwU2BvBO2+wDq7Ac'\
+                        b'hGRXIqXiTg/BWRU41c3ZgiYklt1GUulthOfWQHpPEMbIOPe/'\
+                        b'ga/lvHinKLjAOIAD39TrTLhPyrU+RF2pZ6vjm1YI75TrCLtU'\
+                        b'g+U/e2PUMsv+NzBirSuvuLw1jnomwjUmjxlwOZvbi0tIKG6D'\
+                        b'W+wvcInJZdhHXoSUuitGLtL/D6zAGideUVkL7Hc6C9uwC31S'\
+                        b'yCY0k0EN2IVnwZocUyxOcrBkmxNGzj/8HzAgHTRYTN4Ou20j'\
+                        b'YRKQwoQb+yd14dfFyQt0H1TCPCgNpuQ9vmlFWLLDFaOWGPe/'\
+                        b'geGqnkMkFE9A3TwUR91jmAFd8twbfc84BHBKEFfYynA5m4el'\
+                        b'u3wxdpVj/xugj++2BmOr0SnstYvAHtvwv0TbJhzLtUIgsCFo'\
+                        b'w78ujm+V+ULB1dZ2QqttbATW2tkKy9rbCcs62ROcRGSdncfL'\
+                        b'u3hOV4+Bom4AdpoFQcOUy0ly3gU9fnM9COrkfNWBsxDZ6J8i'\
+                        b'uNbGWXCNnZOgjI2jwGobO34ZSzuBVVbWgtKmJnzL9Cf9YwMi'\
+                        b'65wwYb0HJm3ygpiiL8SVAiGuHARxlWBIbA2HhGoEpm8Lx/oD'\
+                        b'3lA18IWaoT+2GQVgu3EAfjIOZNBjek3NwA+q+r7YfNQbizVD'\
+                        b'yeejCBGYvCWE3O8Uu7eYgi9EN3ljwgYPkKBl8UnpjfxnK7DM'\
+                        b'CLOUbKBtEdCFOcW/Gz/ssSDPloHYQYT6phaTHG8hzyXYYRJM'\
+                        b'zAQyuFUpmTSyqPwGUnLjoWHiR+4XiN3kPrvNKAFdmAewc/m9'\
+                        b'nhgrZfg7n5S+6D8y8M0PGuFCUvuwYocVVu+0gYxGN+R4raY9'\
+                        b'5Pa4YMM+dzieySM1/grUjE7C9dxVOJHRYuuxIAYVv0U/CMp6'\
+                        b'AdjvHIvY6y3YuM8D8uSza3c7kPvavrmvhjU71zAMwNczdzWP'\
+                        b'mr1b8B8ZGDZlI99QcblaiZXaWLrVDEvVzLBMzQIr1W2wRtMB'\
+                        b'ctquxMAJ0m1v4ifTUCgfJXluEUki3YStBsEMamDzsVNQ0gvC'\
+                        b'Pqc4nM6rx8b9nsS8G7mHE6TJvaRUzTFfyRDzFA1g5RUDoXlq'\
+                        b'fw4WW7//s2xkHqHFMl+JSL2YIXsA8xQMsGiLOZZtt8ZKDUes'\
+                        b'2e0GeR0vJJbchoJuIJSOnsJm/RAkkPMthuGM3s0tsaydrEIc'\
+                        b'5Pd5QVbbHTI/O2GFui2UD7nDKSgRAWcy8cOq7a//Z+zspM9a'\
+                        b'jQYJLHD7WlwGP2zQwwJlc0ip2UBawwmrtdyxTseHrEATtplG'\
+                        b'QlE/DOqWMex8s1EU4UzXChichqrRaeh6pJHVacQ2w1BoWZyG'\
+                        b'sXsczE/EYaeBPwQXamHA2CX4ctycVl6hhfx9BJiamlp2dHQ0'\
+                        b'FRcXM9TV1RX/lgGRBSMG8UkWjZupgAVbjpM94Ujy1wNyOr6k'\
+                        b'AgXBOfYaPBKKoeOQRAa2cngll+OgCweH3DjMwBHXNBx0SoZ5'\
+                        b'QDbOkWamaRmNHw8EYOYmK0yQ1oOQ1EF8O10FPALzwSsgKf2O'\
+                        b'gOPHj/t1dnaipqaGsWvXLs2/uwpDhBdO5hVe9FpYcgfmKNti'\
+                        b'oZoT1mj5Qv7ASdLIouGTVoVzRa3w41RDwzoVO6wIx1N70ieJ'\
+                        b'VaEmaDulYulOXyzc5o65Kg6YsdEKoisOYYjIEgzin3vwvV/+'\
+                        b'OQyw/SC4SGXoxBWYus6ACVhORoLVe4MhfzgSP+rHQtk4CVvM'\
+                        b'UqFqkY5tVhyGmmU6tpJrKuS1H4+dI++NwhqdUKzQ9Mfinzww'\
+                        b'W8kWo6bKY9DYWQk8AnOG/asGWDrxzQsbO1ORDGQnusQfiYKi'\
+                        b'QTwTvs0qA+q2F7DTPhs/O1xk7CLHGuTa9uMZ2GqeBiWjBKzX'\
+                        b'je42EQBxaR18OWp6yyC+ubM++KWf0wCpSoID+eZVSazcjw1E'\
+                        b'CBVPhe2wPs8Ea7nkQsf9MvZ5XGHQ4z2uefjZ8SIzp0ZWR8kw'\
+                        b'ARv1YiG5xRY8/HNe8/DN0frol35OA2wVBCUVeAQXvFim7kZS'\
+                        b'JIOIz4SmY06fkqnnX8TgnseT3wW2Z0q7TFhyIH/oNEaILqOp'\
+                        b'c/ovv9DExCTocxqgD17+eUFDxy+BikkiEX+JRZoKPRZYAuPg'\
+                        b'CpiGVMI0tKrnmmkIGalL2qHplMMMi0vtwMDR09s+6cuOHj0a'\
+                        b'9vDhw081wPOhFyoV5Vdfk5d/VSIjc/HGnj1TeMbNqpkguQXa'\
+                        b'Lnk47H2NiaWirSJrYRPdwKDXzMKqYXW6AjHX27DX7RfSyZ3A'\
+                        b'M2baHwPHzJj+SQZ0dXXDrl27htraWkZ2dnZmXV2dW119vVt9'\
+                        b'LyoqK7055zOepXPSkZqejpS0NEIq40yEG+rDJVCjsALlwsLI'\
+                        b'EhSEgdZeDBWYhRXbyO9iv6I+KeSS0ArXxNY+w5xL/A1oHE/G'\
+                        b'yPHzsFJOEcftbGHjYA87J0fYOzvB0dUFzm5uMLUwh9sJD4RG'\
+                        b'RDQM0NbWnqynp5cZExODh48eof32bXTcuYM7d+/i7r17uHf/'\
+                        b'Pu4/eIAHZIXoKtH3PKI8fozH3XS016P9/CyUnhaC3MzJSBk5'\
+                        b'Eue/+AIp8+dD54ghhgvOgqZNMhNqd7aRCG+Dd/pd+HDusWv2'\
+                        b'MTfhEFNLRox2TJi9DpJLZXG9qAjVNTdQQ4NaVwcSTNQ3NKDx'\
+                        b'ZiOysrLQdOsWCkjQB+zdu/eVlZUV7O3tmSgq/oPCqeAnT/CE'\
+                        b'8vQp49EDYvbiUrRzJmP5IgmIiIhg+eTBiJnCg9A5s5HKycAK'\
+                        b'WSXwT1nWI9Y9uR0BFx4y3jSyDpiR38jDRo9HXGIqysrLUV5Z'\
+                        b'AbLqqKyqQlV1Napv3MANkuKcjAxmqqS0hBkA1wAV9474t4Q/'\
+                        b'JaKfkg1PN/3Tzie4l6+Ex5dmQEH2e0yaNAmiwl8h15sHVWem'\
+                        b'IouThqLiIgQFR2CMoASWKByCQ+wtljqe6XfglXYHbkltcIxr'\
+                        b'hoZZFAZ+NQZGlvZ9os6NfENjI6Px5k22Ajebmtj1PgaoOK54'\
+                        b'GnWaKjRFuMKp6M5nz/CM8Pz5c7QW6OLZ5VlQV5gMMTExCPGP'\
+                        b'QJrzYNTFieBSVhyJUClq6+uQcykHplYOGDBoBLYc8YNzQjuc'\
+                        b'45sJLUT8LRzzu4Jxk2ZizXpllFdUdEe/8r3Rp+ZycnJYprS2'\
+                        b'tvY1QAU+oOJ7R50bcSqciKbCX7x4gZZSL7y8JgWrQ/OZeH6+'\
+                        b'0YgwH4LmhDFIT/AmQsrR2taK2x23Wd6WlZdBaetOjOATI3N/'\
+                        b'OmzP3oR1VB3Mw6owd5Uapn4/jwiuYpGlkSZFg60CFU0NUCPU'\
+                        b'XGlZKXm9AXfJHiUD6FsGiMje4rlR50acCn/58iXuNybiReFa'\
+                        b'JATvZeKFSdXxODwMLQnDUZrnjzRSoVpIdB51b3i6go8ekwJB'\
+                        b'zAiJfY/vJOWg738NJqQXqBz0Bs+Q4YhPSmXv+VRoZlATfQzQ'\
+                        b'CL8jvpfwV69e4WlHPp6XqCA3wQDi4mKYOHEijNRHojV+CArP'\
+                        b'm6KwsBD5+fk9hin0c9zjopIy/C/PcKxVt8Iex0wMHDwSeoam'\
+                        b'Pa//HWi29DFAv/Sj4u/XoLNME4XJuzDtO3EWfY0N36IlbjCK'\
+                        b'U3ey3Kwmy52bm4smkgofwsDEiuyHYfhy8DeQXLKSbNSGj77/'\
+                        b'fTQ3N6OlpeUtA0Tskw+Jf3wbj8r00JJ/EAvnz2DiN0mPw61z'\
+                        b'Q1CZvA6pqamgzZCmDF0VcXHxDyIqJo6RY4Ux9BsBTJj04feJ'\
+                        b'TZuGcSrbMXqHFsYvWNxzfcKECbCzs0NkZGRfA1TwU27O9xL/'\
+                        b'8vlTPK40QWetPdavW8rEr1o8HrVnhqIueT5izkbR7s0i8uef'\
+                        b'f7JV6OwutR+i485dtLW195zfp9WP0FPt/gKq8Q6pRH0MUMGd'\
+                        b'3RuWK/7XX1/hSbUlXja6QlVJmomXnD0RxSHD0JwqgfAQXyQn'\
+                        b'J6OSlLw//viDGagiFeMJt+H1gvUQLqyPvOE2qShkfHlT9T7B'\
+                        b'wD3Ss/oaIIK5qdMl/lc8qHLEq5vO0N6+kImfMU0UOT4jcIcj'\
+                        b'hJN+NoiKisLly5fx22+/4fXr14ySkpKuiJJN1psH3Tzkdvde'\
+                        b'0NSjn+FWrt487jW2UB5196Z3VoCK7h39jgp/vKo9BtN9kkz8'\
+                        b'5MmiSHD8Fo/Oj0bgCV0EBgYiJSWFRfT3339n0FW4TKoQnVVu'\
+                        b'kY1GaSapRcsqpbWtjdHW3o52Cpm9uNBVoLWdNik2j3Eh5ZLL'\
+                        b'3W5oQOh93jHA3bg0+rX53vC1XMTEUwKNx6LzwggEu6vDjUyF'\
+                        b'ERERLO+pAW4knzztZFNqIRnGioqLUUy6Me3IpWVlrMOWVXTN'\
+                        b'NwySapVkv1R1U02aFuUG6bY13dBmVts9UnDHCspNEiA2Snh6'\
+                        b'et6Njo5GeHh4jwH6fJ9MmNVXQxB/ShtzZknAQpsfL7K/RqTH'\
+                        b'BpBfcPD19UUxEUgNlBNhV68WENHFSCTVKDQiHDHnYhEbH4dz'\
+                        b'CfGIT0wgjSoRiWSvJKck94zgdCRP43SRzuGAjOrdnEdGJiUT'\
+                        b'5y9QLiAzi5KFC9mUbOTkXuoa5szNzb8gggLoJqRR50a/qSID'\
+                        b'BalHkRW2Dok+i9EYL4gEr0UwMzNjeV9QUEDafQM4ZNpMTU3D'\
+                        b'ddLA0jM4MDY3g7O7G1woHu5wJdDZ3c3zBNwpXp7w8PZ6Lye8'\
+                        b'vd/g04Wnjw88fbvwovj5Mnz8/ZiJnt/EtHL0NuBho4WcKGVc'\
+                        b'CJVDVvRh/JJ9jjSPWyzP6XvaSP5dvJjD0oKeZ13MZuL1jQxh'\
+                        b'aWPdBytbm88C/YHTm5MhwXXvNVBeXICpU6fC1kgVHU2FPeWR'\
+                        b'Vhh6TMsYHa5iYuPIBm0mm/Zyu84BHYl++zdQjwFSCmkp/SU3'\
+                        b'G1fysnqqytsGaCmjmzQtnUPFN2pqaYoO6M/H2wboStC6/jED'\
+                        b'tLokp3PKNypuEuj3f8RRA7QL0mpSRsodh8PJIxUm8G1Igwok'\
+                        b'kQ/My78SGBYZ4/n97Nnf/if+k/i5/7D1//n4PzUSOI/npGvA'\
+                        b'AAAAAElFTkSuQmCC'
@@ -40,6 +40,7 @@ from awlsim.gui.icons.doc_import import *
 from awlsim.gui.icons.doc_new import *
 from awlsim.gui.icons.down import *
 from awlsim.gui.icons.download import *
+from awlsim.gui.icons.download_changed import *
 from awlsim.gui.icons.download_one import *
 from awlsim.gui.icons.enable import *
 from awlsim.gui.icons.exit import *
@@ -93,6 +94,7 @@ __icons = {
 	"doc_new"	: icon_doc_new,
 	"down"		: icon_down,
 	"download"	: icon_download,
+	"download_changed"	: icon_download_changed,
 	"download_one"	: icon_download_one,
 	"enable"	: icon_enable,
 	"exit"		: icon_exit,
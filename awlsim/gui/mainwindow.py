@@ -177,6 +177,7 @@ class MainWidget(QWidget):
 		self.__minCycleTime = 0.0
 		self.__maxCycleTime = 0.0
 		self.__padCycleTime = 0.0
+		self.__missedDeadlines = 0
 
 		self.__updateStatusBar()
 
@@ -563,6 +564,7 @@ class MainWidget(QWidget):
 		self.__minCycleTime = statsMsg.minCycleTime
 		self.__maxCycleTime = statsMsg.maxCycleTime
 		self.__padCycleTime = statsMsg.padCycleTime
+		self.__missedDeadlines = statsMsg.missedDeadlines
 		self.__updateStatusBar()
 
 	def __updateStatusBar(self):
@@ -600,6 +602,9 @@ class MainWidget(QWidget):
 					      minCycleTimeStr,
 					      maxCycleTimeStr,
 					      padCycleTimeStr))
+				if self.__missedDeadlines:
+					status.append("missed deadlines: %d" % (
+						      self.__missedDeadlines))
 
 		statusBar = self.mainWindow.statusBar()
 		statusBar.showMessage("  --  ".join(status))
@@ -751,6 +756,7 @@ class MainWindow(QMainWindow):
 		menu.addAction(self.ctrlTb.onlineAction)
 		menu.addAction(self.ctrlTb.resetAction)
 		menu.addAction(self.ctrlTb.downloadAction)
+		menu.addAction(self.ctrlTb.downloadChangedAction)
 		menu.addAction(self.ctrlTb.downloadSingleAction)
 		menu.addAction(self.ctrlTb.runAction)
 		menu.addAction(self.ctrlTb.diagAction)
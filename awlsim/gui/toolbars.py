@@ -160,6 +160,10 @@ class CpuControlToolBar(QToolBar):
 					      "Download all sources to CPU",
 					      self)
 		self.addAction(self.downloadAction)
+		self.downloadChangedAction = QAction(getIcon("download_changed"),
+						     "Download changed sources to CPU",
+						     self)
+		self.addAction(self.downloadChangedAction)
 		self.downloadSingleAction = QAction(getIcon("download_one"),
 						    "Download single source to CPU",
 						    self)
@@ -178,6 +182,7 @@ class CpuControlToolBar(QToolBar):
 		self.onlineAction.toggled.connect(self.__handleOnlineToggle)
 		self.resetAction.triggered.connect(self.__handleResetTrigger)
 		self.downloadAction.triggered.connect(self.__handleDownloadTrigger)
+		self.downloadChangedAction.triggered.connect(self.__handleDownloadChangedTrigger)
 		self.downloadSingleAction.triggered.connect(self.__handleDownloadSingleTrigger)
 		self.runAction.toggled.connect(self.__handleRunToggle)
 		self.diagAction.toggled.connect(self.__handleDiagToggle)
@@ -200,6 +205,11 @@ class CpuControlToolBar(QToolBar):
 			client = self.mainWindow.getSimClient()
 			client.action_download()
 
+	def __handleDownloadChangedTrigger(self):
+		if not self.__runButtonsBlocked:
+			client = self.mainWindow.getSimClient()
+			client.action_download(incremental=True)
+
 	def __handleDownloadSingleTrigger(self):
 		if not self.__runButtonsBlocked:
 			client = self.mainWindow.getSimClient()
@@ -14,3 +14,15 @@ if __cython.shouldUseCython(__importmod):			#@nocy
 		__cython.cythonImportError(__importcymod, str(e))
 if not __cython.shouldUseCython(__importmod):			#@nocy
 	exec("from %s import *" % __importmod)			#@nocy
+
+__importmod = "awlsim.coreclient.batch"
+
+if __cython.shouldUseCython(__importmod):			#@nocy
+#if True:							#@cy
+	__importcymod = __cython.cythonModuleName(__importmod)
+	try:
+		exec("from %s import *" % __importcymod)
+	except ImportError as e:
+		__cython.cythonImportError(__importcymod, str(e))
+if not __cython.shouldUseCython(__importmod):			#@nocy
+	exec("from %s import *" % __importmod)			#@nocy
@@ -0,0 +1,3 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+from awlsimhw_historian.main import *
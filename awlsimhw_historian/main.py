@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Process image historian and replay hardware interface
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.util import *
+from awlsim.common.enumeration import *
+from awlsim.common.exceptions import *
+
+#from awlsimhw_historian.main cimport * #@cy
+
+from awlsim.core.hardware_params import *
+from awlsim.core.hardware import * #+cimport
+from awlsim.core.cpu import * #+cimport
+
+import struct
+import re
+import zlib
+
+
+__all__ = [
+	"HistorianColumn",
+	"HistorianWriter",
+	"HistorianReader",
+	"HardwareInterface",
+]
+
+
+class HistorianColumn(object):
+	"""One recorded memory range of a historian trace.
+	"""
+
+	EnumGen.start
+	AREA_E		= EnumGen.item	# Inputs
+	AREA_A		= EnumGen.item	# Outputs
+	AREA_M		= EnumGen.item	# Flags
+	AREA_DB		= EnumGen.item	# Data block
+	EnumGen.end
+
+	area2name = {
+		AREA_E		: "E",
+		AREA_A		: "A",
+		AREA_M		: "M",
+		AREA_DB		: "DB",
+	}
+	name2area = pivotDict(area2name)
+
+	__rangeRe = re.compile(r"^(E|A|M|DB)\s*(?:(\d+)\.)?(\d+)\s*\+\s*(\d+)$",
+			       re.IGNORECASE)
+
+	@classmethod
+	def fromString(cls, text):
+		"""Parse a column description.
+		The format is AREA OFFSET+LENGTH with AREA being E, A or M
+		(e.g. E0+4) or DB NUMBER.OFFSET+LENGTH (e.g. DB1.0+2).
+		OFFSET and LENGTH are in bytes.
+		"""
+		m = cls.__rangeRe.match(text.strip())
+		if not m:
+			raise AwlSimError("Historian: Invalid memory range '%s'." % text)
+		area = cls.name2area[m.group(1).upper()]
+		if (area == cls.AREA_DB) != (m.group(2) is not None):
+			raise AwlSimError("Historian: Invalid memory range '%s'." % text)
+		return cls(area, int(m.group(3)), int(m.group(4)),
+			   int(m.group(2) or 0))
+
+	def __init__(self, area, offset, length, dbNumber=0):
+		if area not in self.area2name or\
+		   not (0 <= offset <= 0xFFFFFFFF) or\
+		   not (1 <= length <= 0xFFFF) or\
+		   not (0 <= dbNumber <= 0xFFFF):
+			raise AwlSimError("Historian: Invalid memory range.")
+		self.area = area
+		self.offset = offset
+		self.length = length
+		self.dbNumber = dbNumber
+
+	def fetch(self, cpu): #@nocy
+#@cy	def fetch(self, S7CPU cpu):
+		"""Fetch the current value of this range from the CPU.
+		"""
+		area = self.area
+		if area == self.AREA_E:
+			return cpu.fetchInputRange(self.offset, self.length)
+		if area == self.AREA_A:
+			return cpu.fetchOutputRange(self.offset, self.length)
+		if area == self.AREA_M:
+			return cpu.flags.getDataBytesRange(self.offset, self.length)
+		db = cpu.getDB(self.dbNumber)
+		if db is None:
+			raise AwlSimError("Historian: DB %d does not exist." % (
+				self.dbNumber))
+		return db.structInstance.memory.getDataBytesRange(self.offset,
+								  self.length)
+
+	def __eq__(self, other):
+		return isinstance(other, HistorianColumn) and\
+		       (self.area, self.offset, self.length, self.dbNumber) ==\
+		       (other.area, other.offset, other.length, other.dbNumber)
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	def __repr__(self):
+		if self.area == self.AREA_DB:
+			return "DB%d.%d+%d" % (self.dbNumber, self.offset, self.length)
+		return "%s%d+%d" % (self.area2name[self.area],
+				     self.offset, self.length)
+
+class _HistorianFormat(object):
+	# File format:
+	#	File header:
+	#		Magic			(8 bytes)
+	#		Format version		(16 bit)
+	#		Reserved		(16 bit)
+	#		Number of columns	(32 bit)
+	#	Column headers (one per column):
+	#		Area (AREA_...)		(8 bit)
+	#		Reserved		(8 bit)
+	#		DB number		(16 bit)
+	#		Byte offset		(32 bit)
+	#		Byte length		(32 bit)
+	#	Blocks (appended):
+	#		Magic			(4 bytes)
+	#		Number of records	(32 bit)
+	#		Payload length		(32 bit)
+	#		First cycle number	(64 bit)
+	#		Payload			(zlib compressed)
+	#
+	# The block payload is stored column by column:
+	#	Cycle number deltas to the previous record	(32 bit each)
+	#	Timestamps in seconds since the first record	(double each)
+	#	For each memory range column:
+	#		Change flags, one per record		(8 bit each)
+	#		The XOR deltas of the changed records	(length bytes each)
+	# The deltas of a block start from all-zero values.
+	# So every block can be decoded on its own.
+	hdrStruct = struct.Struct(str(">8sHHI"))
+	colStruct = struct.Struct(str(">BBHII"))
+	blockStruct = struct.Struct(str(">4sIIQ"))
+
+	MAGIC		= b"AWLHIST\x00"
+	BLOCK_MAGIC	= b"BLK\x00"
+	VERSION		= 1
+
+	@staticmethod
+	def xorBytes(a, b):
+		return bytearray(x ^ y for x, y in zip(a, b))
+
+class HistorianWriter(_HistorianFormat):
+	"""Append-only historian trace file writer.
+	The records are buffered and written as one block
+	per 'blockRecords' records.
+	"""
+
+	def __init__(self, filename, columns, blockRecords=256):
+		self.filename = filename
+		self.columns = list(columns)
+		self.blockRecords = max(blockRecords, 1)
+		self.__fd = None
+		self.__startTime = None
+		self.__prevCycle = 0
+		self.__resetBlock()
+
+	def __resetBlock(self):
+		self.__nrRecords = 0
+		self.__firstCycle = 0
+		self.__cycleDeltas = []
+		self.__times = []
+		self.__changeFlags = [ bytearray() for c in self.columns ]
+		self.__deltas = [ [] for c in self.columns ]
+		self.__prevValues = [ bytearray(c.length) for c in self.columns ]
+
+	def open(self):
+		"""Create the trace file and write the file header.
+		"""
+		self.close()
+		try:
+			self.__fd = open(self.filename, "wb")
+			self.__fd.write(self.hdrStruct.pack(
+				self.MAGIC, self.VERSION, 0, len(self.columns)))
+			for column in self.columns:
+				self.__fd.write(self.colStruct.pack(
+					column.area, 0, column.dbNumber,
+					column.offset, column.length))
+			self.__fd.flush()
+		except (IOError, OSError) as e:
+			self.close()
+			raise AwlSimError("Historian: Failed to create "
+				"'%s': %s" % (self.filename, str(e)))
+		self.__startTime = None
+		self.__resetBlock()
+
+	def append(self, cycle, now, values):
+		"""Append the record of cycle number 'cycle'.
+		'now' is the CPU time in seconds.
+		'values' is the list of the column values.
+		"""
+		if self.__startTime is None:
+			self.__startTime = now
+			self.__prevCycle = cycle
+		if not self.__nrRecords:
+			self.__firstCycle = cycle
+			self.__prevCycle = cycle
+		self.__cycleDeltas.append((cycle - self.__prevCycle) & 0xFFFFFFFF)
+		self.__prevCycle = cycle
+		self.__times.append(now - self.__startTime)
+		prevValues = self.__prevValues
+		for i, value in enumerate(values):
+			if value == prevValues[i]:
+				self.__changeFlags[i].append(0)
+			else:
+				self.__changeFlags[i].append(1)
+				self.__deltas[i].append(self.xorBytes(value, prevValues[i]))
+				prevValues[i] = bytearray(value)
+		self.__nrRecords += 1
+		if self.__nrRecords >= self.blockRecords:
+			self.flush()
+
+	def flush(self):
+		"""Write the buffered records as one block.
+		"""
+		nrRecords = self.__nrRecords
+		if not nrRecords or not self.__fd:
+			return
+		payload = [ struct.pack(str(">%dI" % nrRecords), *self.__cycleDeltas),
+			    struct.pack(str(">%dd" % nrRecords), *self.__times) ]
+		for i in range(len(self.columns)):
+			payload.append(bytes(self.__changeFlags[i]))
+			payload.extend(bytes(d) for d in self.__deltas[i])
+		payload = zlib.compress(b"".join(payload))
+		try:
+			self.__fd.write(self.blockStruct.pack(
+				self.BLOCK_MAGIC, nrRecords,
+				len(payload), self.__firstCycle) + payload)
+			self.__fd.flush()
+		except (IOError, OSError) as e:
+			raise AwlSimError("Historian: Failed to write "
+				"'%s': %s" % (self.filename, str(e)))
+		finally:
+			self.__resetBlock()
+
+	def close(self):
+		"""Write the buffered records and close the file.
+		"""
+		if self.__fd:
+			try:
+				self.flush()
+			finally:
+				with suppressAllExc:
+					self.__fd.close()
+				self.__fd = None
+
+class HistorianReader(_HistorianFormat):
+	"""Historian trace file reader.
+	"""
+
+	def __init__(self, filename):
+		self.filename = filename
+		self.columns = []
+		self.__fd = None
+
+	def open(self):
+		"""Open the trace file and read the file header.
+		"""
+		self.close()
+		try:
+			self.__fd = open(self.filename, "rb")
+			data = self.__fd.read(self.hdrStruct.size)
+			if len(data) != self.hdrStruct.size:
+				raise AwlSimError("Historian: '%s' is not a "
+					"trace file." % self.filename)
+			magic, version, _, nrColumns = self.hdrStruct.unpack(data)
+			if magic != self.MAGIC or version != self.VERSION:
+				raise AwlSimError("Historian: '%s' is not a "
+					"trace file or has an unsupported "
+					"version." % self.filename)
+			self.columns = []
+			for i in range(nrColumns):
+				data = self.__fd.read(self.colStruct.size)
+				if len(data) != self.colStruct.size:
+					raise AwlSimError("Historian: '%s' has a "
+						"truncated header." % self.filename)
+				area, _, dbNumber, offset, length =\
+					self.colStruct.unpack(data)
+				self.columns.append(HistorianColumn(
+					area, offset, length, dbNumber))
+		except (IOError, OSError) as e:
+			self.close()
+			raise AwlSimError("Historian: Failed to read "
+				"'%s': %s" % (self.filename, str(e)))
+		except AwlSimError as e:
+			self.close()
+			raise e
+
+	def close(self):
+		if self.__fd:
+			with suppressAllExc:
+				self.__fd.close()
+			self.__fd = None
+
+	def readBlock(self):
+		"""Read and decode the next block.
+		Returns a list of records (cycle, time, values) or None
+		at the end of the trace. A truncated block at the end of
+		the file (e.g. from a crash while recording) ends the trace.
+		"""
+		data = self.__fd.read(self.blockStruct.size)
+		if len(data) != self.blockStruct.size:
+			return None
+		magic, nrRecords, payloadLen, cycle = self.blockStruct.unpack(data)
+		if magic != self.BLOCK_MAGIC:
+			raise AwlSimError("Historian: '%s' has a corrupt "
+				"block." % self.filename)
+		payload = self.__fd.read(payloadLen)
+		if len(payload) != payloadLen:
+			return None
+		try:
+			payload = zlib.decompress(payload)
+			offset = 0
+			cycleDeltas = struct.unpack_from(str(">%dI" % nrRecords),
+							 payload, offset)
+			offset += 4 * nrRecords
+			times = struct.unpack_from(str(">%dd" % nrRecords),
+						   payload, offset)
+			offset += 8 * nrRecords
+			columnValues = []
+			for column in self.columns:
+				changeFlags = bytearray(payload[offset : offset + nrRecords])
+				offset += nrRecords
+				value = bytearray(column.length)
+				values = []
+				for changed in changeFlags:
+					if changed:
+						value = self.xorBytes(value,
+							bytearray(payload[offset : offset + column.length]))
+						offset += column.length
+					values.append(value)
+				columnValues.append(values)
+		except (zlib.error, struct.error) as e:
+			raise AwlSimError("Historian: '%s' has a corrupt "
+				"block." % self.filename)
+		records = []
+		for i in range(nrRecords):
+			cycle += cycleDeltas[i]
+			records.append((cycle, times[i],
+					[ values[i] for values in columnValues ]))
+		return records
+
+	def __iter__(self):
+		"""Iterate over all records (cycle, time, values).
+		"""
+		while True:
+			records = self.readBlock()
+			if records is None:
+				break
+			for record in records:
+				yield record
+
+class HardwareInterface_Historian(AbstractHardwareInterface): #+cdef
+	name		= "historian"
+	description	= "Process image historian and replay.\n"\
+			  "mode=record: Record the selected memory ranges after\n"\
+			  "every cycle into a compressed trace file. Load this module\n"\
+			  "after the modules that read the inputs.\n"\
+			  "The first record is the startup (OB 100) scan.\n"\
+			  "mode=replay: Feed the recorded inputs (E ranges) of a\n"\
+			  "trace file into the CPU before every cycle."
+
+	EnumGen.start
+	MODE_RECORD	= EnumGen.item
+	MODE_REPLAY	= EnumGen.item
+	EnumGen.end
+
+	paramDescs = [
+		HwParamDesc_str("file",
+				description = "The trace file",
+				mandatory = True),
+		HwParamDesc_str("mode",
+				defaultValue = "record",
+				description = "'record' or 'replay'"),
+		HwParamDesc_str("ranges",
+				defaultValue = "",
+				description = "record: Comma separated list of the "
+					      "recorded memory ranges. "
+					      "E0+4 (EB 0 to EB 3), A0+4, M0+4 or "
+					      "DB1.0+4 (DB 1 DBB 0 to DBB 3)"),
+		HwParamDesc_int("blockCycles",
+				defaultValue = 256,
+				minValue = 1,
+				description = "record: Number of cycles per "
+					      "compressed block"),
+		HwParamDesc_bool("realtime",
+				 defaultValue = False,
+				 description = "replay: Apply the recorded inputs "
+					       "with the recorded timing instead of "
+					       "one record per cycle"),
+		HwParamDesc_bool("stopAtEnd",
+				 defaultValue = True,
+				 description = "replay: Shut down the CPU at the "
+					       "end of the trace"),
+	]
+
+	def __init__(self, sim, parameters={}):
+		AbstractHardwareInterface.__init__(self,
+						   sim = sim,
+						   parameters = parameters)
+		self.__mode = self.MODE_RECORD
+		self.__writer = None
+		self.__reader = None
+		self.__records = None
+		self.__next = None
+		self.__inputColumns = []
+		self.__inputValues = []
+		self.__realtime = False
+		self.__startTime = -1.0
+		self.__cycle = 0
+
+	def doStartup(self):
+		mode = self.getParamValueByName("mode").strip().lower()
+		filename = self.getParamValueByName("file")
+		if mode == "record":
+			self.__mode = self.MODE_RECORD
+			try:
+				columns = [ HistorianColumn.fromString(r)
+					    for r in self.getParamValueByName("ranges").split(",")
+					    if r.strip() ]
+			except AwlSimError as e:
+				self.raiseException(e.message)
+			if not columns:
+				self.raiseException("No memory ranges to record.")
+			# Check the ranges once.
+			for column in columns:
+				try:
+					column.fetch(self.cpu)
+				except AwlSimError as e:
+					self.raiseException("The range %s is not "
+						"accessible: %s" % (column, e.message))
+			self.__writer = HistorianWriter(filename, columns,
+				self.getParamValueByName("blockCycles"))
+			try:
+				self.__writer.open()
+			except AwlSimError as e:
+				self.__writer = None
+				self.raiseException(e.message)
+			self.__inputColumns = [ (i, c) for i, c in enumerate(columns)
+						if c.area == HistorianColumn.AREA_E ]
+			self.__inputValues = [ None ] * len(columns)
+		elif mode == "replay":
+			self.__mode = self.MODE_REPLAY
+			self.__reader = HistorianReader(filename)
+			try:
+				self.__reader.open()
+			except AwlSimError as e:
+				self.__reader = None
+				self.raiseException(e.message)
+			self.__inputColumns = [ (i, c) for i, c in enumerate(self.__reader.columns)
+						if c.area == HistorianColumn.AREA_E ]
+			nrInputs = self.cpu.getSpecs().nrInputs
+			for i, column in self.__inputColumns:
+				if column.offset + column.length > nrInputs:
+					self.raiseException("The recorded range %s "
+						"exceeds the input process image." % column)
+			self.__records = iter(self.__reader)
+			self.__next = next(self.__records, None)
+			self.__realtime = self.getParamValueByName("realtime")
+			self.__startTime = -1.0
+		else:
+			self.raiseException("Invalid mode '%s'." % mode)
+		self.__cycle = 0
+
+	def doShutdown(self):
+		if self.__writer:
+			try:
+				self.__writer.close()
+			finally:
+				self.__writer = None
+		if self.__reader:
+			self.__reader.close()
+			self.__reader = None
+		self.__records = None
+		self.__next = None
+
+	def readInputs(self): #+cdef
+		if self.__mode == self.MODE_RECORD:
+			# Capture the inputs as the CPU sees them in this cycle.
+			for i, column in self.__inputColumns:
+				self.__inputValues[i] = column.fetch(self.cpu)
+			return
+
+		record = self.__next
+		if record is None:
+			if self.getParamValueByName("stopAtEnd"):
+				raise MaintenanceRequest(MaintenanceRequest.TYPE_SHUTDOWN,
+					"Historian: End of the replayed trace.")
+			return
+		if self.__realtime:
+			# Apply the last record that is due.
+			# Keep the current inputs, if no record is due.
+			now = self.cpu.now
+			if self.__startTime < 0.0:
+				self.__startTime = now - record[1]
+			elapsed = now - self.__startTime
+			if record[1] > elapsed:
+				return
+			nextRecord = next(self.__records, None)
+			while nextRecord is not None and nextRecord[1] <= elapsed:
+				record = nextRecord
+				nextRecord = next(self.__records, None)
+			self.__next = nextRecord
+		else:
+			self.__next = next(self.__records, None)
+		values = record[2]
+		for i, column in self.__inputColumns:
+			self.cpu.storeInputRange(column.offset, values[i])
+
+	def writeOutputs(self): #+cdef
+		if self.__mode != self.MODE_RECORD:
+			return
+		writer = self.__writer
+		values = self.__inputValues
+		for i, column in enumerate(writer.columns):
+			if column.area != HistorianColumn.AREA_E:
+				values[i] = column.fetch(self.cpu)
+		writer.append(self.__cycle, self.cpu.now, values)
+		self.__cycle += 1
+
+# Module entry point
+HardwareInterface = HardwareInterface_Historian
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+#
+# AWL simulator - Shared memory process image hardware interface
+#
+# Copyright 2019 Michael Buesch <m@bues.ch>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+#from awlsim.common.cython_support cimport * #@cy
+from awlsim.common.compat import *
+
+from awlsim.common.util import *
+from awlsim.common.exceptions import *
+
+#from awlsimhw_shm.main cimport * #@cy
+
+from awlsim.core.hardware_params import *
+from awlsim.core.hardware import * #+cimport
+from awlsim.core.operators import * #+cimport
+from awlsim.core.offset import * #+cimport
+from awlsim.core.cpu import * #+cimport
+
+import mmap
+import os
+import struct
+import tempfile
+
+
+__all__ = [
+	"ShmProcessImage",
+	"HardwareInterface",
+]
+
+
+class ShmProcessImage(object):
+	"""Process image in a shared memory segment.
+	The segment is created by the 'shm' hardware module and can be
+	attached to by any other process on the same machine.
+
+	The input area is written by exactly one external process
+	and read by the CPU before each cycle.
+	The output area and the DB areas are written by the CPU
+	after each cycle and read by the external processes.
+
+	Each of the two directions is protected by a sequence lock:
+	The writer increments the sequence counter to an odd value,
+	writes the data and increments the counter to an even value again.
+	A reader copies the data and retries, if the counter was odd
+	or changed while copying.
+	Neither side ever blocks the other one.
+	"""
+
+	# Segment layout:
+	#	Header (at offset 0):
+	#		Magic			(8 bytes)
+	#		Format version		(16 bit)
+	#		Number of DBs		(16 bit)
+	#		Input area size		(32 bit)
+	#		Output area size	(32 bit)
+	#		Segment size		(32 bit)
+	#	Input sequence counter		(64 bit native, at INPUT_SEQ_OFFSET)
+	#	Output sequence counter		(64 bit native, at OUTPUT_SEQ_OFFSET)
+	#	CPU cycle counter		(64 bit native, at CYCLE_OFFSET)
+	#	DB directory (at DBDIR_OFFSET, one entry per DB):
+	#		DB number		(16 bit)
+	#		reserved		(16 bit)
+	#		Offset of the DB area	(32 bit)
+	#		Size of the DB area	(32 bit)
+	#	Input area
+	#	Output area
+	#	DB areas
+	# All areas are aligned to AREA_ALIGN.
+	hdrStruct = struct.Struct(str(">8sHHIII"))
+	seqStruct = struct.Struct(str("=Q"))
+	dbDirStruct = struct.Struct(str(">HHII"))
+
+	MAGIC		= b"AWLSHMPI"
+	VERSION		= 1
+
+	INPUT_SEQ_OFFSET	= 0x20
+	OUTPUT_SEQ_OFFSET	= 0x28
+	CYCLE_OFFSET		= 0x30
+	DBDIR_OFFSET		= 0x40
+	AREA_ALIGN		= 0x40
+
+	# Number of read attempts before a reader gives up.
+	READ_RETRIES	= 100
+
+	@classmethod
+	def getPath(cls, name):
+		"""Get the file system path of the segment 'name'.
+		"""
+		if os.path.isdir("/dev/shm"):
+			shmDir = "/dev/shm"
+		else:
+			shmDir = tempfile.gettempdir() #@nocov
+		return os.path.join(shmDir, "awlsim-" + name)
+
+	def __init__(self, name):
+		self.name = name
+		self.path = self.getPath(name)
+		self.__fd = None
+		self.__map = None
+		self.inputSize = 0
+		self.outputSize = 0
+		self.inputOffset = 0
+		self.outputOffset = 0
+		self.dbAreas = {}	# DB number -> (offset, size)
+		self.__inputSeq = 0
+		self.__outputSeq = 0
+
+	@property
+	def isOpen(self):
+		return self.__map is not None
+
+	@property
+	def buffer(self):
+		"""The mapped segment.
+		"""
+		return self.__map
+
+	def create(self, inputSize, outputSize, dbSizes):
+		"""Create the segment.
+		An existing segment of the same name is replaced.
+		Processes still attached to it keep the old segment
+		and have to attach again.
+		'dbSizes' is a list of (dbNumber, size) tuples.
+		"""
+		self.close()
+		self.inputSize = inputSize
+		self.outputSize = outputSize
+		self.dbAreas = {}
+		offset = roundUp(self.DBDIR_OFFSET +
+				 (len(dbSizes) * self.dbDirStruct.size),
+				 self.AREA_ALIGN)
+		self.inputOffset = offset
+		offset += roundUp(inputSize, self.AREA_ALIGN)
+		self.outputOffset = offset
+		offset += roundUp(outputSize, self.AREA_ALIGN)
+		for dbNumber, size in dbSizes:
+			self.dbAreas[dbNumber] = (offset, size)
+			offset += roundUp(size, self.AREA_ALIGN)
+		segSize = offset
+		try:
+			if os.path.exists(self.path):
+				os.unlink(self.path)
+			self.__fd = open(self.path, "w+b")
+			self.__fd.truncate(segSize)
+			self.__map = mmap.mmap(self.__fd.fileno(), segSize)
+		except (IOError, OSError, ValueError, mmap.error) as e:
+			self.close()
+			raise AwlSimError("Shared memory process image: "
+				"Failed to create '%s': %s" % (self.path, str(e)))
+		for i, (dbNumber, size) in enumerate(dbSizes):
+			self.dbDirStruct.pack_into(self.__map,
+				self.DBDIR_OFFSET + (i * self.dbDirStruct.size),
+				dbNumber, 0, self.dbAreas[dbNumber][0], size)
+		# The magic is written last. Readers attaching to the
+		# segment do not see a partially initialized header.
+		self.hdrStruct.pack_into(self.__map, 0,
+			b"\x00" * len(self.MAGIC), self.VERSION, len(dbSizes),
+			inputSize, outputSize, segSize)
+		self.__map[0 : len(self.MAGIC)] = self.MAGIC
+
+	def attach(self):
+		"""Attach to an existing segment.
+		"""
+		self.close()
+		try:
+			self.__fd = open(self.path, "r+b")
+			self.__map = mmap.mmap(self.__fd.fileno(), 0)
+			magic, version, dbCount, inputSize, outputSize, segSize =\
+				self.hdrStruct.unpack_from(self.__map, 0)
+			if magic != self.MAGIC or version != self.VERSION or\
+			   segSize != len(self.__map):
+				raise ValueError("Invalid segment header")
+			self.inputSize = inputSize
+			self.outputSize = outputSize
+			self.dbAreas = {}
+			for i in range(dbCount):
+				dbNumber, _, offset, size = self.dbDirStruct.unpack_from(
+					self.__map,
+					self.DBDIR_OFFSET + (i * self.dbDirStruct.size))
+				self.dbAreas[dbNumber] = (offset, size)
+			offset = roundUp(self.DBDIR_OFFSET +
+					 (dbCount * self.dbDirStruct.size),
+					 self.AREA_ALIGN)
+			self.inputOffset = offset
+			self.outputOffset = offset + roundUp(inputSize, self.AREA_ALIGN)
+		except (IOError, OSError, ValueError, struct.error, mmap.error) as e:
+			self.close()
+			raise AwlSimError("Shared memory process image: "
+				"Failed to attach to '%s': %s" % (self.path, str(e)))
+		self.__inputSeq = self.seqStruct.unpack_from(
+			self.__map, self.INPUT_SEQ_OFFSET)[0] & ~1
+		self.__outputSeq = self.seqStruct.unpack_from(
+			self.__map, self.OUTPUT_SEQ_OFFSET)[0] & ~1
+
+	def close(self, unlink=False):
+		"""Detach from the segment.
+		If 'unlink' is True, the segment is removed.
+		"""
+		if self.__map is not None:
+			self.__map.close()
+			self.__map = None
+		if self.__fd is not None:
+			with suppressAllExc:
+				self.__fd.close()
+			self.__fd = None
+		if unlink:
+			with suppressAllExc:
+				os.unlink(self.path)
+
+	def __read(self, seqOffset, readFunc):
+		seqStruct, buf = self.seqStruct, self.__map
+		for i in range(self.READ_RETRIES):
+			seq = seqStruct.unpack_from(buf, seqOffset)[0]
+			if seq & 1:
+				continue
+			data = readFunc(buf)
+			if seqStruct.unpack_from(buf, seqOffset)[0] == seq:
+				return data
+		return None
+
+	def beginInputWrite(self):
+		"""Start writing the input area.
+		The data must be written to 'buffer' at 'inputOffset'.
+		"""
+		self.__inputSeq += 1
+		self.seqStruct.pack_into(self.__map, self.INPUT_SEQ_OFFSET,
+					 self.__inputSeq)
+
+	def endInputWrite(self):
+		"""Publish the data written after beginInputWrite().
+		"""
+		self.__inputSeq += 1
+		self.seqStruct.pack_into(self.__map, self.INPUT_SEQ_OFFSET,
+					 self.__inputSeq)
+
+	def beginOutputWrite(self):
+		"""Start writing the output and DB areas.
+		"""
+		self.__outputSeq += 1
+		self.seqStruct.pack_into(self.__map, self.OUTPUT_SEQ_OFFSET,
+					 self.__outputSeq)
+
+	def endOutputWrite(self, cycle):
+		"""Publish the data written after beginOutputWrite().
+		'cycle' is the CPU cycle counter.
+		"""
+		self.seqStruct.pack_into(self.__map, self.CYCLE_OFFSET, cycle)
+		self.__outputSeq += 1
+		self.seqStruct.pack_into(self.__map, self.OUTPUT_SEQ_OFFSET,
+					 self.__outputSeq)
+
+	def readInputs(self):
+		"""Read a consistent copy of the input area.
+		Returns a bytearray or None, if the writer did not
+		finish in time.
+		"""
+		begin, end = self.inputOffset, self.inputOffset + self.inputSize
+		return self.__read(self.INPUT_SEQ_OFFSET,
+				   lambda buf: bytearray(buf[begin : end]))
+
+	def writeInputs(self, data, offset=0):
+		"""Write 'data' to the input area at byte 'offset'.
+		"""
+		if offset < 0 or offset + len(data) > self.inputSize:
+			raise AwlSimError("Shared memory process image: "
+				"Input write is out of range.")
+		begin = self.inputOffset + offset
+		self.beginInputWrite()
+		self.__map[begin : begin + len(data)] = bytes(data)
+		self.endInputWrite()
+
+	def readOutputs(self):
+		"""Read a consistent copy of the output area.
+		Returns a tuple (cycle, bytearray) or None, if the CPU
+		did not finish writing in time.
+		"""
+		begin, end = self.outputOffset, self.outputOffset + self.outputSize
+		cycleOffset = self.CYCLE_OFFSET
+		seqStruct = self.seqStruct
+		return self.__read(self.OUTPUT_SEQ_OFFSET,
+				   lambda buf: (seqStruct.unpack_from(buf, cycleOffset)[0],
+						bytearray(buf[begin : end])))
+
+	def readDB(self, dbNumber):
+		"""Read a consistent copy of the area of DB 'dbNumber'.
+		Returns a tuple (cycle, bytearray) or None, if the CPU
+		did not finish writing in time.
+		"""
+		try:
+			begin, size = self.dbAreas[dbNumber]
+		except KeyError:
+			raise AwlSimError("Shared memory process image: "
+				"DB %d is not mapped." % dbNumber)
+		cycleOffset = self.CYCLE_OFFSET
+		seqStruct = self.seqStruct
+		return self.__read(self.OUTPUT_SEQ_OFFSET,
+				   lambda buf: (seqStruct.unpack_from(buf, cycleOffset)[0],
+						bytearray(buf[begin : begin + size])))
+
+class HardwareInterface_Shm(AbstractHardwareInterface): #+cdef
+	name		= "shm"
+	description	= "Shared memory process image for local processes.\n"\
+			  "The inputs, outputs and selected DBs are mapped into\n"\
+			  "the shared memory segment /dev/shm/awlsim-NAME.\n"\
+			  "Other processes access it with awlsimhw_shm.ShmProcessImage."
+
+	paramDescs = [
+		HwParamDesc_str("name",
+				defaultValue = "awlsim",
+				description = "Name of the shared memory segment"),
+		HwParamDesc_int("inputSize",
+				defaultValue = 128,
+				minValue = 0,
+				description = "Size of the input area, in bytes"),
+		HwParamDesc_int("outputSize",
+				defaultValue = 128,
+				minValue = 0,
+				description = "Size of the output area, in bytes"),
+		HwParamDesc_str("dbs",
+				defaultValue = "",
+				description = "Comma separated list of DB numbers "
+					      "to map into the segment"),
+	]
+
+	def __init__(self, sim, parameters={}):
+		AbstractHardwareInterface.__init__(self,
+						   sim = sim,
+						   parameters = parameters)
+		self.__image = None
+		self.__dbAreas = []
+		self.__cycle = 0
+
+	def doStartup(self):
+		specs = self.cpu.getSpecs()
+		inputSize = self.getParamValueByName("inputSize")
+		outputSize = self.getParamValueByName("outputSize")
+		if self.inputAddressBase + inputSize > specs.nrInputs:
+			self.raiseException("The input area exceeds the "
+				"input process image size.")
+		if self.outputAddressBase + outputSize > specs.nrOutputs:
+			self.raiseException("The output area exceeds the "
+				"output process image size.")
+		dbSizes = []
+		try:
+			dbNumbers = [ int(n) for n in
+				      self.getParamValueByName("dbs").split(",")
+				      if n.strip() ]
+		except ValueError:
+			self.raiseException("Invalid DB number list.")
+		for dbNumber in dbNumbers:
+			db = self.cpu.getDB(dbNumber) if 0 <= dbNumber <= 0xFFFF else None
+			if db is None:
+				self.raiseException("DB %d does not exist." % dbNumber)
+			dbSizes.append((dbNumber, len(db.structInstance.memory)))
+
+		self.__image = ShmProcessImage(self.getParamValueByName("name"))
+		try:
+			self.__image.create(inputSize, outputSize, dbSizes)
+		except AwlSimError as e:
+			self.__image = None
+			self.raiseException(str(e))
+		self.__dbAreas = [ (dbNumber, ) + self.__image.dbAreas[dbNumber]
+				   for dbNumber, size in dbSizes ]
+		self.__cycle = 0
+
+	def doShutdown(self):
+		if self.__image:
+			self.__image.close(unlink=True)
+			self.__image = None
+
+	def readInputs(self): #+cdef
+#@cy		cdef bytearray data
+
+		data = self.__image.readInputs()
+		if data:
+			self.cpu.storeInputRange(self.inputAddressBase, data)
+
+	def writeOutputs(self): #+cdef
+#@cy		cdef uint32_t outputOffset
+#@cy		cdef uint32_t outputSize
+#@cy		cdef uint32_t dbOffset
+#@cy		cdef uint32_t dbSize
+
+		image = self.__image
+		buf = image.buffer
+		outputOffset = image.outputOffset
+		outputSize = image.outputSize
+
+		image.beginOutputWrite()
+		buf[outputOffset : outputOffset + outputSize] =\
+			bytes(self.cpu.fetchOutputRange(self.outputAddressBase,
+							outputSize))
+		for dbNumber, dbOffset, dbSize in self.__dbAreas:
+			db = self.cpu.getDB(dbNumber)
+			if db is not None:
+				data = db.structInstance.memory.getDataBytesRange(0, dbSize)
+				buf[dbOffset : dbOffset + len(data)] = bytes(data)
+		self.__cycle += 1
+		image.endOutputWrite(self.__cycle)
+
+	def directReadInput(self, accessWidth, accessOffset): #@nocy
+#@cy	cdef bytearray directReadInput(self, uint32_t accessWidth, uint32_t accessOffset):
+#@cy		cdef bytearray data
+#@cy		cdef uint32_t offset
+
+		if accessOffset < self.inputAddressBase:
+			return bytearray()
+		offset = accessOffset - self.inputAddressBase
+		if offset + (accessWidth // 8) > self.__image.inputSize:
+			return bytearray()
+		data = self.__image.readInputs()
+		if data is None:
+			return bytearray()
+		return data[offset : offset + (accessWidth // 8)]
+
+	def directWriteOutput(self, accessWidth, accessOffset, data): #@nocy
+#@cy	cdef ExBool_t directWriteOutput(self, uint32_t accessWidth, uint32_t accessOffset, bytearray data) except ExBool_val:
+#@cy		cdef uint32_t offset
+
+		if accessOffset < self.outputAddressBase:
+			return False
+		offset = accessOffset - self.outputAddressBase
+		if offset + (accessWidth // 8) > self.__image.outputSize:
+			return False
+		offset += self.__image.outputOffset
+		self.__image.beginOutputWrite()
+		self.__image.buffer[offset : offset + len(data)] = bytes(data)
+		self.__image.endOutputWrite(self.__cycle)
+		return True
+
+# Module entry point
+HardwareInterface = HardwareInterface_Shm
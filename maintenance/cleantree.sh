@@ -42,6 +42,8 @@ rm -rf debian/destdir-* \
        debian/python-awlsimhw-profibus \
        debian/python-awlsimhw-rpigpio \
        debian/python-awlsimhw-pixtend \
+       debian/python-awlsimhw-shm \
+       debian/python-awlsimhw-historian \
        debian/python-awlsim-gui \
        debian/cython-awlsim \
        debian/cython-awlsimhw-dummy \
@@ -49,6 +51,8 @@ rm -rf debian/destdir-* \
        debian/cython-awlsimhw-profibus \
        debian/cython-awlsimhw-rpigpio \
        debian/cython-awlsimhw-pixtend \
+       debian/cython-awlsimhw-shm \
+       debian/cython-awlsimhw-historian \
        debian/python3-awlsim \
        debian/python3-awlsim-gui \
        debian/python3-awlsimhw-dummy \
@@ -56,12 +60,16 @@ rm -rf debian/destdir-* \
        debian/python3-awlsimhw-profibus \
        debian/python3-awlsimhw-rpigpio \
        debian/python3-awlsimhw-pixtend \
+       debian/python3-awlsimhw-shm \
+       debian/python3-awlsimhw-historian \
        debian/cython3-awlsim \
        debian/cython3-awlsimhw-dummy \
        debian/cython3-awlsimhw-linuxcnc \
        debian/cython3-awlsimhw-profibus \
        debian/cython3-awlsimhw-rpigpio \
        debian/cython3-awlsimhw-pixtend \
+       debian/cython3-awlsimhw-shm \
+       debian/cython3-awlsimhw-historian \
        debian/awlsim-client \
        debian/awlsim-server \
        debian/awlsim-symtab \
@@ -124,6 +124,8 @@ hwmodules = [
 	"awlsimhw_pyprofibus",
 	"awlsimhw_rpigpio",
 	"awlsimhw_pixtend",
+	"awlsimhw_shm",
+	"awlsimhw_historian",
 ]
 
 # Create freeze executable list.
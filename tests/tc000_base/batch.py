@@ -0,0 +1,104 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+from awlsim.coreserver.memarea import *
+from awlsim.coreclient.batch import *
+
+
+PROGRAM = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: INT;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	DB1.DBW 0
+	+	1
+	T	DB1.DBW 0
+	L	EB 0
+	L	MB 0
+	+I
+	T	AB 0
+	L	MB 1
+	L	1
+	==I
+	SPBN	END
+	CALL	SFC 46
+END:	BE
+END_ORGANIZATION_BLOCK
+
+ORGANIZATION_BLOCK OB 100
+BEGIN
+	L	10
+	T	MB 0
+END_ORGANIZATION_BLOCK
+"""
+
+SCENARIOS = """
+[DEFAULT]
+cycles = 5
+
+[scenario:plain]
+expect = DB:1:0:16:5 A:0:8:10
+
+[scenario:init]
+init = M:0:8:20
+stimulus.2 = E:0:8:3
+expect = A:0:8:23
+
+[scenario:stop]
+cycles = 100
+stimulus.3 = M:1:8:1
+expect = DB:1:0:16:4
+
+[scenario:fail]
+expect = A:0:8:99 M:0:8:10
+"""
+
+class Test_Batch(TestCase):
+	def test_run(self):
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		sim.load(p.getParseTree())
+		sim.build()
+		sim.startup()
+
+		scenarios = BatchScenario.parseText(SCENARIOS)
+		self.assertEqual([ s.name for s in scenarios ],
+				 [ "plain", "init", "stop", "fail" ])
+		finished = []
+		results = BatchRunner(sim, nrJobs=2).run(scenarios,
+							 callback=finished.append)
+		self.assertEqual(len(finished), 4)
+		self.assertEqual([ r.name for r in results ],
+				 [ "plain", "init", "stop", "fail" ])
+		self.assertEqual([ r.passed for r in results ],
+				 [ True, True, True, False ])
+		self.assertEqual(results[2].cycles, 4)
+		self.assertEqual(len(results[3].failures), 1)
+		self.assertIn("A:0:8:99", results[3].failures[0])
+
+		# The scenarios did not change the CPU of this process.
+		memArea = MemoryArea.fromString("DB:1:0:16")
+		memArea.readFromCpu(sim.getCPU())
+		self.assertEqual(bytes(memArea.data), b"\x00\x00")
+		sim.shutdown()
+
+	def test_parse(self):
+		self.assertRaises(AwlSimError, BatchScenario.parseText,
+				  "[scenario:x]\nexpect = A:0:8:1\n")
+		self.assertRaises(AwlSimError, BatchScenario.parseText,
+				  "[scenario:x]\ncycles = 1\nfoo = 1\n")
+		self.assertRaises(AwlSimError, BatchScenario.parseText,
+				  "[scenario:x]\ncycles = 1\ninit = X:0:8:1\n")
+		self.assertRaises(AwlSimError, BatchScenario.parseText,
+				  "[x]\ncycles = 1\n")
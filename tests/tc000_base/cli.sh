@@ -19,6 +19,79 @@ sh_test()
 	"$interpreter" ./awlsim-test --hardware-info dummy >/dev/null ||\
 		test_failed "Call to awlsim-test --hardware-info dummy failed"
 
+	local tmp_blockmeas="$(maketemp blockmeas)"
+	"$interpreter" ./awlsim-test -D -L 1 -M 0.5 \
+		--block-meas "$tmp_blockmeas" --cycle-stats \
+		"$basedir"/tc000_base/EXAMPLE.awlpro >/dev/null ||\
+		test_failed "Call to awlsim-test --block-meas failed"
+	grep -q '^OB;1;' "$tmp_blockmeas" ||\
+		test_failed "awlsim-test --block-meas did not measure OB 1"
+
+	local tmp_samplemeas="$(maketemp samplemeas)"
+	"$interpreter" ./awlsim-test -D -L 1 -M 0.5 \
+		--sample-meas "$tmp_samplemeas" --sample-rate 50 \
+		"$basedir"/tc000_base/EXAMPLE.awlpro >/dev/null ||\
+		test_failed "Call to awlsim-test --sample-meas failed"
+	grep -q '^OB;1;' "$tmp_samplemeas" ||\
+		test_failed "awlsim-test --sample-meas did not sample OB 1"
+
+	local tmp_coverage="$(maketemp coverage)"
+	"$interpreter" ./awlsim-test -D -L 1 -x \
+		--coverage "$tmp_coverage" --coverage-format lcov \
+		"$basedir"/tc000_base/coverage.awl >/dev/null ||\
+		test_failed "Call to awlsim-test --coverage failed"
+	grep -q '^DA:22,0$' "$tmp_coverage" ||\
+		test_failed "awlsim-test --coverage: Unexecuted line not reported"
+	grep -q '^BRDA:11,0,0,5$' "$tmp_coverage" ||\
+		test_failed "awlsim-test --coverage: Branch count mismatch"
+	"$interpreter" ./awlsim-test -D -L 1 -x --coverage - \
+		"$basedir"/tc000_base/coverage.awl |\
+		grep -q "FC 1 NETWORK 'Never executed'" ||\
+		test_failed "awlsim-test --coverage: Unexecuted network not reported"
+
+	local tmp_insntrace="$(maketemp insntrace)"
+	"$interpreter" ./awlsim-test -D -L 1 -M 0.5 \
+		--insn-trace 16 --insn-trace-out "$tmp_insntrace" \
+		"$basedir"/tc000_base/EXAMPLE.awlpro >/dev/null ||\
+		test_failed "Call to awlsim-test --insn-trace failed"
+	[ "$(grep -c '^[0-9]*;[OF][BC];' "$tmp_insntrace")" -eq 16 ] ||\
+		test_failed "awlsim-test --insn-trace did not record 16 instructions"
+
+	local tmp_snapshot="$(maketemp snapshot)"
+	"$interpreter" ./awlsim-test -D -L 1 -M 0.5 \
+		--snapshot-save "$tmp_snapshot" \
+		"$basedir"/tc000_base/EXAMPLE.awlpro >/dev/null ||\
+		test_failed "Call to awlsim-test --snapshot-save failed"
+	head -c 7 "$tmp_snapshot" | grep -q '^AWLSNAP$' ||\
+		test_failed "awlsim-test --snapshot-save did not write a snapshot"
+	"$interpreter" ./awlsim-test -D -L 1 -M 0.5 \
+		--snapshot-load "$tmp_snapshot" \
+		"$basedir"/tc000_base/EXAMPLE.awlpro >/dev/null ||\
+		test_failed "Call to awlsim-test --snapshot-load failed"
+
+	local tmp_retentive="$(maketemp retentive)"
+	rm -f "$tmp_retentive"
+	for i in 1 2; do
+		"$interpreter" ./awlsim-test -D -L 1 -M 0.5 \
+			--retentive "$tmp_retentive" --retentive-areas MB:16,Z:8,DB:1 \
+			"$basedir"/tc000_base/EXAMPLE.awlpro >/dev/null ||\
+			test_failed "Call to awlsim-test --retentive failed"
+	done
+	head -c 7 "$tmp_retentive" | grep -q '^AWLRETM$' ||\
+		test_failed "awlsim-test --retentive did not write the retentive memory"
+
+	local tmp_batch="$(maketemp batch)"
+	printf '[scenario:init]\ncycles = 10\ninit = M:200:8:5\nexpect = M:200:8:5\n\n[scenario:runtime]\nruntime = 0.1\n' > "$tmp_batch" ||\
+		test_failed "Failed to write the batch scenarios"
+	"$interpreter" ./awlsim-test -D -L 1 --batch "$tmp_batch" --jobs 2 \
+		"$basedir"/tc000_base/EXAMPLE.awlpro >/dev/null ||\
+		test_failed "Call to awlsim-test --batch failed"
+	printf '[scenario:fail]\ncycles = 3\nexpect = M:200:8:5\n' > "$tmp_batch" ||\
+		test_failed "Failed to write the batch scenarios"
+	"$interpreter" ./awlsim-test -D -L 0 --batch "$tmp_batch" \
+		"$basedir"/tc000_base/EXAMPLE.awlpro >/dev/null &&\
+		test_failed "awlsim-test --batch did not detect a failed scenario"
+
 
 	# check awlsim-proupgrade executable
 	# (proupgrade uses GUI code, so only run in compatible environment)
@@ -0,0 +1,204 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.common.project import *
+from awlsim.common.sources import *
+from awlsim.coreclient.client import *
+from awlsim.coreserver.memarea import *
+from awlsim.coreserver.messages import *
+
+import socket
+import threading
+
+
+SRC_MAIN = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: INT;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	CALL	FC 1
+END_ORGANIZATION_BLOCK
+"""
+
+SRC_FC1 = """
+FUNCTION FC 1 : VOID
+BEGIN
+	L	DB1.DBW 0
+	+	%d
+	T	DB1.DBW 0
+END_FUNCTION
+"""
+
+SRC_FC2 = """
+FUNCTION FC 2 : VOID
+BEGIN
+	L	%d
+	T	MW 0
+END_FUNCTION
+"""
+
+SRC_BROKEN = """
+FUNCTION FC 3 VOID
+BEGIN
+END_FUNCTION
+"""
+
+class Test_ClientDownload(TestCase):
+	def setUp(self):
+		self.client = AwlSimClient()
+		self.client.spawnServer(listenHost="localhost",
+					listenPort=range(32151, 32251))
+		self.client.connectToServer(host="localhost",
+					    port=self.client.serverProcessPort,
+					    timeout=20.0)
+
+	def tearDown(self):
+		self.client.shutdown()
+
+	@staticmethod
+	def __source(name, text):
+		return AwlSource(name=name, sourceBytes=text.encode("utf-8"))
+
+	@staticmethod
+	def __project(sources):
+		return Project(None, awlSources=sources)
+
+	def __count(self):
+		# Run one cycle and read the DB 1 counter.
+		memAreas = self.client.step(nrCycles=1, readAreas=[
+			MemoryArea(MemoryArea.TYPE_DB, 0, 1, 0, 2) ])
+		data = memAreas[0].data
+		return (data[0] << 8) | data[1]
+
+	def __serverIdents(self):
+		idents = self.client.requestIdents(reqAwlSources=True,
+						   noVolatile=True,
+						   sync=True)
+		return sorted(source.identHash for source in idents.awlSources)
+
+	def test_incremental(self):
+		client = self.client
+		sources = [ self.__source("main", SRC_MAIN),
+			    self.__source("fc1", SRC_FC1 % 1),
+			    self.__source("fc2", SRC_FC2 % 2), ]
+		client.loadProject(self.__project(sources), build=True)
+		self.assertEqual(self.__serverIdents(),
+				 sorted(s.identHash for s in sources))
+		self.assertEqual(self.__count(), 1)
+		self.assertEqual(self.__count(), 2)
+
+		# Change FC 1, add FC 2 in a new source
+		# and remove the old FC 2 source.
+		sources = [ self.__source("main", SRC_MAIN),
+			    self.__source("fc1", SRC_FC1 % 10),
+			    self.__source("fc2new", SRC_FC2 % 3), ]
+		self.assertTrue(client.loadProjectIncremental(
+			self.__project(sources)))
+		self.assertEqual(self.__serverIdents(),
+				 sorted(s.identHash for s in sources))
+		# DB 1 has not been reloaded. It keeps its contents.
+		self.assertEqual(self.__count(), 12)
+
+		# Nothing changed.
+		self.assertTrue(client.loadProjectIncremental(
+			self.__project(sources)))
+		self.assertEqual(self.__serverIdents(),
+				 sorted(s.identHash for s in sources))
+
+	def test_brokenSource(self):
+		client = self.client
+		sources = [ self.__source("main", SRC_MAIN),
+			    self.__source("broken", SRC_BROKEN),
+			    self.__source("fc1", SRC_FC1 % 1), ]
+		self.assertRaises(AwlSimError, client.loadProject,
+				  self.__project(sources), build=True)
+
+		# The connection is still usable and the replies of
+		# the rest of the pipelined batch have been consumed.
+		sources = [ self.__source("main", SRC_MAIN),
+			    self.__source("fc1", SRC_FC1 % 1), ]
+		client.reset()
+		client.loadProject(self.__project(sources), build=True)
+		self.assertEqual(self.__serverIdents(),
+				 sorted(s.identHash for s in sources))
+		self.assertEqual(self.__count(), 1)
+
+class _ReplyServer(threading.Thread):
+	"""Minimal server that replies to every message.
+	The load of the source named 'failSource' fails.
+	"""
+
+	def __init__(self, failSource):
+		threading.Thread.__init__(self)
+		self.daemon = True
+		self.failSource = failSource
+		self.rxMsgIds = []
+		self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.sock.bind(("127.0.0.1", 0))
+		self.sock.listen(1)
+		self.port = self.sock.getsockname()[1]
+
+	def run(self):
+		sock, _ = self.sock.accept()
+		xceiver = AwlSimMessageTransceiver(sock, "client")
+		try:
+			while True:
+				msg = xceiver.receive(timeout=None)
+				if not msg:
+					continue
+				if msg.msgId == AwlSimMessage.MSG_ID_PING:
+					reply = AwlSimMessage_PONG()
+					reply.setReplyTo(msg)
+					xceiver.send(reply)
+					continue
+				self.rxMsgIds.append(msg.msgId)
+				status = AwlSimMessage_REPLY.STAT_OK
+				if msg.msgId == AwlSimMessage.MSG_ID_AWLSRC and\
+				   msg.source.name == self.failSource:
+					status = AwlSimMessage_REPLY.STAT_FAIL
+				xceiver.send(AwlSimMessage_REPLY.make(msg, status))
+		except (TransferError, AwlSimError) as e:
+			pass
+		finally:
+			xceiver.shutdown()
+			self.sock.close()
+
+class Test_ClientDownloadPipeline(TestCase):
+	def __load(self, failSource):
+		server = _ReplyServer(failSource)
+		server.start()
+		client = AwlSimClient()
+		try:
+			client.connectToServer(host="127.0.0.1",
+					       port=server.port,
+					       timeout=20.0)
+			sources = [ AwlSource(name=name,
+					      sourceBytes=SRC_MAIN.encode("utf-8"))
+				    for name in ("a", "b", "c") ]
+			try:
+				client.loadProject(Project(None, awlSources=sources),
+						   build=True)
+			except AwlSimError as e:
+				pass
+		finally:
+			client.shutdown()
+		server.join(10.0)
+		return server.rxMsgIds
+
+	def test_build(self):
+		msgIds = self.__load(failSource=None)
+		self.assertEqual(msgIds.count(AwlSimMessage.MSG_ID_AWLSRC), 3)
+		self.assertEqual(msgIds[-1], AwlSimMessage.MSG_ID_BUILD)
+
+	def test_noBuildAfterFailedLoad(self):
+		# All loads are sent, but no BUILD.
+		msgIds = self.__load(failSource="b")
+		self.assertEqual(msgIds.count(AwlSimMessage.MSG_ID_AWLSRC), 3)
+		self.assertNotIn(AwlSimMessage.MSG_ID_BUILD, msgIds)
@@ -0,0 +1,68 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.histogram import * #+cimport
+from awlsim.common.exceptions import *
+
+
+class Test_Histogram(TestCase):
+	def test_empty(self):
+		h = Histogram()
+		self.assertEqual(h.count, 0)
+		self.assertEqual(h.percentile(50.0), 0)
+		self.assertEqual(h.summary(), (0, 0, 0, 0, 0, 0))
+
+	def test_exact(self):
+		h = Histogram()
+		for i in range(1, 11):
+			h.record(i)
+		self.assertEqual(h.count, 10)
+		self.assertEqual(h.minValue, 1)
+		self.assertEqual(h.maxValue, 10)
+		self.assertEqual(h.percentile(0.0), 1)
+		self.assertEqual(h.percentile(50.0), 5)
+		self.assertEqual(h.percentile(90.0), 9)
+		self.assertEqual(h.percentile(100.0), 10)
+
+	def test_precision(self):
+		h = Histogram()
+		for value in (100, 1000, 12345, 987654, 0x7FFFFFFF):
+			h.reset()
+			h.record(1)
+			h.record(value)
+			h.record(0xFFFFFFFF)
+			p = h.percentile(50.0)
+			self.assertTrue(value <= p <= value + (value // 16))
+
+	def test_tail(self):
+		h = Histogram()
+		for i in range(998):
+			h.record(1000)
+		h.record(40000)
+		h.record(50000)
+		summary = h.summary()
+		self.assertEqual(summary[0], 1000)
+		self.assertTrue(1000 <= summary[1] <= 1063)
+		self.assertTrue(1000 <= summary[3] <= 1063)
+		self.assertTrue(40000 <= summary[4] <= 40959)
+		self.assertEqual(summary[5], 50000)
+
+	def test_clamp(self):
+		h = Histogram()
+		h.record(-5)
+		h.record(0x1FFFFFFFF)
+		self.assertEqual(h.minValue, 0)
+		self.assertEqual(h.maxValue, 0xFFFFFFFF)
+		self.assertEqual(h.percentile(100.0), 0xFFFFFFFF)
+
+	def test_cumulative(self):
+		h = Histogram()
+		self.assertEqual(h.cumulativeCounts((10, 1000)), [0, 0])
+		for value in (5, 20, 20, 3000, 0xFFFFFFFF):
+			h.record(value)
+		self.assertEqual(h.sum, 5 + 20 + 20 + 3000 + 0xFFFFFFFF)
+		self.assertEqual(h.cumulativeCounts((4, 5, 31, 2000, 4000, 0xFFFFFFFF)),
+				 [0, 1, 3, 3, 4, 5])
+		h.reset()
+		self.assertEqual(h.sum, 0)
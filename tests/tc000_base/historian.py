@@ -0,0 +1,136 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.core.cpu import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+from awlsimhw_historian.main import *
+
+import os
+import tempfile
+
+
+PROGRAM = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: INT;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	DB1.DBW 0
+	+	1
+	T	DB1.DBW 0
+	L	EB 0
+	+	1
+	T	AB 0
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_Historian(TestCase):
+	def __makeSim(self, parameters):
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		sim.load(p.getParseTree())
+		sim.build()
+		hwClass = sim.loadHardwareModule("historian")
+		sim.registerHardwareClass(hwClass, parameters)
+		sim.startup()
+		return sim
+
+	def test_recordReplay(self):
+#@cy		cdef S7CPU cpu
+		fd, filename = tempfile.mkstemp(suffix=".awlhist")
+		os.close(fd)
+		try:
+			# Record the startup scan and 10 cycles with changing inputs.
+			sim = self.__makeSim({
+				"file"		: filename,
+				"ranges"	: "E0+1, A0+1, DB1.0+2",
+				"blockCycles"	: "4",
+			})
+			cpu = sim.getCPU()
+			for i in range(10):
+				cpu.storeInputRange(0, bytearray((i // 3,)))
+				sim.runCycle()
+			sim.shutdown()
+
+			reader = HistorianReader(filename)
+			reader.open()
+			self.assertEqual([ str(c) for c in reader.columns ],
+					 [ "E0+1", "A0+1", "DB1.0+2" ])
+			records = list(reader)
+			reader.close()
+			self.assertEqual([ r[0] for r in records ], list(range(11)))
+			self.assertEqual([ bytes(r[2][0]) for r in records[1:] ],
+					 [ bytes(bytearray((i // 3,))) for i in range(10) ])
+			self.assertEqual([ bytes(r[2][1]) for r in records[1:] ],
+					 [ bytes(bytearray((i // 3 + 1,))) for i in range(10) ])
+			self.assertEqual(bytes(records[0][2][1]), b"\x00")
+			self.assertEqual(bytes(records[10][2][2]), b"\x00\x0A")
+			self.assertEqual(sorted(r[1] for r in records),
+					 [ r[1] for r in records ])
+
+			# A truncated block at the end is ignored.
+			with open(filename, "r+b") as fd:
+				fd.truncate(os.path.getsize(filename) - 1)
+			reader.open()
+			self.assertEqual(len(list(reader)), 8)
+			reader.close()
+		finally:
+			os.unlink(filename)
+
+	def test_replay(self):
+#@cy		cdef S7CPU cpu
+		fd, filename = tempfile.mkstemp(suffix=".awlhist")
+		os.close(fd)
+		try:
+			writer = HistorianWriter(filename,
+				[ HistorianColumn.fromString("E0+1") ],
+				blockRecords=2)
+			writer.open()
+			for i in range(5):
+				writer.append(i, i * 0.001, [ bytearray((i * 10,)) ])
+			writer.close()
+
+			# Replay the inputs until the end of the trace.
+			# The first record is applied to the startup scan.
+			sim = self.__makeSim({
+				"file"		: filename,
+				"mode"		: "replay",
+			})
+			cpu = sim.getCPU()
+			outputs = []
+			try:
+				while True:
+					sim.runCycle()
+					outputs.append(cpu.fetchOutputRange(0, 1)[0])
+			except MaintenanceRequest as e:
+				self.assertEqual(e.requestType,
+						 MaintenanceRequest.TYPE_SHUTDOWN)
+			self.assertEqual(outputs, [ 11, 21, 31, 41 ])
+			sim.shutdown()
+		finally:
+			os.unlink(filename)
+
+	def test_params(self):
+		self.assertRaises(AwlSimError, HistorianColumn.fromString, "X0+1")
+		self.assertRaises(AwlSimError, HistorianColumn.fromString, "E0")
+		self.assertRaises(AwlSimError, HistorianColumn.fromString, "E0+0")
+		self.assertRaises(AwlSimError, HistorianColumn.fromString, "M1.0+1")
+		self.assertEqual(str(HistorianColumn.fromString(" db2.4 + 8 ")),
+				 "DB2.4+8")
+		self.assertRaises(AwlSimError, self.__makeSim, {
+			"file"		: "/nonexistent/dir/trace",
+			"ranges"	: "E0+1",
+		})
+		self.assertRaises(AwlSimError, self.__makeSim, {
+			"file"		: "/nonexistent/dir/trace",
+			"ranges"	: "DB5.0+1",
+		})
@@ -0,0 +1,202 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.core.cpu import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+
+
+PROGRAM = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: INT;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+
+FUNCTION_BLOCK FB 1
+	VAR
+		CALLS	: INT;
+	END_VAR
+BEGIN
+	L	#CALLS
+	+	1
+	T	#CALLS
+END_FUNCTION_BLOCK
+
+DATA_BLOCK DB 2
+	FB 1
+BEGIN
+END_DATA_BLOCK
+
+FUNCTION FC 1 : VOID
+BEGIN
+	L	DB1.DBW 0
+	+	1
+	T	DB1.DBW 0
+END_FUNCTION
+
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	CALL	FC 1
+	CALL	FB 1, DB 2
+END_ORGANIZATION_BLOCK
+"""
+
+FC1_NEW = """
+FUNCTION FC 1 : VOID
+BEGIN
+	L	DB1.DBW 0
+	+	10
+	T	DB1.DBW 0
+END_FUNCTION
+"""
+
+FB1_NEW = """
+FUNCTION_BLOCK FB 1
+	VAR
+		CALLS	: INT;
+	END_VAR
+BEGIN
+	L	#CALLS
+	+	100
+	T	#CALLS
+END_FUNCTION_BLOCK
+"""
+
+DB1_NEW = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: INT := 1000;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+"""
+
+DB1_CHANGED = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: INT;
+		EXTRA	: INT;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+"""
+
+FC1_BROKEN = """
+FUNCTION FC 1 : VOID
+BEGIN
+	CALL	FC 99
+END_FUNCTION
+"""
+
+FC1_NEWINTF = """
+FUNCTION FC 1 : VOID
+	VAR_INPUT
+		X	: INT;
+	END_VAR
+BEGIN
+END_FUNCTION
+"""
+
+OB35_NEW = """
+ORGANIZATION_BLOCK OB 35
+BEGIN
+	L	QW 2
+	+	1
+	T	QW 2
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_HotBuild(TestCase):
+	def __load(self, sim, text):
+		p = AwlParser()
+		p.parseText(text)
+		sim.load(p.getParseTree())
+
+	def __readWord(self, cpu, dbNumber): #@nocy
+#@cy	def __readWord(self, S7CPU cpu, dbNumber):
+		data = cpu.getDB(dbNumber).structInstance.memory.getDataBytesRange(0, 2)
+		return (data[0] << 8) | data[1]
+
+	def test_hotBuild(self):
+#@cy		cdef S7CPU cpu
+		sim = AwlSim()
+		sim.reset()
+		self.__load(sim, PROGRAM)
+		sim.build()
+		sim.startup()
+		cpu = sim.getCPU()
+		sim.step(nrCycles=3)
+		self.assertEqual(self.__readWord(cpu, 1), 3)
+		self.assertEqual(self.__readWord(cpu, 2), 3)
+		ob1 = cpu.getOB(1)
+		db1 = cpu.getDB(1)
+
+		# Swap FC 1 and FB 1. The other blocks are not rebuilt.
+		self.__load(sim, FC1_NEW + FB1_NEW)
+		self.assertTrue(sim.hotBuild())
+		self.assertIs(cpu.getOB(1), ob1)
+		self.assertIs(cpu.getDB(1), db1)
+		self.assertIs(cpu.getDB(2).codeBlock, cpu.getFB(1))
+		sim.runCycle()
+		self.assertEqual(self.__readWord(cpu, 1), 13)
+		self.assertEqual(self.__readWord(cpu, 2), 103)
+
+		# A DB with unchanged layout keeps its contents.
+		self.__load(sim, DB1_NEW)
+		self.assertTrue(sim.hotBuild())
+		self.assertIsNot(cpu.getDB(1), db1)
+		self.assertEqual(self.__readWord(cpu, 1), 13)
+		sim.runCycle()
+		self.assertEqual(self.__readWord(cpu, 1), 23)
+
+		# A translation error does not modify the program.
+		fc1 = cpu.getFC(1)
+		self.__load(sim, FC1_BROKEN)
+		self.assertRaises(AwlSimError, sim.hotBuild)
+		self.assertIs(cpu.getFC(1), fc1)
+		self.assertTrue(sim.hotBuild())
+		sim.runCycle()
+		self.assertEqual(self.__readWord(cpu, 1), 33)
+
+		# A DB layout change requires a full build.
+		# The blocks stay pending for it.
+		db1 = cpu.getDB(1)
+		self.__load(sim, DB1_CHANGED)
+		self.assertFalse(sim.hotBuild())
+		self.assertIs(cpu.getDB(1), db1)
+		sim.runCycle()
+		self.assertEqual(self.__readWord(cpu, 1), 43)
+		sim.build()
+		self.assertEqual(self.__readWord(cpu, 1), 0)
+
+		# A code block interface change requires a full build.
+		self.__load(sim, FC1_NEWINTF)
+		self.assertFalse(sim.hotBuild())
+		self.assertIs(cpu.getFC(1), fc1)
+		sim.shutdown()
+
+	def test_newInterruptOB(self):
+#@cy		cdef S7CPU cpu
+		sim = AwlSim()
+		sim.reset()
+		self.__load(sim, PROGRAM)
+		sim.build()
+		cpu = sim.getCPU()
+		conf = cpu.getConf()
+		conf.setVirtTimeEn(True)
+		conf.setVirtTimeCycleStepUs(10000)
+		conf.setCyclicInt(35, 20)
+		sim.startup()
+		sim.step(nrCycles=5)
+
+		# A cyclic interrupt OB added while running is started.
+		self.__load(sim, OB35_NEW)
+		self.assertTrue(sim.hotBuild())
+		sim.step(nrCycles=10)
+		count = cpu.fetchOutputRange(2, 2)
+		self.assertTrue(4 <= ((count[0] << 8) | count[1]) <= 5)
+		sim.shutdown()
@@ -0,0 +1,97 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.core.insntrace import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+
+
+PROGRAM = """
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	MW 0
+	+	1
+	T	MW 0
+	L	MW 0
+	L	3
+	==I
+	SPBN	end
+	CALL	FC 1
+end:	NOP	0
+END_ORGANIZATION_BLOCK
+
+FUNCTION FC 1 : VOID
+BEGIN
+	L	DW#16#12345678
+	AUF	DB 99
+END_FUNCTION
+"""
+
+class Test_InsnTrace(TestCase):
+	def __makeSim(self, depth):
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		sim.getCPU().getConf().setInsnTraceDepth(depth)
+		sim.load(p.getParseTree())
+		sim.build()
+		sim.startup()
+		return sim
+
+	def test_depth(self):
+		for depth in (0, -1, InsnTrace.MAX_DEPTH + 1):
+			self.assertRaises(AwlSimError, InsnTrace, depth)
+		trace = InsnTrace(4)
+		self.assertFalse(trace.haveAnyMeasurements)
+		self.assertEqual(trace.getEntries(), [])
+		self.assertEqual(trace.dump(), "")
+
+	def test_ring(self):
+		sim = self.__makeSim(5)
+		cpu = sim.getCPU()
+		trace = cpu.getInsnTrace()
+		sim.runCycle()
+		# One cycle executes 8 instructions of OB 1 plus the implicit BE.
+		self.assertEqual(trace.count, 9)
+		entries = trace.getEntries()
+		self.assertEqual([ e["seq"] for e in entries ], [ 4, 5, 6, 7, 8 ])
+		self.assertEqual([ e["ip"] for e in entries ], [ 4, 5, 6, 8, 9 ])
+		self.assertTrue(all(e["blockType"] == InsnTrace.BLOCKTYPE_OB
+				    for e in entries))
+		# The state is recorded before the instruction runs.
+		self.assertEqual(entries[0]["accu1"], 1)
+		self.assertEqual(entries[1]["accu1"], 3)
+		self.assertEqual(entries[1]["accu2"], 1)
+		trace.reset()
+		self.assertFalse(trace.haveAnyMeasurements)
+		sim.runCycle()
+		self.assertEqual(len(trace.getEntries()), 5)
+		# Disabling the trace removes the recorder.
+		cpu.getConf().setInsnTraceDepth(0)
+		self.assertIsNone(cpu.getInsnTrace())
+		sim.shutdown()
+
+	def test_error_report(self):
+		sim = self.__makeSim(4)
+		sim.runCycle()
+		sim.runCycle()
+		try:
+			sim.runCycle()
+		except AwlSimError as e:
+			traceStr = e.getInsnTraceStr()
+			report = e.getReport(verbose=True)
+		else:
+			self.fail("No exception raised")
+		self.assertIn("Instruction trace", traceStr)
+		self.assertIn("Instruction trace", report)
+		lines = traceStr.splitlines()
+		self.assertIn("CALL FC 1", lines[-3])
+		self.assertIn("FC 1", lines[-1])
+		self.assertIn("AUF DB 99", lines[-1])
+		self.assertIn("12345678", lines[-1])
+		csv = sim.getCPU().getInsnTrace().dumpCSV(sim.getCPU())
+		self.assertTrue(csv.splitlines()[-1].startswith("27;FC;1;1;"))
+		sim.shutdown()
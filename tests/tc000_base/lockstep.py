@@ -0,0 +1,100 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.core.cpu import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+from awlsim.coreserver.memarea import *
+from awlsim.coreserver.messages import *
+
+
+# The plant model feeds AW 0 back to EW 0.
+# The program increments it and stores the TIME_TCK to MD 0.
+PROGRAM = """
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	EW 0
+	+	1
+	T	AW 0
+	CALL SFC 64 (
+		RET_VAL	:= MD 0,
+	)
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_Lockstep(TestCase):
+	def __makeSim(self):
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		sim.load(p.getParseTree())
+		sim.build()
+		sim.startup()
+		return sim
+
+	def test_step(self):
+#@cy		cdef S7CPU cpu
+		sim = self.__makeSim()
+		cpu = sim.getCPU()
+		conf = cpu.getConf()
+		# With virtual time the clock does not advance between steps.
+		conf.setVirtTimeEn(True)
+		conf.setVirtTimeCycleStepUs(5000)
+		startTime = None
+		for i in range(20):
+			outputs = cpu.fetchOutputRange(0, 2)
+			cpu.storeInputRange(0, bytearray(outputs))
+			sim.step(nrCycles=1, timeStep=0.1)
+			if startTime is None:
+				startTime = cpu.now
+		self.assertEqual(bytes(cpu.fetchOutputRange(0, 2)), b"\x00\x14")
+		elapsed = cpu.now - startTime
+		self.assertTrue(1.9 <= elapsed < 1.91)
+		# The time step only applies during the step.
+		self.assertTrue(conf.virtTimeEn)
+		self.assertEqual(conf.virtTimeCycleStepUs, 5000)
+		# Without plant model feedback the inputs do not change.
+		sim.step(nrCycles=5)
+		self.assertEqual(bytes(cpu.fetchOutputRange(0, 2)), b"\x00\x14")
+		sim.shutdown()
+
+	def test_stepRealTime(self):
+		sim = self.__makeSim()
+		cpu = sim.getCPU()
+		conf = cpu.getConf()
+		startTime = cpu.now
+		sim.step(nrCycles=10, timeStep=1.0)
+		# The CPU is switched back to real time.
+		# The clock continues from the virtual time.
+		self.assertFalse(cpu.virtualTimeEnabled())
+		self.assertFalse(conf.virtTimeEn)
+		self.assertEqual(conf.virtTimeCycleStepUs,
+				 conf.DEFAULT_VIRTTIME_CYCLESTEP_US)
+		self.assertTrue(cpu.now - startTime >= 10.0)
+		sim.shutdown()
+
+	def test_message(self):
+		msg = AwlSimMessage_STEP(0, 10, 0.25,
+			writeAreas=[ MemoryArea(MemoryArea.TYPE_E, 0, 0, 0, 3,
+						b"\x01\x02\x03") ],
+			readAreas=[ MemoryArea(MemoryArea.TYPE_A, 0, 0, 4, 2) ])
+		data = msg.toBytes()[AwlSimMessage.hdrStruct.size : ]
+		msg = AwlSimMessage_STEP.fromBytes(data)
+		self.assertEqual(msg.nrCycles, 10)
+		self.assertEqual(msg.timeStep, 0.25)
+		self.assertEqual(len(msg.writeAreas), 1)
+		self.assertEqual(msg.writeAreas[0].memType, MemoryArea.TYPE_E)
+		self.assertEqual(msg.writeAreas[0].data, b"\x01\x02\x03")
+		self.assertEqual(len(msg.readAreas), 1)
+		self.assertEqual(msg.readAreas[0].start, 4)
+		self.assertEqual(msg.readAreas[0].length, 2)
+
+		msg = AwlSimMessage_STEP(0, 1)
+		data = msg.toBytes()[AwlSimMessage.hdrStruct.size : ]
+		msg = AwlSimMessage_STEP.fromBytes(data)
+		self.assertTrue(msg.timeStep < 0.0)
+		self.assertEqual(msg.writeAreas, [])
+		self.assertEqual(msg.readAreas, [])
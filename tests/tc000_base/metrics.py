@@ -0,0 +1,76 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.coreserver.metrics import *
+
+import socket
+
+try:
+	from urllib.request import urlopen, Request
+except ImportError: #@nocov
+	from urllib2 import urlopen, Request
+
+
+class Test_Metrics(TestCase):
+	def __families(self):
+		return [
+			MetricFamily("awlsim_test_info", MetricFamily.TYPE_INFO,
+				     "Info").add(1, version='1"2'),
+			MetricFamily("awlsim_test_cycles", MetricFamily.TYPE_COUNTER,
+				     "Cycles").add(42),
+			MetricFamily("awlsim_test_load", MetricFamily.TYPE_GAUGE,
+				     "Load").add(0.5, cpu=0).add(True, cpu=1),
+			MetricFamily("awlsim_test_seconds", MetricFamily.TYPE_HISTOGRAM,
+				     "Hist").addHistogram((0.1, 1.0), (3, 4), 5, 2.5),
+		]
+
+	def test_text(self):
+		text = "".join(f.toText(True) for f in self.__families())
+		lines = text.splitlines()
+		self.assertIn("# TYPE awlsim_test_info info", lines)
+		self.assertIn('awlsim_test_info_info{version="1\\"2"} 1', lines)
+		self.assertIn("# TYPE awlsim_test_cycles counter", lines)
+		self.assertIn("awlsim_test_cycles_total 42", lines)
+		self.assertIn('awlsim_test_load{cpu="0"} 0.5', lines)
+		self.assertIn('awlsim_test_load{cpu="1"} 1', lines)
+		self.assertIn('awlsim_test_seconds_bucket{le="0.1"} 3', lines)
+		self.assertIn('awlsim_test_seconds_bucket{le="+Inf"} 5', lines)
+		self.assertIn("awlsim_test_seconds_count 5", lines)
+		self.assertIn("awlsim_test_seconds_sum 2.5", lines)
+
+		text = "".join(f.toText(False) for f in self.__families())
+		lines = text.splitlines()
+		self.assertIn("# TYPE awlsim_test_info_info gauge", lines)
+		self.assertIn("# TYPE awlsim_test_cycles_total counter", lines)
+		self.assertIn("awlsim_test_cycles_total 42", lines)
+
+	def test_http(self):
+		exporter = MetricsExporter("localhost", 0, socket.AF_INET)
+		nrRequests = [ 0 ]
+		def requestCallback():
+			nrRequests[0] += 1
+			exporter.setSnapshot(self.__families())
+		exporter.start(requestCallback)
+		try:
+			host, port = exporter.getAddress()
+			url = "http://%s:%d/metrics" % (host, port)
+			req = Request(url, headers={
+				"Accept" : "application/openmetrics-text; version=1.0.0",
+			})
+			resp = urlopen(req, timeout=10.0)
+			self.assertIn("application/openmetrics-text",
+				      resp.headers.get("Content-Type"))
+			body = resp.read().decode("UTF-8")
+			self.assertIn("awlsim_test_cycles_total 42\n", body)
+			self.assertTrue(body.endswith("# EOF\n"))
+
+			resp = urlopen(url, timeout=10.0)
+			self.assertIn("text/plain", resp.headers.get("Content-Type"))
+			body = resp.read().decode("UTF-8")
+			self.assertNotIn("# EOF", body)
+			self.assertEqual(nrRequests[0], 2)
+		finally:
+			exporter.stop()
+		self.assertFalse(exporter.running)
@@ -0,0 +1,58 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.coreserver.messages import *
+from awlsim.coreserver.multiserver import _ProxyConnection
+
+import socket
+
+
+class Test_MultiServerRouter(TestCase):
+	def setUp(self):
+		self.socks = socket.socketpair()
+		self.client = _ProxyConnection(self.socks[0], "client")
+		self.instance = _ProxyConnection(self.socks[1], "instance",
+						 instanceId=0,
+						 client=self.client)
+		self.client.instances[0] = self.instance
+
+	def tearDown(self):
+		for sock in self.socks:
+			sock.close()
+
+	def test_popMessage(self):
+		conn = self.client
+		msg = AwlSimMessage_PING().toBytes()
+		conn.rxBuf += msg[:-1]
+		self.assertIsNone(conn.popMessage())
+		conn.rxBuf += msg[-1:] + msg
+		self.assertEqual(conn.popMessage(), msg)
+		self.assertEqual(conn.popMessage(), msg)
+		self.assertIsNone(conn.popMessage())
+
+	def test_payloadLimit(self):
+		# A header that announces a huge payload is rejected
+		# before the payload is buffered.
+		conn = self.client
+		conn.rxBuf += AwlSimMessage_PING().toBytes(
+			AwlSimMessageTransceiver.MAX_RX_PAYLOAD_SIZE + 1)
+		self.assertRaises(TransferError, conn.popMessage)
+
+	def test_backpressure(self):
+		client, instance = self.client, self.instance
+		self.assertFalse(client.rxBlocked)
+		self.assertFalse(instance.rxBlocked)
+
+		# The instance does not read its messages.
+		instance.txBuf += bytearray(_ProxyConnection.TX_HIGH_WATER + 1)
+		self.assertTrue(client.rxBlocked)
+		self.assertFalse(instance.rxBlocked)
+		del instance.txBuf[:]
+		self.assertFalse(client.rxBlocked)
+
+		# The client does not read its messages.
+		client.txBuf += bytearray(_ProxyConnection.TX_HIGH_WATER + 1)
+		self.assertTrue(instance.rxBlocked)
+		self.assertTrue(client.rxBlocked)
@@ -0,0 +1,78 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.common.cpuconfig import *
+from awlsim.common.project import *
+from awlsim.core.obscheduler import *
+
+
+class Test_OBScheduler(TestCase):
+	def test_cyclic(self):
+		sched = OBScheduler()
+		sched.setCyclic(30, 0.0, 0.0)
+		sched.setCyclic(35, 0.1, 0.02)
+		sched.setCyclic(38, 0.01, 0.0)
+		sched.start(10.0, { 1, 30, 35, 38 })
+		self.assertFalse(sched.getInterrupt(30).active)
+		self.assertTrue(sched.getInterrupt(35).active)
+		self.assertFalse(sched.getInterrupt(36).active)
+		# OB 38 runs every 10 ms.
+		self.assertAlmostEqual(sched.nextDueTime(), 10.01)
+		self.assertIsNone(sched.popDue(10.0, OBScheduler.PRIORITY_OB1))
+		self.assertEqual(sched.popDue(10.01, OBScheduler.PRIORITY_OB1).obNumber, 38)
+		self.assertIsNone(sched.popDue(10.01, OBScheduler.PRIORITY_OB1))
+		# OB 35 (priority 12) is due, but OB 38 (priority 15) runs first.
+		# A running OB 38 is not preempted by OB 35.
+		self.assertEqual(sched.popDue(10.125, 15), None)
+		intr = sched.popDue(10.125, OBScheduler.PRIORITY_OB1)
+		self.assertEqual(intr.obNumber, 38)
+		# Missed periods are lost.
+		self.assertEqual(intr.lostCount, 10)
+		self.assertAlmostEqual(intr.dueTime, 10.13)
+		intr = sched.popDue(10.125, OBScheduler.PRIORITY_OB1)
+		self.assertEqual(intr.obNumber, 35)
+		self.assertAlmostEqual(intr.dueTime, 10.22)
+		sched.reset()
+		self.assertEqual(sched.nextDueTime(), OBScheduler.NEVER)
+
+	def test_delay(self):
+		sched = OBScheduler()
+		self.assertEqual(sched.startDelay(24, 10, 0, 0.0), OBScheduler.E_OBNR)
+		self.assertEqual(sched.startDelay(20, 0, 0, 0.0), OBScheduler.E_DTIME)
+		self.assertEqual(sched.startDelay(20, 60001, 0, 0.0), OBScheduler.E_DTIME)
+		self.assertEqual(sched.cancelDelay(20), OBScheduler.E_NOTSTARTED)
+		self.assertEqual(sched.startDelay(20, 50, 0x1234, 1.0), 0)
+		self.assertEqual(sched.startDelay(23, 10, 0, 1.0), 0)
+		self.assertEqual(sched.queryDelay(20, True),
+				 (0, OBScheduler.STATUS_ACTIVE | OBScheduler.STATUS_LOADED))
+		self.assertEqual(sched.cancelDelay(23), 0)
+		self.assertEqual(sched.queryDelay(23, False), (0, 0))
+		# Time-delay interrupts survive the start of the cyclic interrupts.
+		sched.start(1.0, set())
+		self.assertAlmostEqual(sched.nextDueTime(), 1.05)
+		intr = sched.popDue(2.0, OBScheduler.PRIORITY_OB1)
+		self.assertEqual(intr.obNumber, 20)
+		self.assertEqual(intr.sign, 0x1234)
+		self.assertFalse(intr.active)
+		self.assertIsNone(sched.popDue(2.0, OBScheduler.PRIORITY_OB1))
+
+	def test_config(self):
+		conf = S7CPUConfig()
+		# The cyclic interrupts are disabled by default.
+		for obNumber in conf.CYCLIC_INT_OBS:
+			self.assertEqual(conf.getCyclicIntPeriodMs(obNumber), 0)
+		self.assertRaises(AwlSimError, conf.setCyclicInt, 39, 100)
+		conf.setCyclicInt(35, 20, 50)
+		self.assertEqual(conf.getCyclicIntPhaseMs(35), 19)
+		conf.setCyclicInt(36, 0, 0)
+		project = Project(None)
+		project.getCpuConf().assignFrom(conf)
+		projectFile = "/tmp/obscheduler.awlpro"
+		project = Project.fromText(project.toText(projectFile), projectFile)
+		newConf = project.getCpuConf()
+		self.assertEqual(newConf.getCyclicIntPeriodMs(35), 20)
+		self.assertEqual(newConf.getCyclicIntPhaseMs(35), 19)
+		self.assertEqual(newConf.getCyclicIntPeriodMs(36), 0)
+		self.assertEqual(newConf.getCyclicIntPeriodMs(30), 0)
@@ -0,0 +1,72 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.common.monotonic import * #+cimport
+from awlsim.core.main import * #+cimport
+from awlsim.core.cpu import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+
+import time
+
+
+# Count the cycles in AW 0.
+PROGRAM = """
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	AW 0
+	+	1
+	T	AW 0
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_PollCycle(TestCase):
+	def __makeSim(self, cycleTimeTarget):
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		sim.load(p.getParseTree())
+		sim.build()
+		cpu = sim.getCPU()
+		cpu.setCycleTimeTarget(cycleTimeTarget)
+		cpu.enableCycleTimeDeadline(True)
+		sim.startup()
+		return sim
+
+	@staticmethod
+	def __cycleCount(sim):
+#@cy		cdef S7CPU cpu
+		cpu = sim.getCPU()
+		data = cpu.fetchOutputRange(0, 2)
+		return (data[0] << 8) | data[1]
+
+	def test_noPadding(self):
+		sim = self.__makeSim(0.0)
+		for i in range(10):
+			self.assertEqual(sim.pollCycle(), 0.0)
+		self.assertEqual(self.__cycleCount(sim), 10)
+		sim.shutdown()
+
+	def test_interleaved(self):
+		# Two CPUs with a cycle time target run in one thread.
+		# Polling never sleeps the cycle padding.
+		sims = [ self.__makeSim(0.02), self.__makeSim(0.02) ]
+		end = monotonic_time() + 0.5
+		while True:
+			now = monotonic_time()
+			if now >= end:
+				break
+			nextTime = end
+			for sim in sims:
+				begin = monotonic_time()
+				nextTime = min(nextTime, sim.pollCycle() or now)
+				self.assertTrue(monotonic_time() - begin < 0.015)
+			sleepTime = nextTime - monotonic_time()
+			if sleepTime > 0.0:
+				time.sleep(sleepTime)
+		for sim in sims:
+			self.assertTrue(15 <= self.__cycleCount(sim) <= 30,
+					"%d cycles" % self.__cycleCount(sim))
+			sim.shutdown()
@@ -0,0 +1,193 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.common.cpuconfig import *
+from awlsim.common.project import *
+from awlsim.core.main import * #+cimport
+from awlsim.core.cpu import * #+cimport
+from awlsim.core.retentive import *
+from awlsim.awlcompiler.tokenizer import *
+from awlsim.coreserver.messages import *
+
+import os
+import tempfile
+import time
+
+
+PROGRAM = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: DINT;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+
+DATA_BLOCK DB 2
+	STRUCT
+		COUNT	: DINT;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	DB1.DBD 0
+	+	L#1
+	T	DB1.DBD 0
+	T	DB2.DBD 0
+	T	MD 0
+	T	MD 4
+
+	SET
+	ZV	Z 1
+	CLR
+	ZV	Z 1
+	ZV	Z 2
+	SET
+	ZV	Z 2
+END_ORGANIZATION_BLOCK
+"""
+
+PROGRAM_NONRETENTIVE = """
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	MW 100
+	+	1
+	T	MW 100
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_Retentive(TestCase):
+	def setUp(self):
+		fd, self.filename = tempfile.mkstemp(prefix="awlsim-retentive-")
+		os.close(fd)
+		os.unlink(self.filename)
+
+	def tearDown(self):
+		if os.path.exists(self.filename):
+			os.unlink(self.filename)
+
+	def __run(self, nrCycles):
+#@cy		cdef S7CPU cpu
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		sim.load(p.getParseTree())
+		sim.build()
+		cpu = sim.getCPU()
+		cpu.getConf().setRetentive(4, 0, 2, [1])
+		cpu.setRetentiveFile(self.filename)
+		sim.startup()
+		sim.step(nrCycles=nrCycles)
+		ret = (bytes(cpu.getDB(1).structInstance.memory.getDataBytes()),
+		       bytes(cpu.getDB(2).structInstance.memory.getDataBytes()),
+		       bytes(cpu.flags.getDataBytesRange(0, 8)),
+		       cpu.counters[1].counter,
+		       cpu.counters[2].counter)
+		sim.shutdown()
+		return ret
+
+	def test_cpu(self):
+		self.assertEqual(self.__run(3), (b"\x00\x00\x00\x03",
+						 b"\x00\x00\x00\x03",
+						 b"\x00\x00\x00\x03\x00\x00\x00\x03",
+						 3, 3))
+		# DB 1, MD 0 and Z 1 are retentive.
+		self.assertEqual(self.__run(2), (b"\x00\x00\x00\x05",
+						 b"\x00\x00\x00\x05",
+						 b"\x00\x00\x00\x05\x00\x00\x00\x05",
+						 5, 2))
+
+	def __cycleTime(self, nrTimersCounters):
+		p = AwlParser()
+		p.parseText(PROGRAM_NONRETENTIVE)
+		sim = AwlSim()
+		sim.reset()
+		cpu = sim.getCPU()
+		cpu.getSpecs().setNrTimers(0xFFFF)
+		cpu.getSpecs().setNrCounters(0xFFFF)
+		sim.load(p.getParseTree())
+		sim.build()
+		cpu.getConf().setRetentive(0, nrTimersCounters,
+					   nrTimersCounters, [])
+		cpu.setRetentiveFile(self.filename)
+		sim.startup()
+		best = None
+		for i in range(5):
+			begin = time.time()
+			sim.step(nrCycles=100)
+			elapsed = time.time() - begin
+			best = elapsed if best is None else min(best, elapsed)
+		sim.shutdown()
+		os.unlink(self.filename)
+		return best
+
+	def test_commitCost(self):
+		# The commit at the end of each cycle
+		# does not scale with unused retentive slots.
+		small = self.__cycleTime(8)
+		big = self.__cycleTime(0xFFFF)
+		self.assertTrue(big < small * 2.0 + 0.005,
+				"%f vs. %f" % (big, small))
+
+	def test_store(self):
+		store = RetentiveStore(self.filename)
+		self.assertIsNone(store.open("test", 4))
+		for value in (b"AAAA", b"BBBB", b"CCCC"):
+			image, offset = store.beginCommit()
+			image[offset : offset + 4] = value
+			store.endCommit()
+		store.close()
+		self.assertEqual(store.open("test", 4), b"CCCC")
+		# A commit that did not finish is discarded.
+		image, offset = store.beginCommit()
+		image[offset : offset + 4] = b"DDDD"
+		store.close()
+		self.assertEqual(store.open("test", 4), b"CCCC")
+		store.close()
+		# The layout does not match.
+		self.assertIsNone(store.open("other", 4))
+		store.close()
+		self.assertIsNone(store.open("test", 4))
+		store.close()
+
+	def test_config(self):
+		conf = S7CPUConfig()
+		self.assertFalse(conf.hasRetentive())
+		self.assertRaises(AwlSimError, conf.setRetentive, 0, 0, 0, [0])
+		conf.setRetentive(16, 8, 4, [3, 1, 3])
+		self.assertEqual(conf.retentiveDBs, (1, 3))
+		msg = AwlSimMessage_CPUCONF(conf)
+		data = msg.toBytes()[AwlSimMessage.hdrStruct.size : ]
+		newConf = AwlSimMessage_CPUCONF.fromBytes(data).cpuconf
+		project = Project(None)
+		project.getCpuConf().assignFrom(newConf)
+		projectFile = "/tmp/retentive.awlpro"
+		project = Project.fromText(project.toText(projectFile), projectFile)
+		newConf = project.getCpuConf()
+		self.assertTrue(newConf.hasRetentive())
+		self.assertEqual((newConf.retentiveFlagBytes,
+				  newConf.retentiveTimers,
+				  newConf.retentiveCounters,
+				  newConf.retentiveDBs), (16, 8, 4, (1, 3)))
+
+	def test_configCompat(self):
+		hdrLen = AwlSimMessage.hdrStruct.size
+		conf = S7CPUConfig()
+		conf.setRetentive(16, 8, 4, [])
+		# Without retentive DBs the payload has the old fixed size.
+		data = AwlSimMessage_CPUCONF(conf).toBytes()[hdrLen : ]
+		self.assertEqual(len(data), AwlSimMessage_CPUCONF.plStruct.size)
+		newConf = AwlSimMessage_CPUCONF.fromBytes(data).cpuconf
+		self.assertEqual(newConf.retentiveDBs, ())
+		# Trailing data after the DB numbers is ignored.
+		conf.setRetentive(16, 8, 4, [2])
+		data = AwlSimMessage_CPUCONF(conf).toBytes()[hdrLen : ]
+		newConf = AwlSimMessage_CPUCONF.fromBytes(data + b"\x00\x07").cpuconf
+		self.assertEqual(newConf.retentiveDBs, (2, ))
+		# Missing DB numbers are rejected.
+		self.assertRaises(TransferError,
+				  AwlSimMessage_CPUCONF.fromBytes, data[:-1])
@@ -0,0 +1,76 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+from awlsimhw_shm.main import *
+
+import os
+
+
+PROGRAM = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: DINT;
+		VALUE	: INT;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	DB1.DBD 0
+	+	L#1
+	T	DB1.DBD 0
+	L	EW 10
+	T	DB1.DBW 4
+	+	1
+	T	AW 20
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_Shm(TestCase):
+	def test_procimg(self):
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		sim.load(p.getParseTree())
+		sim.build()
+		hwClass = sim.loadHardwareModule("shm")
+		name = "test-%d" % os.getpid()
+		sim.registerHardwareClass(hwClass, {
+			"name"			: name,
+			"inputSize"		: "16",
+			"outputSize"		: "8",
+			"outputAddressBase"	: "16",
+			"dbs"			: "1",
+		})
+		sim.startup()
+
+		image = ShmProcessImage(name)
+		image.attach()
+		self.assertEqual((image.inputSize, image.outputSize), (16, 8))
+		self.assertEqual(sorted(image.dbAreas), [1])
+
+		image.writeInputs(b"\x12\x34", 10)
+		sim.step(nrCycles=2)
+		cycle, outputs = image.readOutputs()
+		self.assertEqual(outputs, b"\x00\x00\x00\x00\x12\x35\x00\x00")
+		cycle, data = image.readDB(1)
+		self.assertEqual(data, b"\x00\x00\x00\x02\x12\x34")
+		self.assertEqual(cycle, 3)
+		self.assertRaises(AwlSimError, image.readDB, 2)
+		self.assertRaises(AwlSimError, image.writeInputs, b"\x00\x00", 15)
+
+		# A reader gives up while the writer holds the lock.
+		image.beginInputWrite()
+		self.assertIsNone(image.readInputs())
+		image.endInputWrite()
+		self.assertEqual(image.readInputs()[10:12], b"\x12\x34")
+
+		sim.shutdown()
+		self.assertFalse(os.path.exists(image.path))
+		image.close()
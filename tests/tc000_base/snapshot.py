@@ -0,0 +1,123 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.core.cpu import * #+cimport
+from awlsim.core.snapshot import *
+from awlsim.common.sources import *
+from awlsim.awlcompiler.tokenizer import *
+
+import zlib
+
+
+PROGRAM = """
+DATA_BLOCK DB 1
+	STRUCT
+		COUNT	: DINT;
+		DATA	: ARRAY [1 .. %d] OF BYTE;
+	END_STRUCT;
+BEGIN
+END_DATA_BLOCK
+
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	DB1.DBD 0
+	+	L#1
+	T	DB1.DBD 0
+	T	MD 10
+
+	// T 1 runs for 10 cycles.
+	U	E 0.0
+	L	S5T#1S
+	SE	T 1
+	U	T 1
+	=	A 0.0
+	L	T 1
+	T	AW 2
+
+	// Z 2 counts the cycles.
+	UN	M 0.0
+	=	M 0.0
+	ZV	Z 2
+	L	Z 2
+	T	AW 4
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_Snapshot(TestCase):
+	def __makeSim(self, dbSize=4, program=PROGRAM):
+		source = AwlSource(name="snapshot",
+				   sourceBytes=(program % dbSize).encode("utf-8"))
+		p = AwlParser()
+		p.parseSource(source)
+		sim = AwlSim()
+		sim.reset()
+		sim.load(p.getParseTree(), sourceManager=SourceManager(source))
+		sim.build()
+		sim.startup()
+		return sim
+
+	def __step(self, sim, nrCycles):
+#@cy		cdef S7CPU cpu
+		cpu = sim.getCPU()
+		cpu.storeInputRange(0, bytearray(b"\x01"))
+		sim.step(nrCycles=nrCycles, timeStep=0.1)
+		return bytes(cpu.fetchOutputRange(0, 6))
+
+	def test_roundtrip(self):
+		sim = self.__makeSim()
+		self.__step(sim, 5)
+		data = sim.captureState().toBytes()
+		self.assertTrue(data.startswith(CPUStateSnapshot.MAGIC))
+		expected = self.__step(sim, 10)
+		self.assertEqual(expected[0:1], b"\x01")
+		sim.shutdown()
+
+		sim = self.__makeSim()
+		self.__step(sim, 1)
+		sim.restoreState(CPUStateSnapshot.fromBytes(data))
+		snapshot = sim.captureState()
+		self.assertEqual(snapshot.toBytes(), data)
+		self.assertEqual(self.__step(sim, 10), expected)
+		self.assertEqual(snapshot.dbs[1][0:4], b"\x00\x00\x00\x05")
+		sim.shutdown()
+
+		self.assertEqual(CPUStateSnapshot.fromBytes(
+			snapshot.toBytes(compress=False)).toBytes(), data)
+
+	def test_mismatch(self):
+		sim = self.__makeSim()
+		self.__step(sim, 1)
+		snapshot = sim.captureState()
+		sim.shutdown()
+		sim = self.__makeSim(dbSize=8)
+		self.assertRaises(AwlSimError, sim.restoreState, snapshot)
+		sim.shutdown()
+		# Same memory layout, but different code.
+		sim = self.__makeSim(program=PROGRAM.replace("L#1", "L#2"))
+		self.assertRaises(AwlSimError, sim.restoreState, snapshot)
+		sim.shutdown()
+		self.assertRaises(AwlSimError, CPUStateSnapshot.fromBytes, b"AWLSNAP")
+		self.assertRaises(AwlSimError, CPUStateSnapshot.fromBytes,
+				  snapshot.toBytes()[:-1])
+
+	def test_decompressLimit(self):
+		class SmallSnapshot(CPUStateSnapshot):
+			MAX_DECOMPRESSED_SIZE = 1024
+		def compressed(size):
+			payload = zlib.compress(
+				CPUStateSnapshot.sectHdrStruct.pack(0, size) +
+				bytes(bytearray(size)))
+			return CPUStateSnapshot.hdrStruct.pack(
+				CPUStateSnapshot.MAGIC,
+				CPUStateSnapshot.VERSION,
+				CPUStateSnapshot.FLG_ZLIB,
+				len(payload)) + payload
+		# Unknown sections are ignored.
+		SmallSnapshot.fromBytes(compressed(512))
+		# A payload that decompresses to more than the limit
+		# is rejected before it is fully decompressed.
+		self.assertRaises(AwlSimError, SmallSnapshot.fromBytes,
+				  compressed(1024 * 1024))
@@ -0,0 +1,97 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.core.cpu import * #+cimport
+from awlsim.core.memory import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+
+
+PROGRAM = """
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	L	W#16#1234
+	T	MW 100000
+	SET
+	S	M 200000.3
+	L	DW#16#AABBCCDD
+	T	MD 4094
+	L	0
+	T	MD 600000
+	R	M 700000.0
+
+	L	MD 4094
+	T	AD 0
+	L	MW 300000
+	T	AW 4
+	U	M 200000.3
+	=	A 6.0
+	U	M 500000.0
+	=	A 6.1
+
+	U	E 0.0
+	L	S5T#1S
+	SE	T 1000
+	SET
+	ZV	Z 2000
+	L	Z 2000
+	T	AW 8
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_SparseAlloc(TestCase):
+	def __makeSim(self, nrFlags):
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		specs = sim.getCPU().getSpecs()
+		specs.setNrFlags(nrFlags)
+		specs.setNrTimers(0xFFFF)
+		specs.setNrCounters(0xFFFF)
+		sim.load(p.getParseTree())
+		sim.build()
+		sim.startup()
+		return sim
+
+	def test_sparse(self):
+#@cy		cdef S7CPU cpu
+		sim = self.__makeSim(0x100000)
+		cpu = sim.getCPU()
+		self.assertTrue(isinstance(cpu.flags, AwlSparseMemory))
+		sim.runCycle()
+		self.assertEqual(bytes(cpu.fetchOutputRange(0, 10)),
+				 b"\xAA\xBB\xCC\xDD\x00\x00\x01\x00\x00\x01")
+		flags = cpu.flags
+		self.assertEqual(len(flags), 0x100000)
+		self.assertEqual(bytes(flags.getDataBytesRange(100000, 2)), b"\x12\x34")
+		self.assertEqual(bytes(flags.getDataBytesRange(200000, 1)), b"\x08")
+		self.assertEqual(bytes(flags.getDataBytesRange(0x100000 - 1, 4)), b"\x00")
+		stats = cpu.getAllocStats()
+		self.assertEqual(stats["timers"], (1, 0xFFFF))
+		self.assertEqual(stats["counters"], (1, 0xFFFF))
+		# Zero stores do not allocate pages.
+		self.assertEqual(stats["flag_pages"], (4, 256))
+		data = flags.getDataBytes()
+		self.assertEqual(len(data), 0x100000)
+		self.assertEqual(data[4094:4098], b"\xAA\xBB\xCC\xDD")
+		flags.setDataBytes(data)
+		self.assertEqual(flags.getNrPages(), 4)
+		self.assertEqual(bytes(flags.getDataBytesRange(4094, 4)), b"\xAA\xBB\xCC\xDD")
+		sim.runCycle()
+		# No positive edge, so the counter does not count again.
+		self.assertEqual(bytes(cpu.fetchOutputRange(8, 2)), b"\x00\x01")
+		sim.reset()
+		self.assertEqual(cpu.getAllocStats()["timers"], (0, 0xFFFF))
+		sim.shutdown()
+
+	def test_dense(self):
+		sim = self.__makeSim(0x100000)
+		cpu = sim.getCPU()
+		cpu.getSpecs().setNrFlags(0x10000)
+		self.assertFalse(isinstance(cpu.flags, AwlSparseMemory))
+		self.assertRaises(AwlSimError, sim.runCycle)
+		self.assertEqual(cpu.getAllocStats()["flag_pages"], (16, 16))
+		sim.shutdown()
@@ -0,0 +1,89 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.core.main import * #+cimport
+from awlsim.core.cpu import * #+cimport
+from awlsim.core.timers import * #+cimport
+from awlsim.awlcompiler.tokenizer import *
+
+
+# E 0.0 starts the on-delay timer T 1.
+# Each positive edge of E 0.1 retriggers the extended pulse timer T 2.
+PROGRAM = """
+ORGANIZATION_BLOCK OB 1
+BEGIN
+	U	E 0.0
+	L	S5T#500MS
+	SE	T 1
+	U	T 1
+	=	A 0.0
+
+	U	E 0.1
+	L	S5T#10S
+	SV	T 2
+	U	T 2
+	=	A 0.1
+END_ORGANIZATION_BLOCK
+"""
+
+class Test_TimerService(TestCase):
+	def __makeSim(self):
+		p = AwlParser()
+		p.parseText(PROGRAM)
+		sim = AwlSim()
+		sim.reset()
+		sim.load(p.getParseTree())
+		sim.build()
+		sim.startup()
+		return sim
+
+	def __step(self, sim, inputs, timeStep=0.1):
+#@cy		cdef S7CPU cpu
+		cpu = sim.getCPU()
+		cpu.storeInputRange(0, bytearray((inputs, )))
+		sim.step(nrCycles=1, timeStep=timeStep)
+		return bytearray(cpu.fetchOutputRange(0, 1))[0]
+
+	def test_deadline(self):
+		sim = self.__makeSim()
+		cpu = sim.getCPU()
+		service = cpu.timerService
+		for i in range(3):
+			self.assertEqual(self.__step(sim, 0x01), 0)
+		self.assertTrue(cpu.timers[1].running)
+		self.assertEqual(len(service.heap), 1)
+		for i in range(5):
+			self.__step(sim, 0x01)
+		self.assertEqual(self.__step(sim, 0x01), 0x01)
+		self.assertFalse(cpu.timers[1].running)
+		self.assertEqual(len(service.heap), 0)
+		self.assertEqual(service.nextDeadline, float("inf"))
+		# Stopping the timer leaves a stale entry behind.
+		self.__step(sim, 0x00)
+		self.__step(sim, 0x01)
+		self.assertEqual(self.__step(sim, 0x00), 0)
+		self.assertFalse(cpu.timers[1].running)
+		self.assertEqual(service.nrStale, 1)
+		self.__step(sim, 0x00, 1.0)
+		self.assertEqual(len(service.heap), 0)
+		self.assertEqual(service.nrStale, 0)
+		sim.shutdown()
+
+	def test_retrigger(self):
+		sim = self.__makeSim()
+		cpu = sim.getCPU()
+		service = cpu.timerService
+		for i in range(500):
+			self.assertEqual(self.__step(sim, 0x02 if i % 2 else 0x00, 0.01),
+					 0x02 if i else 0x00)
+		# The stale entries of the retriggered timer are compacted.
+		self.assertTrue(len(service.heap) <= TimerService.COMPACT_MIN * 2)
+		self.assertTrue(cpu.timers[2].running)
+		# The outputs are fetched before the time step.
+		self.assertEqual(self.__step(sim, 0x00, 9.0), 0x02)
+		self.assertEqual(self.__step(sim, 0x00, 2.0), 0x02)
+		self.assertEqual(self.__step(sim, 0x00), 0x00)
+		self.assertEqual(len(service.heap), 0)
+		sim.shutdown()
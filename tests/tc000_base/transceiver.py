@@ -0,0 +1,142 @@
+from __future__ import division, absolute_import, print_function, unicode_literals
+from awlsim_tstlib import *
+initTest(__file__)
+
+from awlsim.common.exceptions import *
+from awlsim.common.sources import *
+from awlsim.coreclient.client import *
+from awlsim.coreserver.messages import *
+
+import socket
+import zlib
+
+
+# A big source that compresses well.
+BIG_SOURCE = "".join(
+	"FUNCTION FC %d : VOID\nBEGIN\n\tL\tMW %d\n\tT\tMW %d\nEND_FUNCTION\n\n" % (
+	i, i * 2, i * 2 + 2)
+	for i in range(1, 1000))
+
+
+class Test_Transceiver(TestCase):
+	def __makePair(self):
+		a, b = socket.socketpair()
+		return (AwlSimMessageTransceiver(a, "a"),
+			AwlSimMessageTransceiver(b, "b"))
+
+	def __receive(self, xceiver):
+		for i in range(100):
+			msg = xceiver.receive(timeout=0.1)
+			if msg:
+				return msg
+		self.fail("No message received")
+
+	def test_roundtrip(self):
+		tx, rx = self.__makePair()
+		try:
+			tx.send(AwlSimMessage_PING())
+			msg = self.__receive(rx)
+			self.assertEqual(msg.msgId, AwlSimMessage.MSG_ID_PING)
+		finally:
+			tx.shutdown()
+			rx.shutdown()
+
+	def test_payloadLimit(self):
+		tx, rx = self.__makePair()
+		try:
+			# A header that announces a huge payload is rejected
+			# before the receive buffer is allocated.
+			hdr = AwlSimMessage_PING().toBytes(
+				AwlSimMessageTransceiver.MAX_RX_PAYLOAD_SIZE + 1)
+			tx.sock.sendall(hdr)
+			self.assertRaises(AwlSimError, self.__receive, rx)
+		finally:
+			tx.shutdown()
+			rx.shutdown()
+
+	def __sendSource(self, tx, rx):
+		source = AwlSource(name="big",
+				   sourceBytes=BIG_SOURCE.encode("utf-8"))
+		msgLen = len(AwlSimMessage_AWLSRC(source).toBytes())
+		tx.send(AwlSimMessage_AWLSRC(source))
+		msg = self.__receive(rx)
+		self.assertEqual(msg.msgId, AwlSimMessage.MSG_ID_AWLSRC)
+		self.assertEqual(msg.source.name, "big")
+		self.assertEqual(msg.source.sourceBytes, source.sourceBytes)
+		self.assertFalse(msg.hdrFlags & AwlSimMessage.HDR_FLAG_ZLIB)
+		return msgLen
+
+	def test_compressedRoundtrip(self):
+		tx, rx = self.__makePair()
+		try:
+			tx.enableCompression()
+			msgLen = self.__sendSource(tx, rx)
+			self.assertTrue(msgLen > AwlSimMessageTransceiver.COMPRESS_THRES)
+			self.assertTrue(rx.rxByteCount < msgLen // 4)
+		finally:
+			tx.shutdown()
+			rx.shutdown()
+
+	def test_uncompressedFallback(self):
+		# The peer did not announce HDR_FLAG_CAP_ZLIB.
+		# Compression is not enabled.
+		tx, rx = self.__makePair()
+		try:
+			msgLen = self.__sendSource(tx, rx)
+			self.assertEqual(rx.rxByteCount, msgLen)
+		finally:
+			tx.shutdown()
+			rx.shutdown()
+
+	def __ping(self, port, capZlib):
+		sock = socket.create_connection(("localhost", port), 20.0)
+		xceiver = AwlSimMessageTransceiver(sock, "server")
+		try:
+			ping = AwlSimMessage_PING()
+			if capZlib:
+				ping.hdrFlags |= AwlSimMessage.HDR_FLAG_CAP_ZLIB
+			xceiver.send(ping)
+			msg = self.__receive(xceiver)
+			self.assertEqual(msg.msgId, AwlSimMessage.MSG_ID_PONG)
+			return bool(msg.hdrFlags & AwlSimMessage.HDR_FLAG_CAP_ZLIB)
+		finally:
+			xceiver.shutdown()
+
+	def test_negotiation(self):
+		client = AwlSimClient()
+		try:
+			client.spawnServer(listenHost="localhost",
+					   listenPort=range(32251, 32351))
+			port = client.serverProcessPort
+			# Both ways work with the client.
+			for compress in (True, False):
+				client.connectToServer(host="localhost",
+						       port=port,
+						       timeout=20.0,
+						       compress=compress)
+				client.loadAwlSource(AwlSource(name="big",
+					sourceBytes=BIG_SOURCE.encode("utf-8")))
+				client.shutdownTransceiver()
+			# The server only announces compression,
+			# if the client announced it.
+			self.assertTrue(self.__ping(port, True))
+			self.assertFalse(self.__ping(port, False))
+		finally:
+			client.shutdown()
+
+	def test_decompressLimit(self):
+		tx, rx = self.__makePair()
+		try:
+			rx.MAX_DECOMPRESSED_SIZE = 1024 * 64
+			payload = zlib.compress(bytes(bytearray(rx.MAX_DECOMPRESSED_SIZE + 1)))
+			hdr = AwlSimMessage.hdrStruct.pack(
+				AwlSimMessage.HDR_MAGIC,
+				AwlSimMessage.MSG_ID_AWLSRC,
+				AwlSimMessage.HDR_FLAG_ZLIB,
+				0, 0, 0, 0, 0, 0, 0,
+				len(payload))
+			tx.sock.sendall(hdr + payload)
+			self.assertRaises(AwlSimError, self.__receive, rx)
+		finally:
+			tx.shutdown()
+			rx.shutdown()
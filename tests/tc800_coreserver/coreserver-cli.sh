@@ -15,6 +15,11 @@ sh_test()
 			--connect-to localhost:$(get_port)
 	done
 
+	infomsg "----- Testing Unix domain socket transport"
+	run_test "$interpreter" "$basedir/tc000_base/EXAMPLE.awlpro" \
+		--spawn-backend --interpreter "$interpreter" \
+		--connect-to localhost:$(get_port) --unix-socket
+
 	infomsg "----- Testing MemoryArea accesses"
 	run_test "$interpreter" "$basedir/tc000_base/EXAMPLE.awlpro" \
 		--spawn-backend --interpreter "$interpreter" \
@@ -26,5 +31,31 @@ sh_test()
 		--mem-write DB:1:5:16:5 --mem-write T:0:0 \
 		--mem-write Z:1:0
 
+	infomsg "----- Testing CPU state snapshots"
+	local tmp_snapshot="$(maketemp snapshot)"
+	run_test "$interpreter" "$basedir/tc000_base/EXAMPLE.awlpro" \
+		--spawn-backend --interpreter "$interpreter" \
+		--connect-to localhost:$(get_port) \
+		--snapshot-save "$tmp_snapshot"
+	run_test "$interpreter" "$basedir/tc000_base/EXAMPLE.awlpro" \
+		--spawn-backend --interpreter "$interpreter" \
+		--connect-to localhost:$(get_port) \
+		--snapshot-load "$tmp_snapshot"
+
+	infomsg "----- Testing multi-instance server"
+	local port="$(get_port)"
+	"$interpreter" "$rootdir/awlsim-server" --loglevel 0 \
+		--listen localhost:$port --instances 3 --workers 2 &
+	local server_pid=$!
+	for instance in 0 2; do
+		run_test "$interpreter" "$basedir/tc000_base/EXAMPLE.awlpro" \
+			--connect-to localhost:$port --instance $instance
+	done
+	"$interpreter" "$rootdir/awlsim-client" --loglevel 0 \
+		--connect localhost:$port --instance 3 --stats >/dev/null 2>&1 &&\
+		test_failed "awlsim-client accepted a nonexistent CPU instance"
+	kill $server_pid
+	wait $server_pid
+
 	infomsg -n "--- Finished coreserver tests "
 }